@@ -52,6 +52,18 @@ def _post(path: str, json: Optional[Dict] = None, tenant_id: Optional[str] = Non
         return {"success": False, "error": str(e)}
 
 
+def _invalidate_graph_cache(tenant_id: str, out: Dict[str, Any]) -> None:
+    """Após sync bem-sucedido, o subgrafo do tenant em cache no Core deixa de valer."""
+    if not out.get("success"):
+        return
+    try:
+        from core.services.cognitive_core.reality.graph_context import invalidate_graph_snippet
+
+        invalidate_graph_snippet(tenant_id)
+    except Exception as e:
+        logger.debug("graph cache invalidation skipped: %s", e)
+
+
 def graph_status(tenant_id: str) -> Dict[str, Any]:
     """GET /api/v1/graph/status/ — status do grafo + health Neo4j."""
     out = _get("/api/v1/graph/status/", tenant_id=tenant_id)
@@ -63,6 +75,7 @@ def graph_sync_full(tenant_id: str) -> Dict[str, Any]:
     """POST /api/v1/graph/sync/full/ — sync completo Postgres → Neo4j."""
     out = _post("/api/v1/graph/sync/full/", tenant_id=tenant_id)
     out.setdefault("success", "error" not in out)
+    _invalidate_graph_cache(tenant_id, out)
     return out
 
 
@@ -70,6 +83,7 @@ def graph_sync_incremental(tenant_id: str) -> Dict[str, Any]:
     """POST /api/v1/graph/sync/incremental/ — sync incremental."""
     out = _post("/api/v1/graph/sync/incremental/", tenant_id=tenant_id)
     out.setdefault("success", "error" not in out)
+    _invalidate_graph_cache(tenant_id, out)
     return out
 
 
@@ -287,8 +287,8 @@ def create_job(request):
 
         # Enfileirar processamento
         try:
-            from app_creative_engine.tasks import process_creative_job
-            process_creative_job.delay(str(job.id))
+            from app_creative_engine.tasks import dispatch_creative_job
+            dispatch_creative_job(job.id)
         except Exception as e:
             job.status = 'failed'
             job.error_message = f'Erro ao enfileirar: {e}'
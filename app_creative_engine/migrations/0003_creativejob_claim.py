@@ -0,0 +1,23 @@
+# Generated manually: dono e instante da reclamação do CreativeJob pelo worker
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_creative_engine', '0002_creativejob_creativejoboutput'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creativejob',
+            name='claimed_by',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='creativejob',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
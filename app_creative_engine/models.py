@@ -130,6 +130,10 @@ class CreativeJob(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Reclamação pelo worker (tasks.py): id da tarefa Celery e último sinal de vida
+    claimed_by = models.CharField(max_length=255, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
     class Meta:
         db_table = 'creative_job'
         ordering = ['-created_at']
@@ -1,12 +1,116 @@
 """
 Celery tasks do Creative Engine - processamento assíncrono de jobs
+
+Cada processo worker carrega a sessão rembg uma vez (warm-up em ``worker_process_init``,
+CREATIVE_ENGINE_WARMUP) e reutiliza-a em todas as tarefas. ``process_creative_job_batch``
+processa vários jobs em fila de uma vez. Os tempos por etapa ficam em
+``CreativeJob.metadata['stage_timings_ms']``.
+
+Despacho (``dispatch_creative_job``, chamado pela API ao criar o job): com
+CREATIVE_ENGINE_BATCH_WINDOW_S > 0 agenda ``drain_creative_jobs`` para daqui a essa janela, que
+junta os jobs em fila em lotes de CREATIVE_ENGINE_BATCH_SIZE; com 0, uma tarefa por job. Todas
+as tarefas reclamam o job de forma atómica (queued → processing, com ``claimed_by`` = id da
+tarefa) e ignoram os que não reclamaram. Com ``task_acks_late`` uma tarefa cujo worker morreu é
+reentregue com o mesmo id e volta a reclamar os seus jobs; um job em ``processing`` sem sinal de
+vida (``claimed_at``, renovado a cada mudança de etapa) há mais de CREATIVE_ENGINE_CLAIM_TIMEOUT_S
+pode ser reclamado por qualquer tarefa, e ``drain_creative_jobs`` devolve-o à fila.
 """
 import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
 from celery import shared_task
+from celery.signals import worker_process_init
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+BATCH_WINDOW_S = float(os.environ.get('CREATIVE_ENGINE_BATCH_WINDOW_S', '2'))
+BATCH_SIZE = max(1, int(os.environ.get('CREATIVE_ENGINE_BATCH_SIZE', '8')))
+# Máximo de lotes despachados por cada execução do drain
+DRAIN_MAX_BATCHES = 10
+CLAIM_TIMEOUT_S = float(os.environ.get('CREATIVE_ENGINE_CLAIM_TIMEOUT_S', '900'))
+
+
+@worker_process_init.connect
+def _warm_up_creative_models(**kwargs):
+    """Carrega o modelo de remoção de fundo no arranque do processo worker."""
+    if os.environ.get('CREATIVE_ENGINE_WARMUP', 'true').lower() not in ('true', '1', 'yes'):
+        return
+    try:
+        from services.creative_engine_service.creation.background_removal import warm_up
+        warm_up()
+    except Exception as e:
+        logger.warning(f"Warm-up do Creative Engine falhou: {e}")
+
+
+def _media_settings():
+    """(base_url, base_dir, media_base) a partir do settings."""
+    from django.conf import settings
+
+    base_url = getattr(settings, 'SINAPUM_CORE_BASE_URL', '') or ''
+    base_dir = Path(getattr(settings, 'BASE_DIR', '.'))
+    media_root = Path(getattr(settings, 'MEDIA_ROOT', 'media'))
+    if not media_root.is_absolute():
+        media_root = base_dir / media_root
+    return base_url, base_dir, str(media_root / 'creative_outputs')
+
+
+def _resolve_image_path(image_path, base_dir):
+    """Resolver path da imagem (pode ser relativo a BASE_DIR ou absoluto)"""
+    if not Path(image_path).is_absolute():
+        return str(Path(base_dir) / image_path) if base_dir else image_path
+    return image_path
+
+
+def _save_outputs(job, outputs, timings):
+    from app_creative_engine.models import CreativeJobOutput
+
+    for out in outputs:
+        CreativeJobOutput.objects.create(
+            job=job,
+            style=out.get('style', ''),
+            template_id=out.get('template_id', ''),
+            image_url=out.get('image_url', ''),
+            thumbnail_url=out.get('thumbnail_url'),
+            metadata=out.get('metadata', {}),
+        )
+    if timings:
+        from app_creative_engine.models import CreativeJob
+
+        job = CreativeJob.objects.get(id=job.id)
+        job.metadata = {**(job.metadata or {}), 'stage_timings_ms': timings}
+        job.save(update_fields=['metadata', 'updated_at'])
+
+
+def _stale_claim():
+    """Jobs em processing sem sinal de vida há mais de CLAIM_TIMEOUT_S (worker morto)."""
+    from django.db.models import Q
+
+    stale = timezone.now() - timedelta(seconds=CLAIM_TIMEOUT_S)
+    # claimed_at vazio: job reclamado antes de existir o campo
+    return Q(status='processing') & (Q(claimed_at__lt=stale) | Q(claimed_at__isnull=True, updated_at__lt=stale))
+
+
+def _claim_job(job_id, owner):
+    """
+    Reclama o job para a tarefa ``owner`` de forma atómica: em fila, já desta tarefa
+    (reentrega com acks_late) ou abandonado. False se outra tarefa o tem.
+    """
+    from django.db.models import Q
+
+    from app_creative_engine.models import CreativeJob
+
+    claimable = Q(status='queued') | _stale_claim()
+    if owner:
+        claimable |= Q(status='processing', claimed_by=owner)
+    return bool(
+        CreativeJob.objects.filter(claimable, id=job_id).update(
+            status='processing', claimed_by=owner or '', claimed_at=timezone.now()
+        )
+    )
+
 
 def _update_job_status(job_id, status, stage='', progress=0, description='', error=None):
     """Atualiza status do job no banco"""
@@ -24,6 +128,8 @@ def _update_job_status(job_id, status, stage='', progress=0, description='', err
             job.error_message = error
         if status == 'completed':
             job.completed_at = timezone.now()
+        if status == 'processing':
+            job.claimed_at = timezone.now()  # sinal de vida
         job.save()
     except Exception as e:
         logger.warning(f"Erro ao atualizar job {job_id}: {e}")
@@ -36,49 +142,28 @@ def process_creative_job(self, job_id: str):
     Enfileirado quando usuário envia foto.
     """
     try:
-        from app_creative_engine.models import CreativeJob, CreativeJobOutput
-        from django.conf import settings
+        from app_creative_engine.models import CreativeJob
         from services.creative_engine_service.creation import CreativeJobProcessor
 
-        job = CreativeJob.objects.get(id=job_id)
-        if job.status not in ('queued', 'processing'):
-            logger.info(f"Job {job_id} já processado: {job.status}")
+        if not _claim_job(job_id, self.request.id):
+            logger.info(f"Job {job_id} não encontrado, reclamado por outra tarefa ou já processado; ignorado")
             return str(job_id)
+        job = CreativeJob.objects.get(id=job_id)
 
-        job.status = 'processing'
-        job.save()
-
-        base_url = getattr(settings, 'SINAPUM_CORE_BASE_URL', '') or ''
-        base_dir = Path(getattr(settings, 'BASE_DIR', '.'))
-        media_root = Path(getattr(settings, 'MEDIA_ROOT', 'media'))
-        if not media_root.is_absolute():
-            media_root = base_dir / media_root
-        media_base = str(media_root / 'creative_outputs')
-
-        # Resolver path da imagem (pode ser relativo a BASE_DIR ou absoluto)
-        from pathlib import Path
-        img_path = job.image_path
-        if not Path(img_path).is_absolute():
-            img_path = str(Path(base_dir) / img_path) if base_dir else img_path
+        base_url, base_dir, media_base = _media_settings()
+        img_path = _resolve_image_path(job.image_path, base_dir)
 
+        timings = {}
         processor = CreativeJobProcessor(media_base=media_base)
         outputs = processor.process(
             job_id=str(job_id),
             image_path=img_path,
             update_status_callback=_update_job_status,
             base_url=base_url,
+            timings=timings,
         )
 
-        for out in outputs:
-            CreativeJobOutput.objects.create(
-                job=job,
-                style=out.get('style', ''),
-                template_id=out.get('template_id', ''),
-                image_url=out.get('image_url', ''),
-                thumbnail_url=out.get('thumbnail_url'),
-                metadata=out.get('metadata', {}),
-            )
-
+        _save_outputs(job, outputs, timings)
         _update_job_status(str(job_id), 'completed', 'done', 100, job.description, None)
         return str(job_id)
 
@@ -89,3 +174,86 @@ def process_creative_job(self, job_id: str):
             logger.exception(f"Erro ao processar job {job_id}")
             _update_job_status(str(job_id), 'failed', 'error', 0, '', str(e))
         raise
+
+
+@shared_task(bind=True)
+def process_creative_job_batch(self, job_ids):
+    """
+    Processa vários jobs em fila numa só tarefa (mesma sessão rembg, análises em paralelo).
+    Alternativa a ``process_creative_job`` para envios em lote: um job é reclamado
+    (queued → processing) antes de entrar no lote, para não ser processado duas vezes.
+    """
+    from app_creative_engine.models import CreativeJob
+    from services.creative_engine_service.creation import CreativeJobProcessor
+
+    base_url, base_dir, media_base = _media_settings()
+    claimed = []
+    for job_id in job_ids:
+        if _claim_job(job_id, self.request.id):
+            claimed.append(CreativeJob.objects.get(id=job_id))
+        else:
+            logger.info(f"Job {job_id} fora da fila; ignorado no lote")
+    if not claimed:
+        return []
+
+    try:
+        processor = CreativeJobProcessor(media_base=media_base)
+        results = processor.process_batch(
+            [{'job_id': str(job.id), 'image_path': _resolve_image_path(job.image_path, base_dir)} for job in claimed],
+            update_status_callback=_update_job_status,
+            base_url=base_url,
+        )
+    except Exception as e:
+        # Os jobs reclamados não podem ficar presos em 'processing'
+        logger.exception(f"Lote de {len(claimed)} jobs falhou")
+        for job in claimed:
+            _update_job_status(str(job.id), 'failed', 'error', 0, '', str(e))
+        raise
+
+    done = []
+    for job in claimed:
+        result = results.get(str(job.id)) or {}
+        try:
+            _save_outputs(job, result.get('outputs') or [], result.get('timings'))
+            done.append(str(job.id))
+        except Exception as e:
+            logger.exception(f"Erro ao gravar outputs do job {job.id}")
+            _update_job_status(str(job.id), 'failed', 'error', 0, '', str(e))
+    return done
+
+
+@shared_task
+def drain_creative_jobs():
+    """
+    Junta os jobs em fila (mais antigos primeiro) em lotes de BATCH_SIZE e despacha cada lote
+    para ``process_creative_job_batch``. Drains concorrentes podem repetir ids: o lote que não
+    reclamar um job ignora-o. Antes disso devolve à fila os jobs presos em ``processing`` (worker
+    morto sem reentrega). Agendado também no beat (``celery_app``) para esta varredura correr
+    sem novos envios.
+    """
+    from app_creative_engine.models import CreativeJob
+
+    stuck = CreativeJob.objects.filter(_stale_claim()).update(status='queued', claimed_by='', claimed_at=None)
+    if stuck:
+        logger.warning(f"{stuck} job(s) presos em processing devolvidos à fila")
+    job_ids = [
+        str(job_id)
+        for job_id in CreativeJob.objects.filter(status='queued')
+        .order_by('created_at')
+        .values_list('id', flat=True)[: BATCH_SIZE * DRAIN_MAX_BATCHES]
+    ]
+    batches = [job_ids[i:i + BATCH_SIZE] for i in range(0, len(job_ids), BATCH_SIZE)]
+    for batch in batches:
+        process_creative_job_batch.delay(batch)
+    return len(batches)
+
+
+def dispatch_creative_job(job_id):
+    """
+    Enfileira o processamento de um job acabado de criar: micro-lote (drain agendado para o fim
+    da janela, que apanha também os jobs criados entretanto) ou tarefa própria sem janela.
+    """
+    if BATCH_WINDOW_S > 0:
+        drain_creative_jobs.apply_async(countdown=BATCH_WINDOW_S)
+    else:
+        process_creative_job.delay(str(job_id))
@@ -5,3 +5,6 @@ class AppInboundEventsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app_inbound_events"
     verbose_name = "Inbound Events"
+
+    def ready(self):
+        from . import signals  # noqa: F401 — contadores operacionais em janela
@@ -0,0 +1,280 @@
+"""
+Contadores operacionais em janela deslizante (Redis), mantidos por sinais nos modelos.
+
+Substitui as agregações de 24h (COUNT / GROUP BY status) feitas a cada mensagem em
+``fetch_core_local_operational_metrics``:
+
+- ``opcount:v1:m:{minuto}``: hash por minuto (epoch // 60) com os incrementos desse minuto
+  (``decision_logs``, ``inbound``, ``status:<STATUS>``). Eventos contam no minuto de
+  ``received_at``; uma mudança de status move a contagem entre campos desse minuto.
+- ``opcount:v1:total``: totais da janela já somados + ``_swept`` (último minuto que saiu da
+  janela) + ``_ready``. A leitura subtrai os minutos que saíram da janela desde a última
+  leitura e devolve os totais: custo constante por leitura (amortizado por minuto decorrido).
+
+Os totais só são usados depois de ``rebuild_operational_counters`` (management command), que
+reconstrói buckets e totais a partir do histórico; até lá, ou sem Redis, quem lê recorre ao ORM.
+Se as leituras pararem mais tempo do que a margem de expiração dos buckets, os totais deixam
+de ser fiáveis: ficam ``_ready=0`` e é preciso voltar a correr o comando.
+
+Um incremento que falha (Redis em baixo, timeout) perde-se e os totais passariam a divergir do
+ORM sem ninguém saber. O processo guarda essa falha e, na primeira chamada seguinte que chega
+ao Redis (``record`` ou leitura), marca ``_ready=0``: as leituras voltam ao ORM até nova
+reconstrução. Correr ``rebuild_operational_counters`` periodicamente (cron, ex.: a cada hora)
+repõe os contadores; cobre também falhas de processos que terminaram antes de as assinalar.
+
+Configuração: COGNITIVE_OPCOUNTERS_ENABLED (true), COGNITIVE_OPCOUNTERS_WINDOW_HOURS (24).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "opcount:v1"
+TOTAL_KEY = f"{PREFIX}:total"
+BUCKET_PREFIX = f"{PREFIX}:m:"
+# Buckets vivem a janela + esta margem: leituras mais espaçadas do que isto invalidam os totais
+BUCKET_MARGIN_MINUTES = 2 * 24 * 60
+
+FIELD_DECISION_LOGS = "decision_logs"
+FIELD_INBOUND = "inbound"
+STATUS_FIELD_PREFIX = "status:"
+
+# KEYS[1] = totais; ARGV: minuto, prefixo dos buckets, ttl do bucket (s), depois pares campo/delta
+_INCR_SCRIPT = """
+local minute = tonumber(ARGV[1])
+local bucket = ARGV[2] .. ARGV[1]
+local swept = tonumber(redis.call('HGET', KEYS[1], '_swept') or '-1')
+for i = 4, #ARGV, 2 do
+    redis.call('HINCRBY', bucket, ARGV[i], ARGV[i + 1])
+    if minute > swept then
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+redis.call('EXPIRE', bucket, tonumber(ARGV[3]))
+return 1
+"""
+
+# KEYS[1] = totais; ARGV: minuto de corte (sai da janela se <= corte), prefixo, máximo de minutos a varrer
+_READ_SCRIPT = """
+if redis.call('HGET', KEYS[1], '_ready') ~= '1' then
+    return false
+end
+local swept = tonumber(redis.call('HGET', KEYS[1], '_swept') or '-1')
+local cutoff = tonumber(ARGV[1])
+if swept < cutoff then
+    if cutoff - swept > tonumber(ARGV[3]) then
+        redis.call('HSET', KEYS[1], '_ready', '0')
+        return false
+    end
+    for m = swept + 1, cutoff do
+        local vals = redis.call('HGETALL', ARGV[2] .. m)
+        for i = 1, #vals, 2 do
+            redis.call('HINCRBY', KEYS[1], vals[i], -tonumber(vals[i + 1]))
+        end
+    end
+    redis.call('HSET', KEYS[1], '_swept', cutoff)
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+_SCRIPTS: Dict[int, Tuple[Any, Any]] = {}
+# Incremento perdido neste processo ainda não assinalado no Redis (ver ``_flush_drift``)
+_DRIFTED = False
+
+
+def counters_enabled() -> bool:
+    return (os.getenv("COGNITIVE_OPCOUNTERS_ENABLED") or "true").strip().lower() in ("1", "true", "yes", "on")
+
+
+def window_hours() -> int:
+    return int(os.getenv("COGNITIVE_OPCOUNTERS_WINDOW_HOURS", "24"))
+
+
+def _client() -> Optional[Any]:
+    if not counters_enabled():
+        return None
+    try:
+        from services.redis_client import get_redis_client
+    except Exception:
+        return None
+    return get_redis_client()
+
+
+def _scripts(client: Any) -> Tuple[Any, Any]:
+    scripts = _SCRIPTS.get(id(client))
+    if scripts is None:
+        scripts = (client.register_script(_INCR_SCRIPT), client.register_script(_READ_SCRIPT))
+        _SCRIPTS[id(client)] = scripts
+    return scripts
+
+
+def minute_of(dt: datetime) -> int:
+    return int(dt.timestamp() // 60)
+
+
+def _bucket_ttl_s() -> int:
+    return (window_hours() * 60 + BUCKET_MARGIN_MINUTES) * 60
+
+
+def status_field(status: str) -> str:
+    return f"{STATUS_FIELD_PREFIX}{status}"
+
+
+def _flush_drift(client: Any) -> None:
+    """Assinala no Redis (``_ready=0``) um incremento que falhou antes neste processo."""
+    global _DRIFTED
+    if _DRIFTED:
+        client.hset(TOTAL_KEY, "_ready", 0)
+        _DRIFTED = False
+        logger.warning(
+            "operational counters: incremento perdido, totais desativados até rebuild_operational_counters"
+        )
+
+
+def record(minute: int, deltas: Iterable[Tuple[str, int]]) -> bool:
+    """Aplica incrementos ao bucket do minuto (e aos totais se o minuto está na janela)."""
+    global _DRIFTED
+    args = []
+    for field, delta in deltas:
+        if delta:
+            args.extend([field, int(delta)])
+    if not args:
+        return True
+    if not counters_enabled():
+        return False
+    client = _client()
+    if client is None:
+        _DRIFTED = True
+        return False
+    try:
+        _flush_drift(client)
+        incr, _ = _scripts(client)
+        incr(keys=[TOTAL_KEY], args=[minute, BUCKET_PREFIX, _bucket_ttl_s(), *args])
+        return True
+    except Exception as e:
+        _DRIFTED = True
+        logger.warning("operational counters: incremento falhou: %s", e)
+        return False
+
+
+def read_window_counts() -> Optional[Dict[str, int]]:
+    """
+    Totais da janela (campo -> contagem) ou None se os contadores não estão prontos / sem Redis.
+    """
+    client = _client()
+    if client is None:
+        return None
+    cutoff = int(time.time() // 60) - window_hours() * 60
+    try:
+        _flush_drift(client)
+        _, read = _scripts(client)
+        raw = read(keys=[TOTAL_KEY], args=[cutoff, BUCKET_PREFIX, BUCKET_MARGIN_MINUTES])
+    except Exception as e:
+        logger.warning("operational counters: leitura falhou: %s", e)
+        return None
+    if not raw:
+        return None
+    if isinstance(raw, dict):
+        items = raw.items()
+    else:
+        items = zip(raw[0::2], raw[1::2])
+    out: Dict[str, int] = {}
+    for field, value in items:
+        field = field.decode() if isinstance(field, bytes) else str(field)
+        if not field.startswith("_"):
+            out[field] = int(value)
+    return out
+
+
+def operational_metrics_from_counters(hours: int) -> Optional[Dict[str, Any]]:
+    """Mesmo formato de ``fetch_core_local_operational_metrics`` a partir dos contadores."""
+    if hours != window_hours():
+        return None
+    counts = read_window_counts()
+    if counts is None:
+        return None
+    return {
+        "source": "core_counters",
+        "window_hours": hours,
+        "decision_logs_count": max(0, counts.get(FIELD_DECISION_LOGS, 0)),
+        "inbound_by_status": {
+            field[len(STATUS_FIELD_PREFIX):]: c
+            for field, c in sorted(counts.items())
+            if field.startswith(STATUS_FIELD_PREFIX) and c > 0
+        },
+        "inbound_recent_count": max(0, counts.get(FIELD_INBOUND, 0)),
+    }
+
+
+def rebuild_from_history(now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Reconstrói buckets e totais da janela a partir do ORM (GROUP BY minuto) e marca os
+    contadores como prontos. Incrementos concorrentes durante a reconstrução podem perder-se
+    (ordem de grandeza: as escritas entre a consulta e a escrita no Redis). Pensado também para
+    correr periodicamente (cron), repondo totais desativados por incrementos perdidos.
+    """
+    global _DRIFTED
+    from django.db.models import Count
+    from django.db.models.functions import TruncMinute
+    from django.utils import timezone
+
+    from app_inbound_events.models import DecisionLog, InboundEvent
+
+    client = _client()
+    if client is None:
+        raise RuntimeError("Redis indisponível ou contadores desativados (COGNITIVE_OPCOUNTERS_ENABLED)")
+
+    now = now or timezone.now()
+    cutoff = minute_of(now) - window_hours() * 60
+    since = datetime.fromtimestamp((cutoff + 1) * 60, tz=dt_timezone.utc)
+    if not timezone.is_aware(now):
+        since = timezone.make_naive(since)
+
+    buckets: Dict[int, Dict[str, int]] = {}
+    totals: Dict[str, int] = {}
+
+    def add(minute: int, field: str, count: int) -> None:
+        bucket = buckets.setdefault(minute, {})
+        bucket[field] = bucket.get(field, 0) + count
+        totals[field] = totals.get(field, 0) + count
+
+    inbound = (
+        InboundEvent.objects.filter(received_at__gte=since)
+        .annotate(minute=TruncMinute("received_at"))
+        .values("minute", "status")
+        .annotate(c=Count("id"))
+    )
+    for row in inbound:
+        minute = minute_of(row["minute"])
+        add(minute, FIELD_INBOUND, row["c"])
+        add(minute, status_field(row["status"]), row["c"])
+
+    decisions = (
+        DecisionLog.objects.filter(recorded_at__gte=since)
+        .annotate(minute=TruncMinute("recorded_at"))
+        .values("minute")
+        .annotate(c=Count("id"))
+    )
+    for row in decisions:
+        add(minute_of(row["minute"]), FIELD_DECISION_LOGS, row["c"])
+
+    ttl = _bucket_ttl_s()
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(TOTAL_KEY)
+    for minute in range(cutoff + 1, minute_of(now) + 1):
+        pipe.delete(f"{BUCKET_PREFIX}{minute}")
+    for minute, fields in buckets.items():
+        key = f"{BUCKET_PREFIX}{minute}"
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, ttl)
+    pipe.hset(TOTAL_KEY, mapping={**totals, "_swept": cutoff, "_ready": 1})
+    pipe.execute()
+    # Falhas anteriores deste processo já estão refletidas no histórico reconstruído
+    _DRIFTED = False
+
+    return {"window_hours": window_hours(), "buckets": len(buckets), "totals": totals}
@@ -0,0 +1,31 @@
+"""
+Reconstrói os contadores operacionais em janela (Redis) a partir do histórico de
+InboundEvent / DecisionLog. Correr no deploy inicial e sempre que o Redis perder os dados
+ou os contadores ficarem inválidos (leituras caem para o ORM até lá).
+
+    python manage.py rebuild_operational_counters
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_inbound_events import counters
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os contadores operacionais em janela (InboundEvent / DecisionLog) a partir do histórico."
+
+    def handle(self, *args, **options):
+        try:
+            result = counters.rebuild_from_history()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        totals = result["totals"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Contadores reconstruídos: janela {result['window_hours']}h, {result['buckets']} minutos, "
+                f"{totals.get(counters.FIELD_INBOUND, 0)} eventos, "
+                f"{totals.get(counters.FIELD_DECISION_LOGS, 0)} decisões."
+            )
+        )
@@ -0,0 +1,52 @@
+"""
+Signals - Inbound Events
+
+Mantém os contadores operacionais em janela (counters.py) a cada criação, mudança de status ou
+remoção de InboundEvent / DecisionLog. Os incrementos correm depois do commit da transação.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters
+from .models import DecisionLog, InboundEvent
+
+
+@receiver(post_init, sender=InboundEvent)
+def remember_inbound_status(sender, instance, **kwargs):
+    instance._counted_status = instance.status
+
+
+@receiver(post_save, sender=InboundEvent)
+def count_inbound_save(sender, instance, created, **kwargs):
+    previous = None if created else instance._counted_status
+    if not created and previous == instance.status:
+        return
+    instance._counted_status = instance.status
+    deltas = [(counters.status_field(instance.status), 1)]
+    if created:
+        deltas.append((counters.FIELD_INBOUND, 1))
+    else:
+        deltas.append((counters.status_field(previous), -1))
+    minute = counters.minute_of(instance.received_at)
+    transaction.on_commit(lambda: counters.record(minute, deltas))
+
+
+@receiver(post_delete, sender=InboundEvent)
+def count_inbound_delete(sender, instance, **kwargs):
+    minute = counters.minute_of(instance.received_at)
+    deltas = [(counters.FIELD_INBOUND, -1), (counters.status_field(instance._counted_status), -1)]
+    transaction.on_commit(lambda: counters.record(minute, deltas))
+
+
+@receiver(post_save, sender=DecisionLog)
+def count_decision_log(sender, instance, created, **kwargs):
+    if created:
+        minute = counters.minute_of(instance.recorded_at)
+        transaction.on_commit(lambda: counters.record(minute, [(counters.FIELD_DECISION_LOGS, 1)]))
+
+
+@receiver(post_delete, sender=DecisionLog)
+def uncount_decision_log(sender, instance, **kwargs):
+    minute = counters.minute_of(instance.recorded_at)
+    transaction.on_commit(lambda: counters.record(minute, [(counters.FIELD_DECISION_LOGS, -1)]))
@@ -7,6 +7,8 @@ class AppMcpToolRegistryConfig(AppConfig):
     verbose_name = 'MCP Tool Registry'
 
     def ready(self):
+        from . import signals  # noqa: F401 — invalidação do cache de planos
+        signals.connect_prompt_template_signals()
         try:
             from adapters.register_resources import register_all_resource_handlers
             register_all_resource_handlers()
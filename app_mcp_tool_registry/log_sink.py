@@ -0,0 +1,174 @@
+"""
+Escrita assíncrona e em lote dos ToolCallLog.
+
+``execute_tool`` deixa de fazer um INSERT síncrono por chamada: os registos vão para uma fila
+limitada em memória e uma thread de fundo grava-os com ``bulk_create`` quando a fila atinge
+MCP_LOG_BATCH_SIZE ou a cada MCP_LOG_FLUSH_INTERVAL_S segundos. Com a fila cheia o registo é
+gravado de forma síncrona (backpressure, sem perda de auditoria). Se o ``bulk_create`` falhar
+(um registo inválido, ligação partida) o lote é regravado registo a registo; só os que falham
+também assim se perdem, contados em ``stats["dropped"]``. MCP_LOG_ASYNC=False desliga o buffer
+(INSERT direto, como antes).
+"""
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import ToolCallLog
+
+logger = logging.getLogger(__name__)
+
+LOG_ASYNC = bool(getattr(settings, "MCP_LOG_ASYNC", True))
+LOG_BATCH_SIZE = int(getattr(settings, "MCP_LOG_BATCH_SIZE", 200))
+LOG_FLUSH_INTERVAL_S = float(getattr(settings, "MCP_LOG_FLUSH_INTERVAL_S", 1.0))
+LOG_QUEUE_MAX = int(getattr(settings, "MCP_LOG_QUEUE_MAX", 10000))
+
+_FIELDS = {f.name for f in ToolCallLog._meta.concrete_fields} - {"id", "created_at"}
+_NOT_NULL_FIELDS = {f.name for f in ToolCallLog._meta.concrete_fields if not f.null}
+
+
+def build_log(fields: Dict[str, Any]) -> ToolCallLog:
+    """ToolCallLog a partir de um dict (ignora chaves desconhecidas; usado também pelo ingest HTTP)."""
+    # None em campos NOT NULL → default do model (ex.: status_code=200, client_key="")
+    data = {
+        k: v for k, v in fields.items()
+        if k in _FIELDS and not (v is None and k in _NOT_NULL_FIELDS)
+    }
+    return ToolCallLog(**data)
+
+
+class ToolCallLogSink:
+    """Fila limitada + thread de flush com bulk_create."""
+
+    def __init__(
+        self,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL_S,
+        max_queue: int = LOG_QUEUE_MAX,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[ToolCallLog]" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "sync_fallback": 0,
+            "errors": 0,
+            "row_fallback": 0,
+            "dropped": 0,
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="toolcalllog-sink", daemon=True)
+                self._thread.start()
+
+    def submit(self, **fields: Any) -> None:
+        entry = build_log(fields)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.stats["sync_fallback"] += 1
+            self._write([entry])
+            return
+        self.stats["enqueued"] += 1
+        self._ensure_thread()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _drain(self) -> List[ToolCallLog]:
+        batch: List[ToolCallLog] = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[ToolCallLog]) -> int:
+        """Grava o lote; devolve quantos registos ficaram gravados."""
+        try:
+            ToolCallLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"ToolCallLog bulk_create falhou ({len(batch)} registos), a gravar um a um: {e}")
+            return self._write_rows(batch)
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return len(batch)
+
+    def _write_rows(self, batch: List[ToolCallLog]) -> int:
+        """Fallback do bulk_create: INSERT por registo, para não perder o lote por um só registo."""
+        self.stats["row_fallback"] += 1
+        # ligação partida pelo erro anterior: reabrir antes de tentar de novo (nunca a meio de
+        # uma transação do pedido, no caminho síncrono de submit)
+        if not connection.in_atomic_block:
+            close_old_connections()
+        written = 0
+        for entry in batch:
+            entry.pk = None
+            entry._state.adding = True
+            try:
+                entry.save(force_insert=True)
+                written += 1
+            except Exception as e:
+                self.stats["dropped"] += 1
+                logger.error(f"ToolCallLog descartado (request_id={entry.request_id}): {e}")
+        self.stats["written"] += written
+        return written
+
+    def flush(self) -> int:
+        """Grava tudo o que está na fila; devolve o número de registos gravados."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                written += self._write(batch)
+        return written
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # thread fora do ciclo request/response: fechar ligações velhas/partidas
+                close_old_connections()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+_SINK = ToolCallLogSink()
+atexit.register(_SINK.flush)
+
+
+def enqueue_tool_call_log(**fields: Any) -> None:
+    """Regista uma chamada de tool (buffer assíncrono ou INSERT direto com MCP_LOG_ASYNC=False)."""
+    if not LOG_ASYNC:
+        build_log(fields).save()
+        return
+    _SINK.submit(**fields)
+
+
+def log_sink_stats() -> Dict[str, Any]:
+    return {**_SINK.stats, "pending": _SINK.pending(), "async": LOG_ASYNC}
+
+
+def flush_tool_call_logs() -> int:
+    return _SINK.flush()
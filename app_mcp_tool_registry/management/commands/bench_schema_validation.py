@@ -0,0 +1,128 @@
+"""
+Microbenchmark da validação JSON Schema das tools cognitivas (seed_core_cognitive_tools).
+
+Compara, por chamada: jsonschema.validate (comportamento antigo), validador jsonschema
+compilado em cache e, se instalado, fastjsonschema. Não escreve na BD: os schemas são
+recolhidos executando o seed com o registry substituído por stubs.
+
+Uso:
+  python manage.py bench_schema_validation
+  python manage.py bench_schema_validation --iterations 5000 --json
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from jsonschema import ValidationError, validate
+
+from app_mcp_tool_registry.management.commands import seed_core_cognitive_tools as seed
+from app_mcp_tool_registry.schema_validation import CompiledValidator, fastjsonschema
+
+_SAMPLES = {"string": "x", "integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}, "null": None}
+
+
+def _sample(schema: Dict[str, Any]) -> Any:
+    """Instância mínima válida: defaults, obrigatórios e um valor por tipo."""
+    if "default" in schema:
+        return schema["default"]
+    for combinator in ("oneOf", "anyOf", "allOf"):
+        if schema.get(combinator):
+            return _sample(schema[combinator][0])
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = kind[0]
+    if kind != "object":
+        return _SAMPLES.get(kind)
+    props = schema.get("properties", {})
+    return {name: _sample(sub) for name, sub in props.items() if isinstance(sub, dict)}
+
+
+def collect_seed_schemas() -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """(tool, input_schema, output_schema) de cada tool do seed, sem tocar na BD."""
+    collected: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
+
+    def fake_get_or_create(name, defaults=None, **kwargs):
+        return SimpleNamespace(name=name, is_active=True, save=lambda: None), True
+
+    def record(tool, version, *, input_schema, output_schema, client):
+        collected.append((tool.name, input_schema, output_schema))
+
+    tool_model = mock.MagicMock()
+    tool_model.objects.get_or_create.side_effect = fake_get_or_create
+    with mock.patch.object(seed, "Tool", tool_model), \
+            mock.patch.object(seed, "_ensure_mrfoo_client", return_value=None), \
+            mock.patch.object(seed, "_upsert_tool_version", side_effect=record):
+        seed.Command(stdout=io.StringIO()).handle()
+    return collected
+
+
+def _validate_old(data: Any, schema: Dict[str, Any]) -> None:
+    try:
+        validate(instance=data, schema=schema)
+    except ValidationError:
+        pass
+
+
+def _per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = "Mede o custo por chamada da validação de input/output das tools seed (antes/depois)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000, help="Validações por schema e backend")
+        parser.add_argument("--json", action="store_true", help="Saída JSON")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options["iterations"])
+        rows = []
+        for tool, input_schema, output_schema in collect_seed_schemas():
+            for kind, schema in (("input", input_schema), ("output", output_schema)):
+                if not schema:
+                    continue
+                data = _sample(schema)
+                row = {
+                    "tool": tool,
+                    "schema": kind,
+                    "validate_us": _per_call_us(lambda: _validate_old(data, schema), iterations),
+                }
+                compiled = CompiledValidator(schema, backend="jsonschema")
+                row["compiled_us"] = _per_call_us(lambda: compiled.first_error(data), iterations)
+                if fastjsonschema is not None:
+                    fast = CompiledValidator(schema, backend="fastjsonschema")
+                    row["fast_us"] = _per_call_us(lambda: fast.first_error(data), iterations)
+                rows.append(row)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        header = f"{'tool':<40}{'schema':<8}{'validate µs':>13}{'compiled µs':>13}{'fast µs':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows:
+            fast = f"{row['fast_us']:.1f}" if "fast_us" in row else "-"
+            self.stdout.write(
+                f"{row['tool']:<40}{row['schema']:<8}{row['validate_us']:>13.1f}{row['compiled_us']:>13.1f}{fast:>10}"
+            )
+        if rows:
+            total_old = sum(r["validate_us"] for r in rows)
+            total_new = sum(r["compiled_us"] for r in rows)
+            self.stdout.write(
+                f"\nTotal: validate {total_old:.1f} µs → compiled {total_new:.1f} µs "
+                f"({total_old / max(total_new, 1e-9):.1f}x)"
+            )
+            if fastjsonschema is not None:
+                total_fast = sum(r["fast_us"] for r in rows)
+                self.stdout.write(f"       fastjsonschema {total_fast:.1f} µs ({total_old / max(total_fast, 1e-9):.1f}x)")
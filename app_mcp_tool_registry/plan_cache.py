@@ -0,0 +1,250 @@
+"""
+Cache em processo de "planos de execução" de tools MCP.
+
+Um plano junta tudo o que ``execute_tool`` precisava de ir buscar ao registry em cada chamada
+(Tool, ToolVersion, ClientApp, allowed_clients e o texto do prompt) para uma chave
+(tool, versão, cliente). Em regime estável uma chamada não faz nenhuma query ao registry.
+
+Invalidação por carimbo de versão: gravações no registry (signals em ``signals.py``) incrementam
+o carimbo local e publicam-no no Redis partilhado (``services.redis_client``), visível a todos
+os workers de todos os hosts; cada worker compara o carimbo no máximo a cada
+MCP_PLAN_CACHE_STAMP_CHECK_S segundos. Se o carimbo partilhado não puder ser lido (Redis em
+baixo / desativado) não há como saber de gravações noutros hosts: os planos são construídos a
+cada chamada (sem cache) e ``registry_version()`` devolve None (respostas sem ETag).
+MCP_PLAN_CACHE_TTL limita a idade de um plano (prompts externos / PromptTemplate).
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from .models import ClientApp, Tool, ToolVersion
+from .schema_validation import get_validator
+from .utils import resolve_prompt_info
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_TTL = float(getattr(settings, "MCP_PLAN_CACHE_TTL", 300))
+PLAN_CACHE_MAX = int(getattr(settings, "MCP_PLAN_CACHE_MAX", 1024))
+STAMP_CHECK_S = float(getattr(settings, "MCP_PLAN_CACHE_STAMP_CHECK_S", 2))
+STAMP_CACHE_KEY = "mcp_registry:plan_version"
+
+
+@dataclass
+class ToolPlan:
+    """Resultado resolvido (e imutável na prática) das lookups do registry para uma chamada."""
+
+    tool_name: str
+    version: str
+    runtime: str
+    config: Dict[str, Any]
+    input_schema: Dict[str, Any]
+    output_schema: Dict[str, Any]
+    input_validator: Any = None
+    output_validator: Any = None
+    prompt_ref: str = ""
+    prompt_text: Optional[str] = None
+    prompt_info: Optional[Dict[str, Any]] = None
+    permission_error: Optional[str] = None
+    stamp: int = 0
+    built_at: float = field(default_factory=time.monotonic)
+
+
+_lock = threading.Lock()
+_plans: Dict[Tuple[str, str, str], ToolPlan] = {}
+_stamp = 0
+_shared_stamp: Optional[int] = None
+_shared_ok = False
+_stamp_checked_at = 0.0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "bypassed": 0}
+
+
+def _stamp_client():
+    try:
+        from services.redis_client import get_redis_client
+
+        return get_redis_client()
+    except Exception:
+        return None
+
+
+def _read_shared_stamp() -> Optional[int]:
+    """
+    Carimbo partilhado no Redis; fixa um novo se a chave não existir (primeiro pedido ou Redis
+    limpo). None se o Redis não estiver acessível.
+    """
+    client = _stamp_client()
+    if client is None:
+        return None
+    try:
+        value = client.get(STAMP_CACHE_KEY)
+        if value is None:
+            client.set(STAMP_CACHE_KEY, int(time.time() * 1000), nx=True)
+            value = client.get(STAMP_CACHE_KEY)
+        return int(value) if value is not None else None
+    except Exception as e:
+        logger.debug(f"Plan cache: carimbo partilhado ilegível: {e}")
+        return None
+
+
+def _sync_stamp() -> Optional[int]:
+    """
+    Carimbo atual; descarta os planos se outro processo gravou no registry. None quando o
+    carimbo partilhado não pôde ser lido: o chamador não deve usar o cache.
+    """
+    global _stamp, _shared_stamp, _shared_ok, _stamp_checked_at
+    now = time.monotonic()
+    if now - _stamp_checked_at < STAMP_CHECK_S:
+        return _stamp if _shared_ok else None
+    _stamp_checked_at = now
+    shared = _read_shared_stamp()
+    with _lock:
+        if shared is None:
+            if _shared_ok:
+                logger.warning("Plan cache: carimbo partilhado indisponível, cache de planos desligado")
+            _shared_ok = False
+            # Ao voltar, o carimbo lido não é comparável com o de antes da falha
+            _plans.clear()
+            _shared_stamp = None
+            return None
+        if _shared_stamp is not None and shared != _shared_stamp:
+            _plans.clear()
+            _stamp += 1
+            _stats["invalidations"] += 1
+        _shared_stamp = shared
+        _shared_ok = True
+        return _stamp
+
+
+def invalidate_plans(reason: str = "") -> None:
+    """Chamado nas gravações do registry: limpa este processo e avisa os restantes."""
+    global _stamp, _shared_stamp, _stamp_checked_at
+    with _lock:
+        _plans.clear()
+        _stamp += 1
+        _stats["invalidations"] += 1
+    client = _stamp_client()
+    try:
+        if client is None:
+            raise RuntimeError("Redis indisponível")
+        # INCR: duas gravações no mesmo milissegundo dão carimbos diferentes; a semente em ms
+        # (SET NX) evita repetir carimbos antigos depois de o Redis ser limpo
+        client.set(STAMP_CACHE_KEY, int(time.time() * 1000), nx=True)
+        _shared_stamp = int(client.incr(STAMP_CACHE_KEY))
+    except Exception as e:
+        # Os outros workers não foram avisados; este volta a ler o carimbo no próximo pedido
+        _stamp_checked_at = 0.0
+        logger.warning(f"Plan cache: carimbo partilhado não publicado: {e}")
+    if reason:
+        logger.debug(f"Plan cache invalidado: {reason}")
+
+
+def registry_version() -> Optional[str]:
+    """
+    Versão atual do registry (carimbo partilhado), usada como ETag dos planos servidos pelo
+    ``/core/tools/resolve/``: muda a cada gravação no registry, em todos os workers.
+    None se o carimbo não puder ser lido (sem ETag: o cliente não deve revalidar).
+    """
+    shared = _read_shared_stamp()
+    return str(shared) if shared is not None else None
+
+
+def _permission_error(tool: Tool, tool_name: str, client_key: str) -> Optional[str]:
+    try:
+        client = ClientApp.objects.get(key=client_key, is_active=True)
+    except ClientApp.DoesNotExist:
+        return f"ClientApp '{client_key}' não encontrado ou inativo"
+    allowed = set(tool.allowed_clients.values_list("pk", flat=True))
+    if allowed and client.pk not in allowed:
+        return f"Cliente '{client_key}' não tem permissão para usar tool '{tool_name}'"
+    return None
+
+
+def build_tool_plan(tool_name: str, version: Optional[str], client_key: Optional[str]) -> ToolPlan:
+    """
+    Lookups do registry para uma chamada (o que execute_tool fazia inline).
+
+    Raises:
+        Tool.DoesNotExist / ToolVersion.DoesNotExist / ValueError como antes.
+    """
+    try:
+        tool = Tool.objects.get(name=tool_name, is_active=True)
+    except Tool.DoesNotExist:
+        raise Tool.DoesNotExist(f"Tool '{tool_name}' não encontrada ou inativa")
+
+    if version:
+        try:
+            tool_version = ToolVersion.objects.get(tool=tool, version=version, is_active=True)
+        except ToolVersion.DoesNotExist:
+            raise ToolVersion.DoesNotExist(
+                f"Versão '{version}' não encontrada ou inativa para tool '{tool_name}'"
+            )
+    else:
+        if not tool.current_version:
+            raise ValueError(f"Tool '{tool_name}' não tem versão atual definida")
+        tool_version = tool.current_version
+
+    safe_config = tool_version.config if isinstance(tool_version.config, dict) else {}
+    prompt_info = None
+    prompt_text = None
+    if tool_version.prompt_ref or safe_config.get("prompt_inline"):
+        prompt_info = resolve_prompt_info(tool_version.prompt_ref, config=safe_config)
+        if prompt_info and prompt_info.get("text"):
+            prompt_text = prompt_info["text"]
+
+    input_schema = tool_version.input_schema or {}
+    output_schema = tool_version.output_schema or {}
+    return ToolPlan(
+        tool_name=tool_name,
+        version=tool_version.version,
+        runtime=tool_version.runtime,
+        config=safe_config,
+        input_schema=input_schema,
+        output_schema=output_schema,
+        input_validator=get_validator(input_schema, tool_name, tool_version.version),
+        output_validator=get_validator(output_schema, tool_name, tool_version.version),
+        prompt_ref=tool_version.prompt_ref or "",
+        prompt_text=prompt_text,
+        prompt_info=prompt_info,
+        permission_error=_permission_error(tool, tool_name, client_key) if client_key else None,
+    )
+
+
+def get_tool_plan(tool_name: str, version: Optional[str] = None, client_key: Optional[str] = None) -> ToolPlan:
+    """Plano em cache para (tool, versão, cliente); constrói-o numa miss."""
+    key = (tool_name, version or "", client_key or "")
+    stamp = _sync_stamp()
+    if stamp is None:
+        _stats["bypassed"] += 1
+        return build_tool_plan(tool_name, version, client_key)
+    plan = _plans.get(key)
+    if plan is not None and plan.stamp == stamp and time.monotonic() - plan.built_at < PLAN_CACHE_TTL:
+        _stats["hits"] += 1
+        return plan
+
+    _stats["misses"] += 1
+    plan = build_tool_plan(tool_name, version, client_key)
+    plan.stamp = stamp
+    # Prompt esperado mas não resolvido (URL em baixo, template em falta): não fixar a falha
+    needs_prompt = bool(plan.prompt_ref or plan.config.get("prompt_inline"))
+    if needs_prompt and not plan.prompt_text:
+        return plan
+    with _lock:
+        if stamp == _stamp:
+            if len(_plans) >= PLAN_CACHE_MAX:
+                _plans.pop(next(iter(_plans)))
+            _plans[key] = plan
+    return plan
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_plans),
+        "stamp": _stamp,
+        "shared_stamp": _shared_ok,
+        "hit_rate": round(_stats["hits"] / total, 4) if total else 0.0,
+    }
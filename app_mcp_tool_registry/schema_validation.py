@@ -0,0 +1,103 @@
+"""
+Validadores JSON Schema pré-compilados.
+
+``jsonschema.validate`` verifica o schema e constrói um validador novo a cada chamada; aqui o
+validador é compilado uma vez por (tool, versão, hash do schema) e reutilizado.
+
+Backend (MCP_SCHEMA_BACKEND):
+- "jsonschema" (padrão): classe de validador do draft declarado, mensagens iguais às de antes.
+- "fastjsonschema": gera código Python para o schema (bem mais rápido); requer o pacote
+  ``fastjsonschema`` e cai para jsonschema se não estiver instalado ou não suportar o schema.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonschema import SchemaError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+try:
+    import fastjsonschema  # type: ignore
+except Exception:  # pragma: no cover - dependência opcional
+    fastjsonschema = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_BACKEND = os.environ.get("MCP_SCHEMA_BACKEND", "jsonschema").lower().strip()
+VALIDATOR_CACHE_MAX = int(os.environ.get("MCP_SCHEMA_CACHE_MAX", "512"))
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(schema, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+class CompiledValidator:
+    """Validador reutilizável; ``first_error`` devolve (mensagem, path) ou None."""
+
+    def __init__(self, schema: Dict[str, Any], backend: str = SCHEMA_BACKEND):
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        self._validator = cls(schema)
+        self._fast = None
+        self.backend = "jsonschema"
+        if backend == "fastjsonschema" and fastjsonschema is not None:
+            try:
+                self._fast = fastjsonschema.compile(schema)
+                self.backend = "fastjsonschema"
+            except Exception as e:
+                logger.debug(f"fastjsonschema não compilou o schema, a usar jsonschema: {e}")
+
+    def first_error(self, data: Any) -> Optional[Tuple[str, List[Any]]]:
+        if self._fast is not None:
+            try:
+                self._fast(data)
+                return None
+            except fastjsonschema.JsonSchemaValueException as e:
+                return e.message, list(e.path or [])[1:]  # path começa em "data"
+        error = best_match(self._validator.iter_errors(data))
+        if error is None:
+            return None
+        return error.message, list(error.path)
+
+
+_lock = threading.Lock()
+_validators: "OrderedDict[Tuple[str, str, str], Optional[CompiledValidator]]" = OrderedDict()
+_stats = {"hits": 0, "compiled": 0}
+
+
+def get_validator(
+    schema: Dict[str, Any], tool: str = "", version: str = ""
+) -> Optional[CompiledValidator]:
+    """
+    Validador em cache para o schema. None sem schema ou com schema inválido (quem chama
+    deve cair no ``jsonschema.validate`` para reportar o SchemaError como antes).
+    """
+    if not schema:
+        return None
+    key = (tool, version, schema_hash(schema))
+    with _lock:
+        if key in _validators:
+            _validators.move_to_end(key)
+            _stats["hits"] += 1
+            return _validators[key]
+    try:
+        validator: Optional[CompiledValidator] = CompiledValidator(schema)
+    except SchemaError:
+        validator = None
+    with _lock:
+        _stats["compiled"] += 1
+        _validators[key] = validator
+        while len(_validators) > VALIDATOR_CACHE_MAX:
+            _validators.popitem(last=False)
+    return validator
+
+
+def validator_cache_stats() -> Dict[str, Any]:
+    return {**_stats, "size": len(_validators), "backend": SCHEMA_BACKEND}
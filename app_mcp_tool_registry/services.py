@@ -9,9 +9,11 @@ import requests
 from typing import Any, Dict, List, Optional
 from django.conf import settings
 # PermissionError é built-in do Python, não precisa importar
-from jsonschema import validate, ValidationError
+from jsonschema import validate
 from .models import Tool, ToolVersion, ToolCallLog, ClientApp
-from .utils import resolve_prompt_info
+from .log_sink import enqueue_tool_call_log
+from .plan_cache import get_tool_plan
+from .schema_validation import get_validator
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +46,12 @@ def validate_input_size(input_data: Dict[str, Any]) -> None:
     logger.debug(f"Input size validated: {input_size} bytes")
 
 
-def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any], schema_name: str = "schema") -> None:
+def validate_json_schema(
+    data: Dict[str, Any],
+    schema: Dict[str, Any],
+    schema_name: str = "schema",
+    validator: Any = None,
+) -> None:
     """
     Valida dados contra um JSON Schema.
     
@@ -52,6 +59,7 @@ def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any], schema_na
         data: Dados a validar
         schema: Schema JSON Schema
         schema_name: Nome do schema para mensagens de erro
+        validator: CompiledValidator de ``schema`` (opcional; senão vem do cache de validadores)
         
     Raises:
         ValueError: Se a validação falhar
@@ -59,14 +67,22 @@ def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any], schema_na
     if not schema:
         return  # Sem schema, não valida
     
-    try:
+    if validator is None:
+        validator = get_validator(schema)
+    if validator is None:
+        # Schema inválido: jsonschema.validate levanta SchemaError como antes
         validate(instance=data, schema=schema)
+        return
+    
+    error = validator.first_error(data)
+    if error is None:
         logger.debug(f"{schema_name} validation passed")
-    except ValidationError as e:
-        error_msg = f"{schema_name} validation failed: {e.message}"
-        if e.path:
-            error_msg += f" (path: {'/'.join(str(p) for p in e.path)})"
-        raise ValueError(error_msg)
+        return
+    message, path = error
+    error_msg = f"{schema_name} validation failed: {message}"
+    if path:
+        error_msg += f" (path: {'/'.join(str(p) for p in path)})"
+    raise ValueError(error_msg)
 
 
 def truncate_payload(payload: Any, max_bytes: int = 10000) -> Any:
@@ -81,22 +97,27 @@ def truncate_payload(payload: Any, max_bytes: int = 10000) -> Any:
         Payload truncado ou mensagem de truncamento
     """
     try:
+        if payload is None:
+            return None
         payload_json = json.dumps(payload, ensure_ascii=False)
+        # len(str) <= bytes UTF-8 <= 4 * len(str): só codifica quando está perto do limite
+        if len(payload_json) * 4 <= max_bytes:
+            return payload
         payload_size = len(payload_json.encode('utf-8'))
         
         if payload_size <= max_bytes:
             return payload
         
         # Truncar mantendo estrutura JSON válida
-        truncated = json.dumps({
+        truncated = {
             "_truncated": True,
             "_original_size_bytes": payload_size,
             "_max_size_bytes": max_bytes,
             "_message": "Payload truncated for logging"
-        })
+        }
         
-        logger.warning(f"Payload truncated: {payload_size} bytes -> {len(truncated)} bytes")
-        return json.loads(truncated)
+        logger.warning(f"Payload truncated: {payload_size} bytes")
+        return truncated
     except Exception as e:
         logger.error(f"Error truncating payload: {e}")
         return {"_error": "Failed to truncate payload", "_exception": str(e)}
@@ -994,75 +1015,37 @@ def execute_tool(
     logger.info(f"[{request_id}][{trace_id}] Executando tool: {tool_name} v{version or 'current'}")
     
     try:
-        # 1. Buscar tool
-        try:
-            tool = Tool.objects.get(name=tool_name, is_active=True)
-        except Tool.DoesNotExist:
-            raise Tool.DoesNotExist(f"Tool '{tool_name}' não encontrada ou inativa")
-        
-        # 2. Buscar versão
-        if version:
-            try:
-                tool_version = ToolVersion.objects.get(
-                    tool=tool,
-                    version=version,
-                    is_active=True
-                )
-            except ToolVersion.DoesNotExist:
-                raise ToolVersion.DoesNotExist(
-                    f"Versão '{version}' não encontrada ou inativa para tool '{tool_name}'"
-                )
-        else:
-            if not tool.current_version:
-                raise ValueError(f"Tool '{tool_name}' não tem versão atual definida")
-            tool_version = tool.current_version
-        
-        # 3. Validar permissões (se client_key fornecido)
+        # 1-3. Tool, versão, permissões e prompt (plano em cache; sem queries em regime estável)
+        plan = get_tool_plan(tool_name, version, client_key)
         if client_key:
-            try:
-                client = ClientApp.objects.get(key=client_key, is_active=True)
-            except ClientApp.DoesNotExist:
-                raise PermissionError(f"ClientApp '{client_key}' não encontrado ou inativo")  # PermissionError é built-in do Python
-            
-            # Verificar se tool tem allowed_clients e se cliente está na lista
-            if tool.allowed_clients.exists():
-                if client not in tool.allowed_clients.all():
-                    raise PermissionError(
-                        f"Cliente '{client_key}' não tem permissão para usar tool '{tool_name}'"
-                    )
+            if plan.permission_error:
+                raise PermissionError(plan.permission_error)  # PermissionError é built-in do Python
         else:
             client_key = "unknown"
-            client = None
         
         # 4. Validar tamanho do input
         validate_input_size(input_data)
         
-        # 5. Resolver prompt_ref para prompt_text
-        prompt_text = None
-        prompt_info = None
-        safe_config = tool_version.config if isinstance(tool_version.config, dict) else {}
-        if tool_version.prompt_ref or safe_config.get("prompt_inline"):
-            prompt_info = resolve_prompt_info(
-                tool_version.prompt_ref,
-                config=safe_config
+        # 5. Prompt resolvido no plano (prompt_ref / prompt_inline)
+        safe_config = plan.config
+        prompt_info = plan.prompt_info
+        prompt_text = plan.prompt_text
+        if prompt_text:
+            logger.info(
+                f"[{request_id}][{trace_id}] Prompt resolvido: "
+                f"{prompt_info.get('nome', 'N/A')} (fonte: {prompt_info.get('fonte', 'desconhecida')})"
             )
-            if prompt_info and prompt_info.get('text'):
-                prompt_text = prompt_info['text']
-                logger.info(
-                    f"[{request_id}][{trace_id}] Prompt resolvido: "
-                    f"{prompt_info.get('nome', 'N/A')} (fonte: {prompt_info.get('fonte', 'desconhecida')})"
-                )
         
         # 6. Validar input_schema
-        if tool_version.input_schema:
+        if plan.input_schema:
             try:
-                validate_json_schema(input_data, tool_version.input_schema, "input_schema")
+                validate_json_schema(input_data, plan.input_schema, "input_schema", validator=plan.input_validator)
                 logger.debug(f"[{request_id}][{trace_id}] Input validado contra schema")
             except ValueError as e:
                 raise ValueError(f"Input validation failed: {str(e)}")
         
         # 7. Executar runtime
-        runtime = tool_version.runtime
+        runtime = plan.runtime
         config = safe_config
         
         logger.info(f"[{request_id}][{trace_id}] Executando runtime: {runtime}")
@@ -1126,11 +1109,11 @@ def execute_tool(
                 "exception_type": type(e).__name__
             }
             
-            ToolCallLog.objects.create(
+            enqueue_tool_call_log(
                 request_id=request_id,
                 trace_id=trace_id,
                 tool=tool_name,
-                version=tool_version.version,
+                version=plan.version,
                 client_key=client_key,
                 ok=False,
                 status_code=500,
@@ -1143,16 +1126,16 @@ def execute_tool(
                 "request_id": request_id,
                 "trace_id": trace_id,
                 "tool": tool_name,
-                "version": tool_version.version,
+                "version": plan.version,
                 "ok": False,
                 "error": error_payload,
                 "latency_ms": latency_ms
             }
         
         # 8. Validar output_schema (não crítico)
-        if tool_version.output_schema and output_data:
+        if plan.output_schema and output_data:
             try:
-                validate_json_schema(output_data, tool_version.output_schema, "output_schema")
+                validate_json_schema(output_data, plan.output_schema, "output_schema", validator=plan.output_validator)
                 logger.debug(f"[{request_id}][{trace_id}] Output validado contra schema")
             except ValueError as e:
                 logger.warning(f"[{request_id}][{trace_id}] Output validation failed (não crítico): {e}")
@@ -1161,11 +1144,11 @@ def execute_tool(
         latency_ms = int((time.time() - start_time) * 1000)
         
         # 10. Registrar log de sucesso
-        ToolCallLog.objects.create(
+        enqueue_tool_call_log(
             request_id=request_id,
             trace_id=trace_id,
             tool=tool_name,
-            version=tool_version.version,
+            version=plan.version,
             client_key=client_key,
             ok=True,
             status_code=200,
@@ -1179,7 +1162,7 @@ def execute_tool(
             "request_id": request_id,
             "trace_id": trace_id,
             "tool": tool_name,
-            "version": tool_version.version,
+            "version": plan.version,
             "ok": True,
             "output": output_data,
             "latency_ms": latency_ms
@@ -1193,7 +1176,7 @@ def execute_tool(
             "message": str(e)
         }
         
-        ToolCallLog.objects.create(
+        enqueue_tool_call_log(
             request_id=request_id,
             trace_id=trace_id,
             tool=tool_name,
@@ -1218,7 +1201,7 @@ def execute_tool(
         
         logger.error(f"[{request_id}][{trace_id}] Erro inesperado: {e}", exc_info=True)
         
-        ToolCallLog.objects.create(
+        enqueue_tool_call_log(
             request_id=request_id,
             trace_id=trace_id,
             tool=tool_name,
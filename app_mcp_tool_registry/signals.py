@@ -0,0 +1,42 @@
+"""
+Signals - MCP Tool Registry
+
+Qualquer gravação no registry (ou num PromptTemplate) invalida o cache de planos de execução.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ClientApp, Tool, ToolVersion
+from .plan_cache import invalidate_plans
+
+
+@receiver(post_save, sender=Tool)
+@receiver(post_delete, sender=Tool)
+@receiver(post_save, sender=ToolVersion)
+@receiver(post_delete, sender=ToolVersion)
+@receiver(post_save, sender=ClientApp)
+@receiver(post_delete, sender=ClientApp)
+def handle_registry_write(sender, instance, **kwargs):
+    invalidate_plans(f"{sender.__name__} {instance.pk}")
+
+
+@receiver(m2m_changed, sender=Tool.allowed_clients.through)
+def handle_allowed_clients_changed(sender, instance, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate_plans(f"allowed_clients {action}")
+
+
+def connect_prompt_template_signals():
+    """PromptTemplate vive em app_sinapum; liga-se só se a app estiver instalada."""
+    try:
+        from app_sinapum.models import PromptTemplate
+    except Exception:
+        return
+
+    def handle_prompt_write(sender, instance, **kwargs):
+        invalidate_plans(f"PromptTemplate {instance.pk}")
+
+    post_save.connect(handle_prompt_write, sender=PromptTemplate, weak=False,
+                      dispatch_uid="mcp_plan_cache_prompt_save")
+    post_delete.connect(handle_prompt_write, sender=PromptTemplate, weak=False,
+                        dispatch_uid="mcp_plan_cache_prompt_delete")
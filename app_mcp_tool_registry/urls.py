@@ -9,7 +9,9 @@ app_name = 'mcp_tool_registry'
 urlpatterns = [
     path('tools/', views.list_tools, name='list_tools'),
     path('tools/resolve/', views.resolve_tool, name='resolve_tool'),
+    path('tools/resolve_batch/', views.resolve_tools_batch, name='resolve_tools_batch'),
     path('tools/log/', views.log_tool_call, name='log_tool_call'),
+    path('tools/log/bulk/', views.log_tool_calls_bulk, name='log_tool_calls_bulk'),
     path('tools/<path:tool_name>/execute/', views.execute_tool_view, name='execute_tool'),
     path('tools/<path:tool_name>/', views.get_tool_detail, name='get_tool_detail'),
     path('executions/', views.list_executions, name='list_executions'),
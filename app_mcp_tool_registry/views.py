@@ -3,12 +3,15 @@ Views para o MCP Tool Registry
 """
 import json
 import logging
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
 from .models import ClientApp, Tool, ToolVersion, ToolCallLog
 from django.core.exceptions import PermissionDenied
+from .log_sink import build_log
+from .plan_cache import registry_version
 from .utils import resolve_prompt_from_ref
 
 logger = logging.getLogger(__name__)
@@ -103,6 +106,110 @@ def get_tool_detail(request, tool_name):
         )
 
 
+def _client_for_resolve(request, client_key):
+    """
+    ClientApp do pedido de resolve (client_key no body ou API key).
+
+    Returns:
+        (client, None) ou (None, JsonResponse de erro)
+    """
+    if client_key:
+        try:
+            return ClientApp.objects.get(key=client_key, is_active=True), None
+        except ClientApp.DoesNotExist:
+            return None, JsonResponse(
+                {"error": f"ClientApp '{client_key}' não encontrado ou inativo"},
+                status=404
+            )
+    # Tentar inferir via API key
+    client = get_client_from_api_key(request)
+    if not client:
+        return None, JsonResponse(
+            {"error": "API key inválida ou ausente. Forneça X-SINAPUM-KEY ou client_key no body."},
+            status=401
+        )
+    return client, None
+
+
+def _build_execution_plan(tool_name, version_str, client):
+    """
+    Execution plan (ToolVersion completo + prompt resolvido) de uma tool para o cliente.
+
+    Returns:
+        (execution_plan, None) ou (None, (mensagem de erro, status HTTP))
+    """
+    # Buscar tool
+    try:
+        tool = Tool.objects.get(name=tool_name)
+    except Tool.DoesNotExist:
+        return None, (f"Tool '{tool_name}' não encontrada", 404)
+
+    # Verificar se tool está ativa
+    if not tool.is_active:
+        return None, (f"Tool '{tool_name}' está inativa", 403)
+
+    # Verificar permissão (allowed_clients)
+    if tool.allowed_clients.exists():
+        if client not in tool.allowed_clients.all():
+            return None, (f"Cliente '{client.key}' não tem permissão para usar esta tool", 403)
+
+    # Buscar versão (se não veio, usa current)
+    if version_str:
+        try:
+            tool_version = ToolVersion.objects.get(
+                tool=tool,
+                version=version_str,
+                is_active=True
+            )
+        except ToolVersion.DoesNotExist:
+            return None, (f"Versão '{version_str}' não encontrada ou inativa para tool '{tool_name}'", 404)
+    else:
+        # Usar versão atual
+        if not tool.current_version:
+            return None, (f"Tool '{tool_name}' não tem versão atual definida", 404)
+        tool_version = tool.current_version
+
+    # Resolver prompt_ref para texto do prompt e informações (se existir)
+    # Usa múltiplas fontes: PostgreSQL, URLs, inline no config
+    prompt_text = None
+    prompt_info = None
+    safe_config = tool_version.config if isinstance(tool_version.config, dict) else {}
+    if tool_version.prompt_ref or safe_config.get("prompt_inline"):
+        from app_mcp_tool_registry.utils import resolve_prompt_info
+        prompt_info = resolve_prompt_info(
+            tool_version.prompt_ref,
+            config=safe_config
+        )
+        if prompt_info and prompt_info.get('text'):
+            prompt_text = prompt_info['text']
+            logger.info(f"✅ Prompt resolvido para tool {tool.name}@{tool_version.version} (fonte: {prompt_info.get('fonte', 'desconhecida')})")
+        else:
+            logger.warning(f"⚠️ Prompt_ref '{tool_version.prompt_ref}' não pôde ser resolvido para tool {tool.name}@{tool_version.version}")
+
+    # Retornar ToolVersion completo
+    return {
+        "tool": tool.name,
+        "version": tool_version.version,
+        "runtime": tool_version.runtime,
+        "config": safe_config,
+        "input_schema": tool_version.input_schema,
+        "output_schema": tool_version.output_schema,
+        "prompt_ref": tool_version.prompt_ref,
+        "prompt_text": prompt_text,  # Texto do prompt resolvido (se disponível)
+        "prompt_info": prompt_info,  # Informações completas do prompt (nome, versão, fonte, etc.)
+        "client_key": client.key  # Incluir client_key na resposta
+    }, None
+
+
+def _etag_matches(request, etag):
+    """If-None-Match contém o ETag atual (ignora prefixo W/ e aspas)."""
+    header = request.headers.get('If-None-Match', '')
+    if not header:
+        return False
+    tags = {t.strip().removeprefix('W/').strip('"') for t in header.split(',')}
+    return etag in tags or '*' in tags
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def resolve_tool(request):
@@ -114,6 +221,11 @@ def resolve_tool(request):
     
     MCP-aware: Aceita context_pack opcionalmente (campo _context_pack).
     Se presente, pode ser usado para enriquecer o execution_plan retornado.
+
+    A resposta leva ETag = versão do registry (muda a cada gravação em Tool, ToolVersion,
+    ClientApp ou prompts). Com If-None-Match igual à versão atual devolve 304 sem montar o
+    plano (só a autenticação do cliente toca na BD): o mcp_service usa isto para revalidar os
+    planos que tem em cache.
     """
     try:
         # Parse do body
@@ -123,108 +235,28 @@ def resolve_tool(request):
         client_key = body.get("client_key")
         input_data = body.get("input", {})
         context_pack = body.get("_context_pack")  # Context Pack opcional (MCP-aware)
-        
+
+        # Obter cliente (via API key ou client_key) antes de qualquer resposta, incluindo o 304
+        client, error_response = _client_for_resolve(request, client_key)
+        if error_response is not None:
+            return error_response
+
         if not tool_name:
             return JsonResponse(
                 {"error": "tool é obrigatório"},
                 status=400
             )
-        
-        # Obter cliente (via API key ou client_key)
-        client = None
-        if client_key:
-            try:
-                client = ClientApp.objects.get(key=client_key, is_active=True)
-            except ClientApp.DoesNotExist:
-                return JsonResponse(
-                    {"error": f"ClientApp '{client_key}' não encontrado ou inativo"},
-                    status=404
-                )
-        else:
-            # Tentar inferir via API key
-            client = get_client_from_api_key(request)
-            if not client:
-                return JsonResponse(
-                    {"error": "API key inválida ou ausente. Forneça X-SINAPUM-KEY ou client_key no body."},
-                    status=401
-                )
-        
-        # Buscar tool
-        try:
-            tool = Tool.objects.get(name=tool_name)
-        except Tool.DoesNotExist:
-            return JsonResponse(
-                {"error": f"Tool '{tool_name}' não encontrada"},
-                status=404
-            )
-        
-        # Verificar se tool está ativa
-        if not tool.is_active:
-            return JsonResponse(
-                {"error": f"Tool '{tool_name}' está inativa"},
-                status=403
-            )
-        
-        # Verificar permissão (allowed_clients)
-        if tool.allowed_clients.exists():
-            if client not in tool.allowed_clients.all():
-                return JsonResponse(
-                    {"error": f"Cliente '{client.key}' não tem permissão para usar esta tool"},
-                    status=403
-                )
-        
-        # Buscar versão (se não veio, usa current)
-        if version_str:
-            try:
-                tool_version = ToolVersion.objects.get(
-                    tool=tool,
-                    version=version_str,
-                    is_active=True
-                )
-            except ToolVersion.DoesNotExist:
-                return JsonResponse(
-                    {"error": f"Versão '{version_str}' não encontrada ou inativa para tool '{tool_name}'"},
-                    status=404
-                )
-        else:
-            # Usar versão atual
-            if not tool.current_version:
-                return JsonResponse(
-                    {"error": f"Tool '{tool_name}' não tem versão atual definida"},
-                    status=404
-                )
-            tool_version = tool.current_version
-        
-        # Resolver prompt_ref para texto do prompt e informações (se existir)
-        # Usa múltiplas fontes: PostgreSQL, URLs, inline no config
-        prompt_text = None
-        prompt_info = None
-        safe_config = tool_version.config if isinstance(tool_version.config, dict) else {}
-        if tool_version.prompt_ref or safe_config.get("prompt_inline"):
-            from app_mcp_tool_registry.utils import resolve_prompt_info
-            prompt_info = resolve_prompt_info(
-                tool_version.prompt_ref,
-                config=safe_config
-            )
-            if prompt_info and prompt_info.get('text'):
-                prompt_text = prompt_info['text']
-                logger.info(f"✅ Prompt resolvido para tool {tool.name}@{tool_version.version} (fonte: {prompt_info.get('fonte', 'desconhecida')})")
-            else:
-                logger.warning(f"⚠️ Prompt_ref '{tool_version.prompt_ref}' não pôde ser resolvido para tool {tool.name}@{tool_version.version}")
-        
-        # Retornar ToolVersion completo
-        execution_plan = {
-            "tool": tool.name,
-            "version": tool_version.version,
-            "runtime": tool_version.runtime,
-            "config": safe_config,
-            "input_schema": tool_version.input_schema,
-            "output_schema": tool_version.output_schema,
-            "prompt_ref": tool_version.prompt_ref,
-            "prompt_text": prompt_text,  # Texto do prompt resolvido (se disponível)
-            "prompt_info": prompt_info,  # Informações completas do prompt (nome, versão, fonte, etc.)
-            "client_key": client.key  # Incluir client_key na resposta
-        }
+
+        etag = registry_version()
+        if etag is not None and _etag_matches(request, etag):
+            response = HttpResponse(status=304)
+            response['ETag'] = f'"{etag}"'
+            return response
+
+        execution_plan, error = _build_execution_plan(tool_name, version_str, client)
+        if error:
+            message, status = error
+            return JsonResponse({"error": message}, status=status)
         
         # MCP-aware: Se context_pack foi fornecido, incluir meta (request_id/trace_id) no execution_plan
         if context_pack and isinstance(context_pack, dict):
@@ -237,7 +269,10 @@ def resolve_tool(request):
                 }
                 logger.info(f"✅ Context Pack recebido: request_id={meta.get('request_id')}, trace_id={meta.get('trace_id')}")
         
-        return JsonResponse(execution_plan)
+        response = JsonResponse(execution_plan)
+        if etag is not None:
+            response['ETag'] = f'"{etag}"'
+        return response
     
     except json.JSONDecodeError:
         return JsonResponse(
@@ -252,6 +287,65 @@ def resolve_tool(request):
         )
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def resolve_tools_batch(request):
+    """
+    POST /core/tools/resolve_batch/
+
+    Resolve várias tools de uma vez (aquecimento do cache de planos do mcp_service no arranque).
+    Body: {"tools": [{"tool": "...", "version": "..."}, ...], "client_key": "..."}; sem "tools"
+    resolve a versão atual de todas as tools ativas. Falhas individuais vão em "errors" sem
+    invalidar o lote. ETag = versão do registry (ver resolve_tool).
+    """
+    etag = registry_version()
+    try:
+        body = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Body inválido. Esperado JSON."}, status=400)
+
+    client, error_response = _client_for_resolve(request, body.get("client_key"))
+    if error_response is not None:
+        return error_response
+
+    items = body.get("tools")
+    if items is None:
+        items = [
+            {"tool": name}
+            for name in Tool.objects.filter(is_active=True).values_list("name", flat=True)
+        ]
+    if not isinstance(items, list):
+        return JsonResponse({"error": "tools deve ser uma lista"}, status=400)
+
+    plans = []
+    errors = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"tool": item}
+        tool_name = item.get("tool") if isinstance(item, dict) else None
+        if not tool_name:
+            errors.append({"tool": None, "error": "tool é obrigatório", "status": 400})
+            continue
+        version_str = item.get("version")
+        try:
+            execution_plan, error = _build_execution_plan(tool_name, version_str, client)
+        except Exception as e:
+            logger.error(f"Erro ao resolver tool {tool_name} (batch): {e}")
+            error = (f"Erro ao resolver tool: {e}", 500)
+        if error:
+            message, status = error
+            errors.append({"tool": tool_name, "version": version_str, "error": message, "status": status})
+            continue
+        # versão pedida (ou "" = current) para o mcp_service saber sob que chave guardar o plano
+        execution_plan["requested_version"] = version_str or ""
+        plans.append(execution_plan)
+
+    response = JsonResponse({"registry_version": etag, "plans": plans, "errors": errors})
+    if etag is not None:
+        response['ETag'] = f'"{etag}"'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def log_tool_call(request):
@@ -300,6 +394,57 @@ def log_tool_call(request):
         )
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def log_tool_calls_bulk(request):
+    """
+    POST /core/tools/log/bulk/
+    
+    Ingestão em lote dos logs de chamada (buffer do mcp_service): um único bulk_create.
+    Se o lote falhar (um registo inválido estraga o INSERT inteiro) grava registo a registo.
+    Body: {"entries": [{...mesmos campos de /core/tools/log/...}, ...]}
+    Resposta: {"ok": true, "count": <gravados>, "failed": <descartados>}
+    """
+    try:
+        body = json.loads(request.body)
+        entries = body.get("entries") if isinstance(body, dict) else body
+        if not isinstance(entries, list):
+            return JsonResponse({"error": "Campo 'entries' (lista) é obrigatório"}, status=400)
+        
+        logs = [build_log(e) for e in entries if isinstance(e, dict)]
+        count, failed = len(logs), 0
+        if logs:
+            try:
+                with transaction.atomic():
+                    ToolCallLog.objects.bulk_create(logs, batch_size=500)
+            except Exception as e:
+                logger.error(f"bulk_create de {len(logs)} logs falhou, a gravar um a um: {e}")
+                count = 0
+                for log_entry in logs:
+                    log_entry.pk = None
+                    log_entry._state.adding = True
+                    try:
+                        with transaction.atomic():
+                            log_entry.save(force_insert=True)
+                        count += 1
+                    except Exception as row_error:
+                        failed += 1
+                        logger.error(f"ToolCallLog descartado (request_id={log_entry.request_id}): {row_error}")
+        return JsonResponse({"ok": True, "count": count, "failed": failed})
+    
+    except json.JSONDecodeError:
+        return JsonResponse(
+            {"error": "Body inválido. Esperado JSON."},
+            status=400
+        )
+    except Exception as e:
+        logger.error(f"Erro ao registrar logs em lote: {e}")
+        return JsonResponse(
+            {"error": "Erro ao registrar logs", "detail": str(e)},
+            status=500
+        )
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def execute_tool_view(request, tool_name):
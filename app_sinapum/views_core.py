@@ -242,9 +242,27 @@ def health_check(request):
     
     Health check do Core Registry.
     """
+    try:
+        from services.redis_client import redis_pool_stats
+        redis_stats = redis_pool_stats()
+    except Exception:
+        redis_stats = None
+    try:
+        from core.services.whatsapp.evora_forwarder import evora_forwarder_stats
+        evora_stats = evora_forwarder_stats()
+    except Exception:
+        evora_stats = None
+    try:
+        from core.services.cognitive_core.reality.graph_context import graph_context_stats
+        worldgraph_stats = graph_context_stats()
+    except Exception:
+        worldgraph_stats = None
     return JsonResponse({
         "status": "healthy",
         "service": "core_registry",
-        "tools_count": len([t for t in TOOLS_REGISTRY if t.get("enabled", True)])
+        "tools_count": len([t for t in TOOLS_REGISTRY if t.get("enabled", True)]),
+        "redis": redis_stats,
+        "evora_forwarder": evora_stats,
+        "worldgraph": worldgraph_stats,
     })
 
@@ -10,6 +10,7 @@ from typing import Any, Dict, Optional
 from django.utils import timezone
 
 from core.services.cognitive_core.behavior_profile.chef_agno_profile import ChefAgnoProfile
+from core.services.cognitive_core.rag.rag_learning import invalidate_action_performance
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,8 @@ def record_decision_feedback_event(
         decision_score_posterior=score,
         evaluated_at=timezone.now(),
     )
+    # Novo resultado muda a média da ação: o ranker volta a ler os pesos deste tenant
+    invalidate_action_performance(tenant_id)
 
     if upsert_vectorstore:
         try:
@@ -81,6 +81,7 @@ class DecisionEngine:
             "template_id": policy.template_id,
             "user_id": user_id,
             "channel": channel,
+            "tenant_id": str(policy_hint.get("tenant_id") or policy_hint.get("tenant") or ""),
         }
 
         cached = semantic_query(intent=text, context=cache_context)
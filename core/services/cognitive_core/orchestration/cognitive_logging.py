@@ -33,8 +33,18 @@ class PipelineTimer:
         self.trace_id = trace_id
         self.stage = stage
         self._t0 = time.perf_counter()
+        self.sources: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, source: str, elapsed_ms: Optional[float], status: str = "ok") -> None:
+        """Tempo de uma fonte da etapa (ex.: rag, graph); vai no evento de ``stop``."""
+        self.sources[source] = {
+            "elapsed_ms": round(elapsed_ms, 2) if elapsed_ms is not None else None,
+            "status": status,
+        }
 
     def stop(self, **payload: Any) -> float:
         ms = (time.perf_counter() - self._t0) * 1000
+        if self.sources:
+            payload.setdefault("sources", self.sources)
         log_pipeline_event(self.trace_id, self.stage, elapsed_ms=ms, payload=payload)
         return ms
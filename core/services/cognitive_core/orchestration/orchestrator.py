@@ -54,7 +54,7 @@ class CognitiveOrchestrator:
             extra={"rag_namespaces": _default_rag_namespaces()},
         )
         t_reality = PipelineTimer(inbound_event_id, "reality")
-        reality = self.reality_builder.build(perception, ctx)
+        reality = self.reality_builder.build(perception, ctx, timer=t_reality)
         t_reality.stop(
             rag_hits=len(reality.rag_long_term),
             live_keys=list((reality.operational_live or {}).keys())[:12],
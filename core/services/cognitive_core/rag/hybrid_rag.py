@@ -1,5 +1,6 @@
 """
-Busca RAG em várias “camadas” via prefixo de `id` no vectorstore (FAISS não expõe namespace HTTP).
+Busca RAG em várias “camadas” via prefixo de `id` no vectorstore (``id_prefix`` em ``/search``,
+filtrado no servidor antes do top-k).
 
 Convenção de IDs (extensível na ingestão):
 - Global gastronomia (PDF SinapUm): ``sinapum.rag.gastronomia:<uuid>``
@@ -14,12 +15,12 @@ import logging
 import re
 from typing import Any, Dict, List
 
-from core.services.vectorstore_client import vectorstore_search
+from core.services.vectorstore_client import vectorstore_search_multi
 
 logger = logging.getLogger(__name__)
 
-# k elevado: o cliente filtra por prefixo *após* o top-k semântico global; aumenta hipótese de hits por camada.
-_DEFAULT_K_FETCH = 80
+# O servidor filtra por prefixo *antes* do top-k: basta uma margem sobre top_k_per_source para o ranker.
+_DEFAULT_K_FETCH = 20
 
 
 def _sanitize_tenant_id(tenant_id: str) -> str:
@@ -54,35 +55,24 @@ def hybrid_rag_search(
     if not q:
         return []
 
-    k_fetch = int(fetch_k or max(_DEFAULT_K_FETCH, top_k_per_source * 15))
+    k_fetch = int(fetch_k or max(_DEFAULT_K_FETCH, top_k_per_source * 4))
     k_fetch = max(10, min(200, k_fetch))
 
     out: List[Dict[str, Any]] = []
     seen: set[str] = set()
 
     tid = _sanitize_tenant_id(tenant_id)
-    if tid:
-        layers = id_prefixes_for_tenant(tid)
-        for source_type, prefix in layers.items():
-            hits = vectorstore_search(q, k=k_fetch, include_text=True, id_prefix=prefix)
-            for h in hits or []:
-                hid = str((h or {}).get("id", ""))
-                if not hid or hid in seen:
-                    continue
-                seen.add(hid)
-                row = dict(h)
-                row["source_type"] = source_type
-                out.append(row)
-        return out
-
     # Sem tenant: só camada global alinhada ao ingestor actual
-    hits = vectorstore_search(q, k=k_fetch, include_text=True, id_prefix="sinapum.rag.gastronomia")
-    for h in hits or []:
-        hid = str((h or {}).get("id", ""))
-        if not hid or hid in seen:
-            continue
-        seen.add(hid)
-        row = dict(h)
-        row["source_type"] = "global"
-        out.append(row)
+    layers = id_prefixes_for_tenant(tid) if tid else {"global": "sinapum.rag.gastronomia"}
+    # Uma ida ao vectorstore (consulta codificada uma vez) para todas as camadas
+    by_layer = vectorstore_search_multi(q, layers, k=k_fetch, include_text=True)
+    for source_type in layers:
+        for h in by_layer.get(source_type) or []:
+            hid = str((h or {}).get("id", ""))
+            if not hid or hid in seen:
+                continue
+            seen.add(hid)
+            row = dict(h)
+            row["source_type"] = source_type
+            out.append(row)
     return out
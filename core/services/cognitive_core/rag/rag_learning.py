@@ -1,15 +1,114 @@
 """
 Pesos de aprendizagem a partir de DecisionFeedbackRecord (decisão → resultado real).
+
+O ranker pede os pesos de todas as ações de uma lista de hits de uma vez
+(``get_action_performances``): uma query por tenant em vez de um ``Avg`` por hit. Os pesos
+ficam em cache por tenant durante COGNITIVE_RAG_LEARNING_CACHE_TTL_S segundos (60; 0 desliga)
+e o cache do tenant é limpo quando ``record_decision_feedback_event`` grava um novo registo.
+Noutros workers a alteração aparece ao fim do TTL.
 """
 from __future__ import annotations
 
 import logging
-from typing import Optional
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
 
-from django.db.models import Avg, Q
+from django.db.models import Q
 
 logger = logging.getLogger(__name__)
 
+_lock = threading.Lock()
+# tenant -> ação -> (peso, instante de cálculo)
+_weights: Dict[str, Dict[str, Tuple[float, float]]] = {}
+
+
+def _cache_ttl_s() -> float:
+    return float(os.getenv("COGNITIVE_RAG_LEARNING_CACHE_TTL_S", "60"))
+
+
+def _weight_from_avg(avg: Optional[float]) -> float:
+    if avg is None:
+        return 1.0
+    w = 1.0 + float(avg) / 10.0
+    return max(0.5, min(1.5, w))
+
+
+def _normalize_action(action: Optional[str]) -> str:
+    act = (action or "").strip()
+    return "" if act == "default" else act
+
+
+def _query_weights(tenant_id: str, actions: Iterable[str]) -> Dict[str, float]:
+    """
+    Uma query para todas as ações: lê (acao da decisão, acao_rag do outcome, score) dos registos
+    que referem alguma delas e faz a média por ação. Um registo que refere a mesma ação nos dois
+    campos conta uma vez, como no filtro OR original.
+    """
+    from app_inbound_events.models import DecisionFeedbackRecord
+
+    acts = sorted(set(actions))
+    rows = (
+        DecisionFeedbackRecord.objects.filter(tenant_id=tenant_id)
+        .filter(Q(decision_json__metadata__acao__in=acts) | Q(outcome_json__acao_rag__in=acts))
+        .values_list("decision_json__metadata__acao", "outcome_json__acao_rag", "decision_score_posterior")
+    )
+    wanted = set(acts)
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for decision_act, outcome_act, score in rows:
+        if score is None:
+            continue
+        for act in {decision_act, outcome_act} & wanted:
+            sums[act] = sums.get(act, 0.0) + float(score)
+            counts[act] = counts.get(act, 0) + 1
+    return {act: _weight_from_avg(sums[act] / counts[act] if act in counts else None) for act in acts}
+
+
+def get_action_performances(tenant_id: str, actions: Iterable[Optional[str]]) -> Dict[str, float]:
+    """
+    Pesos de aprendizagem (~[0.5, 1.5]) para várias ações de um tenant, numa só query.
+    Ações vazias / "default" e tenant vazio → 1.0 (neutro). Chaves: ações como recebidas.
+    """
+    requested = {str(a): _normalize_action(str(a)) for a in actions if a not in (None, "")}
+    out = {a: 1.0 for a in requested}
+    tid = str(tenant_id or "").strip()
+    acts = {act for act in requested.values() if act}
+    if not tid or not acts:
+        return out
+
+    ttl = _cache_ttl_s()
+    now = time.monotonic()
+    known: Dict[str, float] = {}
+    if ttl > 0:
+        with _lock:
+            cached = _weights.get(tid) or {}
+            for act in acts:
+                entry = cached.get(act)
+                if entry is not None and now - entry[1] < ttl:
+                    known[act] = entry[0]
+
+    missing = acts - set(known)
+    if missing:
+        try:
+            fresh = _query_weights(tid, missing)
+        except Exception as e:
+            logger.debug("get_action_performances: %s", e)
+            fresh = {act: 1.0 for act in missing}
+        else:
+            if ttl > 0:
+                with _lock:
+                    table = _weights.setdefault(tid, {})
+                    for act, w in fresh.items():
+                        table[act] = (w, now)
+        known.update(fresh)
+
+    for raw, act in requested.items():
+        if act:
+            out[raw] = known.get(act, 1.0)
+    return out
+
 
 def get_action_performance(tenant_id: str, action: Optional[str]) -> float:
     """
@@ -17,24 +116,16 @@ def get_action_performance(tenant_id: str, action: Optional[str]) -> float:
     Sem dados ou action vazia → 1.0 (neutro).
     Retorno clampado ~[0.5, 1.5] para multiplicar score no ranker.
     """
-    act = (action or "").strip()
-    if not act or act == "default":
-        return 1.0
-    tid = str(tenant_id or "").strip()
-    if not tid:
-        return 1.0
-    try:
-        from app_inbound_events.models import DecisionFeedbackRecord
-
-        qs = DecisionFeedbackRecord.objects.filter(tenant_id=tid).filter(
-            Q(decision_json__metadata__acao=act) | Q(outcome_json__acao_rag=act)
-        )
-        row = qs.aggregate(avg=Avg("decision_score_posterior"))
-        avg = row.get("avg")
-        if avg is None:
-            return 1.0
-        w = 1.0 + float(avg) / 10.0
-        return max(0.5, min(1.5, w))
-    except Exception as e:
-        logger.debug("get_action_performance: %s", e)
+    act = _normalize_action(action)
+    if not act:
         return 1.0
+    return get_action_performances(tenant_id, [act]).get(act, 1.0)
+
+
+def invalidate_action_performance(tenant_id: Optional[str] = None) -> None:
+    """Descarta os pesos em cache do tenant (ou de todos), p.ex. após gravar feedback."""
+    with _lock:
+        if tenant_id is None:
+            _weights.clear()
+        else:
+            _weights.pop(str(tenant_id).strip(), None)
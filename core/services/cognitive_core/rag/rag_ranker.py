@@ -1,5 +1,8 @@
 """
 Ranking de hits RAG com peso por camada, impacto operacional (JSON no text) e aprendizagem por ação.
+
+O JSON de cada hit é lido uma vez: o resultado fica em ``_parsed_metadata`` e é reutilizado por
+``impacto_total_from_ranked``. Os pesos de aprendizagem de todas as ações vêm de uma só query.
 """
 from __future__ import annotations
 
@@ -7,7 +10,7 @@ import json
 from typing import Any, Dict, List, Optional
 
 from core.services.cognitive_core.rag.rag_adaptive_weights import get_namespace_weight
-from core.services.cognitive_core.rag.rag_learning import get_action_performance
+from core.services.cognitive_core.rag.rag_learning import get_action_performances
 
 
 def _metadata_from_hit_text(text: Optional[str]) -> Dict[str, Any]:
@@ -20,6 +23,14 @@ def _metadata_from_hit_text(text: Optional[str]) -> Dict[str, Any]:
         return {}
 
 
+def _hit_metadata(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados já extraídos pelo ranker (``_parsed_metadata``) ou lidos do JSON em text."""
+    parsed = item.get("_parsed_metadata")
+    if isinstance(parsed, dict):
+        return parsed
+    return _metadata_from_hit_text(item.get("text"))
+
+
 def rank_rag_results(
     results: List[Dict[str, Any]],
     *,
@@ -27,15 +38,17 @@ def rank_rag_results(
     top_n: int = 5,
 ) -> List[Dict[str, Any]]:
     tid = str(tenant_id or "").strip() or None
+    items = [item or {} for item in results or []]
+    metas = [_metadata_from_hit_text(item.get("text")) for item in items]
+    learning = get_action_performances(tid, (m.get("acao") for m in metas)) if tid else {}
     ranked: List[Dict[str, Any]] = []
-    for item in results or []:
-        base = float((item or {}).get("score") or 0.0)
-        st = str((item or {}).get("source_type") or "global")
+    for item, meta in zip(items, metas):
+        base = float(item.get("score") or 0.0)
+        st = str(item.get("source_type") or "global")
         namespace_w = get_namespace_weight(st)
-        meta = _metadata_from_hit_text((item or {}).get("text"))
         action_key = meta.get("acao")
         if tid and action_key not in (None, ""):
-            learning_w = get_action_performance(tid, str(action_key))
+            learning_w = learning.get(str(action_key), 1.0)
         else:
             learning_w = 1.0
         impacto_bonus = 0.0
@@ -65,10 +78,10 @@ def rank_rag_results(
 
 
 def impacto_total_from_ranked(ranked: List[Dict[str, Any]]) -> int:
-    """Soma impacto discreto (alto=2, medio=1) a partir do JSON em text."""
+    """Soma impacto discreto (alto=2, medio=1) a partir dos metadados do ranker (ou do JSON em text)."""
     total = 0
     for item in ranked or []:
-        meta = _metadata_from_hit_text((item or {}).get("text"))
+        meta = _hit_metadata(item or {})
         flux = str(meta.get("impacto_fluxo") or "").lower()
         if flux == "alto":
             total += 2
@@ -2,10 +2,25 @@
 Constrói RealityState a partir de PerceptionInput + CognitiveContext.
 Fase 2: operational_live + dynamic_metrics (Segundidade forte); RAG permanece memória, não realidade.
 RAG híbrido (tenant + operacional + global) quando há tenant_id + query.
+
+As três fontes (operacional/ORM, RAG + ranking, grafo) correm em paralelo num pool partilhado
+sob um orçamento de latência por pedido (COGNITIVE_REALITY_BUDGET_MS): o custo é o da fonte
+mais lenta e não a soma. Uma fonte que falha ou não termina no orçamento é substituída por um
+resultado vazio (marcado em ``source_status``) e a construção continua.
+
+Uma fonte atrasada continua a ocupar uma thread depois do orçamento. Para que uma fonte presa
+(ex.: Neo4j em baixo) não esgote o pool partilhado e atrase as outras, cada fonte tem no máximo
+COGNITIVE_REALITY_SOURCE_MAX_INFLIGHT execuções em curso; saturada, a fonte é marcada "timeout"
+sem ser submetida até alguma terminar.
 """
 from __future__ import annotations
 
-from typing import List, Optional
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 from core.services.cognitive_core.context.cognitive_context import CognitiveContext
 from core.services.cognitive_core.perception.input import PerceptionInput
@@ -21,7 +36,76 @@ from core.services.cognitive_core.reality.rag_operational import (
     rag_query_text_from_perception,
 )
 from core.services.cognitive_core.reality.state import RealityState
-from core.services.vectorstore_client import vectorstore_search
+from core.services.vectorstore_client import vectorstore_search_multi
+
+if TYPE_CHECKING:  # import real criaria ciclo reality -> orchestration -> reality
+    from core.services.cognitive_core.orchestration.cognitive_logging import PipelineTimer
+
+logger = logging.getLogger(__name__)
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+_INFLIGHT: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def _budget_ms() -> float:
+    return float(os.getenv("COGNITIVE_REALITY_BUDGET_MS", "2500"))
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Pool do processo para as fontes da realidade (threads reutilizadas entre mensagens)."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("COGNITIVE_REALITY_WORKERS", "12")),
+                    thread_name_prefix="reality-source",
+                )
+    return _POOL
+
+
+def _max_inflight() -> int:
+    default = max(1, int(os.getenv("COGNITIVE_REALITY_WORKERS", "12")) // 3)
+    return max(1, int(os.getenv("COGNITIVE_REALITY_SOURCE_MAX_INFLIGHT", str(default))))
+
+
+def _inflight(name: str) -> threading.BoundedSemaphore:
+    """Limite de execuções em curso (incluindo as que já excederam o orçamento) da fonte."""
+    sem = _INFLIGHT.get(name)
+    if sem is None:
+        with _POOL_LOCK:
+            sem = _INFLIGHT.get(name)
+            if sem is None:
+                sem = _INFLIGHT[name] = threading.BoundedSemaphore(_max_inflight())
+    return sem
+
+
+def _released(fn: Callable[[], Any], sem: threading.BoundedSemaphore) -> Callable[[], Any]:
+    def run() -> Any:
+        try:
+            return fn()
+        finally:
+            sem.release()
+
+    return run
+
+
+def _timed(fn: Callable[[], Any]) -> Callable[[], Tuple[Any, float]]:
+    def run() -> Tuple[Any, float]:
+        t0 = time.perf_counter()
+        try:
+            return fn(), (time.perf_counter() - t0) * 1000
+        finally:
+            # Ligações ORM abertas na thread do pool seguem CONN_MAX_AGE como num pedido
+            try:
+                from django.db import close_old_connections
+
+                close_old_connections()
+            except Exception:
+                pass
+
+    return run
 
 
 def _distinct_rag_sources(hits: List[dict]) -> List[str]:
@@ -54,6 +138,8 @@ class RealityStateBuilder:
         *,
         rag_k: Optional[int] = None,
         extra_namespaces: Optional[List[str]] = None,
+        timer: Optional[PipelineTimer] = None,
+        budget_ms: Optional[float] = None,
     ) -> RealityState:
         hint = perception.context_hint()
         operational = {
@@ -63,10 +149,6 @@ class RealityStateBuilder:
             "contract_version": perception.contract_version,
         }
         tid = str(hint.get("tenant_id") or hint.get("tenant") or "").strip() or None
-        operational_live = build_operational_live_layer(operational, tenant_id=tid)
-        dynamic_metrics = operational_live.pop("dynamic_metrics_derived", {}) or compute_dynamic_metrics(
-            operational_live
-        )
 
         namespaces = list(
             dict.fromkeys(
@@ -80,58 +162,49 @@ class RealityStateBuilder:
 
         k = rag_k if rag_k is not None else self.default_rag_k
         q = (rag_query_text_from_perception(perception) or perception.text or "").strip()
+        hybrid = bool(q and tid)
+        tenant = str(hint.get("tenant_id") or hint.get("tenant") or "")
 
-        merged_hits: List[dict] = []
-        rag_context: List[dict] = []
+        sources: Dict[str, Callable[[], Any]] = {
+            "operational": lambda: build_operational_live_layer(operational, tenant_id=tid),
+            "rag": lambda: self._search_rag(q, tid, namespaces, k, hybrid),
+        }
+        if tenant:
+            sources["graph"] = lambda: graph_snippet_for_tenant(tenant)
+        results, source_status = self._gather(sources, budget_ms, timer)
 
-        if q and tid:
-            raw = hybrid_rag_search(q, tid, top_k_per_source=k)
-            ranked = rank_rag_results(raw, tenant_id=tid, top_n=max(k, 8))
-            merged_hits = ranked
-            rag_context = ranked[:5]
-            impacto_rag = impacto_total_from_ranked(ranked)
+        operational_live = results.get("operational")
+        if operational_live is None:
+            # Sem métricas do ORM: só os hints da percepção (snapshot do cliente incluído)
+            operational_live = dict(operational)
+        dynamic_metrics = operational_live.pop("dynamic_metrics_derived", {}) or compute_dynamic_metrics(
+            operational_live
+        )
+
+        merged_hits: List[dict] = results.get("rag") or []
+        if hybrid:
+            rag_context = merged_hits[:5]
+            impacto_rag = impacto_total_from_ranked(merged_hits)
             operational_live["impacto_rag"] = impacto_rag
             operational_live["rag_impacto_resumo"] = {
                 "modo": "hybrid",
-                "hits_ranked": len(ranked),
+                "hits_ranked": len(merged_hits),
                 "impacto_total": impacto_rag,
             }
-            operational_live["rag_sources_distinct"] = _distinct_rag_sources(merged_hits)
         else:
-            seen_ids: set[str] = set()
-            for ns in namespaces:
-                prefix = f"{ns}:" if ns != "global" else None
-                hits = vectorstore_search(q, k=k, include_text=True, id_prefix=prefix)
-                for h in hits:
-                    hid = str(h.get("id", ""))
-                    if not hid or hid in seen_ids:
-                        continue
-                    seen_ids.add(hid)
-                    row = dict(h)
-                    row["_namespace"] = ns
-                    merged_hits.append(row)
-
-            if q:
-                gastro_hits = vectorstore_search(
-                    q, k=k, include_text=True, id_prefix="sinapum.rag.gastronomia"
-                )
-                for h in gastro_hits or []:
-                    hid = str((h or {}).get("id", ""))
-                    if not hid or hid in seen_ids:
-                        continue
-                    seen_ids.add(hid)
-                    row = dict(h)
-                    row["_namespace"] = "gastronomia"
-                    merged_hits.append(row)
-
             impacto_rag, rag_imp_resumo = compute_impacto_rag_from_hits(merged_hits)
             operational_live["impacto_rag"] = impacto_rag
             operational_live["rag_impacto_resumo"] = rag_imp_resumo
             rag_context = merged_hits[:5]
-            operational_live["rag_sources_distinct"] = _distinct_rag_sources(merged_hits)
+        operational_live["rag_sources_distinct"] = _distinct_rag_sources(merged_hits)
+        if any(status != "ok" for status in source_status.values()):
+            operational_live["reality_sources_status"] = source_status
 
-        tenant = str(hint.get("tenant_id") or hint.get("tenant") or "")
-        graph = graph_snippet_for_tenant(tenant) if tenant else {"available": False, "rows": []}
+        graph = results.get("graph")
+        if graph is None:
+            graph = {"available": False, "rows": []}
+            if tenant:
+                graph["reason"] = f"graph source {source_status.get('graph', 'error')}"
 
         return RealityState(
             operational=operational,
@@ -141,4 +214,86 @@ class RealityStateBuilder:
             rag_context=rag_context,
             graph_structural=graph,
             rag_namespaces=namespaces,
+            source_status=source_status,
         )
+
+    def _search_rag(
+        self,
+        q: str,
+        tid: Optional[str],
+        namespaces: List[str],
+        k: int,
+        hybrid: bool,
+    ) -> List[dict]:
+        """Hits de memória: híbrido (busca + ranking) com tenant e query; senão por namespace."""
+        if hybrid:
+            raw = hybrid_rag_search(q, tid, top_k_per_source=k)
+            return rank_rag_results(raw, tenant_id=tid, top_n=max(k, 8))
+
+        merged_hits: List[dict] = []
+        seen_ids: set[str] = set()
+        # Namespaces + camada gastronomia numa só ida ao vectorstore ("global" = índice inteiro)
+        layers: Dict[str, Any] = {ns: ([f"{ns}:"] if ns != "global" else []) for ns in namespaces}
+        if q:
+            layers.setdefault("gastronomia", "sinapum.rag.gastronomia")
+        by_layer = vectorstore_search_multi(q, layers, k=k, include_text=True)
+        for ns in layers:
+            for h in by_layer.get(ns) or []:
+                hid = str((h or {}).get("id", ""))
+                if not hid or hid in seen_ids:
+                    continue
+                seen_ids.add(hid)
+                row = dict(h)
+                row["_namespace"] = ns
+                merged_hits.append(row)
+        return merged_hits
+
+    def _gather(
+        self,
+        sources: Dict[str, Callable[[], Any]],
+        budget_ms: Optional[float],
+        timer: Optional[PipelineTimer],
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Corre as fontes em paralelo até ao orçamento. Devolve (resultados das fontes que
+        terminaram, status por fonte: ok | error | timeout). Fontes atrasadas continuam no
+        pool mas o resultado é ignorado; fontes com o limite de execuções em curso esgotado
+        não são submetidas (status timeout).
+        """
+        budget_s = max(0.0, (budget_ms if budget_ms is not None else _budget_ms()) / 1000)
+        pool = _pool()
+        futures: Dict[str, Optional[Future]] = {}
+        for name, fn in sources.items():
+            sem = _inflight(name)
+            if not sem.acquire(blocking=False):
+                futures[name] = None
+                continue
+            try:
+                futures[name] = pool.submit(_released(_timed(fn), sem))
+            except Exception:
+                sem.release()
+                raise
+        wait([f for f in futures.values() if f is not None], timeout=budget_s)
+
+        results: Dict[str, Any] = {}
+        status: Dict[str, str] = {}
+        for name, future in futures.items():
+            elapsed_ms: Optional[float] = None
+            if future is None:
+                status[name] = "timeout"
+                logger.warning("reality source %s saturada (execuções anteriores ainda em curso)", name)
+            elif not future.done():
+                if future.cancel():
+                    # nunca chegou a correr: o wrapper não vai libertar o lugar
+                    _inflight(name).release()
+                status[name] = "timeout"
+                logger.warning("reality source %s excedeu o orçamento de %.0f ms", name, budget_s * 1000)
+            elif future.exception() is not None:
+                status[name] = "error"
+                logger.warning("reality source %s falhou: %s", name, future.exception())
+            else:
+                results[name], elapsed_ms = future.result()
+                status[name] = "ok"
+            if timer is not None:
+                timer.record(name, elapsed_ms, status[name])
+        return results, status
@@ -1,17 +1,44 @@
 """
 WorldGraph / Neo4j — consulta estrutural (Segundidade relacional), sem misturar com RAG.
+
+Ligações reutilizadas entre mensagens:
+- Bolt: um ``neo4j.Driver`` por processo (pool de ligações do driver, WORLDGRAPH_POOL_SIZE);
+  cada consulta abre só uma sessão leve, que pede uma ligação ao pool.
+- HTTP: um ``requests.Session`` por processo (keep-alive), como em ``vectorstore_client``.
+
+``graph_snippet_for_tenant`` guarda o resultado por tenant durante WORLDGRAPH_TENANT_CACHE_TTL_S
+segundos (30; 0 desliga). Um sync do grafo do tenant (``adapters.mrfoo_adapter``) invalida a
+entrada com ``invalidate_graph_snippet``. Tempos e contagens por backend: ``graph_context_stats()``.
 """
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+_lock = threading.Lock()
+_driver: Any = None
+_driver_key: Optional[Tuple[int, str, str, str]] = None
+_session: Optional[requests.Session] = None
+
+# tenant -> (instante, resultado)
+_snippets: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_stats: Dict[str, Any] = {
+    "cache": {"hits": 0, "misses": 0, "invalidations": 0},
+    "bolt": {"queries": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0},
+    "http": {"queries": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0},
+}
+
 
 def _bolt_config() -> Dict[str, str]:
     return {
@@ -27,9 +54,72 @@ def _http_graph_url() -> str:
     return (os.getenv("WORLDGRAPH_HTTP_URL") or "").strip().rstrip("/")
 
 
+def _record_query(backend: str, elapsed_ms: float, ok: bool) -> None:
+    with _lock:
+        st = _stats[backend]
+        st["queries"] += 1
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+        if not ok:
+            st["errors"] += 1
+
+
+def _get_driver(cfg: Dict[str, str]) -> Any:
+    """Driver partilhado no processo; recriado após fork ou mudança de credenciais."""
+    global _driver, _driver_key
+    from neo4j import GraphDatabase
+
+    key = (os.getpid(), cfg["url"], cfg["user"], cfg["password"])
+    if _driver is not None and _driver_key == key:
+        return _driver
+    with _lock:
+        if _driver is None or _driver_key != key:
+            stale = _driver if _driver_key is not None and _driver_key[0] == os.getpid() else None
+            _driver = GraphDatabase.driver(
+                cfg["url"],
+                auth=(cfg["user"], cfg["password"]),
+                max_connection_pool_size=int(os.getenv("WORLDGRAPH_POOL_SIZE", "20")),
+                connection_acquisition_timeout=float(os.getenv("WORLDGRAPH_ACQUIRE_TIMEOUT_S", "5")),
+                max_connection_lifetime=float(os.getenv("WORLDGRAPH_CONNECTION_LIFETIME_S", "3600")),
+            )
+            _driver_key = key
+            if stale is not None:
+                stale.close()
+    return _driver
+
+
+def close_graph_driver() -> None:
+    """Fecha o driver Bolt do processo (shutdown / testes)."""
+    global _driver, _driver_key
+    with _lock:
+        driver, _driver, _driver_key = _driver, None, None
+    if driver is not None:
+        try:
+            driver.close()
+        except Exception as e:
+            logger.debug("neo4j driver close: %s", e)
+
+
+atexit.register(close_graph_driver)
+
+
+def _http() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                pool = int(os.getenv("WORLDGRAPH_POOL_SIZE", "20"))
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
+
 def _run_neo4j_bolt(cypher: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
     try:
-        from neo4j import GraphDatabase
+        import neo4j  # noqa: F401
     except ImportError:
         logger.debug("neo4j driver not installed; skip bolt query")
         return []
@@ -38,15 +128,18 @@ def _run_neo4j_bolt(cypher: str, params: Dict[str, Any]) -> List[Dict[str, Any]]
     if not cfg["url"] or not cfg["password"]:
         return []
 
-    driver = GraphDatabase.driver(cfg["url"], auth=(cfg["user"], cfg["password"]))
+    driver = _get_driver(cfg)
     rows: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    ok = False
     try:
         with driver.session() as session:
             result = session.run(cypher, params)
             for record in result:
                 rows.append(record.data())
+        ok = True
     finally:
-        driver.close()
+        _record_query("bolt", (time.perf_counter() - started) * 1000, ok)
     return rows
 
 
@@ -54,8 +147,10 @@ def _run_http_graph(cypher: str, params: Dict[str, Any]) -> Dict[str, Any]:
     base = _http_graph_url()
     if not base:
         return {}
+    started = time.perf_counter()
+    ok = False
     try:
-        r = requests.post(
+        r = _http().post(
             f"{base}/cypher",
             json={"query": cypher, "params": params},
             timeout=float(os.getenv("WORLDGRAPH_HTTP_TIMEOUT", "8")),
@@ -63,10 +158,13 @@ def _run_http_graph(cypher: str, params: Dict[str, Any]) -> Dict[str, Any]:
         )
         if r.status_code >= 400:
             return {"error": r.text[:500], "status_code": r.status_code}
+        ok = True
         return r.json() if r.content else {}
     except Exception as e:
         logger.warning("WORLDGRAPH_HTTP_URL request failed: %s", e)
         return {"error": str(e)}
+    finally:
+        _record_query("http", (time.perf_counter() - started) * 1000, ok)
 
 
 def fetch_graph_context(
@@ -127,11 +225,16 @@ def fetch_graph_context(
     }
 
 
-def graph_snippet_for_tenant(tenant_id: str) -> Dict[str, Any]:
-    """
-    Subgraço / métricas por tenant. Usa WORLDGRAPH_TENANT_CYPHER se definido; senão tenta default + $tenant.
-    """
-    tid = (tenant_id or "").strip()
+def _snippet_cache_ttl_s() -> float:
+    return float(os.getenv("WORLDGRAPH_TENANT_CACHE_TTL_S", "30"))
+
+
+def _cacheable(result: Dict[str, Any]) -> bool:
+    raw = result.get("raw")
+    return not (isinstance(raw, dict) and raw.get("error"))
+
+
+def _query_graph_snippet(tid: str) -> Dict[str, Any]:
     template = (os.getenv("WORLDGRAPH_TENANT_CYPHER") or "").strip()
     if template:
         return fetch_graph_context(cypher=template, params={"tenant": tid, "tenant_id": tid})
@@ -145,3 +248,57 @@ def graph_snippet_for_tenant(tenant_id: str) -> Dict[str, Any]:
     base["tenant_id"] = tid
     base["graph_mode"] = "unconfigured_queries"
     return base
+
+
+def graph_snippet_for_tenant(tenant_id: str) -> Dict[str, Any]:
+    """
+    Subgraço / métricas por tenant. Usa WORLDGRAPH_TENANT_CYPHER se definido; senão tenta default + $tenant.
+    Resultado em cache por tenant (TTL curto); respostas com erro do gateway HTTP não ficam em cache.
+    """
+    tid = (tenant_id or "").strip()
+    ttl = _snippet_cache_ttl_s()
+    if ttl <= 0:
+        return _query_graph_snippet(tid)
+
+    now = time.monotonic()
+    with _lock:
+        entry = _snippets.get(tid)
+        if entry is not None and now - entry[0] < ttl:
+            _snippets.move_to_end(tid)
+            _stats["cache"]["hits"] += 1
+            return dict(entry[1])
+        _stats["cache"]["misses"] += 1
+
+    result = _query_graph_snippet(tid)
+    if _cacheable(result):
+        max_entries = int(os.getenv("WORLDGRAPH_TENANT_CACHE_MAX", "1024"))
+        with _lock:
+            _snippets[tid] = (now, dict(result))
+            _snippets.move_to_end(tid)
+            while len(_snippets) > max_entries:
+                _snippets.popitem(last=False)
+    return result
+
+
+def invalidate_graph_snippet(tenant_id: Optional[str] = None) -> None:
+    """Descarta o subgrafo em cache do tenant (ou de todos), p.ex. após sync do grafo."""
+    with _lock:
+        if tenant_id is None:
+            _snippets.clear()
+        else:
+            _snippets.pop((tenant_id or "").strip(), None)
+        _stats["cache"]["invalidations"] += 1
+
+
+def graph_context_stats() -> Dict[str, Any]:
+    """Contagens e tempos (ms) por backend + cache por tenant, para /health."""
+    with _lock:
+        out: Dict[str, Any] = {"cache": dict(_stats["cache"], entries=len(_snippets))}
+        for backend in ("bolt", "http"):
+            st = dict(_stats[backend])
+            st["avg_ms"] = round(st["total_ms"] / st["queries"], 2) if st["queries"] else None
+            st["total_ms"] = round(st["total_ms"], 2)
+            st["max_ms"] = round(st["max_ms"], 2)
+            out[backend] = st
+        out["bolt"]["driver_open"] = _driver is not None
+    return out
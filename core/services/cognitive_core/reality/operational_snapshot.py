@@ -24,9 +24,21 @@ def _env_bool(name: str, default: bool = False) -> bool:
 
 def fetch_core_local_operational_metrics(*, hours: int = 24) -> Dict[str, Any]:
     """
-    Métricas do próprio Core (Django ORM): volume de decisões e eventos recentes.
+    Métricas do próprio Core: volume de decisões e eventos recentes.
     Não substitui KPIs de restaurante — complementa observabilidade cognitiva.
+
+    Lê os contadores em janela mantidos no Redis (app_inbound_events.counters, leitura O(1));
+    sem Redis ou antes de ``rebuild_operational_counters``, agrega no ORM.
     """
+    try:
+        from app_inbound_events.counters import operational_metrics_from_counters
+
+        from_counters = operational_metrics_from_counters(hours)
+        if from_counters is not None:
+            return from_counters
+    except Exception as e:
+        logger.debug("fetch_core_local_operational_metrics: contadores indisponíveis: %s", e)
+
     since = timezone.now() - timedelta(hours=hours)
     out: Dict[str, Any] = {
         "source": "core_orm",
@@ -16,6 +16,7 @@ class RealityState:
     - dynamic_metrics: throughput, atraso, carga (Fase 2)
     - rag_long_term / rag_context: memória semântica pós-ranking (híbrido)
     - graph_structural: WorldGraph / Neo4j (estrutural)
+    - source_status: ok | error | timeout por fonte consultada na construção
     """
 
     operational: Dict[str, Any] = field(default_factory=dict)
@@ -25,6 +26,7 @@ class RealityState:
     rag_context: List[Dict[str, Any]] = field(default_factory=list)
     graph_structural: Dict[str, Any] = field(default_factory=dict)
     rag_namespaces: List[str] = field(default_factory=list)
+    source_status: Dict[str, str] = field(default_factory=dict)
     version: str = "v2"
 
     def to_llm_context_slice(self) -> Dict[str, Any]:
@@ -10,7 +10,7 @@ import os
 import uuid
 from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from core.services.vectorstore_client import vectorstore_upsert
+from core.services.vectorstore_client import vectorstore_upsert, vectorstore_upsert_batch
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,8 @@ ProgressCallback = Optional[Callable[[str, int, Optional[str]], None]]
 ChunkProgressCallback = Optional[Callable[[int, int], None]]
 
 DEFAULT_CHUNK_WORDS = 400
+# Chunks por POST /upsert_batch (embedding em lote no vectorstore)
+DEFAULT_UPSERT_BATCH = int(os.getenv("RAG_INGEST_UPSERT_BATCH", "64") or 64)
 ID_PREFIX = "sinapum.rag.gastronomia"
 
 
@@ -136,24 +138,34 @@ def ingest_chunk_strings(
     total = len(nonempty)
     ingested = 0
     errors: List[str] = []
-    for idx, chunk in enumerate(nonempty):
-        cid = f"{id_prefix}:{uuid.uuid4().hex}"
-        meta = classify_chunk_operational(chunk)
-        doc: Dict[str, Any] = {
-            "domain": domain,
-            "type": meta["type"],
-            "complexidade": meta["complexidade"],
-            "impacto_fluxo": meta["impacto_fluxo"],
-            "source": source,
-            "text": chunk,
-        }
-        payload = json.dumps(doc, ensure_ascii=False)
-        if vectorstore_upsert(cid, payload):
-            ingested += 1
+    batch_size = max(1, DEFAULT_UPSERT_BATCH)
+    for start in range(0, total, batch_size):
+        batch: List[tuple[str, str]] = []
+        for chunk in nonempty[start : start + batch_size]:
+            cid = f"{id_prefix}:{uuid.uuid4().hex}"
+            meta = classify_chunk_operational(chunk)
+            doc: Dict[str, Any] = {
+                "domain": domain,
+                "type": meta["type"],
+                "complexidade": meta["complexidade"],
+                "impacto_fluxo": meta["impacto_fluxo"],
+                "source": source,
+                "text": chunk,
+            }
+            batch.append((cid, json.dumps(doc, ensure_ascii=False)))
+        n = vectorstore_upsert_batch(batch)
+        if n:
+            ingested += n
+            errors.extend(["upsert_failed"] * (len(batch) - n))
         else:
-            errors.append("upsert_failed")
+            # Vectorstore sem /upsert_batch (ou falha do lote): um POST por chunk
+            for cid, payload in batch:
+                if vectorstore_upsert(cid, payload):
+                    ingested += 1
+                else:
+                    errors.append("upsert_failed")
         if chunk_progress and total > 0:
-            chunk_progress(idx + 1, total)
+            chunk_progress(min(start + batch_size, total), total)
     return {
         "chunks_ingested": ingested,
         "errors": errors,
@@ -1,6 +1,13 @@
+import hashlib
+import json
+import logging
 import os
+import re
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 try:
     from redisvl.index import SearchIndex  # type: ignore
@@ -9,94 +16,234 @@ except Exception:
     SearchIndex = None
     IndexSchema = None
 
+try:
+    from redisvl.query import VectorQuery  # type: ignore
+    from redisvl.query.filter import Tag  # type: ignore
+except Exception:
+    VectorQuery = None
+    Tag = None
+
 from .embeddings import embed_text, EmbeddingProviderError
 
-_INDEX = None
+logger = logging.getLogger(__name__)
+
+# Um índice por shard (tenant quando SEMANTIC_CACHE_SHARD_BY_TENANT=true; "" = índice global)
+_INDEXES: Dict[str, Any] = {}
+_INDEXES_LOCK = threading.Lock()
+
+# Valor de tag para campos vazios: permite filtrar "sem tenant" sem cair no wildcard
+_EMPTY_TAG = "_none"
+
+_FILTER_FIELDS_DEFAULT = "route,channel,tenant_id"
 
 
 def _enabled() -> bool:
     return os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
 
 
-def _get_index():
-    global _INDEX
-    if _INDEX is not None:
-        return _INDEX
+def _shard_by_tenant() -> bool:
+    return os.getenv("SEMANTIC_CACHE_SHARD_BY_TENANT", "false").lower() in ("1", "true", "yes")
+
+
+def _tenant_of(context: Dict[str, Any]) -> str:
+    return str(context.get("tenant_id") or context.get("tenant") or "").strip()
 
-    if SearchIndex is None or IndexSchema is None:
-        _INDEX = None
-        return None
 
+def _shard_for(context: Dict[str, Any]) -> str:
+    if not _shard_by_tenant():
+        return ""
+    return re.sub(r"[^a-zA-Z0-9_.-]", "_", _tenant_of(context))[:80]
+
+
+def _vector_attrs(dim: int) -> Dict[str, Any]:
+    algorithm = os.getenv("SEMANTIC_CACHE_VECTOR_ALGORITHM", "hnsw").lower().strip() or "hnsw"
+    attrs: Dict[str, Any] = {
+        "dims": dim,
+        "distance_metric": "cosine",
+        "algorithm": algorithm,
+        "datatype": "float32",
+    }
+    if algorithm == "hnsw":
+        attrs["m"] = int(os.getenv("SEMANTIC_CACHE_HNSW_M", "16"))
+        attrs["ef_construction"] = int(os.getenv("SEMANTIC_CACHE_HNSW_EF_CONSTRUCTION", "200"))
+        attrs["ef_runtime"] = int(os.getenv("SEMANTIC_CACHE_HNSW_EF_RUNTIME", "10"))
+    return attrs
+
+
+def _schema_fields(dim: int) -> List[Dict[str, Any]]:
+    return [
+        {"name": "intent", "type": "text"},
+        {"name": "response", "type": "text"},
+        {"name": "route", "type": "tag"},
+        {"name": "channel", "type": "tag"},
+        {"name": "user_id", "type": "tag"},
+        {"name": "tenant_id", "type": "tag"},
+        {"name": "created_at", "type": "numeric"},
+        {
+            "name": "intent_vector",
+            "type": "vector",
+            "attrs": _vector_attrs(dim),
+        },
+    ]
+
+
+def _schema_version(fields: List[Dict[str, Any]]) -> str:
+    """
+    Impressão digital do schema. Entra no nome e no prefixo do índice: um deploy que muda campos
+    ou o algoritmo do vetor cria um índice novo em vez de reutilizar um antigo incompatível
+    (p.ex. sem a tag tenant_id, onde toda a consulta filtrada falha). O índice antigo fica
+    órfão até FT.DROPINDEX e as suas chaves expiram pelo TTL.
+    """
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"s{digest[:8]}"
+
+
+def _index_names(shard: str) -> Tuple[str, str]:
     index_name = os.getenv("REDISVL_INDEX_NAME", "vz_semantic_cache")
     prefix = os.getenv("REDISVL_PREFIX", "vz:cache")
+    version = _schema_version(_schema_fields(int(os.getenv("SEMANTIC_VECTOR_DIM", "384"))))
+    index_name, prefix = f"{index_name}:{version}", f"{prefix}:{version}"
+    if shard:
+        return f"{index_name}:{shard}", f"{prefix}:{shard}"
+    return index_name, prefix
+
+
+def _get_index(shard: str = ""):
+    index = _INDEXES.get(shard)
+    if index is not None:
+        return index
+
+    if SearchIndex is None or IndexSchema is None:
+        return None
+
+    index_name, prefix = _index_names(shard)
     dim = int(os.getenv("SEMANTIC_VECTOR_DIM", "384"))
 
     schema_dict = {
         "index": {"name": index_name, "prefix": prefix, "storage_type": "hash"},
-        "fields": [
-            {"name": "intent", "type": "text"},
-            {"name": "response", "type": "text"},
-            {"name": "route", "type": "tag"},
-            {"name": "channel", "type": "tag"},
-            {"name": "user_id", "type": "tag"},
-            {"name": "created_at", "type": "numeric"},
-            {
-                "name": "intent_vector",
-                "type": "vector",
-                "attrs": {
-                    "dims": dim,
-                    "distance_metric": "cosine",
-                    "algorithm": "flat",
-                    "datatype": "float32",
-                },
-            },
-        ],
+        "fields": _schema_fields(dim),
     }
 
-    try:
-        schema = IndexSchema.from_dict(schema_dict)
-        index = SearchIndex(schema)
-        index.create(overwrite=False)
-        _INDEX = index
-    except Exception:
-        _INDEX = None
-    return _INDEX
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(shard)
+        if index is not None:
+            return index
+        try:
+            schema = IndexSchema.from_dict(schema_dict)
+            index = SearchIndex(schema)
+            index.create(overwrite=False)
+            _INDEXES[shard] = index
+        except Exception as e:
+            logger.warning("semantic cache: índice %s indisponível: %s", index_name, e)
+            return None
+    return index
+
+
+def _tag(value: Any) -> str:
+    return str(value or "").strip() or _EMPTY_TAG
 
 
 def _context_fields(context: Dict[str, Any]) -> Dict[str, Any]:
     return {
-        "route": str(context.get("route", "")),
-        "channel": str(context.get("channel", "")),
-        "user_id": str(context.get("user_id", "")),
+        "route": _tag(context.get("route")),
+        "channel": _tag(context.get("channel")),
+        "user_id": _tag(context.get("user_id")),
+        "tenant_id": _tag(_tenant_of(context)),
     }
 
 
+def _filter_expression(context: Dict[str, Any]):
+    """
+    Filtro por tags (SEMANTIC_CACHE_FILTER_FIELDS, default route,channel,tenant_id): o KNN só
+    considera entradas do mesmo tenant/rota/canal — não devolve a resposta de outra rota.
+    """
+    if Tag is None:
+        return None
+    fields = [
+        f.strip()
+        for f in os.getenv("SEMANTIC_CACHE_FILTER_FIELDS", _FILTER_FIELDS_DEFAULT).split(",")
+        if f.strip()
+    ]
+    values = _context_fields(context)
+    expr = None
+    for field in fields:
+        if field not in values:
+            continue
+        clause = Tag(field) == values[field]
+        expr = clause if expr is None else expr & clause
+    return expr
+
+
+def _lru_key(shard: str) -> str:
+    return f"{_index_names(shard)[1]}:__entries"
+
+
+def _evict(index: Any, shard: str) -> None:
+    """
+    Eviction por tamanho e idade além do TTL por chave: um sorted set por shard
+    (chave → created_at) corta as entradas mais antigas acima de SEMANTIC_CACHE_MAX_ENTRIES e
+    as mais velhas que SEMANTIC_CACHE_MAX_AGE_SECONDS.
+    """
+    client = getattr(index, "client", None)
+    if client is None:
+        return
+    max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "50000"))
+    max_age = int(os.getenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "86400"))
+    lru = _lru_key(shard)
+    doomed: List[Any] = []
+    if max_age > 0:
+        doomed.extend(client.zrangebyscore(lru, "-inf", time.time() - max_age))
+    if max_entries > 0:
+        excess = int(client.zcard(lru)) - len(doomed) - max_entries
+        if excess > 0:
+            doomed.extend(client.zrange(lru, len(doomed), len(doomed) + excess - 1))
+    if not doomed:
+        return
+    pipe = client.pipeline(transaction=False)
+    pipe.delete(*doomed)
+    pipe.zrem(lru, *doomed)
+    pipe.execute()
+
+
 def semantic_query(intent: str, context: Dict[str, Any]) -> Optional[str]:
     if not _enabled():
         return None
-    index = _get_index()
-    if index is None:
+    index = _get_index(_shard_for(context))
+    if index is None or VectorQuery is None:
         return None
     threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.86"))
     k = int(os.getenv("SEMANTIC_CACHE_TOPK", "3"))
+    max_age = int(os.getenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "86400"))
     try:
         vec = embed_text([intent])[0]
     except EmbeddingProviderError:
         return None
     try:
-        results = index.query(
+        query = VectorQuery(
             vector=vec,
             vector_field_name="intent_vector",
-            return_fields=["response", "intent", "route", "channel", "user_id"],
+            return_fields=["response", "intent", "route", "channel", "user_id", "tenant_id", "created_at"],
             num_results=k,
-            filter_expression=None,
+            filter_expression=_filter_expression(context),
         )
-    except Exception:
+        results = index.query(query)
+    except Exception as e:
+        logger.warning("semantic cache: consulta falhou: %s", e)
         return None
+    now = time.time()
     best: Optional[Tuple[float, Dict[str, Any]]] = None
     for r in (results or []):
-        score = float(r.get("score", 0.0)) if isinstance(r, dict) else 0.0
-        doc = r.get("document", r) if isinstance(r, dict) else {}
+        if not isinstance(r, dict):
+            continue
+        doc = r.get("document", r)
+        if "vector_distance" in r:
+            # distância cosseno do RediSearch (0 = idêntico) → similaridade
+            score = 1.0 - float(r["vector_distance"])
+        else:
+            score = float(r.get("score", 0.0))
+        created_at = float(doc.get("created_at") or 0)
+        if max_age > 0 and created_at and now - created_at > max_age:
+            continue
         if best is None or score > best[0]:
             best = (score, doc)
     if not best:
@@ -110,24 +257,33 @@ def semantic_query(intent: str, context: Dict[str, Any]) -> Optional[str]:
 def semantic_store(intent: str, context: Dict[str, Any], response: str, ttl_seconds: int = 3600) -> None:
     if not _enabled():
         return
-    index = _get_index()
+    shard = _shard_for(context)
+    index = _get_index(shard)
     if index is None:
         return
     try:
         vec = embed_text([intent])[0]
     except EmbeddingProviderError:
         return
+    created_at = int(time.time())
     doc = {
         "intent": intent,
         "response": response,
         **_context_fields(context),
-        "created_at": int(time.time()),
-        "intent_vector": vec,
+        "created_at": created_at,
+        # storage_type=hash exige o vetor em bytes float32
+        "intent_vector": np.asarray(vec, dtype="float32").tobytes(),
     }
     try:
         keys = index.load([doc])
         key = keys[0] if keys else None
-        if key and ttl_seconds > 0 and getattr(index, "client", None):
-            index.client.expire(key, ttl_seconds)
+        client = getattr(index, "client", None)
+        if key and client is not None:
+            pipe = client.pipeline(transaction=False)
+            if ttl_seconds > 0:
+                pipe.expire(key, ttl_seconds)
+            pipe.zadd(_lru_key(shard), {key: created_at})
+            pipe.execute()
+            _evict(index, shard)
     except Exception:
         return
@@ -1,31 +1,115 @@
 import os
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional
+
+# Implementação única do cache (LRU com TTL + Redis opcional), partilhada com o
+# vectorstore_service: mesma chave ``emb:v1:{modelo}:{sha256(texto normalizado)}`` e float32 em
+# bytes, logo o mesmo Redis serve os dois lados quando o modelo é o mesmo.
+from sinapum_shared.embedding_cache import EmbeddingCache, cache_key, normalize_text
+
+__all__ = [
+    "EmbeddingCache",
+    "EmbeddingProviderError",
+    "cache_key",
+    "embed_text",
+    "embedding_cache_stats",
+    "get_embedding_cache",
+    "normalize_text",
+]
 
 
 class EmbeddingProviderError(RuntimeError):
     pass
 
 
+_MODELS: Dict[str, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _local_model(model_name: str):
+    """SentenceTransformer carregado uma vez por processo (o load custa segundos)."""
+    model = _MODELS.get(model_name)
+    if model is None:
+        with _MODELS_LOCK:
+            model = _MODELS.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer  # type: ignore
+
+                model = SentenceTransformer(model_name)
+                _MODELS[model_name] = model
+    return model
+
+
+_CACHE: Optional[EmbeddingCache] = None
+
+
+def _cache_redis_client():
+    if os.getenv("SEMANTIC_EMBED_CACHE_REDIS", "false").lower() not in ("1", "true", "yes"):
+        return None
+    url = os.getenv("SEMANTIC_EMBED_CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+    if not url:
+        return None
+    from services.redis_client import client_for_url
+
+    # Vetores em bytes: sem decode_responses. Pool e circuit breaker partilhados do processo.
+    return client_for_url(url, decode_responses=False)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = EmbeddingCache(
+            max_size=int(os.getenv("SEMANTIC_EMBED_CACHE_SIZE", "4096")),
+            ttl_seconds=float(os.getenv("SEMANTIC_EMBED_CACHE_TTL", "3600")),
+            redis_client=_cache_redis_client(),
+        )
+    return _CACHE
+
+
+def embedding_cache_stats() -> Dict[str, Any]:
+    return get_embedding_cache().stats()
+
+
+def _encode_local(texts: List[str]) -> List[List[float]]:
+    try:
+        model_name = os.getenv("SEMANTIC_LOCAL_MODEL", "all-MiniLM-L6-v2")
+        model = _local_model(model_name)
+    except Exception as e:
+        raise EmbeddingProviderError(
+            "Provider local requer `sentence-transformers`. Instale e configure."
+        ) from e
+    vecs = model.encode(texts, normalize_embeddings=True)
+    return [v.tolist() for v in vecs]
+
+
 def embed_text(texts: List[str]) -> List[List[float]]:
     """
     Retorna vetores (float[]) para cada texto.
     Provider-agnostic:
     - SEMANTIC_EMBEDDINGS_PROVIDER=local: sentence-transformers
     - SEMANTIC_EMBEDDINGS_PROVIDER=openai: OpenAI (placeholder)
+
+    Textos repetidos (mesmo modelo + texto normalizado) saem do cache de embeddings sem forward
+    pass; só os misses vão ao modelo, num único lote. A normalização só entra na chave: o
+    modelo recebe o texto original.
     """
     provider = os.getenv("SEMANTIC_EMBEDDINGS_PROVIDER", "local").lower().strip()
 
     if provider == "local":
-        try:
-            from sentence_transformers import SentenceTransformer  # type: ignore
-        except Exception as e:
-            raise EmbeddingProviderError(
-                "Provider local requer `sentence-transformers`. Instale e configure."
-            ) from e
         model_name = os.getenv("SEMANTIC_LOCAL_MODEL", "all-MiniLM-L6-v2")
-        model = SentenceTransformer(model_name)
-        vecs = model.encode(texts, normalize_embeddings=True)
-        return [v.tolist() for v in vecs]
+        cache = get_embedding_cache()
+        keys = [cache_key(model_name, t) for t in texts]
+        out: List[Optional[List[float]]] = []
+        for k in keys:
+            vec = cache.get(k)
+            out.append(vec.tolist() if vec is not None else None)
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            vecs = _encode_local([texts[i] for i in missing])
+            for i, vec in zip(missing, vecs):
+                cache.put(keys[i], vec)
+                out[i] = vec
+        return [v for v in out if v is not None]
 
     if provider == "openai":
         raise EmbeddingProviderError(
@@ -30,6 +30,8 @@ app.conf.update(
         "core.services.task_queue_service.tasks.webhook_out": {"queue": "webhooks_out"},
         "core.services.task_queue_service.tasks.metrics_batch": {"queue": "metrics_batch"},
         "app_creative_engine.tasks.process_creative_job": {"queue": "ai_calls"},
+        "app_creative_engine.tasks.process_creative_job_batch": {"queue": "ai_calls"},
+        "app_creative_engine.tasks.drain_creative_jobs": {"queue": "ai_calls"},
     },
     task_queues=(
         Queue("events_ingest"),
@@ -38,6 +40,13 @@ app.conf.update(
         Queue("metrics_batch"),
         Queue("webhooks_out"),
     ),
+    beat_schedule={
+        # Jobs do Creative Engine em fila sem tarefa / presos em processing (worker morto)
+        "creative-engine-drain": {
+            "task": "app_creative_engine.tasks.drain_creative_jobs",
+            "schedule": float(os.environ.get("CREATIVE_ENGINE_DRAIN_INTERVAL_S", "300")),
+        },
+    },
 )
 
 # Autodiscover tasks em apps do Django (setup) e em core.services.task_queue_service
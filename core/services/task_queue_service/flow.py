@@ -71,6 +71,7 @@ def run_event_flow(inbound_event_id: str) -> None:
         "template_id": decision.template_id,
         "user_id": user_id,
         "channel": channel,
+        "tenant_id": str(policy_hint.get("tenant_id") or policy_hint.get("tenant") or ""),
     }
     cached = semantic_query(intent=text, context=cache_context)
     cognitive_context: Dict[str, Any] = {}
@@ -8,7 +8,11 @@ import redis
 
 def _redis_client() -> redis.Redis:
     url = os.getenv("IDEMPOTENCY_REDIS_URL") or os.getenv("CELERY_BROKER_URL") or "redis://localhost:6379/0"
-    return redis.Redis.from_url(url, decode_responses=True)
+    # Pool partilhado do processo (services.redis_client); cliente avulso só com o breaker aberto
+    from services.redis_client import client_for_url
+
+    client = client_for_url(url)
+    return client if client is not None else redis.Redis.from_url(url, decode_responses=True)
 
 
 @contextmanager
@@ -1,16 +1,37 @@
 """
 Cliente HTTP ao vectorstore_service (FastAPI + FAISS) para retrieval no fluxo cognitivo.
 Reutiliza a mesma resolução de URL que `learning.order_feedback_service`.
+
+Todas as chamadas partilham um ``requests.Session`` por processo (keep-alive + pool de ligações).
 """
 import json
 import logging
 import os
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _http() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool = int(os.getenv("VECTORSTORE_POOL_SIZE", "20"))
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
 
 def _vectorstore_url() -> str:
     explicit = os.getenv("VECTORSTORE_URL", "").strip()
@@ -22,7 +43,7 @@ def _vectorstore_url() -> str:
 
 def vectorstore_upsert(item_id: str, text: str) -> bool:
     """
-    POST /upsert no vectorstore_service.
+    POST /upsert no vectorstore_service (substitui o vetor se o id já existir).
     Retorna True se gravado; False em falha (sem exceção — fluxo continua).
     """
     iid = (item_id or "").strip()
@@ -32,7 +53,7 @@ def vectorstore_upsert(item_id: str, text: str) -> bool:
     url = f"{_vectorstore_url()}/upsert"
     try:
         timeout = float(os.getenv("VECTORSTORE_TIMEOUT", "10"))
-        r = requests.post(url, json={"id": iid, "text": body}, timeout=timeout)
+        r = _http().post(url, json={"id": iid, "text": body}, timeout=timeout)
         r.raise_for_status()
         return True
     except Exception as e:
@@ -40,6 +61,48 @@ def vectorstore_upsert(item_id: str, text: str) -> bool:
         return False
 
 
+def vectorstore_upsert_batch(items: Sequence[Tuple[str, str]]) -> int:
+    """
+    POST /upsert_batch no vectorstore_service (embedding em lote + uma escrita no WAL).
+    Retorna o número de itens gravados; 0 em falha (sem exceção — o chamador decide o fallback).
+    """
+    rows = [
+        {"id": (iid or "").strip(), "text": (text or "").strip()}
+        for iid, text in items
+        if (iid or "").strip() and (text or "").strip()
+    ]
+    if not rows:
+        return 0
+    url = f"{_vectorstore_url()}/upsert_batch"
+    try:
+        timeout = float(os.getenv("VECTORSTORE_BATCH_TIMEOUT", "120"))
+        r = _http().post(url, json={"items": rows}, timeout=timeout)
+        r.raise_for_status()
+        return int((r.json() or {}).get("upserted", len(rows)))
+    except Exception as e:
+        logger.warning("vectorstore_upsert_batch falhou: %s", e)
+        return 0
+
+
+def vectorstore_delete(item_ids: Sequence[str]) -> int:
+    """
+    POST /delete no vectorstore_service.
+    Retorna quantos ids existiam e foram apagados; 0 em falha (sem exceção).
+    """
+    ids = [str(i).strip() for i in item_ids if str(i or "").strip()]
+    if not ids:
+        return 0
+    url = f"{_vectorstore_url()}/delete"
+    try:
+        timeout = float(os.getenv("VECTORSTORE_TIMEOUT", "10"))
+        r = _http().post(url, json={"ids": ids}, timeout=timeout)
+        r.raise_for_status()
+        return int((r.json() or {}).get("deleted", 0))
+    except Exception as e:
+        logger.warning("vectorstore_delete falhou: %s", e)
+        return 0
+
+
 def vectorstore_search(
     query: str,
     k: int = 5,
@@ -51,28 +114,91 @@ def vectorstore_search(
     POST /search no vectorstore_service.
     Retorna lista de {id, score, text?} ou [] se indisponível.
     Não levanta exceção em falha de rede — o fluxo principal continua.
+
+    ``id_prefix`` é enviado ao servidor (filtro antes do top-k); o filtro local mantém-se
+    para servidores antigos que ignoram o campo.
     """
     q = (query or "").strip()
     if not q:
         return []
     url = f"{_vectorstore_url()}/search"
+    p = str(id_prefix or "").strip()
+    payload: Dict[str, Any] = {"text": q, "k": k, "include_text": include_text}
+    if p:
+        payload["id_prefix"] = p
     try:
         timeout = float(os.getenv("VECTORSTORE_TIMEOUT", "10"))
-        r = requests.post(
-            url,
-            json={"text": q, "k": k, "include_text": include_text},
-            timeout=timeout,
-        )
+        r = _http().post(url, json=payload, timeout=timeout)
         r.raise_for_status()
         data = r.json()
         results = data.get("results") or []
         if not isinstance(results, list):
             return []
-        if id_prefix:
-            p = str(id_prefix).strip()
-            if p:
-                results = [r for r in results if str((r or {}).get("id", "")).startswith(p)]
+        if p:
+            results = [r for r in results if str((r or {}).get("id", "")).startswith(p)]
         return results
     except Exception as e:
         logger.warning("vectorstore_search falhou: %s", e)
         return []
+
+
+def _search_layer(
+    query: str,
+    prefixes: Union[str, Sequence[str]],
+    *,
+    k: int,
+    include_text: bool,
+) -> List[Dict[str, Any]]:
+    """
+    Fallback de ``/search_multi`` (servidor antigo): uma busca por prefixo da camada, junta por
+    score (top-k, sem ids repetidos). Lista vazia = índice inteiro, como no servidor.
+    """
+    if isinstance(prefixes, str):
+        return vectorstore_search(query, k=k, include_text=include_text, id_prefix=prefixes)
+    prefixes = [str(p) for p in prefixes if str(p or "").strip()]
+    if not prefixes:
+        return vectorstore_search(query, k=k, include_text=include_text)
+    best: Dict[str, Dict[str, Any]] = {}
+    for prefix in prefixes:
+        for hit in vectorstore_search(query, k=k, include_text=include_text, id_prefix=prefix):
+            hid = str((hit or {}).get("id", ""))
+            if hid and (hid not in best or float(hit.get("score") or 0.0) > float(best[hid].get("score") or 0.0)):
+                best[hid] = hit
+    return sorted(best.values(), key=lambda h: float(h.get("score") or 0.0), reverse=True)[:k]
+
+
+def vectorstore_search_multi(
+    query: str,
+    layers: Mapping[str, Union[str, Sequence[str]]],
+    k: int = 5,
+    *,
+    include_text: bool = True,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    POST /search_multi: uma codificação da consulta e uma ida ao servidor para várias camadas.
+    ``layers`` = {camada: prefixo(s) de id} → {camada: [{id, score, text?}]}.
+    Se o servidor não tiver o endpoint (404), faz uma busca por camada; em falha de rede devolve
+    listas vazias (sem exceção).
+    """
+    q = (query or "").strip()
+    names = list(layers)
+    if not q or not names:
+        return {name: [] for name in names}
+    url = f"{_vectorstore_url()}/search_multi"
+    payload = {"text": q, "k": k, "include_text": include_text, "layers": dict(layers)}
+    try:
+        timeout = float(os.getenv("VECTORSTORE_TIMEOUT", "10"))
+        r = _http().post(url, json=payload, timeout=timeout)
+        if r.status_code == 404:
+            return {
+                name: _search_layer(q, prefix, k=k, include_text=include_text)
+                for name, prefix in layers.items()
+            }
+        r.raise_for_status()
+        data = (r.json() or {}).get("results") or {}
+        if not isinstance(data, dict):
+            return {name: [] for name in names}
+        return {name: list(data.get(name) or []) for name in names}
+    except Exception as e:
+        logger.warning("vectorstore_search_multi falhou: %s", e)
+        return {name: [] for name in names}
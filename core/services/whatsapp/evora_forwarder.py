@@ -0,0 +1,419 @@
+"""
+Evora Forwarder - Encaminhamento de mensagens WhatsApp para o Evora/VitrineZap
+==============================================================================
+
+Pool fixo de workers por processo com fila limitada e sessão HTTP partilhada (keep-alive),
+em vez de uma thread e uma ligação TCP por mensagem recebida.
+
+- Backpressure: com a fila cheia a mensagem vai para um Redis Stream de spill (política
+  ``spill``, padrão) ou é descartada (``drop``); ambas contam nas métricas.
+- Retries com backoff exponencial e jitter (full jitter) em erros de rede, 429 e 5xx;
+  esgotados os retries a mensagem também vai para o spill.
+- Workers ociosos drenam o spill (consumer group; entradas de workers mortos são
+  reclamadas com XAUTOCLAIM).
+- Batching: com ``EVORA_WHATSAPP_WEBHOOK_BATCH_URL`` definido, mensagens em fila são
+  enviadas juntas (``{"messages": [...]}``) até ``EVORA_FORWARD_BATCH_SIZE``.
+
+Configuração (settings → env → padrão): EVORA_WHATSAPP_WEBHOOK_URL,
+EVORA_WHATSAPP_WEBHOOK_BATCH_URL, EVORA_FORWARD_WORKERS (4), EVORA_FORWARD_QUEUE_SIZE (1000),
+EVORA_FORWARD_OVERFLOW (spill|drop), EVORA_FORWARD_MAX_RETRIES (3),
+EVORA_FORWARD_BACKOFF_BASE_S (0.5), EVORA_FORWARD_BACKOFF_MAX_S (10),
+EVORA_FORWARD_TIMEOUT_S (15), EVORA_FORWARD_BATCH_SIZE (20),
+EVORA_FORWARD_SPILL_STREAM (whatsapp.evora_forward), EVORA_FORWARD_SPILL_MAX_ATTEMPTS (10).
+"""
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SPILL_GROUP = 'evora_forwarder'
+SPILL_MAXLEN = 100000
+SPILL_POLL_S = 5.0
+SPILL_RECLAIM_IDLE_MS = 60000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _setting(name: str, default: Any) -> Any:
+    """settings.<name> → env var → default (funciona também sem Django configurado)."""
+    try:
+        value = getattr(settings, name, None)
+    except Exception:
+        value = None
+    if value is None or value == '':
+        value = os.environ.get(name)
+    return default if value is None or value == '' else value
+
+
+class ForwardError(Exception):
+    """Falha de encaminhamento; ``retryable`` indica se vale a pena tentar de novo."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _default_session(pool_size: int):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Content-Type'] = 'application/json'
+    return session
+
+
+def _default_redis():
+    try:
+        from services.redis_client import get_redis_client
+    except Exception:
+        return None
+    return get_redis_client()
+
+
+class EvoraForwarder:
+    """Pool de workers que encaminha payloads para o webhook do Evora."""
+
+    def __init__(
+        self,
+        url: str,
+        batch_url: str = '',
+        workers: int = 4,
+        queue_size: int = 1000,
+        overflow: str = 'spill',
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        timeout: float = 15.0,
+        batch_size: int = 20,
+        spill_stream: str = 'whatsapp.evora_forward',
+        spill_max_attempts: int = 10,
+        session: Any = None,
+        redis_factory: Callable[[], Any] = _default_redis,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.url = url
+        self.batch_url = batch_url
+        self.workers = max(1, int(workers))
+        self.overflow = overflow
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.timeout = float(timeout)
+        self.batch_size = max(1, int(batch_size))
+        self.spill_stream = spill_stream
+        self.spill_max_attempts = int(spill_max_attempts)
+        self._queue: 'queue.Queue[Dict]' = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._session = session
+        self._redis_factory = redis_factory
+        self._sleep = sleep
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._inflight = 0
+        self._idle = threading.Condition(self._lock)
+        self._spill_lock = threading.Lock()
+        self._spill_checked_at = 0.0
+        self._spill_group_ready = False
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._latencies: deque = deque(maxlen=500)
+        self._counters = {
+            'submitted': 0,
+            'forwarded': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'spill_drained': 0,
+        }
+
+    # ------------------------------------------------------------------ API
+
+    def submit(self, payload: Dict[str, Any]) -> bool:
+        """
+        Enfileira um payload sem bloquear o pedido. Devolve False se a fila estava cheia
+        (a mensagem foi para o spill ou descartada, conforme a política).
+        """
+        self._ensure_started()
+        self._count('submitted')
+        try:
+            with self._lock:
+                self._queue.put_nowait(payload)
+                self._inflight += 1
+            return True
+        except queue.Full:
+            pass
+        if self.overflow == 'spill' and self._spill([payload], reason='queue_full'):
+            return False
+        self._count('dropped')
+        logger.warning(f"[Evora Forward] Fila cheia ({self._queue.maxsize}), mensagem descartada")
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera até a fila ficar vazia e sem envios em curso (testes / shutdown)."""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._inflight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)  # acorda os workers parados no get()
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+            inflight = self._inflight
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 1)
+
+        return {
+            'workers': self.workers,
+            'alive_workers': sum(1 for t in self._threads if t.is_alive()),
+            'queue_depth': self._queue.qsize(),
+            'queue_max': self._queue.maxsize,
+            'inflight': inflight,
+            'overflow': self.overflow,
+            'batching': bool(self.batch_url),
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'samples': len(latencies)},
+            **counters,
+        }
+
+    # -------------------------------------------------------------- workers
+
+    def _ensure_started(self) -> None:
+        if self._threads and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if self._session is None:
+                self._session = _default_session(self.workers)
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, name=f"evora-forward-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._drain_spill()
+                continue
+            if item is None:
+                continue
+            items = [item]
+            if self.batch_url:
+                while len(items) < self.batch_size:
+                    try:
+                        extra = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if extra is None:
+                        break
+                    items.append(extra)
+            try:
+                self._deliver(items)
+            except Exception as e:
+                logger.error(f"[Evora Forward] Erro inesperado no worker: {e}", exc_info=True)
+            finally:
+                with self._idle:
+                    self._inflight -= len(items)
+                    if self._inflight <= 0:
+                        self._idle.notify_all()
+
+    def _deliver(self, payloads: List[Dict], spill_attempts: int = 0) -> bool:
+        """Envia com retries; esgotados, manda para o spill. True se foi entregue."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self._post(payloads)
+                with self._lock:
+                    self._latencies.append(time.perf_counter() - started)
+                    self._counters['forwarded'] += len(payloads)
+                    if len(payloads) > 1:
+                        self._counters['batches'] += 1
+                return True
+            except ForwardError as e:
+                if e.retryable and attempt < self.max_retries:
+                    attempt += 1
+                    self._count('retries')
+                    self._sleep(self._backoff(attempt))
+                    continue
+                self._count('failed', len(payloads))
+                logger.error(f"[Evora Forward] Falha ao encaminhar para {self.url}: {e}")
+                if e.retryable and spill_attempts + 1 < self.spill_max_attempts:
+                    self._spill(payloads, reason=str(e), attempts=spill_attempts + 1)
+                return False
+
+    def _post(self, payloads: List[Dict]) -> None:
+        if len(payloads) > 1:
+            url, body = self.batch_url, {'messages': payloads}
+        else:
+            url, body = self.url, payloads[0]
+        try:
+            resp = self._session.post(url, json=body, timeout=self.timeout)
+        except Exception as e:
+            raise ForwardError(f"{type(e).__name__}: {e}")
+        if resp.status_code in RETRY_STATUS:
+            raise ForwardError(f"status={resp.status_code}")
+        if resp.status_code >= 400:
+            raise ForwardError(f"status={resp.status_code}: {resp.text[:200]}", retryable=False)
+        logger.debug(f"[Evora Forward] status={resp.status_code} url={url} n={len(payloads)}")
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniforme em [0, min(max, base * 2^(attempt-1))]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    # ---------------------------------------------------------------- spill
+
+    def _spill(self, payloads: List[Dict], reason: str, attempts: int = 0) -> bool:
+        client = self._redis_factory() if self.spill_stream else None
+        if client is None:
+            return False
+        try:
+            pipe = client.pipeline(transaction=False)
+            for payload in payloads:
+                pipe.xadd(
+                    self.spill_stream,
+                    {'payload': json.dumps(payload), 'attempts': attempts, 'reason': reason[:200]},
+                    maxlen=SPILL_MAXLEN,
+                    approximate=True,
+                )
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"[Evora Forward] Spill para {self.spill_stream} falhou: {e}")
+            return False
+        self._count('spilled', len(payloads))
+        return True
+
+    def _drain_spill(self) -> None:
+        """Com a fila local vazia, um worker de cada vez reencaminha entradas do spill."""
+        if not self.spill_stream or time.monotonic() - self._spill_checked_at < SPILL_POLL_S:
+            return
+        if not self._spill_lock.acquire(blocking=False):
+            return
+        try:
+            self._spill_checked_at = time.monotonic()
+            client = self._redis_factory()
+            if client is None:
+                return
+            if not self._spill_group_ready:
+                try:
+                    client.xgroup_create(self.spill_stream, SPILL_GROUP, id='0', mkstream=True)
+                except Exception as e:
+                    if 'BUSYGROUP' not in str(e):
+                        raise
+                self._spill_group_ready = True
+            entries = client.xautoclaim(
+                self.spill_stream, SPILL_GROUP, self._consumer,
+                min_idle_time=SPILL_RECLAIM_IDLE_MS, start_id='0-0', count=self.batch_size,
+            )[1]
+            if not entries:
+                response = client.xreadgroup(
+                    SPILL_GROUP, self._consumer, {self.spill_stream: '>'}, count=self.batch_size
+                )
+                entries = response[0][1] if response else []
+            for entry_id, fields in entries:
+                if not self._queue.empty() or self._stop.is_set():
+                    break
+                # Reencaminhada ou de novo no spill (com attempts+1): em ambos os casos sai daqui
+                if fields:
+                    self._deliver([json.loads(fields['payload'])], int(fields.get('attempts', 0)))
+                    self._count('spill_drained')
+                client.xack(self.spill_stream, SPILL_GROUP, entry_id)
+                client.xdel(self.spill_stream, entry_id)
+        except Exception as e:
+            logger.warning(f"[Evora Forward] Drenagem do spill falhou: {e}")
+        finally:
+            self._spill_lock.release()
+
+
+_forwarder: Optional[EvoraForwarder] = None
+_forwarder_pid: Optional[int] = None
+_forwarder_lock = threading.Lock()
+
+
+def build_evora_forwarder() -> Optional[EvoraForwarder]:
+    """Forwarder configurado por settings/env; None se EVORA_WHATSAPP_WEBHOOK_URL não estiver definido."""
+    url = _setting('EVORA_WHATSAPP_WEBHOOK_URL', '')
+    if not url:
+        return None
+    return EvoraForwarder(
+        url=url,
+        batch_url=_setting('EVORA_WHATSAPP_WEBHOOK_BATCH_URL', ''),
+        workers=int(_setting('EVORA_FORWARD_WORKERS', 4)),
+        queue_size=int(_setting('EVORA_FORWARD_QUEUE_SIZE', 1000)),
+        overflow=str(_setting('EVORA_FORWARD_OVERFLOW', 'spill')).lower(),
+        max_retries=int(_setting('EVORA_FORWARD_MAX_RETRIES', 3)),
+        backoff_base=float(_setting('EVORA_FORWARD_BACKOFF_BASE_S', 0.5)),
+        backoff_max=float(_setting('EVORA_FORWARD_BACKOFF_MAX_S', 10)),
+        timeout=float(_setting('EVORA_FORWARD_TIMEOUT_S', 15)),
+        batch_size=int(_setting('EVORA_FORWARD_BATCH_SIZE', 20)),
+        spill_stream=_setting('EVORA_FORWARD_SPILL_STREAM', 'whatsapp.evora_forward'),
+        spill_max_attempts=int(_setting('EVORA_FORWARD_SPILL_MAX_ATTEMPTS', 10)),
+    )
+
+
+def get_evora_forwarder() -> Optional[EvoraForwarder]:
+    """Forwarder do processo (recriado depois de fork: threads não sobrevivem ao fork)."""
+    global _forwarder, _forwarder_pid
+    pid = os.getpid()
+    if _forwarder_pid == pid:
+        return _forwarder
+    with _forwarder_lock:
+        if _forwarder_pid != pid:
+            _forwarder = build_evora_forwarder()
+            _forwarder_pid = pid
+    return _forwarder
+
+
+def evora_forwarder_stats() -> Optional[Dict[str, Any]]:
+    """Métricas do forwarder do processo (None se o encaminhamento não estiver configurado)."""
+    forwarder = get_evora_forwarder()
+    return forwarder.stats() if forwarder is not None else None
+
+
+def reset_evora_forwarder() -> None:
+    """Para e descarta o forwarder do processo (testes / mudança de configuração)."""
+    global _forwarder, _forwarder_pid
+    with _forwarder_lock:
+        if _forwarder is not None:
+            _forwarder.shutdown(timeout=0)
+        _forwarder = None
+        _forwarder_pid = None
@@ -6,39 +6,26 @@ Handler para receber eventos do WhatsApp Gateway Service (Node.js + Baileys).
 Encaminha mensagens para o Evora/VitrineZap para gerenciamento de conversas.
 """
 import logging
-import threading
 from typing import Dict, Any, Optional
-import requests as http_requests
 from django.http import JsonResponse, HttpRequest
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 
+from .evora_forwarder import get_evora_forwarder
+
 logger = logging.getLogger(__name__)
 
 
-def _forward_to_evora(payload: Dict[str, Any]) -> Optional[Dict]:
-    """Encaminha payload de mensagem para o Evora/VitrineZap em background"""
-    evora_url = getattr(settings, 'EVORA_WHATSAPP_WEBHOOK_URL', '')
-    if not evora_url:
+def _forward_to_evora(payload: Dict[str, Any]) -> Optional[bool]:
+    """
+    Encaminha payload de mensagem para o Evora/VitrineZap em background (pool de workers
+    do processo, ver evora_forwarder). None se o encaminhamento não estiver configurado;
+    False se a fila estava cheia (mensagem em spill ou descartada).
+    """
+    forwarder = get_evora_forwarder()
+    if forwarder is None:
         return None
-
-    def _do_forward():
-        try:
-            resp = http_requests.post(
-                evora_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=15,
-            )
-            logger.info(
-                f"[Evora Forward] status={resp.status_code} url={evora_url}",
-                extra={'response_status': resp.status_code}
-            )
-        except Exception as e:
-            logger.error(f"[Evora Forward] Erro ao encaminhar para {evora_url}: {e}")
-
-    thread = threading.Thread(target=_do_forward, daemon=True)
-    thread.start()
+    return forwarder.submit(payload)
 
 
 @csrf_exempt
@@ -1,10 +1,16 @@
 """
 BackgroundRemovalService - Remoção de fundo de imagens de produtos
 Usa rembg quando disponível, senão retorna imagem original
+
+A sessão rembg (modelo ONNX, CREATIVE_ENGINE_REMBG_MODEL) é carregada uma vez por processo e
+partilhada por todos os serviços: ``warm_up()`` carrega-a no arranque do worker Celery.
 """
+import io
 import logging
+import os
+import threading
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,47 @@ try:
 except ImportError:
     pass
 
+_session_lock = threading.Lock()
+# (pid, modelo) -> sessão rembg; None regista uma falha de carregamento (não repetir por tarefa)
+_sessions: Dict[Tuple[int, str], Any] = {}
+
+
+def _model_name() -> str:
+    return os.environ.get("CREATIVE_ENGINE_REMBG_MODEL", "u2net")
+
+
+def get_rembg_session(model_name: Optional[str] = None) -> Any:
+    """Sessão rembg partilhada no processo (recarregada após fork). None se indisponível."""
+    if not REMBG_AVAILABLE:
+        return None
+    key = (os.getpid(), model_name or _model_name())
+    if key in _sessions:
+        return _sessions[key]
+    with _session_lock:
+        if key not in _sessions:
+            try:
+                _sessions[key] = rembg.new_session(key[1])
+                logger.info(f"rembg: sessão '{key[1]}' carregada (pid {key[0]})")
+            except Exception as e:
+                logger.warning(f"rembg session falhou: {e}")
+                _sessions[key] = None
+    return _sessions[key]
+
+
+def warm_up(model_name: Optional[str] = None) -> bool:
+    """Carrega a sessão e corre uma inferência mínima, para a 1.ª foto não pagar o arranque do ONNX."""
+    session = get_rembg_session(model_name)
+    if session is None:
+        return False
+    try:
+        buf = io.BytesIO()
+        Image.new("RGB", (32, 32), "white").save(buf, format="PNG")
+        rembg.remove(buf.getvalue(), session=session)
+        return True
+    except Exception as e:
+        logger.warning(f"rembg warm-up falhou: {e}")
+        return False
+
 
 class BackgroundRemovalService:
     """
@@ -23,14 +70,8 @@ class BackgroundRemovalService:
     Opcional: requer pip install rembg pillow
     """
 
-    def __init__(self):
-        self._session = None
-        if REMBG_AVAILABLE:
-            try:
-                self._session = rembg.new_session()
-            except Exception as e:
-                logger.warning(f"rembg session falhou: {e}")
-                self._session = None
+    def __init__(self, session: Any = None):
+        self._session = session if session is not None else get_rembg_session()
 
     def remove_background(self, image_path: str, output_path: Optional[str] = None) -> Optional[str]:
         """
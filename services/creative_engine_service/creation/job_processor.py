@@ -1,13 +1,44 @@
 """
 CreativeJobProcessor - Processa jobs de criação em background (fluxo Kwai/Tamo)
+
+Análise (OpenMind, I/O) e remoção de fundo (rembg, CPU) são independentes e correm em
+paralelo; a sessão rembg é a do processo (``background_removal.get_rembg_session``).
+``process_batch`` passa as imagens de vários jobs pela mesma sessão. Tempos por etapa (ms)
+ficam no dict ``timings``: analyze, remove_bg, generate, total.
 """
 import logging
+import os
+import threading
+import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 
 logger = logging.getLogger(__name__)
 
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _stage_pool() -> ThreadPoolExecutor:
+    """Pool do processo para etapas de I/O (análise) em paralelo com a remoção de fundo."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = int(os.environ.get("CREATIVE_ENGINE_STAGE_WORKERS", "4"))
+                _pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="creative-stage")
+    return _pool
+
+
+def _timed(timings: Dict[str, float], stage: str, fn: Callable, *args) -> Any:
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
 
 class CreativeJobProcessor:
     """
@@ -45,6 +76,7 @@ class CreativeJobProcessor:
         image_path: str,
         update_status_callback,
         base_url: str = "",
+        timings: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Processa job completo.
@@ -54,10 +86,12 @@ class CreativeJobProcessor:
             image_path: Caminho da imagem de entrada
             update_status_callback: Função(job_id, status, stage, progress, description, error)
             base_url: URL base para montar URLs das imagens geradas
+            timings: Dict preenchido com o tempo de cada etapa (ms)
 
         Returns:
             Lista de outputs: [{'style': str, 'image_url': str, 'template_id': str}, ...]
         """
+        timings = timings if timings is not None else {}
         outputs = []
         path = Path(image_path)
 
@@ -65,63 +99,19 @@ class CreativeJobProcessor:
             update_status_callback(job_id, 'failed', 'error', 0, '', f'Imagem não encontrada: {image_path}')
             return outputs
 
+        started = time.perf_counter()
         try:
-            # 1. Análise
-            update_status_callback(job_id, 'processing', 'analyzing', 10, 'Analisando imagem...', None)
-            analyzer = self._get_analyzer()
-            analysis = analyzer.analyze(image_path)
+            # 1+2. Análise (pool) em paralelo com a remoção de fundo (esta thread)
+            update_status_callback(job_id, 'processing', 'analyzing', 10, 'Analisando imagem e removendo fundo...', None)
+            analysis_future = _stage_pool().submit(_timed, timings, 'analyze', self._get_analyzer().analyze, image_path)
+            no_bg_path = _timed(timings, 'remove_bg', self._get_bg_remover().remove_background, image_path)
+            analysis = analysis_future.result()
             description = analysis.get('description', 'Produto em destaque')
-            update_status_callback(job_id, 'processing', 'analyzing', 25, description, None)
-
-            # 2. Remoção de fundo
-            update_status_callback(job_id, 'processing', 'removing_bg', 35, 'Removendo fundo...', None)
-            bg_remover = self._get_bg_remover()
-            no_bg_path = bg_remover.remove_background(image_path)
-            if no_bg_path and no_bg_path != image_path:
-                product_image_path = no_bg_path
-            else:
-                product_image_path = image_path
+            update_status_callback(job_id, 'processing', 'removing_bg', 40, description, None)
 
             # 3. Geração de variantes
-            update_status_callback(job_id, 'processing', 'generating', 50, 'Gerando variações...', None)
-            scene_lib = self._get_scene_lib()
-            templates = scene_lib.get_recommended(analysis)
-
-            # Output 1: Clean product (sempre)
-            clean_url = self._save_output(product_image_path, job_id, 'clean_product', base_url)
-            if clean_url:
-                outputs.append({
-                    'style': 'clean_product',
-                    'template_id': 'minimal_studio',
-                    'image_url': clean_url,
-                    'thumbnail_url': clean_url,
-                })
-
-            # Output 2: Original (ou no-bg como alternativa)
-            orig_url = self._save_output(image_path, job_id, 'original', base_url)
-            if orig_url and orig_url != clean_url:
-                outputs.append({
-                    'style': 'original',
-                    'template_id': '',
-                    'image_url': orig_url,
-                    'thumbnail_url': orig_url,
-                })
-
-            # Output 3+: Placeholders para lifestyle (MVP - em produção seria IA)
-            for i, template in enumerate(templates[:2]):
-                if template.get('id') == 'minimal_studio':
-                    continue
-                # MVP: usar clean como placeholder para lifestyle
-                placeholder_url = clean_url or orig_url
-                if placeholder_url:
-                    outputs.append({
-                        'style': f"lifestyle_{template.get('id', i)}",
-                        'template_id': template.get('id', ''),
-                        'image_url': placeholder_url,
-                        'thumbnail_url': placeholder_url,
-                        'metadata': {'template': template.get('name'), 'mvp_placeholder': True},
-                    })
-
+            outputs = self._generate(job_id, image_path, no_bg_path, analysis, update_status_callback, base_url, timings)
+            timings['total'] = round((time.perf_counter() - started) * 1000, 1)
             update_status_callback(job_id, 'completed', 'done', 100, description, None)
             return outputs
 
@@ -130,6 +120,129 @@ class CreativeJobProcessor:
             update_status_callback(job_id, 'failed', 'error', 0, '', str(e))
             return outputs
 
+    def process_batch(
+        self,
+        jobs: List[Dict[str, str]],
+        update_status_callback,
+        base_url: str = "",
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Processa vários jobs de uma vez: as análises correm em paralelo enquanto as imagens
+        passam, uma a uma, pela mesma sessão rembg.
+
+        Args:
+            jobs: [{'job_id': str, 'image_path': str}, ...]
+
+        Returns:
+            {job_id: {'outputs': [...], 'timings': {...}}} (outputs vazio se o job falhou)
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for job in jobs:
+            job_id, image_path = job['job_id'], job['image_path']
+            results[job_id] = {'outputs': [], 'timings': {}}
+            if not Path(image_path).exists():
+                update_status_callback(job_id, 'failed', 'error', 0, '', f'Imagem não encontrada: {image_path}')
+                continue
+            pending.append((job_id, image_path))
+
+        started = time.perf_counter()
+        analyzer = self._get_analyzer()
+        analyses: Dict[str, Future] = {}
+        for job_id, image_path in pending:
+            update_status_callback(job_id, 'processing', 'analyzing', 10, 'Analisando imagem e removendo fundo...', None)
+            analyses[job_id] = _stage_pool().submit(
+                _timed, results[job_id]['timings'], 'analyze', analyzer.analyze, image_path
+            )
+
+        bg_remover = self._get_bg_remover()
+        no_bg_paths: Dict[str, Optional[str]] = {}
+        for job_id, image_path in pending:
+            try:
+                no_bg_paths[job_id] = _timed(
+                    results[job_id]['timings'], 'remove_bg', bg_remover.remove_background, image_path
+                )
+            except Exception as e:
+                logger.warning(f"Remoção de fundo falhou no job {job_id}: {e}")
+                no_bg_paths[job_id] = image_path
+
+        for job_id, image_path in pending:
+            timings = results[job_id]['timings']
+            try:
+                analysis = analyses[job_id].result()
+                description = analysis.get('description', 'Produto em destaque')
+                update_status_callback(job_id, 'processing', 'removing_bg', 40, description, None)
+                results[job_id]['outputs'] = self._generate(
+                    job_id, image_path, no_bg_paths[job_id], analysis, update_status_callback, base_url, timings
+                )
+                timings['total'] = round((time.perf_counter() - started) * 1000, 1)
+                timings['batch_size'] = len(pending)
+                update_status_callback(job_id, 'completed', 'done', 100, description, None)
+            except Exception as e:
+                logger.exception(f"Erro ao processar job {job_id}")
+                update_status_callback(job_id, 'failed', 'error', 0, '', str(e))
+        return results
+
+    def _generate(
+        self,
+        job_id: str,
+        image_path: str,
+        no_bg_path: Optional[str],
+        analysis: Dict[str, Any],
+        update_status_callback,
+        base_url: str,
+        timings: Dict[str, float],
+    ) -> List[Dict[str, Any]]:
+        """Etapa 3: outputs (clean product, original, placeholders lifestyle)."""
+        started = time.perf_counter()
+        outputs = []
+        if no_bg_path and no_bg_path != image_path:
+            product_image_path = no_bg_path
+        else:
+            product_image_path = image_path
+
+        update_status_callback(job_id, 'processing', 'generating', 50, 'Gerando variações...', None)
+        scene_lib = self._get_scene_lib()
+        templates = scene_lib.get_recommended(analysis)
+
+        # Output 1: Clean product (sempre)
+        clean_url = self._save_output(product_image_path, job_id, 'clean_product', base_url)
+        if clean_url:
+            outputs.append({
+                'style': 'clean_product',
+                'template_id': 'minimal_studio',
+                'image_url': clean_url,
+                'thumbnail_url': clean_url,
+            })
+
+        # Output 2: Original (ou no-bg como alternativa)
+        orig_url = self._save_output(image_path, job_id, 'original', base_url)
+        if orig_url and orig_url != clean_url:
+            outputs.append({
+                'style': 'original',
+                'template_id': '',
+                'image_url': orig_url,
+                'thumbnail_url': orig_url,
+            })
+
+        # Output 3+: Placeholders para lifestyle (MVP - em produção seria IA)
+        for i, template in enumerate(templates[:2]):
+            if template.get('id') == 'minimal_studio':
+                continue
+            # MVP: usar clean como placeholder para lifestyle
+            placeholder_url = clean_url or orig_url
+            if placeholder_url:
+                outputs.append({
+                    'style': f"lifestyle_{template.get('id', i)}",
+                    'template_id': template.get('id', ''),
+                    'image_url': placeholder_url,
+                    'thumbnail_url': placeholder_url,
+                    'metadata': {'template': template.get('name'), 'mvp_placeholder': True},
+                })
+
+        timings['generate'] = round((time.perf_counter() - started) * 1000, 1)
+        return outputs
+
     def _save_output(self, image_path: str, job_id: str, style: str, base_url: str) -> Optional[str]:
         """Salva output e retorna URL (compatível com Django MEDIA_URL)"""
         try:
@@ -0,0 +1,112 @@
+"""
+Testes para o CreativeJobProcessor (etapas em paralelo, sessão rembg partilhada, modo batch)
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from services.creative_engine_service.creation import background_removal
+from services.creative_engine_service.creation.job_processor import CreativeJobProcessor
+
+DELAY_S = 0.2
+
+
+class SlowAnalyzer:
+    def analyze(self, image_path):
+        time.sleep(DELAY_S)
+        return {'description': f'Produto {Path(image_path).stem}', 'product_category': 'roupa'}
+
+
+class SlowBgRemover:
+    """Regista as imagens e a thread que as processou (uma sessão = um remover)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def remove_background(self, image_path):
+        time.sleep(DELAY_S)
+        self.calls.append((image_path, threading.get_ident()))
+        return image_path
+
+
+class FakeRembg:
+    def __init__(self):
+        self.sessions = 0
+
+    def new_session(self, model_name):
+        self.sessions += 1
+        return object()
+
+    def remove(self, data, session=None):
+        return data
+
+
+class JobProcessorTestCase(unittest.TestCase):
+    """Testes do processamento de jobs de criação"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.images = []
+        for name in ('a', 'b', 'c'):
+            path = self.tmp / f'{name}.png'
+            path.write_bytes(b'png')
+            self.images.append(str(path))
+        self.statuses = []
+        self.processor = CreativeJobProcessor(media_base=str(self.tmp / 'out'))
+        self.processor.analyzer = SlowAnalyzer()
+        self.processor.bg_remover = SlowBgRemover()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _callback(self, job_id, status, stage, progress, description, error):
+        self.statuses.append((job_id, status, stage))
+
+    def test_analysis_and_bg_removal_run_concurrently(self):
+        """Análise e remoção de fundo sobrepõem-se; tempos por etapa registados"""
+        timings = {}
+        started = time.perf_counter()
+        outputs = self.processor.process('job-1', self.images[0], self._callback, timings=timings)
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, DELAY_S * 1.8)
+        self.assertEqual(outputs[0]['style'], 'clean_product')
+        self.assertEqual(set(timings), {'analyze', 'remove_bg', 'generate', 'total'})
+        self.assertGreaterEqual(timings['analyze'], DELAY_S * 1000 * 0.9)
+        self.assertEqual(self.statuses[-1], ('job-1', 'completed', 'done'))
+
+    def test_batch_uses_one_remover_for_all_jobs(self):
+        """Modo batch: imagens pela mesma sessão, análises em paralelo, falhas isoladas"""
+        jobs = [{'job_id': f'job-{i}', 'image_path': path} for i, path in enumerate(self.images)]
+        jobs.append({'job_id': 'job-missing', 'image_path': str(self.tmp / 'missing.png')})
+        started = time.perf_counter()
+        results = self.processor.process_batch(jobs, self._callback)
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, DELAY_S * (len(self.images) + 1.8))
+        self.assertEqual([c[0] for c in self.processor.bg_remover.calls], self.images)
+        for i in range(len(self.images)):
+            result = results[f'job-{i}']
+            self.assertTrue(result['outputs'])
+            self.assertEqual(result['timings']['batch_size'], 3)
+        self.assertEqual(results['job-missing']['outputs'], [])
+        self.assertIn(('job-missing', 'failed', 'error'), self.statuses)
+
+    def test_rembg_session_loaded_once_per_process(self):
+        """Serviços novos reutilizam a sessão do processo (sem recarregar o modelo)"""
+        fake = FakeRembg()
+        with mock.patch.object(background_removal, 'REMBG_AVAILABLE', True), \
+                mock.patch.object(background_removal, 'rembg', fake, create=True), \
+                mock.patch.dict(background_removal._sessions, clear=True):
+            first = background_removal.BackgroundRemovalService()
+            second = background_removal.BackgroundRemovalService()
+            self.assertIs(first._session, second._session)
+            self.assertEqual(fake.sessions, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
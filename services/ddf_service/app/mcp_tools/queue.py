@@ -1,24 +1,125 @@
 """
 Queue Manager - Gerencia filas de tarefas via MCP
+
+Chaves por fila (``{queue}``):
+  - ``{queue}:pending``     sorted set com as tarefas à espera (menor score = próxima)
+  - ``{queue}:processing``  sorted set das tarefas entregues (score = fim do visibility timeout)
+  - ``{queue}:scores``      hash id -> score original (para voltar à mesma posição se re-enfileirada)
+  - ``{queue}:task:{id}``   dados da tarefa (JSON, TTL 24h)
+  - ``{queue}:signal``      lista de sinais de enqueue (acorda consumidores bloqueados)
+  - ``{queue}:history``     tarefas concluídas/falhadas
+
+O dequeue é um script Lua (atómico): devolve à fila as tarefas cujo visibility timeout
+expirou e move as próximas tarefas de ``pending`` para ``processing`` — duas chamadas
+concorrentes nunca recebem a mesma tarefa. Uma tarefa entregue e não concluída
+(``update_task_status`` com completed/failed) dentro do timeout volta a ser entregue.
+
+A conclusão também é um script Lua: grava o estado e retira a tarefa de ``processing`` *e* de
+``pending`` de uma vez, para que a confirmação tardia de uma tarefa já re-enfileirada por timeout
+não a deixe na fila. O dequeue descarta tarefas cujo estado gravado já é completed/failed.
 """
 
-import redis
 import json
 import os
-from typing import Dict, Optional, Any
+import time
+import uuid
+from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+import redis.asyncio as redis
+
+TASK_TTL_S = 86400  # 24 horas
+
+# Faixa de score por nível de prioridade: prioridade maior sai primeiro e, dentro do mesmo
+# nível, a ordem é de chegada (timestamps cabem folgadamente em 1e10 s)
+PRIORITY_BAND = 1e10
+
+# Máximo de tarefas expiradas devolvidas à fila por chamada de dequeue
+REQUEUE_LIMIT = 100
+
+# KEYS: pending, processing, scores
+# ARGV: count, now (epoch s), deadline (epoch s), requeue_limit, prefixo das chaves de tarefa
+_DEQUEUE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2], 'LIMIT', 0, tonumber(ARGV[4]))
+for _, id in ipairs(expired) do
+    local score = redis.call('HGET', KEYS[3], id)
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], score or ARGV[2], id)
+end
+local out = {}
+local count = tonumber(ARGV[1])
+while #out < count do
+    local head = redis.call('ZRANGE', KEYS[1], 0, count - #out - 1, 'WITHSCORES')
+    if #head == 0 then
+        break
+    end
+    for i = 1, #head, 2 do
+        local id = head[i]
+        redis.call('ZREM', KEYS[1], id)
+        local data = redis.call('GET', ARGV[5] .. id)
+        local finished = false
+        if data then
+            local ok, task = pcall(cjson.decode, data)
+            finished = ok and type(task) == 'table' and (task.status == 'completed' or task.status == 'failed')
+        end
+        if data and not finished then
+            redis.call('ZADD', KEYS[2], ARGV[3], id)
+            redis.call('HSET', KEYS[3], id, head[i + 1])
+            table.insert(out, data)
+        else
+            redis.call('HDEL', KEYS[3], id)
+        end
+    end
+end
+return out
+"""
+
+# KEYS: tarefa, pending, processing, scores, history
+# ARGV: dados (JSON), ttl (s), 1 se estado final, agora (epoch s), id
+_UPDATE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+if ARGV[3] == '1' then
+    redis.call('ZREM', KEYS[2], ARGV[5])
+    redis.call('ZREM', KEYS[3], ARGV[5])
+    redis.call('HDEL', KEYS[4], ARGV[5])
+    redis.call('ZADD', KEYS[5], ARGV[4], ARGV[5])
+end
+return 1
+"""
+
+
+def _priority_score(priority: int, timestamp: float) -> float:
+    return -priority * PRIORITY_BAND + timestamp
+
 
 class QueueManager:
     """Gerencia filas de tarefas assíncronas"""
-    
-    def __init__(self, redis_url: Optional[str] = None):
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        visibility_timeout: Optional[float] = None,
+        client: Optional[Any] = None
+    ):
         self.redis_url = redis_url or os.getenv('REDIS_URL', 'redis://redis:6379/0')
-        self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+        self.redis_client = client or redis.from_url(self.redis_url, decode_responses=True)
         self.default_queue = 'ddf_tasks'
-    
+        self.visibility_timeout = float(
+            visibility_timeout if visibility_timeout is not None
+            else os.getenv('DDF_QUEUE_VISIBILITY_TIMEOUT_S', '300')
+        )
+        # Intervalo máximo de espera entre verificações numa espera bloqueante (apanha
+        # tarefas re-enfileiradas por timeout, que não geram sinal)
+        self.block_interval = float(os.getenv('DDF_QUEUE_BLOCK_INTERVAL_S', '1'))
+        self._dequeue = self.redis_client.register_script(_DEQUEUE_SCRIPT)
+        self._update = self.redis_client.register_script(_UPDATE_SCRIPT)
+
+    async def close(self):
+        """Fecha as ligações ao Redis"""
+        await self.redis_client.aclose()
+
     async def enqueue_task(
-        self, 
+        self,
         task_type: str,
         payload: Dict,
         queue_name: Optional[str] = None,
@@ -26,103 +127,151 @@ class QueueManager:
     ) -> str:
         """
         Adiciona tarefa à fila
-        
+
         Args:
             task_type: Tipo da tarefa (ex: 'generate_image', 'transcribe_audio')
             payload: Dados da tarefa
             queue_name: Nome da fila (opcional)
             priority: Prioridade (0 = normal, 1 = alta, -1 = baixa)
-        
+
         Returns:
             ID da tarefa
         """
         queue = queue_name or self.default_queue
-        
-        task_id = f"{task_type}_{datetime.utcnow().timestamp()}"
-        
+
+        now = datetime.utcnow()
+        task_id = f"{task_type}_{now.timestamp()}_{uuid.uuid4().hex[:8]}"
+
         task_data = {
             'id': task_id,
             'type': task_type,
             'payload': payload,
             'priority': priority,
             'status': 'pending',
-            'created_at': datetime.utcnow().isoformat()
+            'attempts': 0,
+            'created_at': now.isoformat()
         }
-        
-        # Adicionar à fila ordenada (sorted set) para suportar prioridade
-        score = priority * 1000000 + datetime.utcnow().timestamp()
-        self.redis_client.zadd(f"{queue}:pending", {task_id: score})
-        
-        # Salvar dados da tarefa
-        self.redis_client.setex(
-            f"{queue}:task:{task_id}",
-            86400,  # 24 horas
-            json.dumps(task_data)
-        )
-        
+
+        # Dados antes da entrada na fila (o dequeue descarta ids sem dados); sinal no fim
+        # para acordar um consumidor bloqueado
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.set(f"{queue}:task:{task_id}", json.dumps(task_data), ex=TASK_TTL_S)
+            pipe.zadd(f"{queue}:pending", {task_id: _priority_score(priority, now.timestamp())})
+            pipe.lpush(f"{queue}:signal", 1)
+            pipe.ltrim(f"{queue}:signal", 0, 999)
+            await pipe.execute()
+
         return task_id
-    
-    async def dequeue_task(self, queue_name: Optional[str] = None) -> Optional[Dict]:
+
+    async def dequeue_tasks(
+        self,
+        count: int = 1,
+        queue_name: Optional[str] = None,
+        timeout: float = 0
+    ) -> List[Dict]:
+        """
+        Remove e retorna até ``count`` tarefas da fila (maior prioridade primeiro)
+
+        Args:
+            count: Máximo de tarefas a obter
+            queue_name: Nome da fila (opcional)
+            timeout: Segundos a esperar por tarefas se a fila estiver vazia (0 = não espera)
+
+        Returns:
+            Lista de tarefas (vazia se não houver tarefas no tempo indicado)
+        """
+        queue = queue_name or self.default_queue
+        deadline = time.monotonic() + timeout
+
+        while True:
+            tasks = await self._take(queue, count)
+            remaining = deadline - time.monotonic()
+            if tasks or remaining <= 0:
+                return tasks
+            # Espera por um sinal de enqueue (BLPOP aceita frações de segundo)
+            await self.redis_client.blpop(
+                [f"{queue}:signal"], timeout=max(0.01, min(remaining, self.block_interval))
+            )
+
+    async def dequeue_task(
+        self,
+        queue_name: Optional[str] = None,
+        timeout: float = 0
+    ) -> Optional[Dict]:
         """
         Remove e retorna próxima tarefa da fila
-        
+
         Args:
             queue_name: Nome da fila (opcional)
-        
+            timeout: Segundos a esperar se a fila estiver vazia (0 = não espera)
+
         Returns:
             Dados da tarefa ou None se fila vazia
         """
+        tasks = await self.dequeue_tasks(1, queue_name=queue_name, timeout=timeout)
+        return tasks[0] if tasks else None
+
+    async def _take(self, queue: str, count: int) -> List[Dict]:
+        now = time.time()
+        raw = await self._dequeue(
+            keys=[f"{queue}:pending", f"{queue}:processing", f"{queue}:scores"],
+            args=[count, now, now + self.visibility_timeout, REQUEUE_LIMIT, f"{queue}:task:"],
+        )
+        if not raw:
+            return []
+
+        started_at = datetime.utcnow().isoformat()
+        tasks = []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for task_data_str in raw:
+                task_data = json.loads(task_data_str)
+                task_data['status'] = 'processing'
+                task_data['attempts'] = task_data.get('attempts', 0) + 1
+                task_data['started_at'] = started_at
+                pipe.set(f"{queue}:task:{task_data['id']}", json.dumps(task_data), ex=TASK_TTL_S)
+                tasks.append(task_data)
+            await pipe.execute()
+        return tasks
+
+    async def extend_visibility(
+        self,
+        task_id: str,
+        seconds: Optional[float] = None,
+        queue_name: Optional[str] = None
+    ) -> bool:
+        """
+        Prolonga o visibility timeout de uma tarefa em processamento (tarefas longas)
+
+        Returns:
+            False se a tarefa já não está em processamento
+        """
         queue = queue_name or self.default_queue
-        
-        # Obter tarefa com maior prioridade
-        tasks = self.redis_client.zrange(f"{queue}:pending", 0, 0, withscores=True)
-        
-        if not tasks:
-            return None
-        
-        task_id, _ = tasks[0]
-        
-        # Remover da fila
-        self.redis_client.zrem(f"{queue}:pending", task_id)
-        
-        # Obter dados da tarefa
-        task_data_str = self.redis_client.get(f"{queue}:task:{task_id}")
-        
-        if not task_data_str:
-            return None
-        
-        task_data = json.loads(task_data_str)
-        task_data['status'] = 'processing'
-        
-        # Atualizar status
-        self.redis_client.setex(
-            f"{queue}:task:{task_id}",
-            86400,
-            json.dumps(task_data)
+        deadline = time.time() + (self.visibility_timeout if seconds is None else seconds)
+        updated = await self.redis_client.zadd(
+            f"{queue}:processing", {task_id: deadline}, xx=True, ch=True
         )
-        
-        return task_data
-    
+        return bool(updated)
+
     async def get_task_status(self, task_id: str, queue_name: Optional[str] = None) -> Optional[Dict]:
         """
         Obtém status de uma tarefa
-        
+
         Args:
             task_id: ID da tarefa
             queue_name: Nome da fila (opcional)
-        
+
         Returns:
             Dados da tarefa ou None se não encontrada
         """
         queue = queue_name or self.default_queue
-        
-        task_data_str = self.redis_client.get(f"{queue}:task:{task_id}")
-        
+
+        task_data_str = await self.redis_client.get(f"{queue}:task:{task_id}")
+
         if not task_data_str:
             return None
-        
+
         return json.loads(task_data_str)
-    
+
     async def update_task_status(
         self,
         task_id: str,
@@ -133,7 +282,7 @@ class QueueManager:
     ):
         """
         Atualiza status de uma tarefa
-        
+
         Args:
             task_id: ID da tarefa
             status: Novo status (pending, processing, completed, failed)
@@ -142,33 +291,47 @@ class QueueManager:
             queue_name: Nome da fila (opcional)
         """
         queue = queue_name or self.default_queue
-        
-        task_data_str = self.redis_client.get(f"{queue}:task:{task_id}")
-        
+
+        task_data_str = await self.redis_client.get(f"{queue}:task:{task_id}")
+
         if not task_data_str:
             return
-        
+
         task_data = json.loads(task_data_str)
         task_data['status'] = status
         task_data['updated_at'] = datetime.utcnow().isoformat()
-        
+
         if result:
             task_data['result'] = result
-        
+
         if error:
             task_data['error'] = error
-        
-        # Salvar atualização
-        self.redis_client.setex(
-            f"{queue}:task:{task_id}",
-            86400,
-            json.dumps(task_data)
-        )
-        
-        # Se completou ou falhou, mover para fila de histórico
-        if status in ['completed', 'failed']:
-            self.redis_client.zadd(
+
+        # Se completou ou falhou, sai de processamento e da fila (pode lá ter voltado por
+        # timeout) e vai para o histórico, atomicamente com a gravação do estado
+        await self._update(
+            keys=[
+                f"{queue}:task:{task_id}",
+                f"{queue}:pending",
+                f"{queue}:processing",
+                f"{queue}:scores",
                 f"{queue}:history",
-                {task_id: datetime.utcnow().timestamp()}
-            )
+            ],
+            args=[
+                json.dumps(task_data),
+                TASK_TTL_S,
+                1 if status in ['completed', 'failed'] else 0,
+                datetime.utcnow().timestamp(),
+                task_id,
+            ],
+        )
 
+    async def queue_stats(self, queue_name: Optional[str] = None) -> Dict[str, int]:
+        """Tamanho das filas pending / processing / history"""
+        queue = queue_name or self.default_queue
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.zcard(f"{queue}:pending")
+            pipe.zcard(f"{queue}:processing")
+            pipe.zcard(f"{queue}:history")
+            pending, processing, history = await pipe.execute()
+        return {'pending': pending, 'processing': processing, 'history': history}
@@ -1,12 +1,32 @@
 """
 Event Bus Consumer - Consome eventos de Redis Streams
+
+Cada XREADGROUP traz até ``batch_size`` mensagens; as mensagens são agrupadas por chave de
+ordenação (``instance_id`` por omissão) e os grupos correm em paralelo num pool de threads
+limitado — dentro de um grupo a ordem do stream é mantida. Os XACK do lote seguem numa só
+chamada.
+
+Mensagens cujo handler falhou (ou de consumidores que morreram) ficam na PEL; a cada
+``claim_interval`` segundos o consumidor percorre a PEL inteira (XPENDING paginado), reclama com XCLAIM as entradas
+paradas há mais que o backoff da sua contagem de entregas e reprocessa-as. Ao esgotar
+``max_deliveries`` a mensagem vai para o stream ``<stream>.dlq`` e é confirmada.
+
+Uma falha "estaciona" a chave: as mensagens seguintes dessa chave (do mesmo lote ou de leituras
+posteriores) ficam retidas em memória, sem XACK e fora do XCLAIM do reclaim — o idle delas é
+renovado com XCLAIM JUSTID, que não conta entregas, para outros consumidores não as reclamarem.
+Quando a mensagem que falhou é resolvida (sucesso numa nova tentativa ou DLQ) as retidas
+correm pela ordem do stream; só a que falhou gasta entregas.
 """
 import json
 import logging
 import os
 import signal
 import sys
-from typing import Callable, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
 import redis
 
@@ -15,6 +35,30 @@ logger = logging.getLogger(__name__)
 STREAM_WHATSAPP_INBOUND = "whatsapp.inbound"
 CONSUMER_GROUP = "event_consumers"
 BLOCK_MS = 5000
+BATCH_SIZE = int(os.environ.get("EVENT_BUS_BATCH_SIZE", "50"))
+WORKERS = int(os.environ.get("EVENT_BUS_WORKERS", "8"))
+MAX_DELIVERIES = int(os.environ.get("EVENT_BUS_MAX_DELIVERIES", "5"))
+CLAIM_IDLE_MS = int(os.environ.get("EVENT_BUS_CLAIM_IDLE_MS", "30000"))
+CLAIM_INTERVAL_S = float(os.environ.get("EVENT_BUS_CLAIM_INTERVAL", "15"))
+BACKOFF_MAX_MS = int(os.environ.get("EVENT_BUS_BACKOFF_MAX_MS", "600000"))
+DLQ_MAXLEN = int(os.environ.get("EVENT_BUS_DLQ_MAXLEN", "10000"))
+
+
+def dead_letter_stream(stream: str) -> str:
+    return f"{stream}.dlq"
+
+
+def _id_order(msg_id: str) -> Tuple[int, int]:
+    ms, _, seq = str(msg_id).partition("-")
+    try:
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return 0, 0
+
+
+def instance_ordering_key(data: Dict) -> str:
+    """Mensagens da mesma instância WhatsApp são processadas em ordem."""
+    return str(data.get("instance_id") or "default")
 
 
 class EventBusConsumer:
@@ -26,13 +70,31 @@ class EventBusConsumer:
         stream: str,
         consumer_name: str,
         handler: Callable[[Dict], None],
+        batch_size: int = BATCH_SIZE,
+        workers: int = WORKERS,
+        ordering_key: Callable[[Dict], str] = instance_ordering_key,
+        max_deliveries: int = MAX_DELIVERIES,
+        claim_idle_ms: int = CLAIM_IDLE_MS,
+        claim_interval: float = CLAIM_INTERVAL_S,
     ):
         self.redis_url = redis_url
         self.stream = stream
         self.consumer_name = consumer_name
         self.handler = handler
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.ordering_key = ordering_key
+        self.max_deliveries = max(1, max_deliveries)
+        self.claim_idle_ms = max(0, claim_idle_ms)
+        self.claim_interval = claim_interval
+        self.dead_letter_stream = dead_letter_stream(stream)
         self._client: Optional[redis.Redis] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
         self._running = True
+        # chave estacionada -> id da mensagem que falhou; mensagens retidas atrás dela
+        self._parked: Dict[str, str] = {}
+        self._held: Dict[str, List[Tuple[str, Dict]]] = {}
+        self._park_lock = threading.Lock()
 
     @property
     def client(self) -> redis.Redis:
@@ -40,6 +102,14 @@ class EventBusConsumer:
             self._client = redis.from_url(self.redis_url, decode_responses=True)
         return self._client
 
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix=f"{self.consumer_name}-worker"
+            )
+        return self._executor
+
     def _ensure_group(self):
         """Cria consumer group se não existir"""
         try:
@@ -61,37 +131,244 @@ class EventBusConsumer:
                 pass
         return data
 
+    def _handle(self, msg_id: str, data: Dict) -> bool:
+        try:
+            self.handler(self._parse_message(data))
+            return True
+        except Exception as e:
+            logger.error(f"Handler error for {msg_id}: {e}")
+            return False
+
+    def _hold(self, key: str, msg_id: str, data: Dict) -> None:
+        with self._park_lock:
+            held = self._held.setdefault(key, [])
+            if all(held_id != msg_id for held_id, _ in held):
+                held.append((msg_id, data))
+
+    def _process_group(self, key: str, messages: List[Tuple[str, Dict]]) -> List[str]:
+        """
+        Processa mensagens de uma chave em ordem; devolve os ids a confirmar. Na primeira falha
+        a chave fica estacionada: a mensagem que falhou fica na PEL (reclamada com backoff) e as
+        seguintes ficam retidas até ela ser resolvida.
+        """
+        done: List[str] = []
+        for msg_id, data in messages:
+            parked = self._parked.get(key)
+            if parked is not None and parked != msg_id:
+                self._hold(key, msg_id, data)
+                continue
+            if self._handle(msg_id, data):
+                done.append(msg_id)
+                if parked == msg_id:
+                    done.extend(self._release(key))
+            elif parked is None:
+                with self._park_lock:
+                    self._parked[key] = msg_id
+                logger.info(f"Key {key!r} parked behind {msg_id}")
+        return done
+
+    def _release(self, key: str) -> List[str]:
+        """
+        A mensagem estacionada da chave foi resolvida: corre as retidas por ordem até nova
+        falha (que volta a estacionar a chave). Devolve os ids a confirmar.
+        """
+        with self._park_lock:
+            self._parked.pop(key, None)
+            held = sorted(self._held.pop(key, []), key=lambda m: _id_order(m[0]))
+        done: List[str] = []
+        for i, (msg_id, data) in enumerate(held):
+            if self._handle(msg_id, data):
+                done.append(msg_id)
+                continue
+            with self._park_lock:
+                self._parked[key] = msg_id
+                self._held[key] = held[i + 1:] + self._held.get(key, [])
+            logger.info(f"Key {key!r} parked behind {msg_id}")
+            break
+        return done
+
+    def _held_ids(self) -> List[str]:
+        with self._park_lock:
+            return [msg_id for held in self._held.values() for msg_id, _ in held]
+
+    def _keep_held(self) -> None:
+        """
+        Renova o idle das retidas (XCLAIM JUSTID não incrementa entregas) para que nenhum
+        reclaim, deste ou de outro consumidor, as tire de trás da mensagem estacionada.
+        """
+        held = self._held_ids()
+        if held:
+            self.client.xclaim(self.stream, CONSUMER_GROUP, self.consumer_name, 0, held, justid=True)
+
+    def _sync_parked(self) -> None:
+        """Solta chaves cuja mensagem estacionada já saiu da PEL deste consumidor (outro a tratou)."""
+        with self._park_lock:
+            parked = dict(self._parked)
+        for key, msg_id in parked.items():
+            entry = self.client.xpending_range(self.stream, CONSUMER_GROUP, min=msg_id, max=msg_id, count=1)
+            if not entry or entry[0].get("consumer") != self.consumer_name:
+                acked = self._release(key)
+                if acked:
+                    self.client.xack(self.stream, CONSUMER_GROUP, *acked)
+
+    def process_batch(self, stream_messages: List[Tuple[str, Dict]]) -> List[str]:
+        """
+        Distribui um lote pelo pool (um job por chave de ordenação), espera por todos e
+        confirma os processados com um único XACK.
+        """
+        groups: "OrderedDict[str, List[Tuple[str, Dict]]]" = OrderedDict()
+        for msg_id, data in stream_messages:
+            try:
+                key = self.ordering_key(data)
+            except Exception:
+                key = ""
+            groups.setdefault(key, []).append((msg_id, data))
+
+        if len(groups) == 1 or self.workers == 1:
+            acked = [m for key, msgs in groups.items() for m in self._process_group(key, msgs)]
+        else:
+            futures = [self.executor.submit(self._process_group, key, msgs) for key, msgs in groups.items()]
+            acked = [m for f in futures for m in f.result()]
+
+        if acked:
+            self.client.xack(self.stream, CONSUMER_GROUP, *acked)
+        return acked
+
+    def retry_idle_ms(self, deliveries: int) -> int:
+        """Backoff exponencial: idle mínimo antes de nova tentativa após ``deliveries`` entregas."""
+        return min(self.claim_idle_ms * 2 ** max(0, deliveries - 1), max(self.claim_idle_ms, BACKOFF_MAX_MS))
+
+    def dead_letter(self, entries: List[Dict]) -> None:
+        """Copia as mensagens para o stream DLQ (com metadados da falha) e confirma-as no original."""
+        ids = [e["message_id"] for e in entries]
+        pipe = self.client.pipeline(transaction=False)
+        for msg_id in ids:
+            pipe.xrange(self.stream, min=msg_id, max=msg_id, count=1)
+        found = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for entry, rows in zip(entries, found):
+            data = rows[0][1] if rows else {}
+            pipe.xadd(
+                self.dead_letter_stream,
+                {
+                    **data,
+                    "dlq_original_id": entry["message_id"],
+                    "dlq_stream": self.stream,
+                    "dlq_consumer": str(entry.get("consumer", "")),
+                    "dlq_deliveries": int(entry.get("times_delivered", 0)),
+                },
+                maxlen=DLQ_MAXLEN,
+                approximate=True,
+            )
+        pipe.xack(self.stream, CONSUMER_GROUP, *ids)
+        pipe.execute()
+        logger.warning(f"Dead-lettered {len(ids)} message(s) from {self.stream} to {self.dead_letter_stream}")
+
+    def reclaim_pending(self) -> int:
+        """
+        Varre a PEL do grupo: entradas com entregas esgotadas vão para a DLQ; as restantes,
+        paradas há mais que o backoff, são reclamadas (XCLAIM) e reprocessadas.
+        A PEL é percorrida em páginas de ``batch_size`` com um cursor (intervalo exclusivo
+        a partir do último id visto), para que entradas ainda em backoff no início da PEL
+        não escondam as que vêm depois. Devolve quantas entradas foram tratadas.
+        """
+        self._keep_held()
+        self._sync_parked()
+        handled = 0
+        cursor = "-"
+        while self._running:
+            pending = self.client.xpending_range(
+                self.stream,
+                CONSUMER_GROUP,
+                min=cursor,
+                max="+",
+                count=self.batch_size,
+                idle=self.claim_idle_ms,
+            )
+            if not pending:
+                break
+            handled += self._reclaim_page(pending)
+            if len(pending) < self.batch_size:
+                break
+            cursor = f"({pending[-1]['message_id']}"
+        return handled
+
+    def _reclaim_page(self, pending: List[Dict]) -> int:
+        """Trata uma página da PEL (DLQ ou XCLAIM + reprocessamento)."""
+        dead: List[Dict] = []
+        retry: List[str] = []
+        held = set(self._held_ids())
+        for entry in pending:
+            if entry["message_id"] in held:
+                continue
+            deliveries = int(entry.get("times_delivered", 0))
+            if deliveries >= self.max_deliveries:
+                dead.append(entry)
+            elif int(entry.get("time_since_delivered", 0)) >= self.retry_idle_ms(deliveries):
+                retry.append(entry["message_id"])
+
+        if dead:
+            self.dead_letter(dead)
+            self._release_dead(dead)
+        if retry:
+            claimed = self.client.xclaim(
+                self.stream, CONSUMER_GROUP, self.consumer_name, self.claim_idle_ms, retry
+            )
+            live = [(msg_id, data) for msg_id, data in claimed if data]
+            # Entradas já removidas do stream (MAXLEN) não têm payload: só limpar da PEL
+            gone = [msg_id for msg_id, data in claimed if not data]
+            if gone:
+                self.client.xack(self.stream, CONSUMER_GROUP, *gone)
+            if live:
+                logger.info(f"Reclaimed {len(live)} pending message(s) on {self.stream}")
+                self.process_batch(live)
+        return len(dead) + len(retry)
+
+    def _release_dead(self, dead: List[Dict]) -> None:
+        """Mensagens estacionadas que foram para a DLQ libertam as retidas das suas chaves."""
+        dead_ids = {e["message_id"] for e in dead}
+        with self._park_lock:
+            keys = [key for key, msg_id in self._parked.items() if msg_id in dead_ids]
+        acked = [m for key in keys for m in self._release(key)]
+        if acked:
+            self.client.xack(self.stream, CONSUMER_GROUP, *acked)
+
     def run(self):
         """Loop principal de consumo"""
         self._ensure_group()
         signal.signal(signal.SIGINT, self._shutdown)
         signal.signal(signal.SIGTERM, self._shutdown)
 
-        logger.info(f"Consumer {self.consumer_name} started for {self.stream}")
+        logger.info(
+            f"Consumer {self.consumer_name} started for {self.stream} "
+            f"(batch={self.batch_size}, workers={self.workers})"
+        )
 
-        while self._running:
-            try:
-                messages = self.client.xreadgroup(
-                    CONSUMER_GROUP,
-                    self.consumer_name,
-                    {self.stream: ">"},
-                    count=10,
-                    block=BLOCK_MS,
-                )
-                for stream_name, stream_messages in messages:
-                    for msg_id, data in stream_messages:
-                        try:
-                            parsed = self._parse_message(data)
-                            self.handler(parsed)
-                            self.client.xack(self.stream, CONSUMER_GROUP, msg_id)
-                        except Exception as e:
-                            logger.error(f"Handler error for {msg_id}: {e}")
-                            # Não faz XACK - mensagem volta para pending
-            except redis.ConnectionError as e:
-                logger.error(f"Redis connection error: {e}")
-                sys.exit(1)
-            except Exception as e:
-                logger.error(f"Consumer error: {e}")
+        next_claim = 0.0
+        try:
+            while self._running:
+                try:
+                    if time.monotonic() >= next_claim:
+                        self.reclaim_pending()
+                        next_claim = time.monotonic() + self.claim_interval
+                    messages = self.client.xreadgroup(
+                        CONSUMER_GROUP,
+                        self.consumer_name,
+                        {self.stream: ">"},
+                        count=self.batch_size,
+                        block=BLOCK_MS,
+                    )
+                    for stream_name, stream_messages in messages:
+                        self.process_batch(stream_messages)
+                except redis.ConnectionError as e:
+                    logger.error(f"Redis connection error: {e}")
+                    sys.exit(1)
+                except Exception as e:
+                    logger.error(f"Consumer error: {e}")
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
 
     def _shutdown(self, signum, frame):
         self._running = False
@@ -0,0 +1,30 @@
+"""
+Sessão HTTP partilhada pelos handlers dos consumidores (webhooks dos orbitais).
+
+Keep-alive e pool de ligações do tamanho de EVENT_BUS_WORKERS: cada thread do pool do
+``EventBusConsumer`` reutiliza uma ligação em vez de abrir uma por mensagem.
+"""
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Sessão do processo, criada na primeira chamada."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                pool = int(os.environ.get("EVENT_BUS_WORKERS", "8"))
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
@@ -3,6 +3,7 @@ Event Bus Publisher - Publica eventos em Redis Streams
 """
 import json
 import logging
+import os
 from datetime import datetime
 from typing import Any, Dict, Optional
 
@@ -16,12 +17,16 @@ STREAM_WHATSAPP_OUTBOUND = "whatsapp.outbound"
 STREAM_LEADS_CAPTURED = "leads.captured"
 STREAM_ORDERS_CREATED = "orders.created"
 
+# Trimming aproximado (MAXLEN ~): o Redis corta por nós inteiros do radix tree, sem custo extra por XADD
+STREAM_MAXLEN = int(os.environ.get("EVENT_BUS_STREAM_MAXLEN", "10000"))
+
 
 class EventBusPublisher:
     """Publica eventos em Redis Streams"""
 
-    def __init__(self, redis_url: str = "redis://localhost:6379/0"):
+    def __init__(self, redis_url: str = "redis://localhost:6379/0", maxlen: int = STREAM_MAXLEN):
         self.redis_url = redis_url
+        self.maxlen = maxlen
         self._client: Optional[redis.Redis] = None
 
     @property
@@ -68,7 +73,7 @@ class EventBusPublisher:
             data["jid"] = jid
 
         try:
-            msg_id = self.client.xadd(stream, data, maxlen=10000)
+            msg_id = self.client.xadd(stream, data, maxlen=self.maxlen, approximate=True)
             logger.info(f"[EventBus] Published {event} to {stream} id={msg_id}")
             return msg_id
         except redis.RedisError as e:
@@ -41,10 +41,11 @@ def handle_event(data: dict):
     try:
         # Encaminhar para webhook interno do Core (Django)
         from django.conf import settings
+        from event_bus.http import http_session
+
         webhook_url = getattr(settings, "SINAPUM_WHATSAPP_WEBHOOK_URL", None)
         if webhook_url:
-            import requests
-            resp = requests.post(
+            resp = http_session().post(
                 webhook_url,
                 json={
                     "instance_id": instance_id,
@@ -55,10 +56,14 @@ def handle_event(data: dict):
                 headers={"X-API-Key": os.environ.get("SINAPUM_WHATSAPP_GATEWAY_API_KEY", "")},
                 timeout=10,
             )
+            if resp.status_code >= 500:
+                # Erro transitório: sem XACK, a mensagem é reentregue com backoff
+                raise RuntimeError(f"webhook returned {resp.status_code}")
             if resp.status_code != 200:
                 logger.warning(f"Webhook returned {resp.status_code}")
     except Exception as e:
         logger.error(f"Error processing event: {e}", exc_info=True)
+        raise
 
 
 def main():
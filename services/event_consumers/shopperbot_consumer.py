@@ -34,8 +34,10 @@ def handle_event(data: dict):
     logger.info(f"[ShopperBot] Forwarding message instance={instance_id}")
 
     try:
-        import requests
-        resp = requests.post(
+        # event_bus_service entra no sys.path em main()
+        from event_bus.http import http_session
+
+        resp = http_session().post(
             SHOPPERBOT_WEBHOOK_URL,
             json={
                 "instance_id": instance_id,
@@ -45,10 +47,14 @@ def handle_event(data: dict):
             },
             timeout=10,
         )
+        if resp.status_code >= 500:
+            # Erro transitório: sem XACK, a mensagem é reentregue com backoff
+            raise RuntimeError(f"webhook returned {resp.status_code}")
         if resp.status_code != 200:
             logger.warning(f"ShopperBot webhook returned {resp.status_code}")
     except Exception as e:
         logger.error(f"Error forwarding to ShopperBot: {e}", exc_info=True)
+        raise
 
 
 def main():
@@ -0,0 +1,187 @@
+"""
+Teste de carga do POST /mcp/call contra upstreams stub locais.
+
+Sobe numa thread própria um servidor HTTP/1.1 mínimo (asyncio puro, keep-alive) que faz de
+Core (/core/tools/resolve/ com ETag, /core/tools/log/bulk/, /health) e de OpenMind
+(/chat/completions com latência simulada), carrega o ``main.py`` indicado com as URLs a apontar
+para o stub e dispara N chamadas com C em paralelo via ``httpx.ASGITransport`` (sem uvicorn).
+
+Antes/depois: correr com o main.py atual e com uma versão antiga, ex.:
+
+  git show <commit>:services/mcp_service/main.py > /tmp/main_old.py
+  python services/mcp_service/loadtest.py --app /tmp/main_old.py
+  python services/mcp_service/loadtest.py
+
+Opções: --requests 500 --concurrency 100 --upstream-latency-ms 50
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_ETAG = '"1"'
+
+
+class StubUpstream:
+    """Core + OpenMind falsos num único servidor asyncio (thread e loop próprios)."""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.port = 0
+        self.hits: Dict[str, int] = {}
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+    def _route(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Any, float]:
+        """(status, corpo JSON ou None, atraso) para o pedido."""
+        base = f"http://127.0.0.1:{self.port}"
+        if path == "/health":
+            return 200, {"status": "ok"}, 0.0
+        if path == "/core/tools/resolve/":
+            if headers.get("if-none-match") == REGISTRY_ETAG:
+                return 304, None, 0.0
+            request = json.loads(body or b"{}")
+            return 200, {
+                "tool": request.get("tool", "loadtest.echo"),
+                "version": request.get("version") or "1.0.0",
+                "runtime": "prompt",
+                "client_key": "loadtest",
+                "config": {"url": f"{base}/chat/completions", "prompt_inline": "Responda: {text}"},
+                "prompt_text": "Responda: {text}",
+                "input_schema": {"type": "object", "properties": {"text": {"type": "string"}}},
+                "output_schema": {"type": "object"},
+                "prompt_ref": "",
+            }, self.latency_s / 5
+        if path.startswith("/core/tools/log/"):
+            return 201, {"ok": True}, 0.0
+        if path == "/chat/completions":
+            return 200, {
+                "model": "stub",
+                "choices": [{"message": {"content": "ok"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+            }, self.latency_s
+        return 404, {"error": f"{method} {path}"}, 0.0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+                path = path.split("?", 1)[0]
+                self.hits[path] = self.hits.get(path, 0) + 1
+                status, payload, delay = self._route(method, path, headers, body)
+                if delay:
+                    await asyncio.sleep(delay)
+                data = json.dumps(payload).encode() if payload is not None else b""
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\nETag: {REGISTRY_ETAG}\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: keep-alive\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "StubUpstream":
+        threading.Thread(target=self._serve, name="stub-upstream", daemon=True).start()
+        self._ready.wait(5)
+        return self
+
+
+def load_app(path: str, upstream_url: str):
+    """Importa o main.py indicado com Core/OpenMind a apontar para o stub."""
+    os.environ["SINAPUM_CORE_URL"] = upstream_url
+    os.environ["OPENMIND_SERVICE_URL"] = upstream_url
+    spec = importlib.util.spec_from_file_location("mcp_service_loadtest_app", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+async def run_load(app, total: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://mcp", timeout=120) as client:
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                resp = await client.post(
+                    "/mcp/call",
+                    json={"tool": "loadtest.echo", "input": {"text": f"pedido {i}"}},
+                    headers={"X-SINAPUM-KEY": "loadtest"},
+                )
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 200 or not resp.json().get("ok"):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(HERE, "main.py"), help="main.py a testar")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs INFO do serviço")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    sys.path.insert(0, HERE)
+    stub = StubUpstream(args.upstream_latency_ms / 1000).start()
+    app = load_app(args.app, f"http://127.0.0.1:{stub.port}")
+    result = asyncio.run(run_load(app, args.requests, args.concurrency))
+    result["app"] = args.app
+    result["upstream_latency_ms"] = args.upstream_latency_ms
+    result["upstream_hits"] = stub.hits
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
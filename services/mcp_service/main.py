@@ -17,9 +17,22 @@ from starlette.exceptions import HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 import requests
+import httpx
+import asyncio
 import jsonschema
 from jsonschema import validate, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+import hashlib
+import queue
 import re
+import threading
+from collections import OrderedDict
+
+try:
+    import fastjsonschema  # opcional: MCP_SCHEMA_BACKEND=fastjsonschema
+except Exception:
+    fastjsonschema = None
 
 # Configuração de logging
 logging.basicConfig(
@@ -33,7 +46,15 @@ SINAPUM_CORE_URL = os.getenv("SINAPUM_CORE_URL", "http://web:5000").rstrip("/")
 OPENMIND_SERVICE_URL = os.getenv("OPENMIND_SERVICE_URL", "http://openmind:8001")
 # POST /core/tools/resolve/ pode demorar (DB, prompt grande); padrão 30s evita Read timeout=10 em Core lento
 MCP_CORE_RESOLVE_TIMEOUT_S = float(os.getenv("MCP_CORE_RESOLVE_TIMEOUT_S", "30"))
+MCP_OPENMIND_TIMEOUT_S = float(os.getenv("MCP_OPENMIND_TIMEOUT_S", "60"))
+MCP_HTTP_CONNECT_TIMEOUT_S = float(os.getenv("MCP_HTTP_CONNECT_TIMEOUT_S", "5"))
+MCP_HTTP_POOL_TIMEOUT_S = float(os.getenv("MCP_HTTP_POOL_TIMEOUT_S", "30"))
+MCP_PLAN_CACHE_MAX = int(os.getenv("MCP_PLAN_CACHE_MAX", "1024"))
+MCP_PLAN_CACHE_TTL_S = float(os.getenv("MCP_PLAN_CACHE_TTL_S", "30"))
+MCP_PLAN_CACHE_MAX_AGE_S = float(os.getenv("MCP_PLAN_CACHE_MAX_AGE_S", "300"))
 BASE_PATH = "/mcp"
+MCP_SCHEMA_BACKEND = os.getenv("MCP_SCHEMA_BACKEND", "jsonschema").lower().strip()
+MCP_SCHEMA_CACHE_MAX = int(os.getenv("MCP_SCHEMA_CACHE_MAX", "512"))
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -231,15 +252,67 @@ def normalize_context_pack(context_pack: Optional[ContextPack], request_id: Opti
     
     return context_pack
 
-def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any]) -> None:
+# Validadores compilados por (tool, versão, hash do schema): jsonschema.validate reconstruía-os
+# (e revalidava o schema) em cada chamada.
+_VALIDATORS: "OrderedDict[tuple, Any]" = OrderedDict()
+_VALIDATORS_LOCK = threading.Lock()
+
+
+def _compile_validator(schema: Dict[str, Any]) -> Any:
+    """Callable data -> mensagem de erro ou None."""
+    if MCP_SCHEMA_BACKEND == "fastjsonschema" and fastjsonschema is not None:
+        try:
+            fast = fastjsonschema.compile(schema)
+
+            def _fast_check(data):
+                try:
+                    fast(data)
+                    return None
+                except fastjsonschema.JsonSchemaValueException as e:
+                    return e.message
+            return _fast_check
+        except Exception as e:
+            logger.debug("fastjsonschema não compilou o schema, a usar jsonschema: %s", e)
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema)
+
+    def _check(data):
+        error = best_match(validator.iter_errors(data))
+        return error.message if error is not None else None
+    return _check
+
+
+def _get_validator(schema: Dict[str, Any], cache_key: tuple) -> Any:
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    key = (*cache_key, digest)
+    with _VALIDATORS_LOCK:
+        check = _VALIDATORS.get(key)
+        if check is not None:
+            _VALIDATORS.move_to_end(key)
+            return check
+    check = _compile_validator(schema)
+    with _VALIDATORS_LOCK:
+        _VALIDATORS[key] = check
+        while len(_VALIDATORS) > MCP_SCHEMA_CACHE_MAX:
+            _VALIDATORS.popitem(last=False)
+    return check
+
+
+def validate_json_schema(data: Dict[str, Any], schema: Dict[str, Any], cache_key: tuple = ()) -> None:
     """
-    Valida dados contra um JSON Schema.
-    Raises ValidationError se inválido.
+    Valida dados contra um JSON Schema (validador compilado em cache por cache_key + hash).
+    Raises ValueError se inválido.
     """
     try:
+        check = _get_validator(schema, cache_key)
+    except jsonschema.SchemaError:
+        # Schema inválido: mesmo comportamento do jsonschema.validate
         validate(instance=data, schema=schema)
-    except ValidationError as e:
-        raise ValueError(f"Schema validation failed: {e.message}")
+        return
+    message = check(data)
+    if message is not None:
+        raise ValueError(f"Schema validation failed: {message}")
 
 
 def normalize_tool_input(input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -265,7 +338,235 @@ def normalize_tool_input(input_data: Dict[str, Any]) -> Dict[str, Any]:
                 normalized["image_base64"] = f"data:image/jpeg;base64,{img.strip()}"
     return normalized
 
-def execute_runtime_openmind_http(
+# ============================================================================
+# Clientes HTTP upstream (httpx, assíncronos)
+# ============================================================================
+
+class UpstreamPool:
+    """
+    ``httpx.AsyncClient`` partilhado para um upstream (Core, OpenMind): ligações keep-alive
+    reutilizadas entre chamadas, timeouts próprios e um semáforo que limita os pedidos em voo
+    (o excedente espera pela vez em vez de abrir ligações sem limite). Cliente e semáforo ficam
+    presos ao event loop em que foram criados; noutro loop (ex.: testes) são recriados.
+
+    Env por upstream (NAME = CORE / OPENMIND): MCP_<NAME>_MAX_CONNECTIONS,
+    MCP_<NAME>_MAX_KEEPALIVE, MCP_<NAME>_MAX_CONCURRENCY.
+    """
+
+    def __init__(self, name: str, timeout_s: float):
+        prefix = f"MCP_{name.upper()}"
+        self.name = name
+        self.timeout = httpx.Timeout(
+            timeout_s, connect=MCP_HTTP_CONNECT_TIMEOUT_S, pool=MCP_HTTP_POOL_TIMEOUT_S
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv(f"{prefix}_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv(f"{prefix}_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=30.0,
+        )
+        self.max_concurrency = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "200"))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.stats = {"requests": 0, "errors": 0, "waited": 0}
+
+    def _ensure(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._loop = loop
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        self._ensure()
+        if self._semaphore.locked():
+            self.stats["waited"] += 1
+        async with self._semaphore:
+            self.in_flight += 1
+            self.stats["requests"] += 1
+            try:
+                return await self._client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_connections": self.limits.max_connections,
+        }
+
+
+CORE_UPSTREAM = UpstreamPool("core", MCP_CORE_RESOLVE_TIMEOUT_S)
+OPENMIND_UPSTREAM = UpstreamPool("openmind", MCP_OPENMIND_TIMEOUT_S)
+
+
+# ============================================================================
+# Cache de execution plans (resolve no Core Registry)
+# ============================================================================
+
+class ResolvePlanCache:
+    """
+    Execution plans devolvidos por /core/tools/resolve/, por (tool, versão pedida, hash da API
+    key). Durante MCP_PLAN_CACHE_TTL_S o plano é usado sem ir ao Core; depois é revalidado com
+    If-None-Match (ETag = versão do registry) e um 304 renova-o sem o Core tocar na BD. Passados
+    MCP_PLAN_CACHE_MAX_AGE_S é pedido de novo por inteiro (prompts em URLs externas).
+    Chamadas concorrentes para a mesma chave partilham um único pedido ao Core.
+    MCP_PLAN_CACHE_MAX=0 desliga o cache.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float, max_age_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.max_age_s = max_age_s
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.inflight: Dict[tuple, "asyncio.Future[Dict[str, Any]]"] = {}
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "warmed": 0}
+
+    @staticmethod
+    def key(tool: str, version: Optional[str], api_key: Optional[str]) -> tuple:
+        return (tool, version or "", hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16])
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created_at"] >= self.max_age_s:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, plan: Dict[str, Any], etag: Optional[str]) -> Dict[str, Any]:
+        """Guarda o plano; devolve o plano guardado (ou o original, se não for cacheável)."""
+        if self.max_size <= 0:
+            return plan
+        # Prompt esperado mas não resolvido (URL em baixo, template em falta): não fixar a falha
+        config = plan.get("config") if isinstance(plan.get("config"), dict) else {}
+        if (plan.get("prompt_ref") or config.get("prompt_inline")) and not plan.get("prompt_text"):
+            return plan
+        now = time.monotonic()
+        cached = {k: v for k, v in plan.items() if k != "_meta"}  # _meta é do pedido, não do plano
+        self._entries[key] = {"plan": cached, "etag": etag, "fetched_at": now, "created_at": now}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return cached
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "hit_rate": round((self.stats["hits"] + self.stats["revalidated"]) / total, 4) if total else 0.0,
+        }
+
+
+_PLAN_CACHE = ResolvePlanCache(MCP_PLAN_CACHE_MAX, MCP_PLAN_CACHE_TTL_S, MCP_PLAN_CACHE_MAX_AGE_S)
+
+
+async def resolve_execution_plan(
+    tool: str,
+    version: Optional[str],
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+) -> Dict[str, Any]:
+    """
+    Execution plan da tool: do cache se fresco, senão POST /core/tools/resolve/ (condicional
+    quando já há um plano com ETag).
+
+    Raises:
+        httpx.HTTPStatusError: erro do Core Registry (tratado como CORE_REGISTRY_ERROR).
+    """
+    if _PLAN_CACHE.max_size <= 0:
+        return await _fetch_execution_plan(None, None, payload, headers)
+    key = _PLAN_CACHE.key(tool, version, headers.get("X-SINAPUM-KEY"))
+    entry = _PLAN_CACHE.get(key)
+    if entry is not None and time.monotonic() - entry["fetched_at"] < _PLAN_CACHE.ttl_s:
+        _PLAN_CACHE.stats["hits"] += 1
+        return entry["plan"]
+
+    pending = _PLAN_CACHE.inflight.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_fetch_execution_plan(key, entry, payload, headers))
+        _PLAN_CACHE.inflight[key] = pending
+        pending.add_done_callback(lambda _: _PLAN_CACHE.inflight.pop(key, None))
+    else:
+        _PLAN_CACHE.stats["hits"] += 1
+    return await asyncio.shield(pending)
+
+
+async def _fetch_execution_plan(
+    key: Optional[tuple],
+    entry: Optional[Dict[str, Any]],
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+) -> Dict[str, Any]:
+    request_headers = dict(headers)
+    if entry is not None and entry["etag"]:
+        request_headers["If-None-Match"] = entry["etag"]
+    response = await CORE_UPSTREAM.request(
+        "POST",
+        f"{SINAPUM_CORE_URL}/core/tools/resolve/",
+        json=payload,
+        headers=request_headers,
+    )
+    if response.status_code == 304 and entry is not None:
+        _PLAN_CACHE.stats["revalidated"] += 1
+        entry["fetched_at"] = time.monotonic()
+        return entry["plan"]
+    response.raise_for_status()
+
+    _PLAN_CACHE.stats["misses"] += 1
+    plan = response.json()
+    if key is not None:
+        plan = _PLAN_CACHE.put(key, plan, response.headers.get("ETag"))
+    return plan
+
+
+async def warm_plan_cache(api_keys: List[str]) -> int:
+    """
+    Pré-carrega o cache com POST /core/tools/resolve_batch/ (versão atual de todas as tools
+    ativas) para cada API key; devolve o número de planos carregados.
+    """
+    warmed = 0
+    for api_key in api_keys:
+        response = await CORE_UPSTREAM.request(
+            "POST",
+            f"{SINAPUM_CORE_URL}/core/tools/resolve_batch/",
+            json={},
+            headers={"X-SINAPUM-KEY": api_key},
+        )
+        if response.status_code == 404:
+            logger.info("Core sem /core/tools/resolve_batch/: cache de planos sem aquecimento")
+            break
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        for plan in data.get("plans", []):
+            requested = plan.pop("requested_version", "")
+            _PLAN_CACHE.put(_PLAN_CACHE.key(plan.get("tool"), requested, api_key), plan, etag)
+            warmed += 1
+        for error in data.get("errors", []):
+            logger.warning(f"Aquecimento do cache: {error.get('tool')} não resolvida ({error.get('error')})")
+    _PLAN_CACHE.stats["warmed"] += warmed
+    return warmed
+
+
+async def execute_runtime_openmind_http(
     config: Dict[str, Any], 
     input_data: Dict[str, Any],
     prompt_text: Optional[str] = None
@@ -302,7 +603,6 @@ def execute_runtime_openmind_http(
     if image_base64:
         # Se for base64, decodificar e criar arquivo em memória
         import base64
-        from io import BytesIO
         
         # Remover prefixo data:image se existir
         if ',' in image_base64:
@@ -310,8 +610,7 @@ def execute_runtime_openmind_http(
         
         try:
             image_bytes = base64.b64decode(image_base64)
-            image_file = BytesIO(image_bytes)
-            files['image'] = ('image.jpg', image_file, 'image/jpeg')
+            files['image'] = ('image.jpg', image_bytes, 'image/jpeg')
         except Exception as e:
             raise ValueError(f"Erro ao decodificar image_base64: {str(e)}")
     elif image_url:
@@ -333,11 +632,12 @@ def execute_runtime_openmind_http(
         logger.info(f"Prompt incluído: {len(prompt_text)} caracteres")
     
     try:
-        response = requests.post(
+        response = await OPENMIND_UPSTREAM.request(
+            "POST",
             url,
             files=files if files else None,
             data=data,
-            timeout=timeout
+            timeout=httpx.Timeout(timeout, connect=MCP_HTTP_CONNECT_TIMEOUT_S, pool=MCP_HTTP_POOL_TIMEOUT_S),
         )
         response.raise_for_status()
         text_preview = (response.text or "")[:3000]
@@ -348,24 +648,22 @@ def execute_runtime_openmind_http(
                 f"OpenMind HTTP {response.status_code}: resposta não é JSON. Trecho: {text_preview}",
                 http_status=502,
             )
-    except requests.exceptions.HTTPError as e:
-        snippet = ""
-        if e.response is not None:
-            snippet = (e.response.text or "")[:2500]
+    except httpx.HTTPStatusError as e:
+        snippet = (e.response.text or "")[:2500]
         logger.error(f"Erro HTTP ao chamar OpenMind: {e} body={snippet[:500]}")
-        code = e.response.status_code if e.response else 502
+        code = e.response.status_code
         raise OpenMindUpstreamError(
             f"OpenMind HTTP {code}: {snippet or _describe_exception(e)}",
             http_status=502 if code >= 500 else code,
         )
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         logger.error(f"Erro ao chamar OpenMind (rede): {e}")
         raise OpenMindUpstreamError(
             f"OpenMind indisponível ou timeout: {_describe_exception(e)}",
             http_status=503,
         )
 
-def execute_runtime_prompt(
+async def execute_runtime_prompt(
     config: Dict[str, Any],
     input_data: Dict[str, Any],
     prompt_text: Optional[str] = None
@@ -433,12 +731,7 @@ def execute_runtime_prompt(
         if openmind_key:
             headers["Authorization"] = f"Bearer {openmind_key}"
         
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=60
-        )
+        response = await OPENMIND_UPSTREAM.request("POST", url, json=payload, headers=headers)
         response.raise_for_status()
         result = response.json()
         
@@ -454,7 +747,7 @@ def execute_runtime_prompt(
         else:
             return result
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Erro ao executar runtime prompt: {e}")
         raise OpenMindUpstreamError(
             f"LLM service error: {_describe_exception(e)}",
@@ -507,7 +800,7 @@ def extract_usage_from_runtime_output(output_data: Optional[Dict[str, Any]]) ->
     return out
 
 
-def execute_runtime(
+async def execute_runtime(
     runtime: str,
     config: Dict[str, Any],
     input_data: Dict[str, Any],
@@ -523,9 +816,9 @@ def execute_runtime(
         prompt_text: Texto do prompt (resolvido do prompt_ref) - usado para runtime "prompt"
     """
     if runtime == "openmind_http":
-        return execute_runtime_openmind_http(config, input_data, prompt_text=prompt_text)
+        return await execute_runtime_openmind_http(config, input_data, prompt_text=prompt_text)
     elif runtime == "prompt":
-        return execute_runtime_prompt(config, input_data, prompt_text)
+        return await execute_runtime_prompt(config, input_data, prompt_text)
     elif runtime == "noop":
         return {"message": "No operation - tool not implemented"}
     elif runtime == "pipeline":
@@ -548,6 +841,98 @@ def normalize_version_for_registry(version: Optional[str]) -> Optional[str]:
         return f"{v}.0"
     return v
 
+class ToolCallLogBuffer:
+    """
+    Fila limitada de logs de chamada enviada ao Core em lote (POST /core/tools/log/bulk/) por
+    uma thread de fundo: o request deixa de esperar pelo POST de auditoria. Flush ao atingir
+    MCP_LOG_BATCH_SIZE ou a cada MCP_LOG_FLUSH_INTERVAL_S; com a fila cheia o log é descartado
+    (contado em ``dropped``). Core sem o endpoint bulk → envio um a um em /core/tools/log/.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._session = requests.Session()
+        self._bulk_supported = True
+        self.stats = {"enqueued": 0, "sent": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+    def submit(self, entry: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            logger.warning("Buffer de logs cheio: log de %s descartado", entry.get("request_id"))
+            return
+        self.stats["enqueued"] += 1
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="mcp-log-buffer", daemon=True)
+                    self._thread.start()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def _send(self, batch: List[Dict[str, Any]]) -> int:
+        """Envia o lote; devolve quantos logs o Core aceitou."""
+        if self._bulk_supported:
+            resp = self._session.post(
+                f"{SINAPUM_CORE_URL}/core/tools/log/bulk/", json={"entries": batch}, timeout=5
+            )
+            if resp.status_code != 404:
+                resp.raise_for_status()
+                return len(batch)
+            self._bulk_supported = False
+            logger.info("Core sem /core/tools/log/bulk/: a enviar logs um a um")
+        sent = 0
+        for entry in batch:
+            # um log rejeitado (ou timeout) não pode levar consigo o resto do lote
+            try:
+                resp = self._session.post(f"{SINAPUM_CORE_URL}/core/tools/log/", json=entry, timeout=2)
+                resp.raise_for_status()
+                sent += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Erro ao enviar log {entry.get('request_id')} ao Core (não crítico): {e}")
+        return sent
+
+    def flush(self) -> int:
+        sent = 0
+        while True:
+            batch: List[Dict[str, Any]] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return sent
+            try:
+                ok = self._send(batch)
+                sent += ok
+                self.stats["sent"] += ok
+                self.stats["batches"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Erro ao enviar {len(batch)} logs ao Core (não crítico): {e}")
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+_LOG_BUFFER = ToolCallLogBuffer(
+    batch_size=int(os.getenv("MCP_LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("MCP_LOG_FLUSH_INTERVAL_S", "1.0")),
+    max_queue=int(os.getenv("MCP_LOG_QUEUE_MAX", "5000")),
+)
+
+
 def log_tool_call(
     request_id: str,
     trace_id: Optional[str],
@@ -601,11 +986,7 @@ def log_tool_call(
         if provider:
             log_payload["provider"] = provider
         
-        requests.post(
-            f"{SINAPUM_CORE_URL}/core/tools/log/",
-            json=log_payload,
-            timeout=2
-        )
+        _LOG_BUFFER.submit(log_payload)
     except Exception as e:
         logger.warning(f"Erro ao registrar log (não crítico): {e}")
 
@@ -620,10 +1001,7 @@ async def health_check():
     """
     try:
         # Verificar se o Core está acessível
-        core_health = requests.get(
-            f"{SINAPUM_CORE_URL}/health",
-            timeout=2
-        )
+        core_health = await CORE_UPSTREAM.request("GET", f"{SINAPUM_CORE_URL}/health", timeout=2)
         core_status = "healthy" if core_health.status_code == 200 else "unhealthy"
     except Exception as e:
         logger.warning(f"Core não acessível: {e}")
@@ -633,9 +1011,37 @@ async def health_check():
         "status": "healthy",
         "service": "mcp_service",
         "core_status": core_status,
-        "core_url": SINAPUM_CORE_URL
+        "core_url": SINAPUM_CORE_URL,
+        "log_buffer": {**_LOG_BUFFER.stats, "pending": _LOG_BUFFER._queue.qsize()},
+        "upstreams": {pool.name: pool.snapshot() for pool in (CORE_UPSTREAM, OPENMIND_UPSTREAM)},
+        "plan_cache": _PLAN_CACHE.snapshot(),
     }
 
+
+@app.on_event("startup")
+async def _startup():
+    """Aquece o cache de planos em segundo plano (MCP_PLAN_WARMUP_KEYS: API keys separadas por vírgula)."""
+    api_keys = [k.strip() for k in os.getenv("MCP_PLAN_WARMUP_KEYS", "").split(",") if k.strip()]
+    if not api_keys or _PLAN_CACHE.max_size <= 0:
+        return
+
+    async def _warm():
+        try:
+            warmed = await warm_plan_cache(api_keys)
+            logger.info(f"Cache de planos aquecido: {warmed} planos")
+        except Exception as e:
+            logger.warning(f"Aquecimento do cache de planos falhou (não crítico): {e}")
+
+    asyncio.create_task(_warm())
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    """Envia os logs ainda em memória e fecha os pools HTTP antes de terminar."""
+    _LOG_BUFFER.flush()
+    for pool in (CORE_UPSTREAM, OPENMIND_UPSTREAM):
+        await pool.aclose()
+
 @app.get(f"{BASE_PATH}/tools")
 async def list_tools():
     """
@@ -645,10 +1051,7 @@ async def list_tools():
     try:
         logger.info(f"Consultando tools no Core: {SINAPUM_CORE_URL}/core/tools/")
         
-        response = requests.get(
-            f"{SINAPUM_CORE_URL}/core/tools/",
-            timeout=5
-        )
+        response = await CORE_UPSTREAM.request("GET", f"{SINAPUM_CORE_URL}/core/tools/", timeout=5)
         response.raise_for_status()
         
         tools = response.json()
@@ -656,7 +1059,7 @@ async def list_tools():
         
         return JSONResponse(content=tools)
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Erro ao consultar Core: {e}")
         raise HTTPException(
             status_code=503,
@@ -684,7 +1087,7 @@ async def call_tool(
     Fluxo completo:
     1. Normaliza context_pack (gera request_id/trace_id se ausentes)
     2. Autentica client (API key)
-    3. Chama Django /core/tools/resolve (opcionalmente envia context_pack)
+    3. Resolve o execution plan (cache local; Django /core/tools/resolve só se expirado, com ETag)
     4. Valida input_schema
     5. Executa runtime
     6. Valida output_schema
@@ -714,9 +1117,10 @@ async def call_tool(
             "tool": request.tool,
             "input": normalized_input
         }
+        requested_version = normalize_version_for_registry(request.version) if request.version else None
         
-        if request.version:
-            resolve_payload["version"] = normalize_version_for_registry(request.version)
+        if requested_version:
+            resolve_payload["version"] = requested_version
         
         # Opcionalmente enviar context_pack ao Core Registry (se aceitar)
         # Por enquanto, mantemos compatibilidade: Core Registry não precisa aceitar ainda
@@ -728,17 +1132,9 @@ async def call_tool(
         if x_sinapum_key:
             headers["X-SINAPUM-KEY"] = x_sinapum_key
         
-        logger.info(f"[{request_id}][{trace_id}] Resolvendo tool no Core: {SINAPUM_CORE_URL}/core/tools/resolve/")
-        
-        resolve_response = requests.post(
-            f"{SINAPUM_CORE_URL}/core/tools/resolve/",
-            json=resolve_payload,
-            headers=headers,
-            timeout=MCP_CORE_RESOLVE_TIMEOUT_S,
-        )
-        resolve_response.raise_for_status()
+        logger.info(f"[{request_id}][{trace_id}] Resolvendo tool (cache de planos / Core Registry)")
         
-        execution_plan = resolve_response.json()
+        execution_plan = await resolve_execution_plan(request.tool, requested_version, resolve_payload, headers)
         client_key = execution_plan.get("client_key", "unknown")
         tool_name = execution_plan.get("tool", request.tool)
         tool_version = execution_plan.get("version", request.version or "unknown")
@@ -756,7 +1152,7 @@ async def call_tool(
         # 3. Validar input_schema
         if input_schema:
             try:
-                validate_json_schema(normalized_input, input_schema)
+                validate_json_schema(normalized_input, input_schema, (tool_name, tool_version, "input"))
                 logger.info(f"[{request_id}][{trace_id}] Input validado contra schema")
             except ValueError as e:
                 error_detail = ErrorDetail(
@@ -775,7 +1171,8 @@ async def call_tool(
                 core_execute_url = f"{SINAPUM_CORE_URL}/core/tools/{tool_name}/execute/"
                 exec_body = {"input": normalized_input, "client_key": client_key}
                 exec_headers = dict(headers) if headers else {}
-                exec_resp = requests.post(
+                exec_resp = await CORE_UPSTREAM.request(
+                    "POST",
                     core_execute_url,
                     json=exec_body,
                     headers=exec_headers,
@@ -796,7 +1193,7 @@ async def call_tool(
         elif runtime:
             logger.info(f"[{request_id}][{trace_id}] Executando runtime: {runtime}")
             try:
-                output_data = execute_runtime(runtime, config, normalized_input, prompt_text=prompt_text)
+                output_data = await execute_runtime(runtime, config, normalized_input, prompt_text=prompt_text)
                 logger.info(f"[{request_id}][{trace_id}] Runtime executado com sucesso")
                 
                 # Adicionar informações do prompt no cadastro_meta se o output tiver essa estrutura
@@ -838,7 +1235,7 @@ async def call_tool(
         # 5. Validar output_schema
         if output_schema and output_data:
             try:
-                validate_json_schema(output_data, output_schema)
+                validate_json_schema(output_data, output_schema, (tool_name, tool_version, "output"))
                 logger.info(f"[{request_id}][{trace_id}] Output validado contra schema")
             except ValueError as e:
                 logger.warning(f"[{request_id}][{trace_id}] Output validation failed (não crítico): {e}")
@@ -885,14 +1282,14 @@ async def call_tool(
             latency_ms=latency_ms
         )
     
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else 500
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
         error_detail = ErrorDetail(
             code="CORE_REGISTRY_ERROR",
             message=f"Core Registry error: {str(e)}",
             details={
-                "status_code": e.response.status_code if e.response else None,
-                "response": e.response.text if e.response else None
+                "status_code": e.response.status_code,
+                "response": e.response.text
             }
         )
         logger.error(f"[{request_id}][{trace_id}] {error_detail.message}")
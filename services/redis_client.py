@@ -3,36 +3,343 @@ Cliente Redis centralizado para o Core Django.
 
 Usa REDIS_URL (preferencial) ou REDIS_HOST / REDIS_PORT / REDIS_DB.
 Import de `redis` é lazy para não quebrar `migrate` / checks se o pacote não estiver instalado.
+
+Um único ``ConnectionPool`` por (URL, decode_responses) por processo: os clientes devolvidos
+são reutilizados entre pedidos (sem handshake TCP por chamada). As ligações têm health check
+periódico e retry com backoff exponencial; falhas seguidas de ligação abrem o circuit breaker
+desse URL, que faz ``get_redis_client()`` / ``client_for_url()`` devolver None (fail-soft) até
+ao fim do cooldown. Variante asyncio em ``get_async_redis_client()`` (um pool por event loop,
+libertado quando o loop deixa de existir).
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Any, Optional
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
 
 from django.conf import settings
 
+_LOCK = threading.Lock()
+_POOLS: Dict[Tuple[str, bool], Any] = {}
+_CLIENTS: Dict[Tuple[str, bool], Any] = {}
+# loop -> {(url, decode_responses): cliente}; a entrada desaparece com o loop
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, bool], Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+# Clientes asyncio pedidos fora de um loop em execução
+_ASYNC_CLIENTS_NO_LOOP: Dict[Tuple[str, bool], Any] = {}
+
+
+def _setting(name: str, default: Any) -> Any:
+    """settings.<name> → env var → default (funciona também sem Django configurado)."""
+    try:
+        value = getattr(settings, name, None)
+    except Exception:
+        value = None
+    if value is None or value == "":
+        value = os.environ.get(name)
+    return default if value is None or value == "" else value
+
+
+def _enabled() -> bool:
+    value = _setting("ENVIRONMENTAL_STATE_REDIS_ENABLED", True)
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _redis_url() -> str:
+    url = _setting("REDIS_URL", "")
+    if url:
+        return str(url)
+    host = _setting("REDIS_HOST", "localhost")
+    port = int(_setting("REDIS_PORT", 6379))
+    db = int(_setting("REDIS_DB", 0))
+    return f"redis://{host}:{port}/{db}"
 
-def get_redis_client() -> Optional[Any]:
+
+class CircuitBreaker:
     """
-    Retorna cliente Redis ou None se estado ambiental estiver desativado,
-    pacote `redis` ausente ou conexão indisponível (fail-soft).
+    Abre após ``failures`` erros de ligação consecutivos; fechado de novo no primeiro sucesso
+    depois do ``cooldown``. Em half-open só um pedido (a sonda) passa; os restantes continuam
+    a receber None até a sonda registar sucesso ou falha. Uma sonda sem resultado (o cliente
+    não chegou a ser usado) expira ao fim de outro ``cooldown``.
+    """
+
+    def __init__(self, failures: int = 5, cooldown: float = 30.0):
+        self.max_failures = max(1, failures)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return False
+            if self.probe_started is not None and now - self.probe_started < self.cooldown:
+                return False
+            self.probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.probe_started = None
+            if self.failures >= self.max_failures:
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half_open"
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def _breaker_for(url: str) -> CircuitBreaker:
+    """Circuit breaker do URL: uma instância Redis em baixo não bloqueia as outras."""
+    breaker = _BREAKERS.get(url)
+    if breaker is None:
+        with _LOCK:
+            breaker = _BREAKERS.get(url)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    failures=int(_setting("REDIS_CIRCUIT_FAILURES", 5)),
+                    cooldown=float(_setting("REDIS_CIRCUIT_COOLDOWN", 30)),
+                )
+                _BREAKERS[url] = breaker
+    return breaker
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    from redis.backoff import ExponentialBackoff
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+    from redis.retry import Retry
+
+    return {
+        "max_connections": int(_setting("REDIS_POOL_MAX_CONNECTIONS", 50)),
+        "socket_timeout": float(_setting("REDIS_SOCKET_TIMEOUT", 2.0)),
+        "socket_connect_timeout": float(_setting("REDIS_CONNECT_TIMEOUT", 2.0)),
+        "health_check_interval": int(_setting("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+        "retry": Retry(ExponentialBackoff(cap=1.0, base=0.05), int(_setting("REDIS_RETRY_ATTEMPTS", 3))),
+        "retry_on_error": [RedisConnectionError, RedisTimeoutError],
+    }
+
+
+def _connection_errors() -> Tuple[type, ...]:
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+
+    return (RedisConnectionError, RedisTimeoutError)
+
+
+def _breaker_client_class(breaker: CircuitBreaker):
+    """Subclasse de redis.Redis que alimenta ``breaker`` em cada comando."""
+    import redis
+
+    errors = _connection_errors()
+
+    class _BreakerRedis(redis.Redis):
+        def execute_command(self, *args, **options):
+            try:
+                result = super().execute_command(*args, **options)
+            except errors:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+
+    return _BreakerRedis
+
+
+def _async_breaker_client_class(breaker: CircuitBreaker):
+    """Como ``_breaker_client_class`` para ``redis.asyncio.Redis``."""
+    import redis.asyncio as aioredis
+
+    errors = _connection_errors()
+
+    class _AsyncBreakerRedis(aioredis.Redis):
+        async def execute_command(self, *args, **options):
+            try:
+                result = await super().execute_command(*args, **options)
+            except errors:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+
+    return _AsyncBreakerRedis
+
+
+def client_for_url(url: str, decode_responses: bool = True) -> Optional[Any]:
+    """
+    Cliente partilhado sobre o pool do processo para ``url``; None se `redis` não estiver
+    instalado ou o circuit breaker desse URL estiver aberto.
     """
     try:
         import redis
     except ImportError:
         return None
 
-    if not getattr(settings, "ENVIRONMENTAL_STATE_REDIS_ENABLED", True):
+    breaker = _breaker_for(url)
+    if not breaker.allow():
         return None
 
-    url = getattr(settings, "REDIS_URL", None) or os.environ.get("REDIS_URL")
+    key = (url, decode_responses)
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            try:
+                pool = redis.ConnectionPool.from_url(url, decode_responses=decode_responses, **_pool_kwargs())
+                client = _breaker_client_class(breaker)(connection_pool=pool)
+            except Exception:
+                return None
+            _POOLS[key] = pool
+            _CLIENTS[key] = client
+    return client
+
+
+def get_redis_client(decode_responses: bool = True) -> Optional[Any]:
+    """
+    Retorna cliente Redis ou None se estado ambiental estiver desativado,
+    pacote `redis` ausente ou conexão indisponível (fail-soft).
+    """
+    if not _enabled():
+        return None
+    return client_for_url(_redis_url(), decode_responses=decode_responses)
+
+
+def get_async_redis_client(decode_responses: bool = True) -> Optional[Any]:
+    """
+    Variante ``redis.asyncio`` de ``get_redis_client``. As ligações asyncio ficam presas ao
+    loop em que foram criadas, por isso há um pool por event loop em execução; os clientes
+    ficam num ``WeakKeyDictionary`` indexado pelo loop e são libertados com ele.
+    """
     try:
-        if url:
-            return redis.from_url(url, decode_responses=True)
-        host = getattr(settings, "REDIS_HOST", "localhost")
-        port = int(getattr(settings, "REDIS_PORT", 6379))
-        db = int(getattr(settings, "REDIS_DB", 0))
-        return redis.Redis(host=host, port=port, db=db, decode_responses=True)
-    except Exception:
+        import redis.asyncio as aioredis
+    except ImportError:
+        return None
+
+    if not _enabled():
+        return None
+    url = _redis_url()
+    breaker = _breaker_for(url)
+    if not breaker.allow():
         return None
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    key = (url, decode_responses)
+    with _LOCK:
+        if loop is None:
+            clients = _ASYNC_CLIENTS_NO_LOOP
+        else:
+            clients = _ASYNC_CLIENTS.get(loop)
+            if clients is None:
+                clients = _ASYNC_CLIENTS[loop] = {}
+        client = clients.get(key)
+        if client is None:
+            try:
+                from redis.asyncio.retry import Retry as AsyncRetry
+                from redis.backoff import ExponentialBackoff
+
+                kwargs = _pool_kwargs()
+                kwargs["retry"] = AsyncRetry(
+                    ExponentialBackoff(cap=1.0, base=0.05), int(_setting("REDIS_RETRY_ATTEMPTS", 3))
+                )
+                pool = aioredis.ConnectionPool.from_url(url, decode_responses=decode_responses, **kwargs)
+                client = _async_breaker_client_class(breaker)(connection_pool=pool)
+            except Exception:
+                return None
+            clients[key] = client
+    return client
+
+
+def redis_health() -> Dict[str, Any]:
+    """PING no cliente partilhado; usado por health checks."""
+    breaker = _breaker_for(_redis_url())
+    client = get_redis_client()
+    if client is None:
+        return {"ok": False, "circuit": breaker.state}
+    started = time.perf_counter()
+    try:
+        client.ping()
+    except Exception as exc:
+        return {"ok": False, "error": str(exc), "circuit": breaker.state}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2), "circuit": breaker.state}
+
+
+def redis_pool_stats() -> Dict[str, Any]:
+    """Uso dos pools (ligações criadas / livres / em uso) e estado dos circuit breakers."""
+    pools = []
+    for (url, decode), pool in list(_POOLS.items()):
+        pools.append(
+            {
+                "url": url.split("@")[-1],
+                "decode_responses": decode,
+                "max_connections": getattr(pool, "max_connections", None),
+                "created": getattr(pool, "_created_connections", None),
+                "available": len(getattr(pool, "_available_connections", []) or []),
+                "in_use": len(getattr(pool, "_in_use_connections", []) or []),
+            }
+        )
+    circuits = {
+        url.split("@")[-1]: {
+            "state": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "trips": breaker.trips,
+        }
+        for url, breaker in list(_BREAKERS.items())
+    }
+    default = _breaker_for(_redis_url())
+    return {
+        "pools": pools,
+        "async_clients": sum(len(c) for c in list(_ASYNC_CLIENTS.values())) + len(_ASYNC_CLIENTS_NO_LOOP),
+        "circuit": {
+            "state": default.state,
+            "consecutive_failures": default.failures,
+            "trips": default.trips,
+        },
+        "circuits": circuits,
+    }
+
+
+def reset_redis_clients() -> None:
+    """Fecha os pools (ex.: depois de fork ou em testes)."""
+    with _LOCK:
+        for pool in _POOLS.values():
+            try:
+                pool.disconnect()
+            except Exception:
+                pass
+        _POOLS.clear()
+        _CLIENTS.clear()
+        _ASYNC_CLIENTS.clear()
+        _ASYNC_CLIENTS_NO_LOOP.clear()
+        _BREAKERS.clear()
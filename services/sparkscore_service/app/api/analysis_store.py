@@ -0,0 +1,305 @@
+"""
+Armazenamento das análises da API v1 (``/api/v1/analysis/{id}``)
+
+Duas camadas:
+  - memória: LRU com TTL por processo (tamanho limitado, sempre ativa)
+  - backend opcional partilhado entre workers e reinícios: Redis ou SQLite, com as análises
+    em forma compacta (JSON sem espaços + zlib)
+
+Escrita em ambas as camadas; leitura na memória e, em falta, no backend (o resultado volta a
+entrar na memória). Se o backend falhar, a análise continua disponível no processo que a
+gerou e a falha é contada em ``stats()``.
+
+Configuração (env):
+  - SPARKSCORE_ANALYSIS_STORE: ``memory`` (padrão), ``redis`` ou ``sqlite``
+  - SPARKSCORE_ANALYSIS_CACHE_MAX: análises mantidas em memória por processo (padrão 1000)
+  - SPARKSCORE_ANALYSIS_TTL_S: validade de uma análise em segundos (padrão 86400)
+  - SPARKSCORE_ANALYSIS_REDIS_URL: URL do Redis (padrão REDIS_URL)
+  - SPARKSCORE_ANALYSIS_SQLITE_PATH: ficheiro SQLite (padrão data/analyses.sqlite3)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "sparkscore:analysis:"
+
+
+def serialize(data: Dict) -> bytes:
+    """Forma compacta de uma análise (JSON sem espaços, comprimido com zlib)."""
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, 6)
+
+
+def deserialize(blob: bytes) -> Dict:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class MemoryTier:
+    """LRU com TTL em processo."""
+
+    def __init__(self, max_size: int = 1000, ttl_s: float = 86400.0, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max(0, int(max_size))
+        self.ttl_s = float(ttl_s)
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, analysis_id: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(analysis_id)
+            if item is None:
+                return None
+            expires_at, data = item
+            if expires_at <= self._clock():
+                del self._data[analysis_id]
+                self.expired += 1
+                return None
+            self._data.move_to_end(analysis_id)
+            return data
+
+    def put(self, analysis_id: str, data: Dict, ttl_s: Optional[float] = None) -> None:
+        if self.max_size == 0:
+            return
+        expires_at = self._clock() + (self.ttl_s if ttl_s is None else ttl_s)
+        with self._lock:
+            self._data[analysis_id] = (expires_at, data)
+            self._data.move_to_end(analysis_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+class RedisBackend:
+    """Análises em Redis (``SET ... EX``), uma chave por análise."""
+
+    name = "redis"
+
+    def __init__(self, client, ttl_s: float):
+        self._client = client
+        self.ttl_s = max(1, int(ttl_s))
+
+    @classmethod
+    def from_url(cls, url: str, ttl_s: float) -> "RedisBackend":
+        import redis
+
+        return cls(redis.from_url(url, decode_responses=False), ttl_s)
+
+    def get(self, analysis_id: str) -> Optional[bytes]:
+        return self._client.get(REDIS_KEY_PREFIX + analysis_id)
+
+    def put_many(self, items: List[Tuple[str, bytes]]) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for analysis_id, blob in items:
+            pipe.set(REDIS_KEY_PREFIX + analysis_id, blob, ex=self.ttl_s)
+        pipe.execute()
+
+    def count(self) -> Optional[int]:
+        return None
+
+
+class SQLiteBackend:
+    """
+    Análises num ficheiro SQLite (modo WAL, partilhável pelos workers da mesma máquina).
+    As expiradas são apagadas de tempos a tempos nas escritas.
+    """
+
+    name = "sqlite"
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str, ttl_s: float, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl_s = float(ttl_s)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "analysis_id TEXT PRIMARY KEY, expires_at REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_expires ON analyses (expires_at)")
+
+    def get(self, analysis_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM analyses WHERE analysis_id = ? AND expires_at > ?",
+                (analysis_id, self._clock()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, items: List[Tuple[str, bytes]]) -> None:
+        now = self._clock()
+        expires_at = now + self.ttl_s
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO analyses (analysis_id, expires_at, data) VALUES (?, ?, ?)",
+                    [(analysis_id, expires_at, sqlite3.Binary(blob)) for analysis_id, blob in items],
+                )
+                self._writes += len(items)
+                if self._writes >= self.PURGE_EVERY:
+                    self._writes = 0
+                    self._conn.execute("DELETE FROM analyses WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def count(self) -> Optional[int]:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+class AnalysisStore:
+    """Memória (LRU/TTL) + backend opcional, com métricas de tamanho, acertos e evicções."""
+
+    def __init__(self, memory: MemoryTier, backend=None):
+        self.memory = memory
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counters = {
+            "puts": 0,
+            "hits": 0,
+            "backend_hits": 0,
+            "misses": 0,
+            "backend_errors": 0,
+        }
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def get(self, analysis_id: str) -> Optional[Dict]:
+        data = self.memory.get(analysis_id)
+        if data is not None:
+            self._count("hits")
+            return data
+        if self.backend is not None:
+            try:
+                blob = self.backend.get(analysis_id)
+            except Exception as exc:
+                self._count("backend_errors")
+                logger.warning("analysis_store: leitura em %s falhou: %s", self.backend.name, exc)
+                blob = None
+            if blob:
+                data = deserialize(blob)
+                self.memory.put(analysis_id, data)
+                self._count("backend_hits")
+                return data
+        self._count("misses")
+        return None
+
+    def put_many(self, records: Iterable[Tuple[str, Dict]]) -> None:
+        records = list(records)
+        if not records:
+            return
+        for analysis_id, data in records:
+            self.memory.put(analysis_id, data)
+        self._count("puts", len(records))
+        if self.backend is not None:
+            try:
+                self.backend.put_many([(analysis_id, serialize(data)) for analysis_id, data in records])
+            except Exception as exc:
+                self._count("backend_errors")
+                logger.warning("analysis_store: escrita em %s falhou: %s", self.backend.name, exc)
+
+    def put(self, analysis_id: str, data: Dict) -> None:
+        self.put_many([(analysis_id, data)])
+
+    async def aget(self, analysis_id: str) -> Optional[Dict]:
+        """``get`` sem bloquear o event loop quando é preciso ir ao backend."""
+        if self.backend is None:
+            return self.get(analysis_id)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, analysis_id)
+
+    async def aput_many(self, records: Iterable[Tuple[str, Dict]]) -> None:
+        records = list(records)
+        if self.backend is None:
+            self.put_many(records)
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.put_many, records)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        backend_size = None
+        if self.backend is not None:
+            try:
+                backend_size = self.backend.count()
+            except Exception:
+                backend_size = None
+        return {
+            "backend": self.backend.name if self.backend is not None else "memory",
+            "memory_size": len(self.memory),
+            "memory_max": self.memory.max_size,
+            "ttl_s": self.memory.ttl_s,
+            "evictions": self.memory.evictions,
+            "expired": self.memory.expired,
+            "backend_size": backend_size,
+            **counters,
+        }
+
+
+def _build_backend(kind: str, ttl_s: float):
+    if kind == "redis":
+        url = os.environ.get("SPARKSCORE_ANALYSIS_REDIS_URL") or os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+        return RedisBackend.from_url(url, ttl_s)
+    if kind == "sqlite":
+        path = os.environ.get("SPARKSCORE_ANALYSIS_SQLITE_PATH", "data/analyses.sqlite3")
+        return SQLiteBackend(path, ttl_s)
+    return None
+
+
+def build_analysis_store() -> AnalysisStore:
+    """Store configurado pelo ambiente; backend indisponível -> só memória (com aviso)."""
+    kind = os.environ.get("SPARKSCORE_ANALYSIS_STORE", "memory").strip().lower()
+    ttl_s = float(os.environ.get("SPARKSCORE_ANALYSIS_TTL_S", "86400"))
+    memory = MemoryTier(int(os.environ.get("SPARKSCORE_ANALYSIS_CACHE_MAX", "1000")), ttl_s)
+    try:
+        backend = _build_backend(kind, ttl_s)
+    except Exception as exc:
+        logger.warning("analysis_store: backend '%s' indisponível, a usar só memória: %s", kind, exc)
+        backend = None
+    return AnalysisStore(memory, backend)
+
+
+_store: Optional[AnalysisStore] = None
+_store_lock = threading.Lock()
+
+
+def get_analysis_store() -> AnalysisStore:
+    """Store partilhado do processo (criado no primeiro uso)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_analysis_store()
+    return _store
+
+
+def reset_analysis_store() -> None:
+    """Descarta o store do processo (testes / mudança de configuração)."""
+    global _store
+    with _store_lock:
+        _store = None
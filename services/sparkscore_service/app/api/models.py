@@ -134,6 +134,32 @@ class AnalyzePieceResponse(BaseModel):
         ...,
         description="PPA / antecipação de ação (ponte com orbitais + modulação ambiental opcional)",
     )
+    timings: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Tempos de execução em ms (orbitals_ms por orbital_id, total_ms)",
+    )
+
+
+class AnalyzeBatchRequest(BaseModel):
+    """Request para análise de várias peças"""
+    pieces: List[AnalyzePieceRequest] = Field(
+        ..., min_length=1, max_length=5000, description="Peças a analisar"
+    )
+
+
+class BatchItemError(BaseModel):
+    """Falha na análise de uma peça do lote"""
+    index: int
+    piece_id: str
+    error: str
+
+
+class AnalyzeBatchResponse(BaseModel):
+    """Resposta de análise em lote (resultados na ordem das peças enviadas)"""
+    count: int = Field(..., description="Número de peças analisadas com sucesso")
+    results: List[AnalyzePieceResponse] = Field(default_factory=list)
+    errors: List[BatchItemError] = Field(default_factory=list)
+    elapsed_ms: float = Field(..., description="Tempo total do lote em ms")
 
 
 class AnalysisResponse(BaseModel):
@@ -145,6 +171,7 @@ class AnalysisResponse(BaseModel):
     orbitals: List[OrbitalResultResponse]
     insights: List[Insight]
     ppa: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None
     created_at: str
 
 
@@ -2,24 +2,51 @@
 API v1 - Endpoints para análise de peças do Creative Engine
 """
 
+import time
 import uuid
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional, Tuple
 from fastapi import APIRouter, HTTPException
 from app.api.models import (
+    AnalyzeBatchRequest,
+    AnalyzeBatchResponse,
     AnalyzePieceRequest,
     AnalyzePieceResponse,
     AnalysisResponse
 )
-from app.orbitals.pipeline import run_orbitals
-
-# Armazenamento in-memory (para MVP)
-# Em produção, substituir por banco de dados
-_analysis_store: Dict[str, Dict] = {}
+from app.api.analysis_store import get_analysis_store
+from app.orbitals.pipeline import run_orbitals_async, run_orbitals_batch_async
 
 router = APIRouter(prefix="/api/v1", tags=["API v1"])
 
 
+def _build_response(request: AnalyzePieceRequest, result: Dict) -> Tuple[Dict, Optional[Tuple[str, Dict]]]:
+    """Dados da resposta de uma peça e registo a armazenar (None se não solicitado)."""
+    # Gerar ID único para a análise
+    analysis_id = str(uuid.uuid4())
+    
+    # Preparar resposta
+    response_data = {
+        "analysis_id": analysis_id,
+        "piece_id": request.piece.piece_id,
+        "pipeline_version": result["pipeline_version"],
+        "overall_score": result["overall_score"],
+        "orbitals": result["orbitals"],
+        "insights": result["insights"],
+        "ppa": result["ppa"],
+        "timings": result.get("timings"),
+    }
+    
+    # Armazenar análise se solicitado
+    record = None
+    if request.options is None or request.options.store_analysis:
+        record = (analysis_id, {
+            **response_data,
+            "created_at": datetime.utcnow().isoformat() + "Z"
+        })
+    return response_data, record
+
+
 @router.post("/analyze_piece", response_model=AnalyzePieceResponse)
 async def analyze_piece(request: AnalyzePieceRequest):
     """
@@ -34,29 +61,11 @@ async def analyze_piece(request: AnalyzePieceRequest):
         payload = request.model_dump()
         
         # Executar pipeline orbital
-        result = run_orbitals(payload)
-        
-        # Gerar ID único para a análise
-        analysis_id = str(uuid.uuid4())
-        
-        # Preparar resposta
-        response_data = {
-            "analysis_id": analysis_id,
-            "piece_id": request.piece.piece_id,
-            "pipeline_version": result["pipeline_version"],
-            "overall_score": result["overall_score"],
-            "orbitals": result["orbitals"],
-            "insights": result["insights"],
-            "ppa": result["ppa"],
-        }
-        
-        # Armazenar análise se solicitado
-        if request.options is None or request.options.store_analysis:
-            _analysis_store[analysis_id] = {
-                **response_data,
-                "created_at": datetime.utcnow().isoformat() + "Z"
-            }
+        result = await run_orbitals_async(payload)
         
+        response_data, record = _build_response(request, result)
+        if record is not None:
+            await get_analysis_store().aput_many([record])
         return AnalyzePieceResponse(**response_data)
     
     except Exception as e:
@@ -66,6 +75,44 @@ async def analyze_piece(request: AnalyzePieceRequest):
         )
 
 
+@router.post("/analyze_batch", response_model=AnalyzeBatchResponse)
+async def analyze_batch(request: AnalyzeBatchRequest):
+    """
+    Analisa várias peças do Creative Engine num único pedido
+    
+    O pipeline e o matcher de keywords são partilhados; o texto de cada peça é preparado
+    uma vez para todos os orbitais e as peças são processadas em paralelo. Uma peça com
+    erro não invalida o lote (vai em ``errors``).
+    """
+    started = time.perf_counter()
+    results = await run_orbitals_batch_async([piece.model_dump() for piece in request.pieces])
+    
+    response_items = []
+    records = []
+    errors = []
+    for index, (piece, result) in enumerate(zip(request.pieces, results)):
+        if isinstance(result, Exception):
+            errors.append({
+                "index": index,
+                "piece_id": piece.piece.piece_id,
+                "error": f"Erro ao processar análise: {str(result)}",
+            })
+            continue
+        response_data, record = _build_response(piece, result)
+        response_items.append(response_data)
+        if record is not None:
+            records.append(record)
+    
+    await get_analysis_store().aput_many(records)
+    
+    return AnalyzeBatchResponse(
+        count=len(response_items),
+        results=response_items,
+        errors=errors,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+
 @router.get("/analysis/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(analysis_id: str):
     """
@@ -74,14 +121,22 @@ async def get_analysis(analysis_id: str):
     Retorna a análise completa armazenada, incluindo todos os orbitais
     e insights gerados.
     """
-    if analysis_id not in _analysis_store:
+    stored = await get_analysis_store().aget(analysis_id)
+    if stored is None:
         raise HTTPException(
             status_code=404,
             detail=f"Análise '{analysis_id}' não encontrada"
         )
     
-    stored = _analysis_store[analysis_id]
-    
     return AnalysisResponse(**stored)
 
 
+@router.get("/analysis_store/stats")
+async def analysis_store_stats():
+    """
+    Métricas do armazenamento de análises
+    
+    Backend em uso, tamanho e limite da camada em memória, evicções, expirações,
+    acertos (memória / backend), falhas e erros do backend.
+    """
+    return get_analysis_store().stats()
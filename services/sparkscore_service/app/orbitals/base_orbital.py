@@ -5,6 +5,7 @@ Classe base para todos os orbitais
 from abc import ABC, abstractmethod
 from typing import Dict, Optional, List
 from app.orbitals.orbital_result import OrbitalResult
+from app.orbitals.text_features import PREPARED_TEXT_KEY, PreparedText, extract_text
 
 
 class BaseOrbital(ABC):
@@ -85,18 +86,11 @@ class BaseOrbital(ABC):
         Returns:
             Texto combinado (text_overlay + caption)
         """
-        # Tentar formato Creative Engine primeiro (piece.text_overlay, piece.caption)
-        piece = payload.get("piece", {})
-        if piece:
-            text_overlay = self.normalize_text(piece.get("text_overlay"))
-            caption = self.normalize_text(piece.get("caption"))
-        else:
-            # Fallback para formato antigo (text_overlay, caption direto)
-            text_overlay = self.normalize_text(payload.get("text_overlay"))
-            caption = self.normalize_text(payload.get("caption"))
-        
-        parts = [text_overlay, caption]
-        return " ".join([p for p in parts if p])
+        # Texto já preparado pelo pipeline (uma vez por peça para todos os orbitais)
+        prepared = payload.get(PREPARED_TEXT_KEY)
+        if isinstance(prepared, PreparedText):
+            return prepared
+        return extract_text(payload)
     
     def extract_goal(self, payload: Dict) -> str:
         """
@@ -144,6 +138,17 @@ class BaseOrbital(ABC):
             "format": context.get("format", "")
         }
     
+    def keyword_vocabulary(self) -> List[str]:
+        """
+        Keywords fixas do orbital (atributos ``*_keywords``), usadas para construir o
+        matcher partilhado do registry.
+        """
+        vocabulary: List[str] = []
+        for attr, value in vars(self).items():
+            if attr.endswith("_keywords") and isinstance(value, (list, tuple)):
+                vocabulary.extend(kw for kw in value if isinstance(kw, str))
+        return vocabulary
+
     def count_words(self, text: str) -> int:
         """
         Conta palavras em texto
@@ -156,6 +161,8 @@ class BaseOrbital(ABC):
         """
         if not text:
             return 0
+        if isinstance(text, PreparedText):
+            return text.word_count
         return len(text.split())
     
     def detect_keywords(self, text: str, keywords: List[str]) -> int:
@@ -171,6 +178,8 @@ class BaseOrbital(ABC):
         """
         if not text or not keywords:
             return 0
+        if isinstance(text, PreparedText):
+            return text.count_keywords(keywords)
         
         text_lower = text.lower()
         return sum(1 for kw in keywords if kw in text_lower)
@@ -30,6 +30,8 @@ class CsvOrbital(BaseOrbital):
             "chame", "convide", "indique", "divulga", "whatsapp",
             "fale", "contato", "zap"
         ]
+        self.share_keywords = ["compartilhe", "envie", "marque", "repasse", "encaminhe", "divulga"]
+        self.cta_keywords = ["chame", "clique", "whatsapp", "fale", "contato", "acesse", "veja"]
 
     def analyze(self, payload: Dict) -> OrbitalResult:
         """
@@ -57,8 +59,7 @@ class CsvOrbital(BaseOrbital):
         raw_features["circulation_triggers_found"] = circulation_triggers
 
         # 3. Convite explícito a compartilhar
-        share_keywords = ["compartilhe", "envie", "marque", "repasse", "encaminhe", "divulga"]
-        share_invitation = self.detect_keywords(text, share_keywords) > 0
+        share_invitation = self.detect_keywords(text, self.share_keywords) > 0
         raw_features["share_invitation_detected"] = share_invitation
 
         # 4. Clareza do vetor (objetivo + CTA)
@@ -131,14 +132,13 @@ class CsvOrbital(BaseOrbital):
             return 0.3
 
         score = 0.5
-        cta_keywords = ["chame", "clique", "whatsapp", "fale", "contato", "acesse", "veja"]
-        cta_found = self.detect_keywords(text, cta_keywords) > 0
+        cta_found = self.detect_keywords(text, self.cta_keywords) > 0
         if cta_found:
             score += 0.25
         goal_parts = goal.replace("_", " ").split() if goal else []
         if goal_parts and self.detect_keywords(text, goal_parts) > 0:
             score += 0.2
-        if len(text.split()) >= 3:
+        if self.count_words(text) >= 3:
             score += 0.1
 
         return min(score, 1.0)
@@ -1,11 +1,54 @@
 """
 Pipeline Orbital - Executa análise completa de orbitais
+
+O pipeline é construído uma vez por processo (``get_pipeline``) e reconstruído quando
+config/orbitals.yaml muda (mtime verificado no máximo a cada SPARKSCORE_CONFIG_CHECK_S
+segundos). Os orbitais de uma análise correm em paralelo num pool de threads partilhado
+(SPARKSCORE_ORBITAL_WORKERS) e o tempo de cada um vai em ``timings``. O texto da peça é
+preparado uma vez (``text_features``) e partilhado por todos os orbitais.
 """
 
-from typing import Dict, List
-from app.orbitals.registry import OrbitalRegistry
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.orbitals.base_orbital import BaseOrbital
+from app.orbitals.registry import CONFIG_PATH, OrbitalRegistry
 from app.orbitals.orbital_result import OrbitalResult
 from app.orbitals.ppa_bridge import compute_pipeline_ppa
+from app.orbitals.text_features import prepare_payload
+
+logger = logging.getLogger(__name__)
+
+ORBITAL_WORKERS = int(os.environ.get("SPARKSCORE_ORBITAL_WORKERS", "16"))
+CONFIG_CHECK_S = float(os.environ.get("SPARKSCORE_CONFIG_CHECK_S", "2"))
+BATCH_CHUNK = int(os.environ.get("SPARKSCORE_BATCH_CHUNK", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=max(1, ORBITAL_WORKERS), thread_name_prefix="orbital")
+
+
+def _analyze_orbital(orbital: BaseOrbital, payload: Dict) -> Tuple[OrbitalResult, float]:
+    """Executa um orbital; erro vira resultado "disabled". Devolve (resultado, ms)."""
+    started = time.perf_counter()
+    try:
+        result = orbital.analyze(payload)
+    except Exception as e:
+        # Em caso de erro, criar resultado de erro
+        result = OrbitalResult(
+            orbital_id=orbital.orbital_id,
+            name=orbital.name,
+            status="disabled",
+            score=None,
+            confidence=None,
+            rationale=f"Erro ao processar orbital: {str(e)}",
+            top_features=[],
+            raw_features={"error": str(e)},
+            version=orbital.version
+        )
+    return result, round((time.perf_counter() - started) * 1000, 3)
 
 
 class OrbitalPipeline:
@@ -18,6 +61,9 @@ class OrbitalPipeline:
         cfg = self.registry.config.get("pipeline") or {}
         self.pipeline_version = str(cfg.get("version", "1.0.0"))
         self._pipeline_cfg = cfg
+        # Ordem fixa: ativos primeiro, depois placeholders (a config não muda sem reconstruir o pipeline)
+        self._active_orbitals = self.registry.get_active_orbitals()
+        self._orbitals = self._active_orbitals + self.registry.get_placeholder_orbitals()
     
     def run_orbitals(self, payload: Dict) -> Dict:
         """
@@ -33,57 +79,61 @@ class OrbitalPipeline:
                 "overall_score": float,
                 "orbitals": [OrbitalResult...],
                 "insights": List[Dict],
-                "ppa": Dict (antecipacao de acao + modulacao ambiental opcional)
+                "ppa": Dict (antecipacao de acao + modulacao ambiental opcional),
+                "timings": {"orbitals_ms": {orbital_id: float}, "total_ms": float}
             }
         """
-        # 1. Executar orbitais ativos
-        active_orbitals = self.registry.get_active_orbitals()
-        active_results = []
-        
-        for orbital in active_orbitals:
-            try:
-                result = orbital.analyze(payload)
-                active_results.append(result)
-            except Exception as e:
-                # Em caso de erro, criar resultado de erro
-                error_result = OrbitalResult(
-                    orbital_id=orbital.orbital_id,
-                    name=orbital.name,
-                    status="disabled",
-                    score=None,
-                    confidence=None,
-                    rationale=f"Erro ao processar orbital: {str(e)}",
-                    top_features=[],
-                    raw_features={"error": str(e)},
-                    version=orbital.version
-                )
-                active_results.append(error_result)
-        
-        # 2. Incluir placeholders
-        placeholder_orbitals = self.registry.get_placeholder_orbitals()
-        placeholder_results = []
-        
-        for orbital in placeholder_orbitals:
+        started = time.perf_counter()
+        payload = prepare_payload(payload, self.registry.keyword_matcher)
+        # 1-2. Executar orbitais ativos e placeholders em paralelo (ordem dos resultados preservada)
+        futures = [_executor.submit(_analyze_orbital, orbital, payload) for orbital in self._orbitals]
+        return self._assemble(payload, [f.result() for f in futures], started)
+
+    async def run_orbitals_async(self, payload: Dict) -> Dict:
+        """Igual a ``run_orbitals`` sem bloquear o event loop (endpoints async)."""
+        started = time.perf_counter()
+        payload = prepare_payload(payload, self.registry.keyword_matcher)
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(_executor, _analyze_orbital, orbital, payload) for orbital in self._orbitals)
+        )
+        return self._assemble(payload, list(outcomes), started)
+
+    def run_orbitals_serial(self, payload: Dict) -> Dict:
+        """Orbitais em sequência na thread atual (uma peça de um lote; o paralelismo é entre peças)."""
+        started = time.perf_counter()
+        payload = prepare_payload(payload, self.registry.keyword_matcher)
+        outcomes = [_analyze_orbital(orbital, payload) for orbital in self._orbitals]
+        return self._assemble(payload, outcomes, started)
+
+    def _run_chunk(self, payloads: List[Dict]) -> List[object]:
+        outcomes: List[object] = []
+        for payload in payloads:
             try:
-                result = orbital.analyze(payload)
-                placeholder_results.append(result)
+                outcomes.append(self.run_orbitals_serial(payload))
             except Exception as e:
-                # Em caso de erro, criar resultado de erro
-                error_result = OrbitalResult(
-                    orbital_id=orbital.orbital_id,
-                    name=orbital.name,
-                    status="disabled",
-                    score=None,
-                    confidence=None,
-                    rationale=f"Erro ao processar orbital: {str(e)}",
-                    top_features=[],
-                    raw_features={"error": str(e)},
-                    version=orbital.version
-                )
-                placeholder_results.append(error_result)
-        
+                outcomes.append(e)
+        return outcomes
+
+    async def run_batch_async(self, payloads: List[Dict]) -> List[object]:
+        """
+        Analisa várias peças: blocos de SPARKSCORE_BATCH_CHUNK peças correm em paralelo no pool
+        (orbitais em série dentro de cada peça; o trabalho é quase todo CPU, uma tarefa por
+        peça só acrescentaria overhead). Resultados na ordem dos payloads; uma exceção fica no
+        lugar do resultado da peça que falhou.
+        """
+        loop = asyncio.get_running_loop()
+        size = max(1, BATCH_CHUNK)
+        chunks = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+        done = await asyncio.gather(*(loop.run_in_executor(_executor, self._run_chunk, c) for c in chunks))
+        return [outcome for chunk in done for outcome in chunk]
+
+    def _assemble(self, payload: Dict, outcomes: List[Tuple[OrbitalResult, float]], started: float) -> Dict:
+        """Combina os resultados dos orbitais em score, insights, PPA e timings."""
+        active_results = [result for result, _ in outcomes[:len(self._active_orbitals)]]
+
         # 3. Combinar resultados (ativos primeiro, depois placeholders)
-        all_results = active_results + placeholder_results
+        all_results = [result for result, _ in outcomes]
         
         # 4. Calcular overall_score (média ponderada dos orbitais ativos)
         overall_score = self._calculate_overall_score(active_results)
@@ -100,6 +150,10 @@ class OrbitalPipeline:
             "orbitals": [result.model_dump() for result in all_results],
             "insights": insights,
             "ppa": ppa,
+            "timings": {
+                "orbitals_ms": {orbital.orbital_id: ms for orbital, (_, ms) in zip(self._orbitals, outcomes)},
+                "total_ms": round((time.perf_counter() - started) * 1000, 3),
+            },
         }
     
     def _calculate_overall_score(self, active_results: List[OrbitalResult]) -> float:
@@ -251,6 +305,55 @@ class OrbitalPipeline:
         return " ".join([p for p in parts if p])
 
 
+_pipeline: Optional[OrbitalPipeline] = None
+_pipeline_mtime: Optional[float] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _config_mtime() -> Optional[float]:
+    try:
+        return CONFIG_PATH.stat().st_mtime
+    except OSError:
+        return None
+
+
+def get_pipeline() -> OrbitalPipeline:
+    """
+    Pipeline partilhado do processo; reconstruído se orbitals.yaml mudou. Se a nova config
+    não carregar, mantém o pipeline anterior.
+    """
+    global _pipeline, _pipeline_mtime, _checked_at
+    now = time.monotonic()
+    if _pipeline is not None and now - _checked_at < CONFIG_CHECK_S:
+        return _pipeline
+    with _lock:
+        _checked_at = now
+        mtime = _config_mtime()
+        if _pipeline is None or mtime != _pipeline_mtime:
+            try:
+                pipeline = OrbitalPipeline()
+            except Exception as e:
+                if _pipeline is None:
+                    raise
+                logger.error(f"orbitals.yaml inválido, a manter o pipeline anterior: {e}")
+            else:
+                if _pipeline is not None:
+                    logger.info(f"orbitals.yaml alterado: pipeline recarregado (v{pipeline.pipeline_version})")
+                _pipeline = pipeline
+            _pipeline_mtime = mtime
+    return _pipeline
+
+
+def reset_pipeline() -> None:
+    """Força reconstrução na próxima chamada (testes)."""
+    global _pipeline, _pipeline_mtime, _checked_at
+    with _lock:
+        _pipeline = None
+        _pipeline_mtime = None
+        _checked_at = 0.0
+
+
 def run_orbitals(payload: Dict) -> Dict:
     """
     Função helper para executar pipeline orbital
@@ -261,6 +364,14 @@ def run_orbitals(payload: Dict) -> Dict:
     Returns:
         Dict com análise completa
     """
-    pipeline = OrbitalPipeline()
-    return pipeline.run_orbitals(payload)
+    return get_pipeline().run_orbitals(payload)
+
+
+async def run_orbitals_async(payload: Dict) -> Dict:
+    """Variante de ``run_orbitals`` para endpoints async."""
+    return await get_pipeline().run_orbitals_async(payload)
+
 
+async def run_orbitals_batch_async(payloads: List[Dict]) -> List[Dict]:
+    """Lote de peças (``/api/v1/analyze_batch``); ver ``OrbitalPipeline.run_batch_async``."""
+    return await get_pipeline().run_batch_async(payloads)
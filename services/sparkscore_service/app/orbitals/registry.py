@@ -17,6 +17,9 @@ from app.orbitals.temporal_orbital import TemporalOrbital
 from app.orbitals.social_orbital import SocialOrbital
 from app.orbitals.csv_orbital import CsvOrbital
 from app.orbitals.environmental_indiciary import EnvironmentalIndiciaryOrbital
+from app.orbitals.text_features import KeywordMatcher
+
+CONFIG_PATH = Path(__file__).parent.parent.parent / 'config' / 'orbitals.yaml'
 
 
 class OrbitalRegistry:
@@ -43,11 +46,14 @@ class OrbitalRegistry:
         self.config = self._load_config()
         self._orbitals: Dict[str, BaseOrbital] = {}
         self._initialize_orbitals()
+        # Keywords de todos os orbitais num único autómato (texto varrido uma vez por peça)
+        self.keyword_matcher = KeywordMatcher(
+            kw for orbital in self._orbitals.values() for kw in orbital.keyword_vocabulary()
+        )
     
     def _load_config(self) -> Dict:
         """Carrega configuração de orbitais do YAML"""
-        config_path = Path(__file__).parent.parent.parent / 'config' / 'orbitals.yaml'
-        with open(config_path, 'r', encoding='utf-8') as f:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     
     def _initialize_orbitals(self):
@@ -0,0 +1,109 @@
+"""
+Pré-processamento de texto partilhado pelos orbitais
+
+Sem isto cada orbital extrai e normaliza o texto da peça, conta palavras e procura as suas
+keywords com um ciclo ``kw in text``. O pipeline passa a preparar o texto uma vez por peça
+(``PreparedText``) e a procurar todas as keywords dos orbitais numa única passagem com um
+``KeywordMatcher`` construído uma vez por registry.
+
+Backend do matcher: autómato Aho-Corasick do pacote opcional ``pyahocorasick`` (uma passagem
+pelo texto para todo o vocabulário); sem o pacote, varrimento do vocabulário com ``in`` — para
+o vocabulário atual (~60 keywords, textos curtos) é tão rápido quanto um Aho-Corasick em
+Python puro.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    import ahocorasick  # opcional: pip install pyahocorasick
+except Exception:  # pragma: no cover - dependência opcional
+    ahocorasick = None
+
+# Chave do payload onde o pipeline deixa o texto preparado (lida por BaseOrbital)
+PREPARED_TEXT_KEY = "_prepared_text"
+
+
+class KeywordMatcher:
+    """
+    Matcher multi-padrão sobre um vocabulário fixo: ``find(text)`` devolve o conjunto das
+    keywords que ocorrem em ``text`` como substring (mesma semântica de ``kw in text``).
+    """
+
+    def __init__(self, keywords: Iterable[str], use_automaton: bool = True):
+        self.vocabulary: Set[str] = {kw for kw in keywords if kw}
+        self._keywords = tuple(sorted(self.vocabulary))
+        self._automaton = None
+        if use_automaton and ahocorasick is not None and self.vocabulary:
+            automaton = ahocorasick.Automaton()
+            for kw in self._keywords:
+                automaton.add_word(kw, kw)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    @property
+    def backend(self) -> str:
+        return "ahocorasick" if self._automaton is not None else "scan"
+
+    def find(self, text: str) -> Set[str]:
+        if not text:
+            return set()
+        if self._automaton is not None:
+            return {kw for _, kw in self._automaton.iter(text)}
+        return {kw for kw in self._keywords if kw in text}
+
+
+class PreparedText(str):
+    """
+    Texto normalizado da peça (continua a ser um ``str``) com tokens, contagem de palavras e
+    as keywords do vocabulário já encontradas.
+    """
+
+    tokens: List[str]
+    word_count: int
+    vocabulary: Set[str]
+    found: Set[str]
+
+    def __new__(cls, text: str, matcher: Optional[KeywordMatcher] = None) -> "PreparedText":
+        obj = super().__new__(cls, text)
+        obj.tokens = text.split()
+        obj.word_count = len(obj.tokens)
+        obj.vocabulary = matcher.vocabulary if matcher is not None else set()
+        obj.found = matcher.find(text) if matcher is not None and text else set()
+        return obj
+
+    def split(self, sep: Optional[str] = None, maxsplit: int = -1) -> List[str]:
+        if sep is None and maxsplit == -1:
+            return list(self.tokens)
+        return super().split(sep, maxsplit)
+
+    def count_keywords(self, keywords: Iterable[str]) -> int:
+        """Equivalente a ``sum(kw in text)``; keywords fora do vocabulário caem no ``in``."""
+        total = 0
+        for kw in keywords:
+            if kw in self.vocabulary:
+                total += kw in self.found
+            else:
+                total += kw in self
+        return total
+
+
+def _normalize(text: Optional[str]) -> str:
+    return text.lower().strip() if text else ""
+
+
+def extract_text(payload: Dict) -> str:
+    """
+    Texto normalizado da peça (text_overlay + caption), formato Creative Engine
+    (piece.text_overlay, piece.caption) ou antigo (campos no topo do payload).
+    """
+    piece = payload.get("piece", {})
+    source = piece if piece else payload
+    parts = [_normalize(source.get("text_overlay")), _normalize(source.get("caption"))]
+    return " ".join([p for p in parts if p])
+
+
+def prepare_payload(payload: Dict, matcher: Optional[KeywordMatcher]) -> Dict:
+    """Cópia rasa do payload com o texto preparado (o payload original não é alterado)."""
+    if isinstance(payload.get(PREPARED_TEXT_KEY), PreparedText):
+        return payload
+    return {**payload, PREPARED_TEXT_KEY: PreparedText(extract_text(payload), matcher)}
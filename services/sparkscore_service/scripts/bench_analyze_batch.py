@@ -0,0 +1,108 @@
+"""
+Benchmark da análise em lote do SparkScore
+
+Compara, sobre N peças sintéticas:
+  - per_request: pipeline construído por peça e texto extraído/varrido por cada orbital
+    (comportamento antigo do /api/v1/analyze_piece)
+  - shared:      pipeline partilhado, orbitais em série, sem texto preparado
+  - batch:       run_orbitals_batch_async (texto preparado uma vez + matcher Aho-Corasick,
+    peças em paralelo) — caminho do /api/v1/analyze_batch
+e confirma que os scores são idênticos.
+
+Uso (na pasta services/sparkscore_service):
+  python scripts/bench_analyze_batch.py --pieces 3000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.orbitals.pipeline import OrbitalPipeline, _analyze_orbital, get_pipeline, run_orbitals_batch_async
+
+WORDS = (
+    "promoção hoje chame no whatsapp fale conosco compre agora garanta o seu oferta "
+    "imperdível últimas unidades compartilhe com amigos marque quem precisa link na bio "
+    "confira veja saiba mais produto novo qualidade entrega rápida desconto frete grátis "
+    "zap contato clique acesse baixe cadastre somente hoje corre"
+).split()
+GOALS = ["whatsapp_click", "link_click", "purchase", "download", "signup"]
+
+
+def make_pieces(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    pieces = []
+    for i in range(n):
+        pieces.append({
+            "source": "vitrinezap_creative_engine",
+            "piece": {
+                "piece_id": f"bench_{i}",
+                "piece_type": "image",
+                "text_overlay": " ".join(rng.choices(WORDS, k=rng.randint(3, 12))).upper(),
+                "caption": " ".join(rng.choices(WORDS, k=rng.randint(5, 40))),
+                "hashtags": [],
+            },
+            "objective": {"primary_goal": rng.choice(GOALS)},
+            "distribution": {"channel": "whatsapp_status", "format": "story_vertical"},
+        })
+    return pieces
+
+
+def run_per_request(pieces):
+    results = []
+    for payload in pieces:
+        pipeline = OrbitalPipeline()
+        started = time.perf_counter()
+        outcomes = [_analyze_orbital(orbital, payload) for orbital in pipeline._orbitals]
+        results.append(pipeline._assemble(payload, outcomes, started))
+    return results
+
+
+def run_shared(pieces):
+    pipeline = get_pipeline()
+    results = []
+    for payload in pieces:
+        started = time.perf_counter()
+        outcomes = [_analyze_orbital(orbital, payload) for orbital in pipeline._orbitals]
+        results.append(pipeline._assemble(payload, outcomes, started))
+    return results
+
+
+def run_batch(pieces):
+    return asyncio.run(run_orbitals_batch_async(pieces))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pieces", type=int, default=3000)
+    args = parser.parse_args()
+
+    pieces = make_pieces(args.pieces)
+    get_pipeline()  # construção fora da medição dos modos partilhados
+
+    timings = {}
+    outputs = {}
+    for name, fn in (("per_request", run_per_request), ("shared", run_shared), ("batch", run_batch)):
+        started = time.perf_counter()
+        outputs[name] = fn(pieces)
+        timings[name] = time.perf_counter() - started
+
+    reference = [(r["overall_score"], [o["score"] for o in r["orbitals"]]) for r in outputs["per_request"]]
+    for name in ("shared", "batch"):
+        got = [(r["overall_score"], [o["score"] for o in r["orbitals"]]) for r in outputs[name]]
+        assert got == reference, f"{name}: resultados diferentes do per_request"
+
+    print(f"{args.pieces} peças (resultados idênticos nos três modos)")
+    for name, elapsed in timings.items():
+        print(
+            f"  {name:<12}{elapsed * 1000:>10.1f} ms  {elapsed / args.pieces * 1e6:>8.1f} µs/peça  "
+            f"{timings['per_request'] / elapsed:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -261,3 +261,31 @@ def test_analyze_piece_insights():
     # Mas a estrutura deve estar presente
 
 
+
+
+def test_analyze_batch():
+    """Testa análise em lote (resultados na ordem das peças, iguais à análise individual)"""
+    pieces = []
+    for i, caption in enumerate(["Chame no WhatsApp", "Aproveite", "Compartilhe com amigos"]):
+        pieces.append({
+            "source": "vitrinezap_creative_engine",
+            "piece": {
+                "piece_id": f"ce_batch_{i}",
+                "piece_type": "image",
+                "text_overlay": "PROMOÇÃO HOJE",
+                "caption": caption
+            },
+            "objective": {"primary_goal": "whatsapp_click"},
+            "distribution": {"channel": "whatsapp_status", "format": "story_vertical"}
+        })
+    
+    response = client.post("/api/v1/analyze_batch", json={"pieces": pieces})
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["count"] == 3
+    assert data["errors"] == []
+    assert [r["piece_id"] for r in data["results"]] == ["ce_batch_0", "ce_batch_1", "ce_batch_2"]
+    
+    single = client.post("/api/v1/analyze_piece", json=pieces[0]).json()
+    assert data["results"][0]["overall_score"] == single["overall_score"]
@@ -0,0 +1,135 @@
+"""
+Unit tests do armazenamento de análises (LRU/TTL em memória, backends SQLite e Redis)
+"""
+
+import asyncio
+
+import pytest
+from app.api import analysis_store
+from app.api.analysis_store import (
+    AnalysisStore,
+    MemoryTier,
+    RedisBackend,
+    SQLiteBackend,
+    deserialize,
+    serialize,
+)
+
+ANALYSIS = {
+    "analysis_id": "a1",
+    "piece_id": "ce_1",
+    "pipeline_version": "1.0.0",
+    "overall_score": 76.4,
+    "orbitals": [{"orbital_id": "semiotic", "score": 80.0, "rationale": "Promoção"}],
+    "insights": [],
+    "created_at": "2026-01-16T14:32:10Z",
+}
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Cliente Redis em memória com o subconjunto usado pelo RedisBackend."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def execute(self):
+        return []
+
+
+class TestMemoryTier:
+    """Camada em memória limitada"""
+
+    def test_lru_evicta_menos_recente(self):
+        tier = MemoryTier(max_size=2, ttl_s=60)
+        tier.put("a", {"n": 1})
+        tier.put("b", {"n": 2})
+        tier.get("a")
+        tier.put("c", {"n": 3})
+        assert tier.get("b") is None
+        assert tier.get("a") == {"n": 1}
+        assert len(tier) == 2
+        assert tier.evictions == 1
+
+    def test_ttl_expira(self):
+        clock = FakeClock()
+        tier = MemoryTier(max_size=10, ttl_s=5, clock=clock)
+        tier.put("a", {"n": 1})
+        clock.now += 6
+        assert tier.get("a") is None
+        assert tier.expired == 1
+
+
+class TestAnalysisStore:
+    """Memória + backend partilhado"""
+
+    def test_serializacao_compacta(self):
+        blob = serialize(ANALYSIS)
+        assert deserialize(blob) == ANALYSIS
+        assert len(blob) < len(str(ANALYSIS))
+
+    def test_sqlite_visivel_entre_processos(self, tmp_path):
+        path = str(tmp_path / "analyses.sqlite3")
+        worker_a = AnalysisStore(MemoryTier(10, 60), SQLiteBackend(path, 60))
+        worker_b = AnalysisStore(MemoryTier(10, 60), SQLiteBackend(path, 60))
+        worker_a.put("a1", ANALYSIS)
+        assert worker_b.get("a1") == ANALYSIS
+        assert worker_b.get("a1") == ANALYSIS
+        stats = worker_b.stats()
+        assert (stats["backend_hits"], stats["hits"], stats["backend_size"]) == (1, 1, 1)
+
+    def test_sqlite_respeita_ttl(self, tmp_path):
+        clock = FakeClock()
+        backend = SQLiteBackend(str(tmp_path / "analyses.sqlite3"), 5, clock=clock)
+        backend.put_many([("a1", serialize(ANALYSIS))])
+        clock.now += 6
+        assert backend.get("a1") is None
+
+    def test_redis_backend(self):
+        client = FakeRedis()
+        writer = AnalysisStore(MemoryTier(10, 60), RedisBackend(client, 60))
+        reader = AnalysisStore(MemoryTier(10, 60), RedisBackend(client, 60))
+        asyncio.run(writer.aput_many([("a1", ANALYSIS)]))
+        assert asyncio.run(reader.aget("a1")) == ANALYSIS
+        assert set(client.data) == {analysis_store.REDIS_KEY_PREFIX + "a1"}
+
+    def test_falha_do_backend_mantem_memoria(self):
+        class BrokenBackend:
+            name = "broken"
+
+            def get(self, analysis_id):
+                raise ConnectionError("down")
+
+            def put_many(self, items):
+                raise ConnectionError("down")
+
+            def count(self):
+                return None
+
+        store = AnalysisStore(MemoryTier(10, 60), BrokenBackend())
+        store.put("a1", ANALYSIS)
+        assert store.get("a1") == ANALYSIS
+        assert store.get("a2") is None
+        stats = store.stats()
+        assert (stats["backend_errors"], stats["misses"]) == (2, 1)
+
+    def test_backend_indisponivel_usa_memoria(self, monkeypatch):
+        monkeypatch.setenv("SPARKSCORE_ANALYSIS_STORE", "sqlite")
+        monkeypatch.setenv("SPARKSCORE_ANALYSIS_SQLITE_PATH", "/dev/null/analyses.sqlite3")
+        assert analysis_store.build_analysis_store().stats()["backend"] == "memory"
@@ -0,0 +1,89 @@
+"""
+Unit tests do pipeline orbital (instância partilhada, hot-reload da config, execução paralela)
+"""
+
+import asyncio
+import time
+
+import pytest
+from app.orbitals import pipeline as pipeline_module
+from app.orbitals.base_orbital import BaseOrbital
+from app.orbitals.orbital_result import OrbitalResult
+from tests.conftest import payload_minimal
+
+
+class SlowOrbital(BaseOrbital):
+    """Orbital falso que demora ``delay`` segundos (simula I/O)."""
+
+    def __init__(self, orbital_id: str, delay: float):
+        super().__init__(orbital_id=orbital_id, name=orbital_id)
+        self.delay = delay
+
+    def analyze(self, payload):
+        time.sleep(self.delay)
+        return OrbitalResult(
+            orbital_id=self.orbital_id,
+            name=self.name,
+            status="placeholder",
+            rationale="lento",
+            top_features=[],
+            raw_features={},
+            version=self.version,
+        )
+
+
+@pytest.fixture(autouse=True)
+def fresh_pipeline():
+    pipeline_module.reset_pipeline()
+    yield
+    pipeline_module.reset_pipeline()
+
+
+class TestPipelineSingleton:
+    """Pipeline construído uma vez por processo"""
+
+    def test_get_pipeline_reutiliza_instancia(self):
+        assert pipeline_module.get_pipeline() is pipeline_module.get_pipeline()
+
+    def test_recarrega_quando_config_muda(self, monkeypatch):
+        first = pipeline_module.get_pipeline()
+        monkeypatch.setattr(pipeline_module, "_config_mtime", lambda: 1.0)
+        monkeypatch.setattr(pipeline_module, "_checked_at", 0.0)
+        assert pipeline_module.get_pipeline() is not first
+
+    def test_config_invalida_mantem_pipeline_anterior(self, monkeypatch):
+        first = pipeline_module.get_pipeline()
+        monkeypatch.setattr(pipeline_module, "_config_mtime", lambda: 2.0)
+        monkeypatch.setattr(pipeline_module, "_checked_at", 0.0)
+
+        def broken():
+            raise ValueError("yaml inválido")
+
+        monkeypatch.setattr(pipeline_module, "OrbitalPipeline", broken)
+        assert pipeline_module.get_pipeline() is first
+
+
+class TestPipelineParallel:
+    """Orbitais em paralelo e timings por orbital"""
+
+    def test_timings_por_orbital(self):
+        result = pipeline_module.run_orbitals(payload_minimal(text_overlay="Chame no zap"))
+        timings = result["timings"]
+        assert set(timings["orbitals_ms"]) == {o["orbital_id"] for o in result["orbitals"]}
+        assert timings["total_ms"] >= 0
+
+    def test_latencia_limitada_pelo_orbital_mais_lento(self):
+        pipeline = pipeline_module.get_pipeline()
+        slow = [SlowOrbital(f"lento_{i}", 0.1) for i in range(5)]
+        pipeline._orbitals = pipeline._active_orbitals + slow
+        started = time.perf_counter()
+        result = pipeline.run_orbitals(payload_minimal())
+        assert time.perf_counter() - started < 0.35
+        assert [o["orbital_id"] for o in result["orbitals"]][-5:] == [o.orbital_id for o in slow]
+
+    def test_async_igual_ao_sincrono(self):
+        payload = payload_minimal(text_overlay="Promoção hoje, chame no whatsapp")
+        sync_result = pipeline_module.run_orbitals(payload)
+        async_result = asyncio.run(pipeline_module.run_orbitals_async(payload))
+        assert async_result["overall_score"] == sync_result["overall_score"]
+        assert async_result["orbitals"] == sync_result["orbitals"]
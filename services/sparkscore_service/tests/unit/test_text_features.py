@@ -0,0 +1,69 @@
+"""
+Unit tests do pré-processamento de texto partilhado (matcher de keywords, PreparedText)
+"""
+
+import pytest
+from app.orbitals import text_features
+from app.orbitals.registry import OrbitalRegistry
+from app.orbitals.text_features import KeywordMatcher, PreparedText, extract_text, prepare_payload
+from tests.conftest import payload_minimal
+
+VOCAB = ["whatsapp", "whats", "app", "saiba mais", "mais", "zap", "chame"]
+TEXTS = [
+    "",
+    "chame no whatsapp agora",
+    "saiba mais no zap",
+    "whatsappzap whats",
+    "nada relevante aqui",
+]
+
+
+class TestKeywordMatcher:
+    """Mesma semântica de `kw in text` em ambos os backends"""
+
+    @pytest.mark.parametrize("use_automaton", [True, False])
+    def test_find_equivale_a_substring(self, use_automaton):
+        matcher = KeywordMatcher(VOCAB, use_automaton=use_automaton)
+        for text in TEXTS:
+            assert matcher.find(text) == {kw for kw in VOCAB if kw in text}
+
+    def test_backend_scan_sem_pacote(self, monkeypatch):
+        monkeypatch.setattr(text_features, "ahocorasick", None)
+        assert KeywordMatcher(VOCAB).backend == "scan"
+
+
+class TestPreparedText:
+    """Texto preparado uma vez por peça"""
+
+    def test_tokens_e_contagem(self):
+        text = PreparedText("chame no whatsapp agora", KeywordMatcher(VOCAB))
+        assert text == "chame no whatsapp agora"
+        assert text.word_count == 4
+        assert text.split() == ["chame", "no", "whatsapp", "agora"]
+        assert text.count_keywords(["whatsapp", "zap", "agora"]) == 2  # "agora" fora do vocabulário
+
+    def test_extract_text_normaliza(self):
+        payload = payload_minimal(text_overlay="  PROMOÇÃO HOJE ", caption="Chame no WhatsApp")
+        assert extract_text(payload) == "promoção hoje chame no whatsapp"
+
+    def test_prepare_payload_nao_altera_original(self):
+        payload = payload_minimal()
+        prepared = prepare_payload(payload, None)
+        assert text_features.PREPARED_TEXT_KEY not in payload
+        assert isinstance(prepared[text_features.PREPARED_TEXT_KEY], PreparedText)
+
+
+class TestOrbitaisComTextoPreparado:
+    """Resultados idênticos com e sem texto preparado"""
+
+    @pytest.mark.parametrize("text_overlay,caption", [
+        ("PROMOÇÃO HOJE", "Chame no WhatsApp"),
+        ("Compartilhe e marque", "saiba mais no link, confira"),
+        ("", ""),
+    ])
+    def test_resultados_iguais(self, text_overlay, caption):
+        registry = OrbitalRegistry()
+        payload = payload_minimal(text_overlay=text_overlay, caption=caption)
+        prepared = prepare_payload(payload, registry.keyword_matcher)
+        for orbital in registry.get_all_orbitals():
+            assert orbital.analyze(prepared) == orbital.analyze(payload)
@@ -1,28 +1,147 @@
+import base64
+import bisect
 import os
 import json
+import threading
+import time
+from contextlib import contextmanager
+
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from sinapum_shared.embedding_cache import EmbeddingCache, cache_key
+
+from .index_factory import IndexSpec, build_base_index, configure, empty_like, index_type_of, search_params
+
+# Sentinela para o limite superior de um intervalo de prefixo na lista ordenada de ids.
+_PREFIX_UPPER = "\U0010ffff"
+
+
+class _RWLock:
+    """
+    Leitores concorrentes / escritor exclusivo, com preferência ao escritor. ``with lock:`` é a
+    secção de escrita (como um ``threading.Lock``); ``with lock.read():`` a de leitura.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def __enter__(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+        return False
 
 
 class FaissStore:
-    def __init__(self, data_dir: str, model_name: str):
+    """
+    Persistência: snapshot (index.faiss + id_map.json + doc_texts.json) + write-ahead log
+    append-only (wal.jsonl). Cada upsert só acrescenta linhas ao WAL; o snapshot completo é
+    reescrito a cada ``snapshot_every`` entradas (compactação) e no shutdown.
+
+    Ids estáveis: o índice é um ``IndexIDMap2`` com ids int64 internos mapeados para os ids
+    string. Reinserir um id substitui o vetor (o antigo vira tombstone, excluído da busca);
+    quando os tombstones passam de ``compact_ratio`` do índice, uma thread reconstrói o índice
+    só com os vetores vivos.
+
+    O índice base segue ``index_spec`` (flat, HNSW, IVF-Flat, IVF-PQ). Tipos IVF só entram em uso
+    depois de treinados por :meth:`rebuild` (comando ``python -m app.rebuild``).
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        model_name: str,
+        *,
+        encode_batch_size: int = 64,
+        snapshot_every: int = 500,
+        compact_ratio: float = 0.2,
+        compact_min: int = 64,
+        index_spec: IndexSpec | None = None,
+        exact_filter_max: int = 2048,
+        query_cache: EmbeddingCache | None = None,
+    ):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
         self.index_path = os.path.join(self.data_dir, "index.faiss")
         self.map_path = os.path.join(self.data_dir, "id_map.json")
         self.texts_path = os.path.join(self.data_dir, "doc_texts.json")
+        self.wal_path = os.path.join(self.data_dir, "wal.jsonl")
+        self.encode_batch_size = max(1, int(encode_batch_size))
+        self.snapshot_every = max(1, int(snapshot_every))
+        self.compact_ratio = max(0.0, float(compact_ratio))
+        self.compact_min = max(1, int(compact_min))
+        # FAISS não admite leituras concorrentes com add_with_ids: buscas em leitura, o resto em escrita
+        self._lock = _RWLock()
+        self._wal_entries = 0
+        self._compacting = False
+        self.index_spec = index_spec or IndexSpec()
+        # Em índices aproximados, filtros que deixam até N candidatos são resolvidos por produto
+        # interno exato sobre esses vetores (HNSW/IVF filtrados perdem recall em subconjuntos pequenos)
+        self.exact_filter_max = max(0, int(exact_filter_max))
 
-        self.model = SentenceTransformer(model_name)
-        self.id_map: list[str] = []
+        self.model_name = model_name
+        self._model = None
+        # Embeddings de consulta repetidos (saudações, menus) não voltam ao transformer
+        self.query_cache = query_cache if query_cache is not None else EmbeddingCache()
+        # id interno (int64 no FAISS) ↔ id string
+        self.int_to_id: dict[int, str] = {}
+        self.id_to_int: dict[str, int] = {}
+        self._next_id = 0
+        # ids internos substituídos/apagados ainda presentes no índice até à compactação
+        self._tombstones: set[int] = set()
         self.doc_texts: dict[str, str] = {}
         self.index = None
+        # Índice de metadados: (id, id interno) ordenado por id → filtro por prefixo em O(log n + m)
+        self._sorted_ids: list[tuple[str, int]] = []
 
         self._load()
 
+    @property
+    def model(self):
+        # Carregado na primeira codificação — o rebuild offline não precisa do modelo
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def base_index(self):
+        return faiss.downcast_index(self.index.index) if self.index is not None else None
+
+    # ------------------------------------------------------------------ carga / persistência
+
     def _load(self):
+        id_map = None
         if os.path.exists(self.map_path):
             with open(self.map_path, "r", encoding="utf-8") as f:
-                self.id_map = json.load(f)
+                id_map = json.load(f)
         if os.path.exists(self.texts_path):
             with open(self.texts_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -33,41 +152,398 @@ class FaissStore:
         else:
             self.index = None
 
+        if isinstance(id_map, list):
+            self._migrate_positional(id_map)
+        elif isinstance(id_map, dict):
+            self._next_id = int(id_map.get("next_id", 0))
+            for iid, doc_id in (id_map.get("ids") or {}).items():
+                self._bind(str(doc_id), int(iid))
+            self._tombstones = {int(i) for i in id_map.get("tombstones") or []}
+        if self.index is not None:
+            configure(self.base_index, self.index_spec)
+
+        self._replay_wal()
+        self._sorted_ids = sorted((doc_id, iid) for iid, doc_id in self.int_to_id.items())
+
+    def _migrate_positional(self, id_map: list):
+        """
+        Formato antigo: IndexFlatIP + lista posicional (ids repetidos possíveis).
+        Converte para IndexIDMap2 com id interno = posição; a última ocorrência de cada id fica viva,
+        as anteriores viram tombstones.
+        """
+        n = len(id_map)
+        if self.index is not None and not isinstance(self.index, faiss.IndexIDMap2):
+            vecs = self.index.reconstruct_n(0, self.index.ntotal)
+            self.index = self._new_index(vecs.shape[1])
+            self.index.add_with_ids(vecs, np.arange(len(vecs), dtype="int64"))
+        for pos, doc_id in enumerate(id_map):
+            self._bind(str(doc_id), pos)
+        self._next_id = n
+
+    def _replay_wal(self):
+        """Reaplica entradas do WAL posteriores ao snapshot (id interno >= next_id do snapshot)."""
+        if not os.path.exists(self.wal_path):
+            return
+        snapshot_next_id = self._next_id
+        with open(self.wal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por crash a meio da escrita
+                    break
+                self._wal_entries += 1
+                op = entry.get("op")
+                if op == "add":
+                    iid = int(entry["iid"])
+                    if iid < snapshot_next_id:
+                        continue
+                    vec = np.frombuffer(base64.b64decode(entry["vec"]), dtype="float32").reshape(1, -1)
+                    self._add_vectors(vec, [str(entry["id"])], [str(entry["text"])], [iid])
+                elif op == "del":
+                    # Só apaga se o id ainda aponta para o mesmo id interno (evita apagar uma reinserção)
+                    doc_id = str(entry["id"])
+                    if self.id_to_int.get(doc_id) == int(entry["iid"]):
+                        self._delete_locked([doc_id])
+
+    def _write_atomic(self, path: str, write):
+        tmp = path + ".tmp"
+        write(tmp)
+        os.replace(tmp, path)
+
     def _save(self):
+        """Snapshot completo + truncagem do WAL (compactação)."""
+        if self._tombstones:
+            self._rebuild_locked()
         if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
-        with open(self.map_path, "w", encoding="utf-8") as f:
-            json.dump(self.id_map, f, ensure_ascii=False, indent=2)
-        with open(self.texts_path, "w", encoding="utf-8") as f:
-            json.dump(self.doc_texts, f, ensure_ascii=False, indent=2)
+            index = self.index
+            self._write_atomic(self.index_path, lambda p: faiss.write_index(index, p))
 
-    def upsert(self, item_id: str, text: str):
-        vec = self.model.encode([text], normalize_embeddings=True).astype("float32")
-        dim = vec.shape[1]
+        def dump(obj):
+            def _w(p):
+                with open(p, "w", encoding="utf-8") as f:
+                    json.dump(obj, f, ensure_ascii=False)
+            return _w
+
+        id_map = {
+            "next_id": self._next_id,
+            "ids": {str(iid): doc_id for iid, doc_id in self.int_to_id.items()},
+            "tombstones": sorted(self._tombstones),
+        }
+        self._write_atomic(self.map_path, dump(id_map))
+        self._write_atomic(self.texts_path, dump(self.doc_texts))
+        # Entradas já cobertas pelo snapshot são ignoradas no replay (iid < next_id / del idempotente),
+        # por isso um crash entre o snapshot e a truncagem não duplica vetores.
+        open(self.wal_path, "w", encoding="utf-8").close()
+        self._wal_entries = 0
+
+    def _wal_append(self, entries: list[dict]):
+        with open(self.wal_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._wal_entries += len(entries)
+        if self._wal_entries >= self.snapshot_every:
+            self._save()
+
+    def snapshot(self):
+        with self._lock:
+            if self._wal_entries or self._tombstones:
+                self._save()
+
+    # ------------------------------------------------------------------ índice
+
+    def _new_index(self, dim: int):
+        # IVF sem treino não aceita vetores: começa em flat até ao rebuild offline
+        if self.index_spec.needs_training:
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        return faiss.IndexIDMap2(build_base_index(self.index_spec, dim))
 
+    def _bind(self, doc_id: str, iid: int):
+        old = self.id_to_int.get(doc_id)
+        if old is not None:
+            self._tombstones.add(old)
+            self.int_to_id.pop(old, None)
+            i = bisect.bisect_left(self._sorted_ids, (doc_id, old))
+            if i < len(self._sorted_ids) and self._sorted_ids[i] == (doc_id, old):
+                del self._sorted_ids[i]
+        self.id_to_int[doc_id] = iid
+        self.int_to_id[iid] = doc_id
+        bisect.insort(self._sorted_ids, (doc_id, iid))
+
+    def _add_vectors(self, vecs: np.ndarray, ids: list[str], texts: list[str], iids: list[int]):
         if self.index is None:
-            self.index = faiss.IndexFlatIP(dim)
+            self.index = self._new_index(vecs.shape[1])
+        self.index.add_with_ids(vecs, np.asarray(iids, dtype="int64"))
+        for item_id, text, iid in zip(ids, texts, iids):
+            self._bind(item_id, iid)
+            self.doc_texts[item_id] = text
+        self._next_id = max(self._next_id, max(iids) + 1)
+
+    def _delete_locked(self, ids: list[str]) -> list[tuple[str, int]]:
+        removed: list[tuple[str, int]] = []
+        for doc_id in ids:
+            iid = self.id_to_int.pop(doc_id, None)
+            if iid is None:
+                continue
+            self.int_to_id.pop(iid, None)
+            self._tombstones.add(iid)
+            self.doc_texts.pop(doc_id, None)
+            i = bisect.bisect_left(self._sorted_ids, (doc_id, iid))
+            if i < len(self._sorted_ids) and self._sorted_ids[i] == (doc_id, iid):
+                del self._sorted_ids[i]
+            removed.append((doc_id, iid))
+        return removed
+
+    def _live_vectors_locked(self) -> tuple[np.ndarray, np.ndarray]:
+        """(vetores, ids internos) vivos, na ordem do índice."""
+        n = self.index.ntotal
+        all_ids = faiss.vector_to_array(self.index.id_map).astype("int64")
+        vecs = self.base_index.reconstruct_n(0, n) if n else np.zeros((0, self.index.d), dtype="float32")
+        live = np.fromiter((i not in self._tombstones for i in all_ids.tolist()), dtype=bool, count=n)
+        return vecs[live], all_ids[live]
+
+    def _rebuild_locked(self):
+        """
+        Reconstrói o índice só com os vetores vivos (com o lock de escrita: nenhuma busca em curso).
+        """
+        if self.index is None:
+            self._tombstones.clear()
+            return
+        vecs, ids = self._live_vectors_locked()
+        new_index = faiss.IndexIDMap2(configure(empty_like(self.base_index), self.index_spec))
+        if len(ids):
+            new_index.add_with_ids(vecs, ids)
+        self.index = new_index
+        self._tombstones.clear()
+
+    def live_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock.read():
+            if self.index is None:
+                return np.zeros((0, 0), dtype="float32"), np.zeros(0, dtype="int64")
+            return self._live_vectors_locked()
 
-        self.index.add(vec)
-        self.id_map.append(item_id)
-        # Último texto por id (vários vetores com o mesmo id podem existir no índice)
-        self.doc_texts[str(item_id)] = text
-        self._save()
+    def rebuild(self, spec: IndexSpec, *, train_max: int = 100_000) -> dict:
+        """
+        Migra o índice actual para ``spec`` (treina IVF/PQ numa amostra de até ``train_max``
+        vetores vivos), troca o índice e grava o snapshot. Devolve tempos de treino e de inserção.
+        """
+        with self._lock:
+            if self.index is None:
+                self.index_spec = spec
+                return {"index_type": spec.index_type, "vectors": 0, "train_s": 0.0, "add_s": 0.0}
+            vecs, ids = self._live_vectors_locked()
+            base = build_base_index(spec, self.index.d, n_train=min(len(ids), train_max))
+            t0 = time.perf_counter()
+            if not base.is_trained:
+                sample = vecs
+                if len(vecs) > train_max:
+                    pick = np.random.default_rng(0).choice(len(vecs), size=train_max, replace=False)
+                    sample = vecs[pick]
+                base.train(sample)
+            t1 = time.perf_counter()
+            new_index = faiss.IndexIDMap2(base)
+            if len(ids):
+                new_index.add_with_ids(vecs, ids)
+            configure(base, spec)
+            t2 = time.perf_counter()
+            self.index = new_index
+            self.index_spec = spec
+            self._tombstones.clear()
+            self._save()
+        return {
+            "index_type": index_type_of(base),
+            "vectors": int(len(ids)),
+            "train_s": round(t1 - t0, 3),
+            "add_s": round(t2 - t1, 3),
+        }
 
-    def search(self, text: str, k: int = 5, include_text: bool = True):
-        if self.index is None or len(self.id_map) == 0:
+    def _needs_compaction(self) -> bool:
+        if self.index is None or not self._tombstones:
+            return False
+        return len(self._tombstones) >= max(self.compact_min, self.compact_ratio * self.index.ntotal)
+
+    def _maybe_compact_async(self):
+        if self._compacting or not self._needs_compaction():
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name="faiss-compact", daemon=True).start()
+
+    def compact(self):
+        """Remove fisicamente os tombstones do índice (reconstrução)."""
+        try:
+            with self._lock:
+                if self._tombstones:
+                    self._rebuild_locked()
+        finally:
+            self._compacting = False
+
+    # ------------------------------------------------------------------ API
+
+    @property
+    def size(self) -> int:
+        return len(self.int_to_id)
+
+    def stats(self) -> dict:
+        return {
+            "index_type": index_type_of(self.base_index) if self.index is not None else None,
+            "live": len(self.int_to_id),
+            "vectors": int(self.index.ntotal) if self.index is not None else 0,
+            "tombstones": len(self._tombstones),
+            "wal_entries": self._wal_entries,
+            "query_cache": self.query_cache.stats(),
+        }
+
+    def upsert(self, item_id: str, text: str):
+        self.upsert_batch([(item_id, text)])
+
+    def upsert_batch(self, items: list[tuple[str, str]]) -> int:
+        """
+        Codifica todos os textos em lotes de ``encode_batch_size``, acrescenta ao índice numa só
+        chamada e regista no WAL. Ids já existentes são substituídos (o vetor antigo vira tombstone).
+        Devolve o número de itens gravados.
+        """
+        items = [(str(i), str(t)) for i, t in items if str(i).strip() and str(t).strip()]
+        if not items:
+            return 0
+        # Dentro do mesmo lote, a última ocorrência de um id vence
+        items = list(dict(items).items())
+        ids = [i for i, _ in items]
+        texts = [t for _, t in items]
+        vecs = self.model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            normalize_embeddings=True,
+        ).astype("float32")
+
+        with self._lock:
+            iids = list(range(self._next_id, self._next_id + len(items)))
+            self._add_vectors(vecs, ids, texts, iids)
+            self._wal_append(
+                [
+                    {
+                        "op": "add",
+                        "iid": iid,
+                        "id": item_id,
+                        "text": text,
+                        "vec": base64.b64encode(vecs[offset].tobytes()).decode("ascii"),
+                    }
+                    for offset, (item_id, text, iid) in enumerate(zip(ids, texts, iids))
+                ]
+            )
+            self._maybe_compact_async()
+        return len(items)
+
+    def delete(self, ids: list[str]) -> int:
+        """Apaga ids (tombstone + WAL). Devolve quantos existiam."""
+        with self._lock:
+            removed = self._delete_locked([str(i) for i in ids if str(i).strip()])
+            if removed:
+                self._wal_append([{"op": "del", "id": doc_id, "iid": iid} for doc_id, iid in removed])
+                self._maybe_compact_async()
+        return len(removed)
+
+    def internal_ids_for_prefixes(self, prefixes: list[str]) -> np.ndarray:
+        """
+        Ids internos vivos cujos ids começam por algum dos prefixos (união, sem repetição).
+        Usa a lista ordenada de ids — não percorre o mapa inteiro.
+        """
+        found: set[int] = set()
+        for p in prefixes:
+            lo = bisect.bisect_left(self._sorted_ids, (p,))
+            hi = bisect.bisect_left(self._sorted_ids, (p + _PREFIX_UPPER,))
+            found.update(iid for _, iid in self._sorted_ids[lo:hi])
+        return np.fromiter(sorted(found), dtype="int64", count=len(found))
+
+    def search(
+        self,
+        text: str,
+        k: int = 5,
+        include_text: bool = True,
+        *,
+        id_prefix: str | None = None,
+        namespaces: list[str] | None = None,
+    ):
+        """
+        Busca semântica. Com ``id_prefix`` e/ou ``namespaces`` (prefixos de id), o filtro é aplicado
+        dentro do FAISS (IDSelector) *antes* do top-k — o k pedido é devolvido só para a camada.
+        Tombstones nunca entram no top-k.
+        """
+        if self.index is None or not self.int_to_id:
             return []
+        prefixes = [p for p in [id_prefix, *(namespaces or [])] if p]
+        return self.search_vector(self.encode_query(text), k, include_text, prefixes=prefixes)
+
+    def search_multi(self, text: str, layers: dict[str, list[str]], k: int = 5, include_text: bool = True):
+        """
+        Uma codificação da consulta, uma busca filtrada por camada: ``{camada: [prefixos]}`` →
+        ``{camada: resultados}``. Camadas sem prefixos buscam no índice inteiro.
+        """
+        if self.index is None or not self.int_to_id or not layers:
+            return {name: [] for name in layers}
+        q = self.encode_query(text)
+        return {
+            name: self.search_vector(q, k, include_text, prefixes=[p for p in prefixes if p])
+            for name, prefixes in layers.items()
+        }
+
+    def encode_query(self, text: str) -> np.ndarray:
+        key = cache_key(self.model_name, text)
+        vec = self.query_cache.get(key)
+        if vec is None:
+            vec = self.model.encode([text], normalize_embeddings=True).astype("float32")[0]
+            self.query_cache.put(key, vec)
+        return vec.reshape(1, -1)
 
-        q = self.model.encode([text], normalize_embeddings=True).astype("float32")
-        scores, idxs = self.index.search(q, k)
+    def search_vector(self, q: np.ndarray, k: int, include_text: bool = True, *, prefixes: list[str] | None = None):
+        """
+        Top-k para um vetor de consulta já codificado (1×d), com filtro opcional por prefixos.
+        Corre com o lock de leitura: índice, tombstones e mapas de ids não mudam durante a busca.
+        """
+        with self._lock.read():
+            return self._search_vector_locked(q, k, include_text, prefixes)
+
+    def _search_vector_locked(self, q: np.ndarray, k: int, include_text: bool, prefixes: list[str] | None):
+        index = self.index
+        if index is None or not self.int_to_id:
+            return []
+
+        base = faiss.downcast_index(index.index)
+        sel = None
+        allowed = None
+        if prefixes:
+            # O índice de prefixos só contém ids vivos
+            allowed = self.internal_ids_for_prefixes(prefixes)
+            if allowed.size == 0:
+                return []
+            k = min(k, int(allowed.size))
+            sel = faiss.IDSelectorBatch(allowed)
+        elif self._tombstones:
+            dead = np.fromiter(self._tombstones, dtype="int64", count=len(self._tombstones))
+            dead_sel = faiss.IDSelectorBatch(dead)
+            sel = faiss.IDSelectorNot(dead_sel)
+
+        if allowed is not None and not isinstance(base, faiss.IndexFlat) and allowed.size <= self.exact_filter_max:
+            scores, idxs = self._exact_subset_search(index, q, allowed, k)
+        else:
+            scores, idxs = index.search(q, k, params=search_params(base, sel))
 
         results = []
-        for score, idx in zip(scores[0].tolist(), idxs[0].tolist()):
-            if idx == -1:
+        for score, iid in zip(scores[0].tolist(), idxs[0].tolist()):
+            doc_id = self.int_to_id.get(iid) if iid != -1 else None
+            if doc_id is None:
                 continue
-            doc_id = self.id_map[idx]
             row: dict = {"id": doc_id, "score": float(score)}
             if include_text:
                 row["text"] = self.doc_texts.get(str(doc_id), "")
             results.append(row)
         return results
+
+    @staticmethod
+    def _exact_subset_search(index, q: np.ndarray, allowed: np.ndarray, k: int):
+        """Top-k exato por produto interno sobre um subconjunto pequeno de ids internos."""
+        vecs = index.reconstruct_batch(allowed)
+        sims = vecs @ q[0]
+        top = np.argsort(-sims)[:k]
+        return sims[top][None, :], allowed[top][None, :]
@@ -0,0 +1,131 @@
+"""
+Tipos de índice FAISS do vectorstore (flat exato, HNSW, IVF-Flat, IVF-PQ).
+
+O tipo é escolhido por env (``VECTORSTORE_INDEX_TYPE``). Índices IVF precisam de treino: o
+serviço continua em flat até o comando offline ``python -m app.rebuild`` treinar e gravar o
+índice novo (ver README).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+
+import faiss
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+# Abaixo de 2^4 pontos de treino o PQ já não compensa: usa IVF-Flat
+MIN_PQ_NBITS = 4
+
+
+@dataclass
+class IndexSpec:
+    index_type: str = "flat"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 1024
+    ivf_nprobe: int = 16
+    pq_m: int = 48
+    pq_nbits: int = 8
+
+    @classmethod
+    def from_env(cls) -> "IndexSpec":
+        index_type = os.getenv("VECTORSTORE_INDEX_TYPE", "flat").strip().lower() or "flat"
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"VECTORSTORE_INDEX_TYPE inválido: {index_type} (use {', '.join(INDEX_TYPES)})")
+        return cls(
+            index_type=index_type,
+            hnsw_m=int(os.getenv("VECTORSTORE_HNSW_M", "32")),
+            hnsw_ef_construction=int(os.getenv("VECTORSTORE_HNSW_EF_CONSTRUCTION", "80")),
+            hnsw_ef_search=int(os.getenv("VECTORSTORE_HNSW_EF_SEARCH", "64")),
+            ivf_nlist=int(os.getenv("VECTORSTORE_IVF_NLIST", "1024")),
+            ivf_nprobe=int(os.getenv("VECTORSTORE_IVF_NPROBE", "16")),
+            pq_m=int(os.getenv("VECTORSTORE_PQ_M", "48")),
+            pq_nbits=int(os.getenv("VECTORSTORE_PQ_NBITS", "8")),
+        )
+
+    @property
+    def needs_training(self) -> bool:
+        return self.index_type in ("ivf_flat", "ivf_pq")
+
+
+def build_base_index(spec: IndexSpec, dim: int, n_train: int = 0):
+    """
+    Índice base (sem IDMap) para o ``spec``. ``n_train`` limita nlist a ~n_train/39 — o FAISS
+    pede pelo menos 39 pontos de treino por centróide — e pq_nbits a log2(n_train), porque o
+    PQ precisa de 2^nbits pontos; com menos de 2^MIN_PQ_NBITS pontos o IVF-PQ passa a IVF-Flat.
+    """
+    metric = faiss.METRIC_INNER_PRODUCT
+    if spec.index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, spec.hnsw_m, metric)
+        index.hnsw.efConstruction = spec.hnsw_ef_construction
+    elif spec.index_type in ("ivf_flat", "ivf_pq"):
+        nlist = spec.ivf_nlist
+        if n_train:
+            nlist = max(1, min(nlist, n_train // 39))
+        nbits = spec.pq_nbits
+        if spec.index_type == "ivf_pq" and n_train and n_train < (1 << nbits):
+            nbits = n_train.bit_length() - 1
+            if nbits < MIN_PQ_NBITS:
+                logger.warning(
+                    "IVF-PQ pede %d pontos de treino (há %d): a usar IVF-Flat", 1 << spec.pq_nbits, n_train
+                )
+            else:
+                logger.warning("IVF-PQ: pq_nbits %d -> %d (%d pontos de treino)", spec.pq_nbits, nbits, n_train)
+        if spec.index_type == "ivf_flat" or nbits < MIN_PQ_NBITS:
+            desc = f"IVF{nlist},Flat"
+        else:
+            if dim % spec.pq_m:
+                raise ValueError(f"VECTORSTORE_PQ_M={spec.pq_m} tem de dividir a dimensão {dim}")
+            desc = f"IVF{nlist},PQ{spec.pq_m}x{nbits}"
+        index = faiss.index_factory(dim, desc, metric)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    configure(index, spec)
+    return index
+
+
+def configure(base, spec: IndexSpec):
+    """Aplica parâmetros de busca (efSearch / nprobe) a um índice base carregado ou novo."""
+    if hasattr(base, "hnsw"):
+        base.hnsw.efSearch = spec.hnsw_ef_search
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        ivf.nprobe = spec.ivf_nprobe
+        try:
+            # reconstruct_n (compactação/rebuild) precisa do direct map em IVF
+            ivf.make_direct_map()
+        except RuntimeError:
+            pass
+    return base
+
+
+def index_type_of(base) -> str:
+    if hasattr(base, "hnsw"):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+    return "flat"
+
+
+def search_params(base, sel):
+    """SearchParameters com selector, do tipo que o índice base exige (IVF rejeita o genérico)."""
+    if sel is None:
+        return None
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=sel, nprobe=ivf.nprobe)
+    if hasattr(base, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=sel)
+
+
+def empty_like(base):
+    """Cópia vazia do índice base mantendo o treino (quantizador IVF/PQ)."""
+    clone = faiss.clone_index(base)
+    clone.reset()
+    return clone
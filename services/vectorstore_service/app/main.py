@@ -1,13 +1,30 @@
 import os
 from fastapi import FastAPI
 from pydantic import BaseModel
+from sinapum_shared.embedding_cache import EmbeddingCache
+
 from .faiss_store import FaissStore
+from .index_factory import IndexSpec
 
 app = FastAPI(title="vectorstore_service")
 
 DATA_DIR = os.getenv("VECTORSTORE_DATA_DIR", "/data")
 MODEL = os.getenv("VECTORSTORE_MODEL", "all-MiniLM-L6-v2")
-store = FaissStore(DATA_DIR, MODEL)
+store = FaissStore(
+    DATA_DIR,
+    MODEL,
+    encode_batch_size=int(os.getenv("VECTORSTORE_ENCODE_BATCH", "64")),
+    snapshot_every=int(os.getenv("VECTORSTORE_SNAPSHOT_EVERY", "500")),
+    compact_ratio=float(os.getenv("VECTORSTORE_COMPACT_RATIO", "0.2")),
+    compact_min=int(os.getenv("VECTORSTORE_COMPACT_MIN", "64")),
+    index_spec=IndexSpec.from_env(),
+    exact_filter_max=int(os.getenv("VECTORSTORE_EXACT_FILTER_MAX", "2048")),
+    query_cache=EmbeddingCache.from_url(
+        os.getenv("VECTORSTORE_EMBED_CACHE_REDIS_URL") or None,
+        max_size=int(os.getenv("VECTORSTORE_EMBED_CACHE_SIZE", "4096")),
+        ttl_seconds=float(os.getenv("VECTORSTORE_EMBED_CACHE_TTL", "3600")),
+    ),
+)
 
 
 class UpsertReq(BaseModel):
@@ -15,10 +32,34 @@ class UpsertReq(BaseModel):
     text: str
 
 
+class UpsertBatchReq(BaseModel):
+    items: list[UpsertReq]
+
+
+class DeleteReq(BaseModel):
+    ids: list[str]
+
+
 class SearchReq(BaseModel):
     text: str
     k: int = 5
     include_text: bool = True
+    # Filtro por prefixo de id aplicado antes do top-k (ex.: "tenant:42:gastro:")
+    id_prefix: str | None = None
+    namespaces: list[str] | None = None
+
+
+class SearchMultiReq(BaseModel):
+    text: str
+    k: int = 5
+    include_text: bool = True
+    # camada → prefixo(s) de id, ex.: {"tenant": "tenant:42:gastro:", "global": "sinapum.rag.gastronomia"}
+    layers: dict[str, str | list[str]]
+
+
+@app.on_event("shutdown")
+def _snapshot_on_shutdown():
+    store.snapshot()
 
 
 @app.get("/health")
@@ -32,6 +73,42 @@ def upsert(req: UpsertReq):
     return {"status": "ok"}
 
 
+@app.post("/upsert_batch")
+def upsert_batch(req: UpsertBatchReq):
+    n = store.upsert_batch([(it.id, it.text) for it in req.items])
+    return {"status": "ok", "upserted": n}
+
+
+@app.post("/delete")
+def delete(req: DeleteReq):
+    return {"status": "ok", "deleted": store.delete(req.ids)}
+
+
+@app.get("/stats")
+def stats():
+    return store.stats()
+
+
+@app.post("/snapshot")
+def snapshot():
+    store.snapshot()
+    return {"status": "ok"}
+
+
 @app.post("/search")
 def search(req: SearchReq):
-    return {"results": store.search(req.text, req.k, include_text=req.include_text)}
+    return {
+        "results": store.search(
+            req.text,
+            req.k,
+            include_text=req.include_text,
+            id_prefix=req.id_prefix,
+            namespaces=req.namespaces,
+        )
+    }
+
+
+@app.post("/search_multi")
+def search_multi(req: SearchMultiReq):
+    layers = {name: [p] if isinstance(p, str) else list(p) for name, p in req.layers.items()}
+    return {"results": store.search_multi(req.text, layers, req.k, include_text=req.include_text)}
@@ -0,0 +1,123 @@
+"""
+Rebuild/treino offline do índice do vectorstore.
+
+Migra o índice persistido (flat ou outro) para o tipo pedido, treina IVF/PQ quando necessário e
+reporta recall@k e latência face à busca exata, para escolher o compromisso por deployment.
+
+Uso (com o serviço parado, ou reiniciado a seguir para carregar o índice novo):
+
+    python -m app.rebuild --type hnsw
+    python -m app.rebuild --type ivf_pq --nlist 4096 --pq-m 48 --dry-run
+
+Os parâmetros não passados vêm das mesmas env vars do serviço (``VECTORSTORE_*``).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from dataclasses import replace
+
+import faiss
+import numpy as np
+
+from .faiss_store import FaissStore
+from .index_factory import INDEX_TYPES, IndexSpec, build_base_index, search_params
+
+
+def _latency_ms(index, queries: np.ndarray, k: int) -> list[float]:
+    out = []
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        index.search(queries[i : i + 1], k)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def evaluate(vecs: np.ndarray, candidate, *, k: int = 10, n_queries: int = 200, seed: int = 0) -> dict:
+    """
+    Recall@k e latência do ``candidate`` (índice base já povoado com ``vecs`` na mesma ordem) face
+    ao IndexFlatIP exato. As consultas são vetores do próprio corpus com ruído leve.
+    """
+    n = len(vecs)
+    if n == 0:
+        return {"queries": 0}
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(n, size=min(n_queries, n), replace=False)
+    queries = vecs[pick] + rng.normal(0, 0.01, size=(len(pick), vecs.shape[1])).astype("float32")
+    faiss.normalize_L2(queries)
+    k = min(k, n)
+
+    exact = faiss.IndexFlatIP(vecs.shape[1])
+    exact.add(vecs)
+    _, gt = exact.search(queries, k)
+    _, got = candidate.search(queries, k, params=search_params(candidate, None))
+    recall = float(np.mean([len(set(g) & set(r)) / k for g, r in zip(gt.tolist(), got.tolist())]))
+
+    lat_exact = _latency_ms(exact, queries, k)
+    lat_cand = _latency_ms(candidate, queries, k)
+    return {
+        "queries": int(len(pick)),
+        "k": int(k),
+        f"recall@{k}": round(recall, 4),
+        "exact_ms_p50": round(float(np.percentile(lat_exact, 50)), 3),
+        "exact_ms_p95": round(float(np.percentile(lat_exact, 95)), 3),
+        "ann_ms_p50": round(float(np.percentile(lat_cand, 50)), 3),
+        "ann_ms_p95": round(float(np.percentile(lat_cand, 95)), 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild/treino do índice FAISS do vectorstore")
+    parser.add_argument("--data-dir", default=os.getenv("VECTORSTORE_DATA_DIR", "/data"))
+    parser.add_argument("--type", choices=INDEX_TYPES, default=None, help="default: VECTORSTORE_INDEX_TYPE")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, default=None)
+    parser.add_argument("--pq-m", type=int, default=None)
+    parser.add_argument("--hnsw-m", type=int, default=None)
+    parser.add_argument("--ef-search", type=int, default=None)
+    parser.add_argument("--train-max", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--eval-queries", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="só treina e avalia; não grava o índice")
+    args = parser.parse_args(argv)
+
+    spec = IndexSpec.from_env()
+    overrides = {
+        "index_type": args.type,
+        "ivf_nlist": args.nlist,
+        "ivf_nprobe": args.nprobe,
+        "pq_m": args.pq_m,
+        "hnsw_m": args.hnsw_m,
+        "hnsw_ef_search": args.ef_search,
+    }
+    spec = replace(spec, **{k: v for k, v in overrides.items() if v is not None})
+
+    store = FaissStore(
+        args.data_dir,
+        os.getenv("VECTORSTORE_MODEL", "all-MiniLM-L6-v2"),
+        index_spec=spec,
+    )
+    vecs, _ = store.live_vectors()
+    report: dict = {"data_dir": args.data_dir, "spec": spec.__dict__, "vectors": int(len(vecs))}
+
+    if len(vecs):
+        # Avaliação num índice à parte (ordem = vecs), independente do swap no store
+        candidate = build_base_index(spec, vecs.shape[1], n_train=min(len(vecs), args.train_max))
+        t0 = time.perf_counter()
+        if not candidate.is_trained:
+            candidate.train(vecs[: args.train_max])
+        candidate.add(vecs)
+        report["eval_build_s"] = round(time.perf_counter() - t0, 3)
+        report["eval"] = evaluate(vecs, candidate, k=args.k, n_queries=args.eval_queries)
+
+    if not args.dry_run:
+        report["rebuild"] = store.rebuild(spec, train_max=args.train_max)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -24,6 +24,8 @@ function isEventBusEnabled() {
 }
 
 const STREAM_WHATSAPP_INBOUND = "whatsapp.inbound";
+// MAXLEN ~: mantém o stream limitado em memória sob carga contínua
+const STREAM_MAXLEN = parseInt(process.env.EVENT_BUS_STREAM_MAXLEN || "10000", 10);
 
 async function publishToEventBus(instanceId, eventType, payload) {
   if (!isEventBusEnabled()) return;
@@ -44,7 +46,7 @@ async function publishToEventBus(instanceId, eventType, payload) {
     if (payload && typeof payload === "object" && payload.from) {
       fields.push("jid", payload.from);
     }
-    await client.xadd(STREAM_WHATSAPP_INBOUND, "*", ...fields);
+    await client.xadd(STREAM_WHATSAPP_INBOUND, "MAXLEN", "~", STREAM_MAXLEN, "*", ...fields);
     console.log(`[EventBus] Published ${event} to ${STREAM_WHATSAPP_INBOUND}`);
   } catch (e) {
     console.error("[EventBus] Publish error:", e.message);
@@ -64,6 +64,8 @@ SINAPUM_WHATSAPP_AUTO_CONNECT = os.environ.get('SINAPUM_WHATSAPP_AUTO_CONNECT',
 
 # Evora/VitrineZap - Forward de mensagens WhatsApp
 EVORA_WHATSAPP_WEBHOOK_URL = os.environ.get('EVORA_WHATSAPP_WEBHOOK_URL', '')
+# Endpoint opcional do Evora que aceita lotes ({"messages": [...]}); ver core/services/whatsapp/evora_forwarder.py
+EVORA_WHATSAPP_WEBHOOK_BATCH_URL = os.environ.get('EVORA_WHATSAPP_WEBHOOK_BATCH_URL', '')
 
 # WhatsApp Gateway - Camada de Abstração Padrão (core/services/whatsapp)
 WHATSAPP_GATEWAY_PROVIDER = os.environ.get('WHATSAPP_GATEWAY_PROVIDER', 'legacy')  # legacy|simulated|noop|evolution|cloud|baileys
@@ -402,6 +404,15 @@ PROMPT_REF_FORMAT = os.environ.get('PROMPT_REF_FORMAT', 'sistema:nome')  # 'nome
 # MCP Tool Registry Configuration
 # Limite máximo de tamanho de input em bytes (padrão: 10MB)
 MCP_MAX_INPUT_BYTES = int(os.environ.get('MCP_MAX_INPUT_BYTES', 10485760))  # 10MB
+# Cache de planos de execução (app_mcp_tool_registry/plan_cache.py)
+MCP_PLAN_CACHE_TTL = float(os.environ.get('MCP_PLAN_CACHE_TTL', 300))  # segundos
+MCP_PLAN_CACHE_MAX = int(os.environ.get('MCP_PLAN_CACHE_MAX', 1024))
+MCP_PLAN_CACHE_STAMP_CHECK_S = float(os.environ.get('MCP_PLAN_CACHE_STAMP_CHECK_S', 2))
+# ToolCallLog em lote (app_mcp_tool_registry/log_sink.py)
+MCP_LOG_ASYNC = os.environ.get('MCP_LOG_ASYNC', 'True').lower() in ('true', '1', 'yes')
+MCP_LOG_BATCH_SIZE = int(os.environ.get('MCP_LOG_BATCH_SIZE', 200))
+MCP_LOG_FLUSH_INTERVAL_S = float(os.environ.get('MCP_LOG_FLUSH_INTERVAL_S', 1.0))
+MCP_LOG_QUEUE_MAX = int(os.environ.get('MCP_LOG_QUEUE_MAX', 10000))
 
 # DDF Service Configuration (para runtime ddf)
 DDF_BASE_URL = os.environ.get('DDF_BASE_URL', 'http://ddf_service:8005')
@@ -500,6 +511,14 @@ ENV_HISTORY_MAX_LEN = int(os.environ.get('ENV_HISTORY_MAX_LEN', '100'))
 ENVIRONMENTAL_STATE_REDIS_ENABLED = os.environ.get(
     'ENVIRONMENTAL_STATE_REDIS_ENABLED', 'True'
 ).lower() in ('true', '1', 'yes')
+# Pool partilhado (services/redis_client.py): ligações, timeouts, retry e circuit breaker
+REDIS_POOL_MAX_CONNECTIONS = int(os.environ.get('REDIS_POOL_MAX_CONNECTIONS', '50'))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', '2.0'))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', '2.0'))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+REDIS_RETRY_ATTEMPTS = int(os.environ.get('REDIS_RETRY_ATTEMPTS', '3'))
+REDIS_CIRCUIT_FAILURES = int(os.environ.get('REDIS_CIRCUIT_FAILURES', '5'))
+REDIS_CIRCUIT_COOLDOWN = float(os.environ.get('REDIS_CIRCUIT_COOLDOWN', '30'))
 
 # ============================================================================
 # SinapCore — módulos cognitivos plugáveis (defaults estáticos: agent_core.config.settings.MODULE_DEFAULTS)
@@ -0,0 +1,5 @@
+"""
+Código partilhado entre o Core e os microserviços que o copiam para a própria imagem
+(ver ``services/vectorstore_service/Dockerfile``). Só dependências leves (numpy; redis opcional),
+sem Django.
+"""
@@ -0,0 +1,114 @@
+"""
+Cache de embeddings de consulta (LRU com TTL em processo + Redis opcional).
+
+Implementação única, usada pelo vectorstore_service e pelo cache semântico do Core
+(``core/services/semantic_cache_service/embeddings.py``). Chave
+``emb:v1:{modelo}:{sha256(texto normalizado)}`` e float32 em bytes: com o mesmo modelo e o mesmo
+Redis, um embedding calculado num lado serve o outro. Só numpy (redis opcional): a imagem do
+vectorstore copia este pacote ao lado de ``app/``.
+
+A normalização (espaços) só entra na chave; quem codifica envia o texto original ao modelo.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"emb:v1:{model_name}:{digest}"
+
+
+class EmbeddingCache:
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 3600.0, redis_client=None):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._redis = redis_client
+        self._data: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, redis_url: str | None, **kwargs) -> "EmbeddingCache":
+        client = None
+        if redis_url:
+            try:
+                import redis
+
+                client = redis.from_url(redis_url, decode_responses=False)
+            except Exception:
+                client = None
+        return cls(redis_client=client, **kwargs)
+
+    def get(self, key: str) -> np.ndarray | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, vec = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return vec
+                del self._data[key]
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+            except Exception:
+                raw = None
+            if raw:
+                vec = np.frombuffer(raw, dtype="float32").copy()
+                self._put_local(key, vec)
+                with self._lock:
+                    self.redis_hits += 1
+                return vec
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_local(self, key: str, vec: np.ndarray) -> None:
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, vec)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype="float32")
+        self._put_local(key, vec)
+        if self._redis is not None:
+            try:
+                self._redis.set(key, vec.tobytes(), ex=int(self.ttl_seconds))
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.redis_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.redis_hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.redis_hits) / total, 4) if total else 0.0,
+                "redis": self._redis is not None,
+            }
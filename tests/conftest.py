@@ -1,3 +1,28 @@
 """
 Fixtures compartilhadas para testes do Core_SinapUm.
+
+Django configurado uma vez para os testes unitários que tocam no ORM: sqlite em memória e só
+as apps cujos models os testes criam com ``schema_editor``.
 """
+import sys
+from pathlib import Path
+
+_root = Path(__file__).resolve().parents[1]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.contenttypes",
+            "django.contrib.auth",
+            "app_inbound_events",
+            "app_mcp_tool_registry",
+        ],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        USE_TZ=True,
+    )
+    django.setup()
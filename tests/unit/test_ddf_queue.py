@@ -0,0 +1,117 @@
+"""
+Testes unitários da fila de tarefas do DDF (dequeue atómico, prioridade, visibility timeout).
+
+Correm contra o fakeredis com suporte a Lua (``pip install "fakeredis[lua]"``).
+"""
+import asyncio
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+_queue_path = Path(__file__).resolve().parents[2] / "services" / "ddf_service" / "app" / "mcp_tools" / "queue.py"
+_spec = importlib.util.spec_from_file_location("ddf_mcp_queue", _queue_path)
+ddf_queue = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ddf_queue)
+
+
+def _manager(**kwargs):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return ddf_queue.QueueManager(redis_url="redis://fake", client=client, **kwargs)
+
+
+class TestQueueManager:
+    def test_priority_then_arrival_order(self):
+        async def run():
+            queue = _manager()
+            low = await queue.enqueue_task("t", {"n": "low"}, priority=-1)
+            first = await queue.enqueue_task("t", {"n": "first"})
+            high = await queue.enqueue_task("t", {"n": "high"}, priority=1)
+            second = await queue.enqueue_task("t", {"n": "second"})
+            tasks = await queue.dequeue_tasks(10)
+            return [t["id"] for t in tasks], [low, first, high, second]
+
+        got, (low, first, high, second) = asyncio.run(run())
+        assert got == [high, first, second, low]
+
+    def test_no_double_delivery_across_workers(self):
+        async def run():
+            queue = _manager()
+            ids = [await queue.enqueue_task("t", {"i": i}) for i in range(300)]
+            delivered = []
+
+            async def worker(batch):
+                while True:
+                    tasks = await queue.dequeue_tasks(batch)
+                    if not tasks:
+                        return
+                    for task in tasks:
+                        delivered.append(task["id"])
+                        await queue.update_task_status(task["id"], "completed")
+
+            await asyncio.gather(*(worker(1 + i % 5) for i in range(40)))
+            return ids, delivered, await queue.queue_stats()
+
+        ids, delivered, stats = asyncio.run(run())
+        assert len(delivered) == len(set(delivered)) == 300
+        assert set(delivered) == set(ids)
+        assert stats == {"pending": 0, "processing": 0, "history": 300}
+
+    def test_expired_task_is_requeued(self):
+        async def run():
+            queue = _manager(visibility_timeout=0.05)
+            task_id = await queue.enqueue_task("t", {})
+            first = await queue.dequeue_task()
+            assert await queue.dequeue_task() is None
+            await asyncio.sleep(0.1)
+            again = await queue.dequeue_task()
+            # expira outra vez e volta a pending (dequeue sem pedir tarefas só re-enfileira)
+            await asyncio.sleep(0.1)
+            await queue.dequeue_tasks(0)
+            requeued = await queue.queue_stats()
+            # confirmação tardia do worker depois do re-enfileiramento
+            await queue.update_task_status(task_id, "completed")
+            await asyncio.sleep(0.1)
+            return first, again, requeued, await queue.queue_stats(), await queue.dequeue_task()
+
+        first, again, requeued, stats, after_ack = asyncio.run(run())
+        assert first["id"] == again["id"]
+        assert (first["attempts"], again["attempts"]) == (1, 2)
+        assert again["status"] == "processing"
+        assert requeued["pending"] == 1
+        assert stats == {"pending": 0, "processing": 0, "history": 1}
+        assert after_ack is None
+
+    def test_dequeue_skips_tasks_already_finished(self):
+        async def run():
+            queue = _manager()
+            task_id = await queue.enqueue_task("t", {})
+            key = f"{queue.default_queue}:task:{task_id}"
+            data = json.loads(await queue.redis_client.get(key))
+            data["status"] = "completed"
+            await queue.redis_client.set(key, json.dumps(data))
+            return await queue.dequeue_task(), await queue.queue_stats()
+
+        task, stats = asyncio.run(run())
+        assert task is None
+        assert stats["pending"] == 0 and stats["processing"] == 0
+
+    def test_blocking_dequeue_wakes_on_enqueue(self):
+        async def run():
+            queue = _manager()
+
+            async def producer():
+                await asyncio.sleep(0.05)
+                return await queue.enqueue_task("t", {})
+
+            task, task_id = await asyncio.gather(queue.dequeue_task(timeout=2), producer())
+            empty = await queue.dequeue_task(timeout=0.05)
+            return task, task_id, empty
+
+        task, task_id, empty = asyncio.run(run())
+        assert task["id"] == task_id
+        assert empty is None
@@ -0,0 +1,215 @@
+"""
+Testes unitários do EventBusConsumer (lote, ordenação por chave, XACK em bloco, PEL/DLQ).
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+_event_bus = _root / "services" / "event_bus_service"
+if str(_event_bus) not in sys.path:
+    sys.path.insert(0, str(_event_bus))
+
+from event_bus.consumer import CONSUMER_GROUP, EventBusConsumer
+
+
+def _consumer(handler, workers=4, **kwargs):
+    consumer = EventBusConsumer(
+        redis_url="redis://unused",
+        stream="whatsapp.inbound",
+        consumer_name="test",
+        handler=handler,
+        workers=workers,
+        **kwargs,
+    )
+    consumer._client = MagicMock()
+    return consumer
+
+
+class TestEventBusConsumerBatch:
+    def test_acks_whole_batch_in_one_call(self):
+        consumer = _consumer(lambda data: None)
+        msgs = [(f"1-{i}", {"instance_id": f"i{i % 3}", "payload": "{}"}) for i in range(6)]
+        acked = consumer.process_batch(msgs)
+        assert sorted(acked) == sorted(m for m, _ in msgs)
+        consumer.client.xack.assert_called_once()
+        args = consumer.client.xack.call_args.args
+        assert args[:2] == ("whatsapp.inbound", CONSUMER_GROUP)
+        assert sorted(args[2:]) == sorted(m for m, _ in msgs)
+
+    def test_failed_message_is_not_acked(self):
+        def handler(data):
+            if data["payload"].get("fail"):
+                raise RuntimeError("boom")
+
+        consumer = _consumer(handler)
+        acked = consumer.process_batch(
+            [("1-0", {"instance_id": "a", "payload": '{"fail": true}'}), ("1-1", {"instance_id": "b", "payload": "{}"})]
+        )
+        assert acked == ["1-1"]
+
+    def test_failure_leaves_later_messages_of_same_instance_pending(self):
+        seen = []
+
+        def handler(data):
+            seen.append(data["payload"]["n"])
+            if data["payload"]["n"] == 2:
+                raise RuntimeError("boom")
+
+        consumer = _consumer(handler)
+        acked = consumer.process_batch(
+            [
+                ("1-0", {"instance_id": "a", "payload": '{"n": 1}'}),
+                ("1-1", {"instance_id": "a", "payload": '{"n": 2}'}),
+                ("1-2", {"instance_id": "a", "payload": '{"n": 3}'}),
+            ]
+        )
+        assert acked == ["1-0"]
+        assert seen == [1, 2]
+
+    def test_same_instance_keeps_order_other_instances_run_in_parallel(self):
+        seen = []
+        lock = threading.Lock()
+        active = {"now": 0, "max": 0}
+
+        def handler(data):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.02)
+            with lock:
+                seen.append((data["instance_id"], data["payload"]["n"]))
+                active["now"] -= 1
+
+        consumer = _consumer(handler)
+        msgs = [(f"1-{n}", {"instance_id": f"i{n % 2}", "payload": f'{{"n": {n}}}'}) for n in range(6)]
+        consumer.process_batch(msgs)
+        for inst in ("i0", "i1"):
+            order = [n for i, n in seen if i == inst]
+            assert order == sorted(order)
+        assert active["max"] >= 2
+
+
+def _pending(msg_id, deliveries, idle_ms):
+    return {"message_id": msg_id, "consumer": "dead", "time_since_delivered": idle_ms, "times_delivered": deliveries}
+
+
+class TestEventBusConsumerReclaim:
+    def test_backoff_grows_with_deliveries(self):
+        consumer = _consumer(lambda data: None, claim_idle_ms=1000)
+        assert [consumer.retry_idle_ms(n) for n in (1, 2, 3)] == [1000, 2000, 4000]
+
+    def test_claims_idle_entries_and_reprocesses(self):
+        seen = []
+        consumer = _consumer(lambda data: seen.append(data["payload"]["n"]), claim_idle_ms=1000)
+        consumer.client.xpending_range.return_value = [
+            _pending("1-0", 1, 5000),
+            _pending("1-1", 3, 2000),  # ainda dentro do backoff (4000 ms)
+        ]
+        consumer.client.xclaim.return_value = [("1-0", {"instance_id": "a", "payload": '{"n": 7}'})]
+
+        assert consumer.reclaim_pending() == 1
+        claim_args = consumer.client.xclaim.call_args.args
+        assert claim_args[2] == "test" and claim_args[4] == ["1-0"]
+        assert seen == [7]
+        consumer.client.xack.assert_called_once_with("whatsapp.inbound", CONSUMER_GROUP, "1-0")
+
+    def test_exhausted_entries_go_to_dead_letter_stream(self):
+        consumer = _consumer(lambda data: None, max_deliveries=3)
+        consumer.client.xpending_range.return_value = [_pending("1-0", 3, 99999)]
+        pipe = consumer.client.pipeline.return_value
+        pipe.execute.side_effect = [[[("1-0", {"event": "whatsapp.message.received"})]], [None, 1]]
+
+        assert consumer.reclaim_pending() == 1
+        consumer.client.xclaim.assert_not_called()
+        stream, fields = pipe.xadd.call_args.args
+        assert stream == "whatsapp.inbound.dlq"
+        assert fields["event"] == "whatsapp.message.received"
+        assert fields["dlq_original_id"] == "1-0" and fields["dlq_deliveries"] == 3
+        assert pipe.xadd.call_args.kwargs["approximate"] is True
+        pipe.xack.assert_called_once_with("whatsapp.inbound", CONSUMER_GROUP, "1-0")
+
+    def test_trimmed_entries_are_only_acked(self):
+        consumer = _consumer(lambda data: None, claim_idle_ms=0)
+        consumer.client.xpending_range.return_value = [_pending("1-0", 1, 10)]
+        consumer.client.xclaim.return_value = [("1-0", None)]
+        consumer.reclaim_pending()
+        consumer.client.xack.assert_called_once_with("whatsapp.inbound", CONSUMER_GROUP, "1-0")
+
+    def test_walks_pel_past_entries_still_in_backoff(self):
+        seen = []
+        consumer = _consumer(lambda data: seen.append(data["payload"]["n"]), batch_size=2, claim_idle_ms=1000)
+        consumer.client.xpending_range.side_effect = [
+            [_pending("1-0", 3, 2000), _pending("1-1", 3, 2000)],  # em backoff (4000 ms)
+            [_pending("1-2", 1, 5000), _pending("1-3", 1, 5000)],
+            [_pending("1-4", 1, 5000)],
+        ]
+        consumer.client.xclaim.side_effect = lambda stream, group, name, idle, ids: [
+            (msg_id, {"instance_id": msg_id, "payload": '{"n": %s}' % msg_id[-1]}) for msg_id in ids
+        ]
+
+        assert consumer.reclaim_pending() == 3
+        cursors = [c.kwargs["min"] for c in consumer.client.xpending_range.call_args_list]
+        assert cursors == ["-", "(1-1", "(1-3"]
+        assert sorted(seen) == [2, 3, 4]
+
+    def test_reclaims_more_stuck_entries_than_batch_size(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        seen = []
+        consumer = _consumer(lambda data: seen.append(data["payload"]["n"]), batch_size=2, claim_idle_ms=0)
+        client = fakeredis.FakeRedis(decode_responses=True)
+        consumer._client = client
+        client.xgroup_create("whatsapp.inbound", CONSUMER_GROUP, id="0", mkstream=True)
+        for n in range(5):
+            client.xadd("whatsapp.inbound", {"instance_id": f"i{n}", "payload": f'{{"n": {n}}}'})
+        client.xreadgroup(CONSUMER_GROUP, "dead", {"whatsapp.inbound": ">"})
+        time.sleep(0.01)
+
+        assert consumer.reclaim_pending() == 5
+        assert sorted(seen) == [0, 1, 2, 3, 4]
+        assert client.xpending("whatsapp.inbound", CONSUMER_GROUP)["pending"] == 0
+
+    def test_bad_message_does_not_drag_later_messages_of_its_key_to_dlq(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        seen = []
+
+        def handler(data):
+            seen.append((data["instance_id"], data["payload"]["n"]))
+            if data["payload"]["n"] == 2:
+                raise RuntimeError("boom")
+
+        stream = "whatsapp.inbound"
+        consumer = _consumer(handler, claim_idle_ms=0, max_deliveries=2)
+        client = fakeredis.FakeRedis(decode_responses=True)
+        consumer._client = client
+        client.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+
+        def add(instance, n):
+            client.xadd(stream, {"instance_id": instance, "payload": f'{{"n": {n}}}'})
+
+        def read():
+            for _, messages in client.xreadgroup(CONSUMER_GROUP, "test", {stream: ">"}):
+                consumer.process_batch(messages)
+
+        for n in (1, 2, 3, 4):
+            add("a", n)
+        add("b", 6)
+        read()
+        add("a", 5)  # chega depois, com a chave ainda estacionada
+        read()
+        assert [n for i, n in seen if i == "a"] == [1, 2]
+        assert ("b", 6) in seen
+
+        time.sleep(0.01)
+        consumer.reclaim_pending()  # 2ª entrega da mensagem 2: falha outra vez
+        time.sleep(0.01)
+        consumer.reclaim_pending()  # entregas esgotadas: DLQ e liberta as retidas
+
+        assert [n for i, n in seen if i == "a"] == [1, 2, 2, 3, 4, 5]
+        dlq = client.xrange(consumer.dead_letter_stream)
+        assert [fields["payload"] for _, fields in dlq] == ['{"n": 2}']
+        assert client.xpending(stream, CONSUMER_GROUP)["pending"] == 0
@@ -0,0 +1,126 @@
+"""
+Testes unitários do encaminhamento para o Evora (pool de workers, retries, backpressure, batching).
+"""
+import importlib.util
+import threading
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+_spec = importlib.util.spec_from_file_location(
+    "evora_forwarder", _root / "core" / "services" / "whatsapp" / "evora_forwarder.py"
+)
+evora_forwarder = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(evora_forwarder)
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class FakeSession:
+    """Regista os POSTs; ``statuses`` define as respostas em sequência (depois 200)."""
+
+    def __init__(self, statuses=(), gate=None):
+        self.statuses = list(statuses)
+        self.gate = gate
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post(self, url, json=None, timeout=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        with self._lock:
+            self.calls.append((url, json))
+            status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        return FakeResponse(status)
+
+
+def _forwarder(session, **kwargs):
+    kwargs.setdefault("redis_factory", lambda: None)
+    return evora_forwarder.EvoraForwarder(
+        url="http://evora/webhook", session=session, sleep=lambda s: None, **kwargs
+    )
+
+
+class TestEvoraForwarder:
+    def test_bounded_pool_forwards_every_message_once(self):
+        session = FakeSession()
+        forwarder = _forwarder(session, workers=3)
+        for i in range(200):
+            assert forwarder.submit({"message_id": i})
+        assert forwarder.flush(5)
+        stats = forwarder.stats()
+        forwarder.shutdown()
+        assert sorted(body["message_id"] for _, body in session.calls) == list(range(200))
+        assert stats["alive_workers"] == 3
+        assert (stats["forwarded"], stats["queue_depth"], stats["inflight"]) == (200, 0, 0)
+        assert stats["latency_ms"]["samples"] == 200
+
+    def test_retries_transient_errors(self):
+        session = FakeSession([503, ConnectionError("reset"), 200])
+        forwarder = _forwarder(session, workers=1, max_retries=3)
+        forwarder.submit({"message_id": 1})
+        forwarder.flush(5)
+        forwarder.shutdown()
+        assert len(session.calls) == 3
+        assert forwarder.stats()["retries"] == 2
+        assert forwarder.stats()["forwarded"] == 1
+
+    def test_client_errors_are_not_retried(self):
+        session = FakeSession([400])
+        forwarder = _forwarder(session, workers=1)
+        forwarder.submit({"message_id": 1})
+        forwarder.flush(5)
+        forwarder.shutdown()
+        assert len(session.calls) == 1
+        assert forwarder.stats()["failed"] == 1
+
+    def test_backoff_is_capped(self):
+        forwarder = _forwarder(FakeSession(), backoff_base=1, backoff_max=4)
+        assert all(0 <= forwarder._backoff(attempt) <= 4 for attempt in range(1, 10) for _ in range(20))
+
+    def test_full_queue_drops_without_spill_backend(self):
+        gate = threading.Event()
+        forwarder = _forwarder(FakeSession(gate=gate), workers=1, queue_size=2)
+        accepted = [forwarder.submit({"message_id": i}) for i in range(10)]
+        gate.set()
+        forwarder.flush(5)
+        forwarder.shutdown()
+        assert accepted.count(False) >= 7
+        assert forwarder.stats()["dropped"] == accepted.count(False)
+
+    def test_batches_when_batch_url_is_configured(self):
+        gate = threading.Event()
+        session = FakeSession(gate=gate)
+        forwarder = _forwarder(session, workers=1, batch_url="http://evora/batch", batch_size=10)
+        for i in range(11):
+            forwarder.submit({"message_id": i})
+        gate.set()
+        forwarder.flush(5)
+        forwarder.shutdown()
+        batch_calls = [body for url, body in session.calls if url == "http://evora/batch"]
+        assert batch_calls and len(batch_calls[0]["messages"]) == 10
+        assert forwarder.stats()["forwarded"] == 11
+
+    def test_spill_to_stream_and_drain(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis(decode_responses=True)
+        session = FakeSession([503, 503])
+        forwarder = _forwarder(session, workers=1, max_retries=1, redis_factory=lambda: client)
+        forwarder.submit({"message_id": 1})
+        forwarder.flush(5)
+        assert client.xlen("whatsapp.evora_forward") == 1
+
+        forwarder._spill_checked_at = 0.0
+        forwarder._drain_spill()
+        forwarder.shutdown()
+        assert session.calls[-1][1] == {"message_id": 1}
+        assert client.xlen("whatsapp.evora_forward") == 0
+        stats = forwarder.stats()
+        assert (stats["spilled"], stats["spill_drained"], stats["forwarded"]) == (1, 1, 1)
@@ -0,0 +1,174 @@
+"""
+Testes unitários do FaissStore do vectorstore_service (filtro por prefixo antes do top-k,
+substituição/remoção com recarga snapshot + WAL, compactação e treino em corpus pequeno).
+
+Correm com o faiss instalado; o SentenceTransformer é trocado por um codificador determinístico.
+"""
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from services.vectorstore_service.app.faiss_store import FaissStore
+from services.vectorstore_service.app.index_factory import IndexSpec, build_base_index, index_type_of
+
+DIM = 8
+
+
+def _axis(i, noise=0.0, seed=0):
+    vec = np.zeros(DIM, dtype="float32")
+    vec[i] = 1.0
+    if noise:
+        vec += np.random.default_rng(seed).normal(scale=noise, size=DIM).astype("float32")
+    return vec
+
+
+class FakeModel:
+    """Texto ``"eixo:<i>:<semente>"`` → vetor perto do eixo i; outros textos → vetor por hash."""
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True):
+        out = []
+        for text in texts:
+            if text.startswith("eixo:"):
+                _, axis, seed = text.split(":")
+                vec = _axis(int(axis), noise=0.05 if int(seed) else 0.0, seed=int(seed))
+            else:
+                seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+                vec = np.random.default_rng(seed).normal(size=DIM).astype("float32")
+            out.append(vec / np.linalg.norm(vec))
+        return np.asarray(out, dtype="float32")
+
+
+def _store(data_dir, **kwargs):
+    kwargs.setdefault("snapshot_every", 1000)
+    kwargs.setdefault("compact_min", 1000)
+    store = FaissStore(str(data_dir), "fake-model", **kwargs)
+    store._model = FakeModel()
+    return store
+
+
+class TestPrefixFilter:
+    def test_filter_is_applied_before_top_k(self, tmp_path):
+        store = _store(tmp_path)
+        # 20 notícias junto da consulta; as FAQs ficam longe e nunca entrariam num top-2 global
+        store.upsert_batch([(f"news:{i}", f"eixo:0:{i + 1}") for i in range(20)])
+        store.upsert_batch([("faq:1", "eixo:1:0"), ("faq:2", "eixo:2:0")])
+
+        assert {r["id"] for r in store.search("eixo:0:0", k=2)} <= {f"news:{i}" for i in range(20)}
+        hits = store.search("eixo:0:0", k=2, id_prefix="faq:")
+        assert sorted(r["id"] for r in hits) == ["faq:1", "faq:2"]
+
+    def test_search_multi_returns_k_per_layer(self, tmp_path):
+        store = _store(tmp_path)
+        store.upsert_batch([(f"tenant:t1:{i}", f"eixo:0:{i + 1}") for i in range(5)])
+        store.upsert_batch([(f"global:{i}", f"eixo:3:{i + 1}") for i in range(5)])
+
+        layers = store.search_multi("eixo:0:0", {"tenant": ["tenant:t1:"], "global": ["global:"]}, k=3)
+        assert len(layers["tenant"]) == 3 and all(r["id"].startswith("tenant:t1:") for r in layers["tenant"])
+        assert len(layers["global"]) == 3 and all(r["id"].startswith("global:") for r in layers["global"])
+
+    def test_hnsw_filter_uses_exact_search_on_small_subsets(self, tmp_path):
+        store = _store(tmp_path, index_spec=IndexSpec(index_type="hnsw", hnsw_m=8))
+        store.upsert_batch([(f"news:{i}", f"eixo:0:{i + 1}") for i in range(30)])
+        store.upsert_batch([("faq:1", "eixo:1:0")])
+
+        assert [r["id"] for r in store.search("eixo:0:0", k=5, id_prefix="faq:")] == ["faq:1"]
+
+
+class TestPersistence:
+    def test_replace_and_delete_survive_reload_from_wal(self, tmp_path):
+        store = _store(tmp_path)
+        store.upsert_batch([("a", "eixo:0:0"), ("b", "eixo:1:0"), ("c", "eixo:2:0")])
+        store.upsert("a", "eixo:3:0")  # substitui: o vetor antigo vira tombstone
+        assert store.delete(["b", "inexistente"]) == 1
+
+        reloaded = _store(tmp_path)
+        assert reloaded.size == 2
+        assert reloaded.doc_texts == {"a": "eixo:3:0", "c": "eixo:2:0"}
+        assert reloaded.search("eixo:3:0", k=1)[0]["id"] == "a"
+        # vetor antigo de "a" e o de "b" continuam no índice como tombstones até à compactação
+        assert reloaded.stats()["tombstones"] == 2 and reloaded.stats()["vectors"] == 4
+        assert "b" not in {r["id"] for r in reloaded.search("eixo:1:0", k=5)}
+
+    def test_reload_replays_only_wal_entries_after_the_snapshot(self, tmp_path):
+        store = _store(tmp_path)
+        store.upsert_batch([("a", "eixo:0:0"), ("b", "eixo:1:0")])
+        store.snapshot()
+        store.upsert("c", "eixo:2:0")
+        store.upsert("a", "eixo:4:0")
+        store.delete(["b"])
+
+        reloaded = _store(tmp_path)
+        assert sorted(reloaded.id_to_int) == ["a", "c"]
+        assert reloaded.doc_texts["a"] == "eixo:4:0"
+        # o snapshot já compactou os tombstones: o índice tem os 2 vetores do snapshot + 2 do WAL
+        assert reloaded.index.ntotal == 4
+        assert {r["id"] for r in reloaded.search("eixo:4:0", k=5)} == {"a", "c"}
+
+        reloaded.snapshot()
+        again = _store(tmp_path)
+        assert again.stats()["tombstones"] == 0 and again.stats()["vectors"] == 2
+        assert again.search("eixo:2:0", k=1)[0]["id"] == "c"
+
+
+class TestCompaction:
+    def test_compact_drops_tombstones_and_keeps_results(self, tmp_path):
+        store = _store(tmp_path)
+        store.upsert_batch([(f"d{i}", f"eixo:{i % DIM}:{i}") for i in range(10)])
+        store.upsert_batch([(f"d{i}", f"eixo:{(i + 1) % DIM}:{i}") for i in range(5)])
+        store.delete(["d9"])
+        before = store.search("eixo:2:0", k=3)
+        assert store.stats()["tombstones"] == 6
+
+        store.compact()
+
+        assert store.stats()["tombstones"] == 0
+        assert store.stats()["vectors"] == store.size == 9
+        assert store.search("eixo:2:0", k=3) == before
+
+    def test_tombstone_ratio_triggers_background_compaction(self, tmp_path):
+        store = _store(tmp_path, compact_min=1, compact_ratio=0.5)
+        store.upsert_batch([("a", "eixo:0:0"), ("b", "eixo:1:0")])
+        store.delete(["a"])  # 1 tombstone em 2 vetores
+        for _ in range(100):
+            if not store._compacting:
+                break
+            time.sleep(0.01)
+        assert store.stats()["tombstones"] == 0 and store.stats()["vectors"] == 1
+
+
+class TestIndexSpecClamping:
+    def test_nlist_is_clamped_to_training_points(self):
+        index = build_base_index(IndexSpec(index_type="ivf_flat", ivf_nlist=1024), DIM, n_train=100)
+        assert faiss.extract_index_ivf(index).nlist == 100 // 39
+
+    def test_pq_bits_shrink_with_small_corpus(self):
+        index = build_base_index(IndexSpec(index_type="ivf_pq", pq_m=4, pq_nbits=8), DIM, n_train=100)
+        ivf = faiss.downcast_index(faiss.extract_index_ivf(index))
+        assert isinstance(ivf, faiss.IndexIVFPQ)
+        assert ivf.pq.nbits == 6
+
+    def test_tiny_corpus_falls_back_to_ivf_flat(self):
+        index = build_base_index(IndexSpec(index_type="ivf_pq", pq_m=4), DIM, n_train=10)
+        assert index_type_of(index) == "ivf_flat"
+
+    def test_rebuild_trains_on_small_corpus(self, tmp_path):
+        store = _store(tmp_path)
+        store.upsert_batch([(f"d{i}", f"eixo:{i % DIM}:{i + 1}") for i in range(50)])
+
+        report = store.rebuild(IndexSpec(index_type="ivf_pq", ivf_nlist=1024, pq_m=4, pq_nbits=8))
+
+        assert report["index_type"] == "ivf_pq" and report["vectors"] == 50
+        assert faiss.extract_index_ivf(store.base_index).nlist == 1
+        assert store.search("eixo:3:0", k=1)[0]["id"] in {f"d{i}" for i in range(3, 50, DIM)}
+        reloaded = _store(tmp_path, index_spec=store.index_spec)
+        assert reloaded.stats()["index_type"] == "ivf_pq" and reloaded.size == 50
@@ -0,0 +1,124 @@
+"""
+Testes unitários do contexto WorldGraph: driver Bolt partilhado, cache por tenant com
+invalidação no sync do grafo e métricas de consulta.
+"""
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from adapters import mrfoo_adapter
+from core.services.cognitive_core.reality import graph_context
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, cypher, params):
+        self.driver.queries.append((cypher, params))
+        return [FakeRecord({"tenant": params["tenant"], "n": len(self.driver.queries)})]
+
+
+class FakeDriver:
+    def __init__(self, url, auth=None, **kwargs):
+        self.url = url
+        self.kwargs = kwargs
+        self.queries = []
+        self.closed = False
+
+    def session(self):
+        return FakeSession(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def bolt(monkeypatch):
+    """Substitui o pacote neo4j (não instalado aqui) e configura o WorldGraph por Bolt."""
+    drivers = []
+
+    def make_driver(*args, **kwargs):
+        drivers.append(FakeDriver(*args, **kwargs))
+        return drivers[-1]
+
+    fake_neo4j = types.ModuleType("neo4j")
+    fake_neo4j.GraphDatabase = types.SimpleNamespace(driver=make_driver)
+    monkeypatch.setitem(sys.modules, "neo4j", fake_neo4j)
+    monkeypatch.setenv("WORLDGRAPH_BOLT_URL", "bolt://graph:7687")
+    monkeypatch.setenv("WORLDGRAPH_PASSWORD", "secret")
+    monkeypatch.setenv("WORLDGRAPH_TENANT_CYPHER", "MATCH (n {tenant: $tenant}) RETURN count(n) AS n")
+    monkeypatch.delenv("WORLDGRAPH_HTTP_URL", raising=False)
+    graph_context.close_graph_driver()
+    graph_context.invalidate_graph_snippet()
+    yield drivers
+    graph_context.close_graph_driver()
+    graph_context.invalidate_graph_snippet()
+
+
+class TestGraphContext:
+    def test_driver_is_shared_between_queries(self, bolt, monkeypatch):
+        monkeypatch.setenv("WORLDGRAPH_TENANT_CACHE_TTL_S", "0")
+        for tenant in ("t1", "t2", "t1"):
+            assert graph_context.graph_snippet_for_tenant(tenant)["via"] == "bolt"
+        assert len(bolt) == 1
+        assert len(bolt[0].queries) == 3
+        assert bolt[0].kwargs["max_connection_pool_size"] == 20
+
+        stats = graph_context.graph_context_stats()
+        assert stats["bolt"]["queries"] == 3 and stats["bolt"]["errors"] == 0
+        assert stats["bolt"]["driver_open"] is True
+
+    def test_credentials_change_replaces_driver(self, bolt, monkeypatch):
+        monkeypatch.setenv("WORLDGRAPH_TENANT_CACHE_TTL_S", "0")
+        graph_context.graph_snippet_for_tenant("t1")
+        monkeypatch.setenv("WORLDGRAPH_PASSWORD", "rotated")
+        graph_context.graph_snippet_for_tenant("t1")
+        assert len(bolt) == 2 and bolt[0].closed and not bolt[1].closed
+
+    def test_snippet_cached_per_tenant(self, bolt):
+        first = graph_context.graph_snippet_for_tenant("t1")
+        first["rows"] = []  # quem chama pode alterar o dict devolvido
+        again = graph_context.graph_snippet_for_tenant("t1")
+        graph_context.graph_snippet_for_tenant("t2")
+
+        assert again["rows"] == [{"tenant": "t1", "n": 1}]
+        assert len(bolt[0].queries) == 2
+        cache = graph_context.graph_context_stats()["cache"]
+        assert (cache["hits"], cache["misses"], cache["entries"]) == (1, 2, 2)
+
+    def test_graph_sync_invalidates_tenant(self, bolt, monkeypatch):
+        monkeypatch.setattr(mrfoo_adapter, "_post", lambda path, json=None, tenant_id=None: {"success": True})
+        graph_context.graph_snippet_for_tenant("t1")
+        graph_context.graph_snippet_for_tenant("t2")
+
+        assert mrfoo_adapter.graph_sync_incremental("t1")["success"]
+        assert graph_context.graph_snippet_for_tenant("t1")["rows"] == [{"tenant": "t1", "n": 3}]
+        assert graph_context.graph_snippet_for_tenant("t2")["rows"] == [{"tenant": "t2", "n": 2}]
+
+    def test_failed_sync_keeps_cache(self, bolt, monkeypatch):
+        monkeypatch.setattr(mrfoo_adapter, "_post", lambda path, json=None, tenant_id=None: {"error": "down"})
+        graph_context.graph_snippet_for_tenant("t1")
+        assert not mrfoo_adapter.graph_sync_full("t1")["success"]
+        graph_context.graph_snippet_for_tenant("t1")
+        assert len(bolt[0].queries) == 1
@@ -0,0 +1,124 @@
+"""
+Testes unitários do cache de execution plans do mcp_service (TTL, revalidação por ETag, single-flight).
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+_mcp_service = _root / "services" / "mcp_service"
+if str(_mcp_service) not in sys.path:
+    sys.path.insert(0, str(_mcp_service))
+
+import main as mcp_main
+
+PLAN = {
+    "tool": "vitrinezap.analisar_produto",
+    "version": "1.0.0",
+    "runtime": "noop",
+    "config": {},
+    "client_key": "vitrinezap",
+    "_meta": {"request_id": "r1"},
+}
+
+
+class FakeCore:
+    """Substitui CORE_UPSTREAM.request: responde ao resolve e regista os pedidos."""
+
+    def __init__(self, etag='"7"', delay=0.0):
+        self.etag = etag
+        self.delay = delay
+        self.calls = []
+
+    async def request(self, method, url, **kwargs):
+        headers = kwargs.get("headers") or {}
+        self.calls.append(headers)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        request = httpx.Request(method, url)
+        if headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag}, request=request)
+        return httpx.Response(200, json=PLAN, headers={"ETag": self.etag}, request=request)
+
+
+@pytest.fixture
+def core(monkeypatch):
+    fake = FakeCore()
+    monkeypatch.setattr(mcp_main.CORE_UPSTREAM, "request", fake.request)
+    cache = mcp_main.ResolvePlanCache(max_size=16, ttl_s=60, max_age_s=300)
+    monkeypatch.setattr(mcp_main, "_PLAN_CACHE", cache)
+    return fake
+
+
+def _resolve(version=None, key="k1"):
+    return mcp_main.resolve_execution_plan(
+        PLAN["tool"], version, {"tool": PLAN["tool"]}, {"X-SINAPUM-KEY": key}
+    )
+
+
+class TestResolvePlanCache:
+    def test_fresh_plan_skips_core(self, core):
+        async def run():
+            first = await _resolve()
+            second = await _resolve()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert len(core.calls) == 1
+        assert second is first
+        assert "_meta" not in first
+        assert mcp_main._PLAN_CACHE.stats["hits"] == 1
+
+    def test_plans_are_keyed_by_version_and_api_key(self, core):
+        async def run():
+            await _resolve()
+            await _resolve(version="1.0.0")
+            await _resolve(key="k2")
+
+        asyncio.run(run())
+        assert len(core.calls) == 3
+
+    def test_stale_plan_is_revalidated_with_etag(self, core):
+        mcp_main._PLAN_CACHE.ttl_s = 0
+
+        async def run():
+            first = await _resolve()
+            second = await _resolve()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert core.calls[1]["If-None-Match"] == '"7"'
+        assert second is first
+        assert mcp_main._PLAN_CACHE.stats["revalidated"] == 1
+
+    def test_registry_change_refetches_plan(self, core):
+        mcp_main._PLAN_CACHE.ttl_s = 0
+
+        async def run():
+            await _resolve()
+            core.etag = '"8"'
+            await _resolve()
+
+        asyncio.run(run())
+        assert mcp_main._PLAN_CACHE.stats["misses"] == 2
+
+    def test_concurrent_misses_share_one_request(self, core):
+        core.delay = 0.01
+
+        async def run():
+            return await asyncio.gather(*(_resolve() for _ in range(20)))
+
+        plans = asyncio.run(run())
+        assert len(core.calls) == 1
+        assert all(plan is plans[0] for plan in plans)
+
+    def test_core_errors_are_raised(self, monkeypatch, core):
+        async def not_found(method, url, **kwargs):
+            return httpx.Response(404, json={"error": "x"}, request=httpx.Request(method, url))
+
+        monkeypatch.setattr(mcp_main.CORE_UPSTREAM, "request", not_found)
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(_resolve())
@@ -0,0 +1,134 @@
+"""
+Testes unitários dos contadores operacionais em janela (Redis) vs agregação no ORM.
+
+Correm contra o fakeredis com suporte a Lua (``pip install "fakeredis[lua]"``).
+"""
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from django.db import connection
+from django.utils import timezone
+
+from app_inbound_events import counters
+from app_inbound_events.models import DecisionLog, InboundEvent, InboundEventStatus
+from core.services.cognitive_core.reality import operational_snapshot
+
+
+@pytest.fixture
+def db():
+    with connection.schema_editor() as editor:
+        editor.create_model(InboundEvent)
+        editor.create_model(DecisionLog)
+    yield
+    with connection.schema_editor() as editor:
+        editor.delete_model(DecisionLog)
+        editor.delete_model(InboundEvent)
+
+
+@pytest.fixture
+def redis_counters(monkeypatch, db):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(counters, "_client", lambda: client)
+    return client
+
+
+def _orm_metrics():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(counters, "operational_metrics_from_counters", lambda hours: None)
+        return operational_snapshot.fetch_core_local_operational_metrics()
+
+
+def _comparable(metrics):
+    return {k: metrics[k] for k in ("decision_logs_count", "inbound_by_status", "inbound_recent_count")}
+
+
+def _event(n, minutes_ago=0, status=InboundEventStatus.RECEIVED):
+    return InboundEvent.objects.create(
+        event_id=f"ev-{n}",
+        source="whatsapp",
+        status=status,
+        received_at=timezone.now() - timedelta(minutes=minutes_ago),
+    )
+
+
+class TestOperationalCounters:
+    def test_not_ready_falls_back_to_orm(self, redis_counters):
+        _event(1)
+        metrics = operational_snapshot.fetch_core_local_operational_metrics()
+        assert metrics["source"] == "core_orm"
+        assert metrics["inbound_recent_count"] == 1
+
+    def test_backfill_matches_orm(self, redis_counters):
+        for i in range(5):
+            _event(i, minutes_ago=i * 90, status=InboundEventStatus.PROCESSED if i % 2 else InboundEventStatus.FAILED)
+        _event(99, minutes_ago=30 * 60)  # fora da janela
+        DecisionLog.objects.create(event_id="ev-1")
+
+        result = counters.rebuild_from_history()
+        metrics = operational_snapshot.fetch_core_local_operational_metrics()
+        assert result["totals"][counters.FIELD_INBOUND] == 5
+        assert metrics["source"] == "core_counters"
+        assert _comparable(metrics) == _comparable(_orm_metrics())
+
+    def test_live_updates_follow_inserts_and_status_changes(self, redis_counters):
+        counters.rebuild_from_history()
+        ev = _event(1)
+        _event(2, minutes_ago=60)
+        _event(3, minutes_ago=26 * 60)  # chega atrasado, já fora da janela
+        for status in (InboundEventStatus.ENQUEUED, InboundEventStatus.PROCESSING, InboundEventStatus.PROCESSED):
+            ev = InboundEvent.objects.get(pk=ev.pk)
+            ev.status = status
+            ev.save(update_fields=["status"])
+        DecisionLog.objects.create(event_id="ev-1")
+        InboundEvent.objects.get(event_id="ev-2").delete()
+
+        metrics = operational_snapshot.fetch_core_local_operational_metrics()
+        assert metrics["source"] == "core_counters"
+        assert metrics["inbound_by_status"] == {"PROCESSED": 1}
+        assert _comparable(metrics) == _comparable(_orm_metrics())
+
+    def test_old_minutes_leave_the_window(self, redis_counters, monkeypatch):
+        _event(1, minutes_ago=10)
+        _event(2, minutes_ago=23 * 60)
+        counters.rebuild_from_history()
+        assert counters.read_window_counts()[counters.FIELD_INBOUND] == 2
+
+        real_time = time.time
+        monkeypatch.setattr(counters.time, "time", lambda: real_time() + 2 * 3600)
+        counts = counters.read_window_counts()
+        assert counts[counters.FIELD_INBOUND] == 1
+        assert counts[counters.status_field(InboundEventStatus.RECEIVED)] == 1
+
+    def test_long_gap_invalidates_counters(self, redis_counters, monkeypatch):
+        counters.rebuild_from_history()
+        real_time = time.time
+        monkeypatch.setattr(
+            counters.time, "time", lambda: real_time() + (counters.BUCKET_MARGIN_MINUTES + 60) * 60
+        )
+        assert counters.read_window_counts() is None
+        assert redis_counters.hget(counters.TOTAL_KEY, "_ready") == "0"
+
+    def test_failed_increment_marks_counters_not_ready(self, redis_counters, monkeypatch):
+        counters.rebuild_from_history()
+        monkeypatch.setattr(counters, "_client", lambda: None)  # Redis em baixo
+        _event(1)
+        assert counters._DRIFTED
+
+        monkeypatch.setattr(counters, "_client", lambda: redis_counters)
+        assert counters.read_window_counts() is None
+        assert redis_counters.hget(counters.TOTAL_KEY, "_ready") == "0"
+        assert operational_snapshot.fetch_core_local_operational_metrics()["source"] == "core_orm"
+
+        counters.rebuild_from_history()
+        assert counters.read_window_counts()[counters.FIELD_INBOUND] == 1
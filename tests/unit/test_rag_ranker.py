@@ -0,0 +1,113 @@
+"""
+Testes unitários do ranking RAG: pesos de aprendizagem numa só query (com cache por tenant)
+e metadados do hit lidos uma só vez.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app_inbound_events.models import DecisionFeedbackRecord
+from core.services.cognitive_core.learning.decision_feedback import record_decision_feedback_event
+from core.services.cognitive_core.rag import rag_learning, rag_ranker
+
+
+@pytest.fixture
+def feedback_db():
+    with connection.schema_editor() as editor:
+        editor.create_model(DecisionFeedbackRecord)
+    rag_learning.invalidate_action_performance()
+    yield
+    rag_learning.invalidate_action_performance()
+    with connection.schema_editor() as editor:
+        editor.delete_model(DecisionFeedbackRecord)
+
+
+def _feedback(tenant, score, *, decision_acao=None, outcome_acao=None):
+    DecisionFeedbackRecord.objects.create(
+        trace_id="t",
+        tenant_id=tenant,
+        source="test",
+        decision_action="x",
+        decision_json={"metadata": {"acao": decision_acao}} if decision_acao else {},
+        outcome_json={"acao_rag": outcome_acao} if outcome_acao else {},
+        decision_score_posterior=score,
+    )
+
+
+def _hit(hit_id, acao=None, flux=None, score=1.0):
+    doc = {"type": "rag_feedback"}
+    if acao:
+        doc["acao"] = acao
+    if flux:
+        doc["impacto_fluxo"] = flux
+    return {"id": hit_id, "score": score, "source_type": "tenant", "text": json.dumps(doc)}
+
+
+class TestActionPerformances:
+    def test_batch_matches_single_lookup(self, feedback_db, monkeypatch):
+        monkeypatch.setenv("COGNITIVE_RAG_LEARNING_CACHE_TTL_S", "0")
+        _feedback("t1", 2.0, decision_acao="reduzir")
+        _feedback("t1", 4.0, outcome_acao="reduzir")
+        _feedback("t1", -3.0, decision_acao="monitorar", outcome_acao="monitorar")
+        _feedback("t1", 5.0, decision_acao="monitorar", outcome_acao="reduzir")
+        _feedback("t2", 9.0, decision_acao="reduzir")
+
+        batch = rag_learning.get_action_performances("t1", ["reduzir", "monitorar", "nova", "default", None])
+        assert batch == {
+            "reduzir": pytest.approx(1.0 + (2.0 + 4.0 + 5.0) / 3 / 10),
+            "monitorar": pytest.approx(1.0 + (-3.0 + 5.0) / 2 / 10),
+            "nova": 1.0,
+            "default": 1.0,
+        }
+        for act in ("reduzir", "monitorar", "nova"):
+            assert rag_learning.get_action_performance("t1", act) == batch[act]
+
+    def test_rank_uses_one_query_and_caches_per_tenant(self, feedback_db):
+        _feedback("t1", 5.0, decision_acao="reduzir")
+        hits = [_hit(f"h{i}", acao=acao) for i, acao in enumerate(["reduzir", "monitorar", "reduzir", "x", "y"])]
+
+        with CaptureQueriesContext(connection) as first:
+            ranked = rag_ranker.rank_rag_results(hits, tenant_id="t1", top_n=5)
+        assert len(first.captured_queries) == 1
+        assert ranked[0]["_rank_weights"]["learning"] == pytest.approx(1.5)
+
+        with CaptureQueriesContext(connection) as second:
+            rag_ranker.rank_rag_results(hits, tenant_id="t1", top_n=5)
+        assert len(second.captured_queries) == 0
+
+    def test_feedback_write_invalidates_tenant_cache(self, feedback_db):
+        assert rag_learning.get_action_performance("t1", "reduzir") == 1.0
+        record_decision_feedback_event(
+            trace_id="tr",
+            tenant_id="t1",
+            source="test",
+            decision_action="x",
+            decision_snapshot={"metadata": {"acao": "reduzir"}},
+            predicted={"risk_level": "low"},
+            outcome={},
+        )
+        assert rag_learning.get_action_performance("t1", "reduzir") != 1.0
+
+
+class TestParsedMetadata:
+    def test_impacto_total_reuses_ranker_metadata(self, monkeypatch):
+        hits = [_hit("a", flux="alto"), _hit("b", flux="medio"), _hit("c")]
+        ranked = rag_ranker.rank_rag_results(hits, top_n=5)
+
+        def no_parse(text):
+            raise AssertionError("JSON do hit lido duas vezes")
+
+        monkeypatch.setattr(rag_ranker, "_metadata_from_hit_text", no_parse)
+        assert rag_ranker.impacto_total_from_ranked(ranked) == 3
+
+    def test_impacto_total_still_reads_raw_hits(self):
+        assert rag_ranker.impacto_total_from_ranked([_hit("a", flux="alto")]) == 2
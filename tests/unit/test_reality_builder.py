@@ -0,0 +1,130 @@
+"""
+Testes unitários do RealityStateBuilder (fontes em paralelo, orçamento de latência, resultados parciais).
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from core.services.cognitive_core.orchestration.cognitive_logging import PipelineTimer
+from core.services.cognitive_core.reality import builder as builder_module
+from core.services.cognitive_core.reality.builder import RealityStateBuilder
+
+DELAY_S = 0.15
+
+
+class FakePerception:
+    text = "quanto tempo demora o pedido"
+    user_id = "5511999999999"
+    channel = "whatsapp"
+    contract_version = "v1"
+
+    def context_hint(self):
+        return {"tenant_id": "t1", "operational_snapshot": {"fila_em_preparo": 5, "fila_confirmado": 1}}
+
+
+@pytest.fixture
+def slow_sources(monkeypatch):
+    """Cada fonte demora DELAY_S (ORM, vectorstore + ranking, grafo)."""
+
+    def slow(result):
+        def fn(*args, **kwargs):
+            time.sleep(DELAY_S)
+            return result() if callable(result) else result
+
+        return fn
+
+    monkeypatch.setenv("COGNITIVE_CORE_INCLUDE_LOCAL_ORM_METRICS", "false")
+    monkeypatch.setattr(
+        builder_module,
+        "build_operational_live_layer",
+        slow(lambda: {"operational_snapshot": {"fila_em_preparo": 5}, "dynamic_metrics_derived": {"estimated_load": 0.2}}),
+    )
+    monkeypatch.setattr(builder_module, "hybrid_rag_search", slow([{"id": "a", "source_type": "tenant"}]))
+    monkeypatch.setattr(builder_module, "rank_rag_results", lambda raw, **kw: list(raw))
+    monkeypatch.setattr(builder_module, "graph_snippet_for_tenant", slow({"available": True, "rows": [{"n": 1}]}))
+    monkeypatch.setattr(builder_module, "rag_query_text_from_perception", lambda p: p.text)
+
+
+def _build(**kwargs):
+    ctx = SimpleNamespace(rag_namespaces=[])
+    return RealityStateBuilder().build(FakePerception(), ctx, **kwargs)
+
+
+class TestRealityStateBuilderFanOut:
+    def test_sources_run_concurrently(self, slow_sources):
+        timer = PipelineTimer("trace-1", "reality")
+        started = time.perf_counter()
+        reality = _build(timer=timer, budget_ms=2000)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < DELAY_S * 2
+        assert reality.source_status == {"operational": "ok", "rag": "ok", "graph": "ok"}
+        assert [h["id"] for h in reality.rag_long_term] == ["a"]
+        assert reality.graph_structural["rows"] == [{"n": 1}]
+        assert reality.dynamic_metrics == {"estimated_load": 0.2}
+        assert set(timer.sources) == {"operational", "rag", "graph"}
+        assert all(s["elapsed_ms"] >= DELAY_S * 1000 * 0.9 for s in timer.sources.values())
+
+    def test_slow_source_returns_partial_result(self, slow_sources, monkeypatch):
+        def very_slow_graph(tenant):
+            time.sleep(1.0)
+            return {"available": True, "rows": [{"n": 1}]}
+
+        monkeypatch.setattr(builder_module, "graph_snippet_for_tenant", very_slow_graph)
+        timer = PipelineTimer("trace-2", "reality")
+        started = time.perf_counter()
+        reality = _build(timer=timer, budget_ms=400)
+
+        assert time.perf_counter() - started < 0.8
+        assert reality.source_status["graph"] == "timeout"
+        assert reality.graph_structural["available"] is False
+        assert reality.rag_long_term and reality.source_status["rag"] == "ok"
+        assert timer.sources["graph"] == {"elapsed_ms": None, "status": "timeout"}
+        assert reality.operational_live["reality_sources_status"]["graph"] == "timeout"
+
+    def test_failing_source_falls_back_to_hints(self, slow_sources, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(builder_module, "build_operational_live_layer", broken)
+        reality = _build(budget_ms=2000)
+
+        assert reality.source_status["operational"] == "error"
+        assert reality.operational_live["tenant_id"] == "t1"
+        # Métricas dinâmicas derivadas do snapshot do cliente presente nos hints
+        assert reality.dynamic_metrics["estimated_load"] > 0
+        assert reality.operational_live["impacto_rag"] is not None
+
+    def test_stuck_source_is_not_resubmitted_past_its_inflight_cap(self, slow_sources, monkeypatch):
+        release = threading.Event()
+        calls = []
+
+        def stuck_graph(tenant):
+            calls.append(tenant)
+            release.wait(5)
+            return {"available": True, "rows": [{"n": 1}]}
+
+        monkeypatch.setattr(builder_module, "graph_snippet_for_tenant", stuck_graph)
+        monkeypatch.setattr(builder_module, "_INFLIGHT", {})
+        monkeypatch.setenv("COGNITIVE_REALITY_SOURCE_MAX_INFLIGHT", "1")
+        try:
+            assert _build(budget_ms=300).source_status["graph"] == "timeout"
+            second = _build(budget_ms=300)
+            assert second.source_status["graph"] == "timeout"
+            assert second.source_status["rag"] == "ok"
+            assert len(calls) == 1
+        finally:
+            release.set()
+        deadline = time.monotonic() + 2
+        while builder_module._INFLIGHT["graph"]._value == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _build(budget_ms=2000).source_status["graph"] == "ok"
+        assert len(calls) == 2
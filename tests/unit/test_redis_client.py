@@ -0,0 +1,101 @@
+"""
+Testes unitários do cliente Redis partilhado (pool por processo, circuit breaker, métricas).
+"""
+import asyncio
+import gc
+import sys
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from services import redis_client
+from services.redis_client import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pools(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://127.0.0.1:1/0")
+    redis_client.reset_redis_clients()
+    yield
+    redis_client.reset_redis_clients()
+
+
+class TestRedisClientPool:
+    def test_client_is_reused_across_calls(self):
+        first = redis_client.get_redis_client()
+        assert first is not None
+        assert redis_client.get_redis_client() is first
+        assert redis_client.get_redis_client(decode_responses=False) is not first
+        stats = redis_client.redis_pool_stats()
+        assert len(stats["pools"]) == 2
+        assert stats["pools"][0]["max_connections"] == 50
+
+    def test_disabled_by_setting(self, monkeypatch):
+        monkeypatch.setenv("ENVIRONMENTAL_STATE_REDIS_ENABLED", "false")
+        assert redis_client.get_redis_client() is None
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        breaker = CircuitBreaker(failures=2, cooldown=60)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+        breaker.opened_at -= 60
+        assert breaker.state == "half_open" and breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.trips == 1
+
+    def test_half_open_lets_a_single_probe_through(self):
+        breaker = CircuitBreaker(failures=1, cooldown=60)
+        breaker.record_failure()
+        breaker.opened_at -= 60
+        assert breaker.allow()
+        assert not breaker.allow() and not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+    def test_connection_errors_trip_shared_breaker(self, monkeypatch):
+        monkeypatch.setenv("REDIS_CIRCUIT_FAILURES", "1")
+        monkeypatch.setenv("REDIS_RETRY_ATTEMPTS", "0")
+        monkeypatch.setenv("REDIS_CONNECT_TIMEOUT", "0.2")
+        client = redis_client.get_redis_client()
+        with pytest.raises(Exception):
+            client.ping()
+        assert redis_client.get_redis_client() is None
+        assert redis_client.redis_pool_stats()["circuit"]["trips"] == 1
+
+    def test_breaker_is_per_url(self, monkeypatch):
+        monkeypatch.setenv("REDIS_CIRCUIT_FAILURES", "1")
+        monkeypatch.setenv("REDIS_RETRY_ATTEMPTS", "0")
+        monkeypatch.setenv("REDIS_CONNECT_TIMEOUT", "0.2")
+        down = redis_client.client_for_url("redis://127.0.0.1:1/1")
+        with pytest.raises(Exception):
+            down.ping()
+        assert redis_client.client_for_url("redis://127.0.0.1:1/1") is None
+        assert redis_client.client_for_url("redis://127.0.0.1:1/2") is not None
+        assert redis_client.get_redis_client() is not None
+
+
+class TestAsyncClients:
+    def test_one_client_per_loop_released_with_the_loop(self):
+        async def get():
+            return redis_client.get_async_redis_client()
+
+        loop = asyncio.new_event_loop()
+        try:
+            first = loop.run_until_complete(get())
+            assert first is not None
+            assert loop.run_until_complete(get()) is first
+        finally:
+            loop.close()
+        assert redis_client.redis_pool_stats()["async_clients"] == 1
+
+        del loop, first
+        gc.collect()
+        assert redis_client.redis_pool_stats()["async_clients"] == 0
@@ -0,0 +1,64 @@
+"""
+Testes unitários do cache de planos do registry MCP (carimbo partilhado no Redis).
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from app_mcp_tool_registry import plan_cache
+from app_mcp_tool_registry.plan_cache import ToolPlan
+
+
+def _plan(tool_name, version, client_key):
+    return ToolPlan(tool_name=tool_name, version="1.0.0", runtime="noop", config={}, input_schema={}, output_schema={})
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """Redis partilhado (fakeredis); ``shared.down = True`` simula o Redis em baixo."""
+
+    class Shared:
+        client = fakeredis.FakeRedis(decode_responses=True)
+        down = False
+
+    monkeypatch.setattr(plan_cache, "_stamp_client", lambda: None if Shared.down else Shared.client)
+    monkeypatch.setattr(plan_cache, "build_tool_plan", _plan)
+    monkeypatch.setattr(plan_cache, "STAMP_CHECK_S", 0)
+    monkeypatch.setattr(plan_cache, "_shared_stamp", None)
+    monkeypatch.setattr(plan_cache, "_shared_ok", False)
+    monkeypatch.setattr(plan_cache, "_stamp_checked_at", 0.0)
+    monkeypatch.setattr(plan_cache, "_stats", {"hits": 0, "misses": 0, "invalidations": 0, "bypassed": 0})
+    plan_cache._plans.clear()
+    return Shared
+
+
+class TestSharedStamp:
+    def test_plans_are_cached_while_stamp_is_unchanged(self, shared):
+        first = plan_cache.get_tool_plan("t")
+        assert plan_cache.get_tool_plan("t") is first
+
+    def test_write_on_another_host_invalidates_plans(self, shared):
+        first = plan_cache.get_tool_plan("t")
+        shared.client.set(plan_cache.STAMP_CACHE_KEY, 1)
+        assert plan_cache.get_tool_plan("t") is not first
+
+    def test_registry_version_follows_shared_stamp(self, shared):
+        version = plan_cache.registry_version()
+        assert version == shared.client.get(plan_cache.STAMP_CACHE_KEY)
+        plan_cache.invalidate_plans("teste")
+        assert plan_cache.registry_version() != version
+
+    def test_unreadable_stamp_disables_cache_and_etag(self, shared):
+        plan_cache.get_tool_plan("t")
+        shared.down = True
+        first = plan_cache.get_tool_plan("t")
+        assert plan_cache.get_tool_plan("t") is not first
+        assert plan_cache.registry_version() is None
+        assert plan_cache.plan_cache_stats()["bypassed"] == 2
@@ -0,0 +1,49 @@
+"""
+Testes unitários do POST /core/tools/resolve/ (autenticação antes da revalidação por ETag).
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from django.db import connection
+from django.test import RequestFactory
+
+from app_mcp_tool_registry import views
+from app_mcp_tool_registry.models import ClientApp
+
+
+@pytest.fixture
+def client_app(monkeypatch):
+    with connection.schema_editor() as editor:
+        editor.create_model(ClientApp)
+    monkeypatch.setattr(views, "registry_version", lambda: "7")
+    yield ClientApp.objects.create(key="vitrinezap", name="VitrineZap", api_key="secret")
+    with connection.schema_editor() as editor:
+        editor.delete_model(ClientApp)
+
+
+def _resolve(**headers):
+    request = RequestFactory().post(
+        "/core/tools/resolve/",
+        data=json.dumps({"tool": "vitrinezap.analisar_produto"}),
+        content_type="application/json",
+        **{f"HTTP_{k}": v for k, v in headers.items()},
+    )
+    return views.resolve_tool(request)
+
+
+class TestResolveEtag:
+    def test_current_etag_with_valid_key_is_304(self, client_app):
+        response = _resolve(IF_NONE_MATCH='"7"', X_SINAPUM_KEY="secret")
+        assert response.status_code == 304
+        assert response["ETag"] == '"7"'
+
+    def test_current_etag_without_key_is_rejected(self, client_app):
+        assert _resolve(IF_NONE_MATCH='"7"').status_code == 401
+        assert _resolve(IF_NONE_MATCH='"7"', X_SINAPUM_KEY="wrong").status_code == 401
@@ -0,0 +1,41 @@
+"""
+Testes unitários dos validadores JSON Schema pré-compilados do MCP Tool Registry.
+"""
+import sys
+from pathlib import Path
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from app_mcp_tool_registry import schema_validation
+from app_mcp_tool_registry.schema_validation import CompiledValidator, get_validator
+
+SCHEMA = {
+    "type": "object",
+    "required": ["query"],
+    "properties": {"query": {"type": "string"}, "k": {"type": "integer"}},
+}
+
+
+class TestSchemaValidation:
+    def test_validator_is_compiled_once_per_tool_version_and_schema(self):
+        first = get_validator(SCHEMA, "core.rag_query", "1.0.0")
+        assert get_validator(dict(SCHEMA), "core.rag_query", "1.0.0") is first
+        assert get_validator(SCHEMA, "core.rag_query", "2.0.0") is not first
+        assert schema_validation.validator_cache_stats()["hits"] >= 1
+
+    def test_first_error_reports_message_and_path(self):
+        validator = CompiledValidator(SCHEMA, backend="jsonschema")
+        assert validator.first_error({"query": "oi"}) is None
+        message, path = validator.first_error({"query": "oi", "k": "5"})
+        assert "integer" in message and path == ["k"]
+        message, path = validator.first_error({})
+        assert "'query' is a required property" == message
+
+    def test_invalid_schema_is_not_compiled(self):
+        assert get_validator({"type": 12}) is None
+
+    def test_fast_backend_falls_back_when_unavailable(self, monkeypatch):
+        monkeypatch.setattr(schema_validation, "fastjsonschema", None)
+        assert CompiledValidator(SCHEMA, backend="fastjsonschema").backend == "jsonschema"
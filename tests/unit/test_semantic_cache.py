@@ -0,0 +1,133 @@
+"""
+Testes unitários do cache semântico: KNN filtrado por tenant, versão do schema no nome do
+índice e eviction por tamanho/idade.
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from core.services.semantic_cache_service import cache
+
+
+class FakeTag:
+    """Expressão de tag mínima (redisvl não está instalado aqui): guarda as cláusulas."""
+
+    def __init__(self, field, clauses=None):
+        self.field = field
+        self.clauses = clauses or []
+
+    def __eq__(self, value):
+        return FakeTag(self.field, [(self.field, value)])
+
+    def __and__(self, other):
+        return FakeTag(None, self.clauses + other.clauses)
+
+
+class FakeIndex:
+    """Índice em memória que aplica o filtro de tags como o RediSearch."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.client = None
+
+    def query(self, query):
+        wanted = dict(query.filter_expression.clauses)
+        return [
+            {"vector_distance": 0.01, **doc}
+            for doc in self.docs
+            if all(doc.get(field) == value for field, value in wanted.items())
+        ]
+
+
+class FakeVectorQuery:
+    def __init__(self, vector, vector_field_name, return_fields, num_results, filter_expression):
+        self.filter_expression = filter_expression
+
+
+@pytest.fixture
+def semantic(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    monkeypatch.setattr(cache, "Tag", FakeTag)
+    monkeypatch.setattr(cache, "VectorQuery", FakeVectorQuery)
+    monkeypatch.setattr(cache, "embed_text", lambda texts: [[1.0, 0.0] for _ in texts])
+    now = int(time.time())
+    docs = [
+        {"response": "resposta t1", "route": "orbital", "channel": "whatsapp", "tenant_id": "t1", "created_at": now},
+        {"response": "resposta t2", "route": "orbital", "channel": "whatsapp", "tenant_id": "t2", "created_at": now},
+    ]
+    monkeypatch.setattr(cache, "_get_index", lambda shard="": FakeIndex(docs))
+    return docs
+
+
+def _ctx(tenant):
+    return {"tenant_id": tenant, "route": "orbital", "channel": "whatsapp"}
+
+
+class TestSemanticCacheTenantFilter:
+    def test_only_same_tenant_entries_answer(self, semantic):
+        assert cache.semantic_query("quanto tempo falta", _ctx("t1")) == "resposta t1"
+        assert cache.semantic_query("quanto tempo falta", _ctx("t2")) == "resposta t2"
+        assert cache.semantic_query("quanto tempo falta", _ctx("t3")) is None
+
+    def test_missing_tenant_does_not_match_other_tenants(self, semantic):
+        assert cache.semantic_query("quanto tempo falta", _ctx("")) is None
+        expr = cache._filter_expression(_ctx(""))
+        assert ("tenant_id", cache._EMPTY_TAG) in expr.clauses
+
+    def test_entries_older_than_max_age_are_ignored(self, semantic, monkeypatch):
+        monkeypatch.setenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "60")
+        semantic[0]["created_at"] = int(time.time()) - 3600
+        assert cache.semantic_query("quanto tempo falta", _ctx("t1")) is None
+
+
+class TestSemanticCacheSchemaVersion:
+    def test_schema_change_uses_new_index(self, monkeypatch):
+        monkeypatch.setenv("SEMANTIC_CACHE_VECTOR_ALGORITHM", "hnsw")
+        hnsw = cache._index_names("")
+        monkeypatch.setenv("SEMANTIC_CACHE_VECTOR_ALGORITHM", "flat")
+        flat = cache._index_names("")
+        assert hnsw != flat
+        assert hnsw[0].startswith("vz_semantic_cache:s") and hnsw[1].startswith("vz:cache:s")
+        assert cache._index_names("t1")[0] == f"{flat[0]}:t1"
+
+
+class TestSemanticCacheEviction:
+    @pytest.fixture
+    def index(self):
+        fakeredis = pytest.importorskip("fakeredis")
+
+        class Index:
+            client = fakeredis.FakeRedis()
+
+        return Index()
+
+    def _fill(self, index, ages):
+        lru = cache._lru_key("")
+        now = time.time()
+        for i, age in enumerate(ages):
+            key = f"doc:{i}"
+            index.client.hset(key, mapping={"response": str(i)})
+            index.client.zadd(lru, {key: now - age})
+        return lru
+
+    def test_size_limit_drops_oldest(self, index, monkeypatch):
+        monkeypatch.setenv("SEMANTIC_CACHE_MAX_ENTRIES", "3")
+        monkeypatch.setenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "0")
+        lru = self._fill(index, [50, 40, 30, 20, 10])
+        cache._evict(index, "")
+        assert index.client.zrange(lru, 0, -1) == [b"doc:2", b"doc:3", b"doc:4"]
+        assert not index.client.exists("doc:0", "doc:1")
+
+    def test_age_limit_drops_expired(self, index, monkeypatch):
+        monkeypatch.setenv("SEMANTIC_CACHE_MAX_ENTRIES", "100")
+        monkeypatch.setenv("SEMANTIC_CACHE_MAX_AGE_SECONDS", "60")
+        lru = self._fill(index, [600, 120, 5])
+        cache._evict(index, "")
+        assert index.client.zrange(lru, 0, -1) == [b"doc:2"]
+        assert index.client.exists("doc:2") == 1
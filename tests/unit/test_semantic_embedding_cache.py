@@ -0,0 +1,102 @@
+"""
+Testes unitários do cache de embeddings do semantic_cache_service.
+"""
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from core.services.semantic_cache_service import embeddings
+from core.services.semantic_cache_service.embeddings import EmbeddingCache, cache_key
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class TestEmbeddingCache:
+    def test_key_ignores_whitespace_differences(self):
+        assert cache_key("m", "  oi   tudo bem ") == cache_key("m", "oi tudo bem")
+        assert cache_key("m", "oi") != cache_key("outro", "oi")
+
+    def test_lru_evicts_oldest(self):
+        cache = EmbeddingCache(max_size=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+        assert cache.get("b") is None
+        assert cache.get("a").tolist() == [1.0]
+
+    def test_expired_entry_is_a_miss(self):
+        cache = EmbeddingCache(ttl_seconds=-1)
+        cache.put("a", [1.0])
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_redis_tier_serves_other_process(self):
+        redis = _FakeRedis()
+        EmbeddingCache(redis_client=redis).put("k", [0.5, 0.25])
+        other = EmbeddingCache(redis_client=redis)
+        assert other.get("k").tolist() == [0.5, 0.25]
+        assert other.stats()["redis_hits"] == 1
+
+    def test_embed_text_only_encodes_misses(self):
+        embeddings._CACHE = EmbeddingCache()
+        calls = []
+
+        def fake_encode(texts):
+            calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        try:
+            with patch.object(embeddings, "_encode_local", side_effect=fake_encode):
+                first = embeddings.embed_text(["oi", "menu"])
+                second = embeddings.embed_text(["oi ", "cardápio"])
+        finally:
+            stats = embeddings.embedding_cache_stats()
+            embeddings._CACHE = None
+        assert first == [[2.0], [4.0]]
+        assert second == [[2.0], [8.0]]
+        assert calls == [["oi", "menu"], ["cardápio"]]
+        assert stats["hits"] == 1
+
+    def test_encoder_receives_original_text(self):
+        embeddings._CACHE = EmbeddingCache()
+        calls = []
+
+        def fake_encode(texts):
+            calls.append(list(texts))
+            return [[1.0] for _ in texts]
+
+        try:
+            with patch.object(embeddings, "_encode_local", side_effect=fake_encode):
+                embeddings.embed_text(["  oi   tudo bem\n"])
+                embeddings.embed_text(["oi tudo bem"])
+        finally:
+            embeddings._CACHE = None
+        assert calls == [["  oi   tudo bem\n"]]
+
+    def test_uses_the_shared_cache_module(self):
+        from sinapum_shared import embedding_cache
+
+        assert EmbeddingCache is embedding_cache.EmbeddingCache
+
+    def test_redis_tier_uses_the_shared_client(self):
+        sentinel = object()
+        env = {"SEMANTIC_EMBED_CACHE_REDIS": "true", "SEMANTIC_EMBED_CACHE_REDIS_URL": "redis://cache:6379/3"}
+        with patch.dict("os.environ", env), patch(
+            "services.redis_client.client_for_url", return_value=sentinel
+        ) as client_for_url:
+            assert embeddings._cache_redis_client() is sentinel
+        client_for_url.assert_called_once_with("redis://cache:6379/3", decode_responses=False)
@@ -0,0 +1,83 @@
+"""
+Testes unitários do buffer de ToolCallLog (bulk_create em lote, fallback registo a registo).
+"""
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from django.db import DatabaseError, connection
+
+from app_mcp_tool_registry.log_sink import ToolCallLogSink
+from app_mcp_tool_registry.models import ToolCallLog
+
+
+@pytest.fixture
+def db():
+    with connection.schema_editor() as editor:
+        editor.create_model(ToolCallLog)
+    yield
+    with connection.schema_editor() as editor:
+        editor.delete_model(ToolCallLog)
+
+
+def _sink(**kwargs):
+    sink = ToolCallLogSink(**kwargs)
+    # sem thread de fundo: os testes chamam flush()
+    sink._ensure_thread = lambda: None
+    return sink
+
+
+class TestToolCallLogSink:
+    def test_flush_writes_in_batches(self, db):
+        sink = _sink(batch_size=2)
+        for i in range(5):
+            sink.submit(request_id=f"r{i}", tool="t", version="1")
+        assert sink.flush() == 5
+        assert ToolCallLog.objects.count() == 5
+        assert sink.stats["batches"] == 3
+
+    def test_failed_bulk_create_falls_back_to_row_inserts(self, db):
+        sink = _sink(batch_size=10)
+        for i in range(3):
+            sink.submit(request_id=f"r{i}", tool="t", version="1")
+        # um registo inválido (NOT NULL) estraga o lote inteiro no bulk_create
+        sink._queue.queue[1].tool = None
+
+        assert sink.flush() == 2
+        assert sorted(ToolCallLog.objects.values_list("request_id", flat=True)) == ["r0", "r2"]
+        assert sink.stats["row_fallback"] == 1
+        assert sink.stats["dropped"] == 1
+
+    def test_transient_bulk_error_loses_nothing(self, db):
+        sink = _sink()
+        sink.submit(request_id="r0", tool="t", version="1")
+        with patch.object(ToolCallLog.objects, "bulk_create", side_effect=DatabaseError("gone")):
+            assert sink.flush() == 1
+        assert ToolCallLog.objects.count() == 1
+        assert sink.stats["errors"] == 1 and sink.stats["dropped"] == 0
+
+
+class TestBulkLogEndpoint:
+    def _post(self, entries):
+        from django.test import RequestFactory
+
+        from app_mcp_tool_registry.views import log_tool_calls_bulk
+
+        request = RequestFactory().post(
+            "/core/tools/log/bulk/", data=json.dumps({"entries": entries}), content_type="application/json"
+        )
+        return json.loads(log_tool_calls_bulk(request).content)
+
+    def test_bad_entry_does_not_drop_the_batch(self, db):
+        entries = [{"request_id": f"r{i}", "tool": "t", "version": "1"} for i in range(3)]
+        entries[1]["status_code"] = "not-a-number"
+
+        assert self._post(entries) == {"ok": True, "count": 2, "failed": 1}
+        assert sorted(ToolCallLog.objects.values_list("request_id", flat=True)) == ["r0", "r2"]
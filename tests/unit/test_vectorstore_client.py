@@ -0,0 +1,64 @@
+"""
+Testes unitários do cliente do vectorstore: fallback de /search_multi para servidores antigos.
+"""
+import importlib.util
+from pathlib import Path
+
+_root = Path(__file__).resolve().parents[2]
+_spec = importlib.util.spec_from_file_location(
+    "vectorstore_client", _root / "core" / "services" / "vectorstore_client.py"
+)
+vectorstore_client = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(vectorstore_client)
+
+INDEX = [
+    {"id": "tenant:t1:a", "score": 0.9},
+    {"id": "tenant:t2:b", "score": 0.95},
+    {"id": "mrfoo:c", "score": 0.7},
+    {"id": "mrfoo:d", "score": 0.4},
+    {"id": "global:e", "score": 0.8},
+]
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def json(self):
+        return self._payload
+
+
+class OldServer:
+    """Servidor sem /search_multi; /search filtra por id_prefix e devolve o top-k."""
+
+    def __init__(self):
+        self.searches = []
+
+    def post(self, url, json=None, timeout=None):
+        if url.endswith("/search_multi"):
+            return FakeResponse(404)
+        prefix = json.get("id_prefix", "")
+        self.searches.append(prefix)
+        hits = sorted((h for h in INDEX if h["id"].startswith(prefix)), key=lambda h: -h["score"])
+        return FakeResponse(200, {"results": hits[: json["k"]]})
+
+
+class TestSearchMultiFallback:
+    def test_list_prefixes_stay_scoped(self, monkeypatch):
+        server = OldServer()
+        monkeypatch.setattr(vectorstore_client, "_http", lambda: server)
+        out = vectorstore_client.vectorstore_search_multi(
+            "pedido atrasado",
+            {"tenant": ["tenant:t1:"], "mrfoo": ["mrfoo:", "tenant:t1:"], "global": [], "legacy": "mrfoo:"},
+            k=2,
+        )
+        assert [h["id"] for h in out["tenant"]] == ["tenant:t1:a"]
+        assert [h["id"] for h in out["mrfoo"]] == ["tenant:t1:a", "mrfoo:c"]
+        assert [h["id"] for h in out["global"]] == ["tenant:t2:b", "tenant:t1:a"]
+        assert [h["id"] for h in out["legacy"]] == ["mrfoo:c", "mrfoo:d"]
+        assert sorted(server.searches) == sorted(["tenant:t1:", "mrfoo:", "tenant:t1:", "", "mrfoo:"])